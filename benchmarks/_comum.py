@@ -0,0 +1,47 @@
+"""
+Utilitários compartilhados pelos benchmarks do SISD.
+
+Responsabilidades:
+- Colocar ``src/`` no ``sys.path`` ao ser importado, para que os benchmarks importem os
+  módulos do sistema (``common``, ``client``, ``cloud``...).
+- Calcular percentis das amostras medidas.
+- Gravar os resultados em JSON com data, versão do Python e plataforma.
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(RAIZ, "src")
+PROTOS = os.path.join(SRC, "middleware", "protos")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+
+def percentil(valores, p):
+    """
+    Percentil ``p`` (0-100) pelo posto mais próximo; None sem amostras.
+    """
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def grava_resultados(caminho, benchmark, parametros, resultados):
+    """
+    Grava os resultados de um benchmark em ``caminho`` (JSON).
+    """
+    with open(caminho, "w") as arquivo:
+        json.dump({
+            "benchmark": benchmark,
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "parametros": parametros,
+            "resultados": resultados,
+        }, arquivo, indent=2)
+    print(f"Resultados gravados em {caminho}")
@@ -0,0 +1,134 @@
+"""
+Benchmark da agregação em fluxo do cliente do SISD.
+
+Alimenta o ``Agregador`` (``src/client/agregacao.py``) com leituras sintéticas de vários
+sensores, num relógio simulado, e mede:
+
+- o custo por leitura de ``registra`` (Welford na janela de 1 s, janelas maiores por
+  combinação das fechadas);
+- o volume que iria para o cloud replicando cada leitura bruta vs. só os agregados das
+  resoluções replicadas (entradas e bytes JSON, no formato de ``registrar_mensagem``);
+- a exatidão: agregados de 1 min e janela deslizante conferidos contra o cálculo direto
+  sobre as leituras guardadas.
+
+Uso:
+    python benchmarks/agregacao_cliente.py [--sensores 3] [--taxa 100] [--duracao 7200]
+                                           [--resolucoes 1min,1h] [--semente 1] [--saida resultado.json]
+"""
+
+import argparse
+import json
+import math
+import random
+import time
+
+from _comum import grava_resultados, percentil
+
+from client.agregacao import GRANDEZAS, Agregador
+
+
+def gera_leituras(args, aleatorio):
+    """
+    Leituras intercaladas dos sensores, ``taxa`` por segundo cada, como passeio aleatório.
+    """
+    atuais = [[25.0, 55.0, 1005.0] for _ in range(args.sensores)]
+    leituras = []
+    for i in range(int(args.duracao * args.taxa)):
+        instante = i / args.taxa
+        for s, atual in enumerate(atuais):
+            for j in range(3):
+                atual[j] += aleatorio.gauss(0, 0.1)
+            leituras.append((f"sensor_{s}", round(atual[0], 1), round(atual[1], 1), round(atual[2], 1), instante))
+    return leituras
+
+
+def exato(valores):
+    media = math.fsum(valores) / len(valores)
+    return {"min": min(valores), "max": max(valores), "media": media,
+            "desvio": math.sqrt(math.fsum((v - media) ** 2 for v in valores) / len(valores))}
+
+
+def confere(agregado, leituras, tolerancia=1e-6):
+    if agregado["n"] != len(leituras):
+        return False
+    for j, grandeza in enumerate(GRANDEZAS):
+        esperado = exato([leitura[1 + j] for leitura in leituras])
+        if any(abs(agregado[grandeza][k] - esperado[k]) > tolerancia for k in esperado):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da agregação em fluxo do cliente")
+    parser.add_argument("--sensores", type=int, default=3)
+    parser.add_argument("--taxa", type=float, default=100, help="leituras/s por sensor")
+    parser.add_argument("--duracao", type=float, default=7200, help="segundos simulados")
+    parser.add_argument("--resolucoes", default="1min,1h", help="resoluções replicadas")
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    leituras = gera_leituras(args, random.Random(args.semente))
+    replicadas = set(args.resolucoes.split(","))
+    fechados = []
+    agregador = Agregador(ao_fechar=fechados.append)
+
+    tempos = []
+    for sensor, temperatura, umidade, pressao, instante in leituras:
+        inicio = time.perf_counter()
+        agregador.registra(sensor, temperatura, umidade, pressao, instante)
+        tempos.append(time.perf_counter() - inicio)
+    agregador.fecha_vencidas(args.duracao + 3600)
+    desempenho = {
+        "p50_us": round(percentil(tempos, 50) * 1e6, 2),
+        "p99_us": round(percentil(tempos, 99) * 1e6, 2),
+        "media_us": round(sum(tempos) / len(tempos) * 1e6, 2),
+        "leituras_por_s": round(len(tempos) / sum(tempos)),
+    }
+
+    # Volume de replicação: uma entrada por leitura vs. uma por agregado replicado
+    bytes_brutas = sum(len(json.dumps({"id": "127.0.0.1:5000", "timestamp": instante,
+                                       "mensagem": f"{t:.1f},{u:.1f},{p:.1f}"}).encode())
+                       for _, t, u, p, instante in leituras)
+    agregados = [a for a in fechados if a["resolucao"] in replicadas and a["n"]]
+    bytes_agregados = sum(len(json.dumps({"id": "client", "timestamp": a["fim"], "mensagem": "[Agregado]",
+                                          "agregado": a}).encode()) for a in agregados)
+    volume = {
+        "entradas_brutas": len(leituras), "bytes_brutas": bytes_brutas,
+        "entradas_agregados": len(agregados), "bytes_agregados": bytes_agregados,
+        "reducao_bytes": round(bytes_brutas / max(bytes_agregados, 1), 1),
+    }
+
+    # Exatidão: janelas de 1 min do primeiro sensor e uma janela deslizante de 90 s
+    sensor = "sensor_0"
+    do_sensor = [leitura for leitura in leituras if leitura[0] == sensor]
+    minutos = [a for a in fechados if a["sensor"] == sensor and a["resolucao"] == "1min"]
+    minutos_ok = all(confere(a, [leit for leit in do_sensor if a["inicio"] <= leit[4] < a["fim"]])
+                     for a in minutos)
+    verificador = Agregador()
+    agora = math.floor(args.duracao / 2)
+    for leitura in do_sensor:
+        if leitura[4] >= agora:
+            break
+        verificador.registra(*leitura)
+    deslizante = verificador.deslizante(sensor, 90, agora)
+    deslizante_ok = confere(deslizante, [leit for leit in do_sensor if agora - 90 <= leit[4] < agora])
+    exatidao = {"janelas_1min": len(minutos), "janelas_1min_conferem": minutos_ok,
+                "deslizante_90s_confere": deslizante_ok}
+
+    print(f"{len(leituras)} leituras ({args.sensores} sensores × {args.taxa:g}/s × {args.duracao:g} s simulados)")
+    print(f"  registra: p50 {desempenho['p50_us']} µs, p99 {desempenho['p99_us']} µs por leitura "
+          f"({desempenho['leituras_por_s']} leituras/s)")
+    print(f"  replicação bruta: {volume['entradas_brutas']} entradas, {volume['bytes_brutas']} bytes")
+    print(f"  replicação de agregados ({args.resolucoes}): {volume['entradas_agregados']} entradas, "
+          f"{volume['bytes_agregados']} bytes ({volume['reducao_bytes']}x menos)")
+    print(f"  {len(minutos)} janelas de 1 min conferem com o cálculo direto: {minutos_ok}")
+    print(f"  janela deslizante de 90 s confere com o cálculo direto: {deslizante_ok}")
+
+    if args.saida:
+        grava_resultados(args.saida, "agregacao_cliente", vars(args),
+                         {"desempenho": desempenho, "volume": volume, "exatidao": exatidao})
+
+
+if __name__ == "__main__":
+    main()
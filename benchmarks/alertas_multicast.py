@@ -0,0 +1,152 @@
+"""
+Benchmark dos alertas multicast do SISD em loopback.
+
+Publica uma rajada de alertas de vários sensores o mais rápido possível e compara:
+
+- o envio antigo: um socket UDP novo por alerta, com o alerta em texto;
+- ``PublicadorAlertas``: socket de longa duração e alertas binários agrupados em
+  datagramas, sem repetição, com cada lote enviado duas vezes e com as duas rodadas
+  cadenciadas em ``--taxa`` datagramas/s.
+
+Para cada modo mede alertas/s publicados e recebidos, datagramas enviados, a perda
+observada (alertas que não chegaram ao assinante) e, nos modos novos, se a perda
+detectada pelas lacunas de sequência do assinante bate com a perda real.
+
+Uso:
+    python benchmarks/alertas_multicast.py [--alertas 50000] [--sensores 10] [--porta 15007]
+                                           [--buffer-recepcao 262144] [--taxa 20000]
+                                           [--saida resultado.json]
+"""
+
+import argparse
+import socket
+import struct
+import threading
+import time
+
+from _comum import grava_resultados
+
+from multicast.sensor_alert import (MCAST_GRP, SEVERIDADE_CRITICO, AssinanteAlertas,
+                                    PublicadorAlertas)
+
+
+def aguarda_silencio(contador, silencio=0.5, limite=30.0):
+    """
+    Espera até o contador parar de mudar por ``silencio`` segundos; retorna o instante da
+    última mudança.
+    """
+    fim = time.monotonic() + limite
+    ultimo_valor, ultima_mudanca = contador(), time.monotonic()
+    while time.monotonic() < fim:
+        time.sleep(0.05)
+        valor = contador()
+        if valor != ultimo_valor:
+            ultimo_valor, ultima_mudanca = valor, time.monotonic()
+        elif time.monotonic() - ultima_mudanca >= silencio:
+            break
+    return ultima_mudanca
+
+
+def envia_legado(mensagem, porta):
+    # Como o enviar_alerta antigo: um socket por alerta
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, struct.pack("b", 1))
+    try:
+        sock.sendto(mensagem.encode("utf-8"), (MCAST_GRP, porta))
+    finally:
+        sock.close()
+
+
+def mede_legado(args):
+    assinante = AssinanteAlertas(porta=args.porta, buffer_recepcao=args.buffer_recepcao)
+    recebidos = [0]
+    ativo = [True]
+
+    def recebe():
+        while ativo[0]:
+            try:
+                assinante._sock.recvfrom(65535)
+                recebidos[0] += 1
+            except socket.timeout:
+                continue
+
+    t = threading.Thread(target=recebe, daemon=True)
+    t.start()
+    inicio = time.monotonic()
+    for i in range(args.alertas):
+        envia_legado(f"ALERTA sensor_{5000 + i % args.sensores}: condição climática extrema "
+                     f"41.2,9.8,970.1|{i}", args.porta)
+    publicacao = time.monotonic() - inicio
+    ultima = aguarda_silencio(lambda: recebidos[0])
+    ativo[0] = False
+    t.join()
+    assinante._sock.close()
+    return resume(args, publicacao, ultima - inicio, recebidos[0], args.alertas)
+
+
+def mede_publicador(args, repeticoes, taxa_max):
+    assinante = AssinanteAlertas(porta=args.porta, janela_repeticao=0,
+                                 buffer_recepcao=args.buffer_recepcao).inicia()
+    publicador = PublicadorAlertas(porta=args.porta, repeticoes=repeticoes, taxa_max=taxa_max,
+                                   intervalo_resumo=0.2)
+    inicio = time.monotonic()
+    for i in range(args.alertas):
+        publicador.publica(5000 + i % args.sensores, SEVERIDADE_CRITICO, 41.2, 9.8, 970.1, regra=1)
+    publicador.descarrega(timeout=60)
+    publicacao = time.monotonic() - inicio
+    # Deixa sair um resumo, para que a perda no fim da rajada também seja detectada
+    time.sleep(0.3)
+    ultima = aguarda_silencio(lambda: assinante.estatisticas().get("entregues", 0))
+    publicador.fecha()
+    assinante.para()
+    estatisticas = assinante.estatisticas()
+    resultado = resume(args, publicacao, ultima - inicio, estatisticas.get("entregues", 0),
+                       publicador.estatisticas()["datagramas"])
+    resultado["perda_detectada"] = estatisticas.get("perdidos", 0)
+    resultado["duplicados_descartados"] = estatisticas.get("duplicados", 0)
+    return resultado
+
+
+def resume(args, publicacao, recepcao, recebidos, datagramas):
+    return {
+        "publicados_por_s": round(args.alertas / publicacao),
+        "recebidos_por_s": round(recebidos / max(recepcao, 1e-9)),
+        "datagramas": datagramas,
+        "recebidos": recebidos,
+        "perdidos": args.alertas - recebidos,
+        "perda_pct": round(100 * (args.alertas - recebidos) / args.alertas, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos alertas multicast em loopback")
+    parser.add_argument("--alertas", type=int, default=50000)
+    parser.add_argument("--sensores", type=int, default=10)
+    parser.add_argument("--porta", type=int, default=15007)
+    parser.add_argument("--buffer-recepcao", type=int, default=256 * 1024,
+                        help="SO_RCVBUF do assinante (limitado por net.core.rmem_max)")
+    parser.add_argument("--taxa", type=float, default=20000, help="datagramas/s no modo cadenciado")
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    resultados = {
+        "legado": mede_legado(args),
+        "lote": mede_publicador(args, repeticoes=1, taxa_max=0),
+        "lote_repetido": mede_publicador(args, repeticoes=2, taxa_max=0),
+        "lote_cadenciado": mede_publicador(args, repeticoes=2, taxa_max=args.taxa),
+    }
+    print(f"Rajada de {args.alertas} alertas de {args.sensores} sensores:")
+    for nome, resultado in resultados.items():
+        linha = (f"  {nome:15s}: publicados {resultado['publicados_por_s']} alertas/s, "
+                 f"recebidos {resultado['recebidos_por_s']} alertas/s, {resultado['datagramas']} datagramas, "
+                 f"perda {resultado['perdidos']} ({resultado['perda_pct']}%)")
+        if "perda_detectada" in resultado:
+            linha += f", perda detectada pelas sequências {resultado['perda_detectada']}"
+        print(linha)
+
+    if args.saida:
+        grava_resultados(args.saida, "alertas_multicast", vars(args), resultados)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Benchmark do anel de token do SISD.
+
+Sobe N sensores reais (``src/sensor/sensor.py``, um subprocesso por sensor) em loopback,
+configurados por variáveis de ambiente, conecta um cliente a todos com o motor de
+ingestão, injeta o token como ``enviar_token_para_maior_id`` faz (texto "TOKEN" na porta
+de token do maior id) e mede, pelo que chega ao cliente:
+
+- leituras/s entregues;
+- tempo de rotação do token (p50/p99): entre o início de duas posses do mesmo sensor;
+- latência de troca (p50/p99/p99.9): da última leitura de uma posse à primeira leitura
+  da posse seguinte, em outro sensor.
+
+Cada leitura percorre o caminho real do sensor (``enviar_dados``: trava do snapshot,
+log local, replicação, regras) e cada troca passa por ``pass_token``/``AnelToken``.
+Os dados dos sensores (logs, snapshots e chaves) ficam em um diretório temporário;
+a replicação aponta para uma porta fechada e as entradas vão para o spill.
+
+Uso:
+    python benchmarks/anel_token.py [--tamanhos 3,10,30] [--duracao 5] [--max-leituras 1]
+                                    [--porta-base 21000] [--saida resultado.json]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from _comum import SRC, grava_resultados, percentil
+
+from client.ingestao import MotorIngestao
+from common.framing import TIPO_LEITURA
+
+SENSOR = os.path.join(SRC, "sensor", "sensor.py")
+DESLOCAMENTO_TOKEN = 2000   # mesma convenção do sensor: porta de token = porta base + 2000
+ESPACAMENTO = 10            # o sensor também usa porta + 1 (Bully), + 1000 e + 3000
+
+
+def ambiente_sensor(portas, dados, max_leituras):
+    """
+    Variáveis de ambiente de um sensor do anel de benchmark.
+    """
+    ambiente = dict(os.environ)
+    ambiente.update({
+        "PYTHONPATH": os.pathsep.join([SRC, os.path.join(SRC, "middleware", "protos")]),
+        "PYTHONUNBUFFERED": "1",
+        "SISD_SENSORES_CONHECIDOS": ",".join(f"sensor_{p}=127.0.0.1:{p + 1}" for p in portas),
+        "SISD_SENSOR_DADOS": dados,
+        "SISD_CHAVES_DIR": os.path.join(dados, "chaves"),
+        "SISD_CLOUD_URL": "http://127.0.0.1:9",
+        # Sempre há uma leitura devida: o anel, e não o intervalo entre leituras, dita o ritmo
+        "SISD_TAXA_LEITURAS": "1000000",
+        "SISD_TOKEN_MAX_LEITURAS": str(max_leituras),
+        "SISD_TOKEN_MAX_POSSE_MS": "",
+        # Sem regeneração durante a medição: o token nunca é perdido em loopback
+        "SISD_TOKEN_TIMEOUT_PERDA": "1000000000",
+        "SISD_TOKEN_TIMEOUT_ACK": "5",
+    })
+    return ambiente
+
+
+def aguarda(condicao, timeout, mensagem):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        if condicao():
+            return
+        time.sleep(0.05)
+    raise RuntimeError(mensagem)
+
+
+def porta_aberta(porta):
+    try:
+        socket.create_connection(("127.0.0.1", porta), timeout=0.2).close()
+        return True
+    except OSError:
+        return False
+
+
+def injeta_token(portas):
+    """
+    Injeta o token como o cliente: texto "TOKEN" na porta de token do sensor de maior id.
+    """
+    s = socket.create_connection(("127.0.0.1", max(portas) + DESLOCAMENTO_TOKEN))
+    s.sendall("TOKEN".encode())
+    s.close()
+
+
+def posses(chegadas):
+    """
+    Agrupa as chegadas ``(instante, porta)`` em posses consecutivas do mesmo sensor:
+    ``[(porta, primeira, ultima), ...]``.
+    """
+    grupos = []
+    for instante, porta in chegadas:
+        if grupos and grupos[-1][0] == porta:
+            grupos[-1][2] = instante
+        else:
+            grupos.append([porta, instante, instante])
+    return grupos
+
+
+def executa_rodada(n, porta_base, duracao, max_leituras):
+    portas = [porta_base + ESPACAMENTO * i for i in range(n)]
+    chegadas = []
+
+    def processa_quadro(host, porta, tipo, payload):
+        if tipo == TIPO_LEITURA:
+            chegadas.append((time.perf_counter(), porta))
+
+    dados = tempfile.mkdtemp(prefix="sisd_anel_")
+    processos = []
+    motor = None
+    # As mensagens do motor de ingestão não se misturam à tabela de resultados
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            for porta in portas:
+                processos.append(subprocess.Popen(
+                    [sys.executable, SENSOR, str(porta)], env=ambiente_sensor(portas, dados, max_leituras),
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            aguarda(lambda: all(porta_aberta(p + DESLOCAMENTO_TOKEN) for p in portas), 60,
+                    "Sensores não abriram as portas do anel")
+            motor = MotorIngestao(processa_quadro, lambda *args: None, backoff_inicial=0.05, backoff_max=0.5)
+            motor.inicia([{"host": "127.0.0.1", "porta": p} for p in portas])
+            aguarda(lambda: len(motor.conectados()) == n, 30, "Cliente não conectou a todos os sensores")
+            time.sleep(0.5)
+            injeta_token(portas)
+            time.sleep(min(2.0, duracao / 2))   # aquecimento: ao menos algumas rotações
+
+            inicio_indice = len(chegadas)
+            inicio = time.perf_counter()
+            time.sleep(duracao)
+            decorrido = time.perf_counter() - inicio
+            medidas = chegadas[inicio_indice:]
+        finally:
+            if motor is not None:
+                motor.atualiza_sensores([])
+                time.sleep(0.1)
+                motor.loop.call_soon_threadsafe(motor.loop.stop)
+            for processo in processos:
+                processo.terminate()
+            for processo in processos:
+                processo.wait(timeout=10)
+            shutil.rmtree(dados, ignore_errors=True)
+
+    grupos = posses(medidas)
+    trocas = [seguinte[1] - atual[2] for atual, seguinte in zip(grupos, grupos[1:])]
+    inicios = {}
+    rotacoes = []
+    for porta, primeira, _ in grupos:
+        if porta in inicios:
+            rotacoes.append(primeira - inicios[porta])
+        inicios[porta] = primeira
+
+    def ms(valor):
+        return round(valor * 1000, 3) if valor is not None else None
+
+    return {
+        "n": n,
+        "max_leituras": max_leituras,
+        "duracao_s": round(decorrido, 3),
+        "leituras_por_s": round(len(medidas) / decorrido, 1),
+        "passagens_por_s": round(len(trocas) / decorrido, 1),
+        "rotacoes_por_s": round(len(trocas) / n / decorrido, 2),
+        "rotacao_p50_ms": ms(percentil(rotacoes, 50)),
+        "rotacao_p99_ms": ms(percentil(rotacoes, 99)),
+        "troca_p50_ms": ms(percentil(trocas, 50)),
+        "troca_p99_ms": ms(percentil(trocas, 99)),
+        "troca_p999_ms": ms(percentil(trocas, 99.9)),
+        "troca_max_ms": ms(max(trocas) if trocas else None),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do anel de token do SISD")
+    parser.add_argument("--tamanhos", default="3,10,30", help="tamanhos de anel separados por vírgula")
+    parser.add_argument("--duracao", type=float, default=5.0, help="segundos de medição por tamanho")
+    parser.add_argument("--max-leituras", type=int, default=1, help="leituras por posse do token")
+    parser.add_argument("--porta-base", type=int, default=21000)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    resultados = []
+    porta_base = args.porta_base
+    print(f"{'N':>5} {'leituras/s':>11} {'rotações/s':>11} {'rotação p50':>12} {'rotação p99':>12} "
+          f"{'troca p50':>10} {'troca p99':>10} {'troca p99.9':>12}")
+    for n in (int(t) for t in args.tamanhos.split(",")):
+        r = executa_rodada(n, porta_base, args.duracao, args.max_leituras)
+        resultados.append(r)
+        print(f"{n:>5} {r['leituras_por_s']:>11} {r['rotacoes_por_s']:>11} {r['rotacao_p50_ms']:>10}ms "
+              f"{r['rotacao_p99_ms']:>10}ms {r['troca_p50_ms']:>8}ms {r['troca_p99_ms']:>8}ms "
+              f"{r['troca_p999_ms']:>10}ms")
+        # Cada rodada usa uma faixa de portas nova (portas em TIME_WAIT da rodada anterior)
+        porta_base += ESPACAMENTO * (n + 1)
+
+    if args.saida:
+        parametros = {"duracao": args.duracao, "max_leituras": args.max_leituras}
+        grava_resultados(args.saida, "anel_token", parametros, resultados)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark do canal seguro entre cliente e sensor do SISD.
+
+Mede, no mesmo processo (custo de CPU, sem rede):
+
+- handshakes/s do esquema antigo (segredo cifrado com RSA-OAEP pelo cliente e decifrado
+  pelo sensor a cada conexão);
+- handshakes/s do canal seguro completo (X25519 + assinatura RSA-PSS do sensor);
+- handshakes/s com retomada por ticket (sem operação com a chave privada);
+- vazão de leituras: quadros em claro (esquema antigo, sem cifra após o handshake) vs.
+  registros AES-GCM e ChaCha20-Poly1305 (cifrar no sensor + decifrar no cliente), com
+  uma leitura por registro e com leituras agrupadas.
+
+Uso:
+    python benchmarks/canal_seguro.py [--handshakes 300] [--leituras 100000] [--lote 16]
+                                      [--saida resultado.json]
+"""
+
+import argparse
+import os
+import time
+
+from _comum import grava_resultados
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+from common.canal_seguro import ChaveiroSessoes, EmissorTickets, aceita_handshake
+from common.framing import CABECALHO, DecodificadorQuadros, codifica_leitura
+
+OAEP = padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+
+
+def mede(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return repeticoes / (time.perf_counter() - inicio)
+
+
+def handshakes(args, chave_privada):
+    chave_publica = chave_privada.public_key()
+
+    def rsa_antigo():
+        segredo = os.urandom(16)
+        assert chave_privada.decrypt(chave_publica.encrypt(segredo, OAEP), OAEP) == segredo
+
+    emissor = EmissorTickets()
+    chaveiro = ChaveiroSessoes(None, "aes-gcm")
+
+    def handshake_cliente(retomada):
+        # inicia() consome o ticket guardado; sem ticket o handshake é completo
+        handshake = chaveiro.inicia("sensor:5000")
+        aceite, _ = aceita_handshake(handshake.ola, chave_privada, emissor)
+        sessao = chaveiro.conclui(handshake, aceite[CABECALHO.size:])
+        assert sessao.retomada == retomada
+        if not retomada:
+            chaveiro.inicia("sensor:5000")
+
+    resultado = {
+        "rsa_oaep_por_s": round(mede(rsa_antigo, args.handshakes)),
+        "completo_por_s": round(mede(lambda: handshake_cliente(False), args.handshakes)),
+    }
+    # Um handshake completo deixa o ticket para a primeira retomada
+    handshake = chaveiro.inicia("sensor:5000")
+    aceite, _ = aceita_handshake(handshake.ola, chave_privada, emissor)
+    chaveiro.conclui(handshake, aceite[CABECALHO.size:])
+    resultado["retomado_por_s"] = round(mede(lambda: handshake_cliente(True), args.handshakes))
+    return resultado
+
+
+def vazao(args, chave_privada, cifra, lote):
+    quadros = [codifica_leitura(25.0, 50.0, 1013.0, i, 5000, i) for i in range(lote)]
+    registro = b"".join(quadros)
+    if cifra is None:
+        decodificador = DecodificadorQuadros()
+
+        def passo():
+            decodificador.alimenta(registro)
+    else:
+        chaveiro = ChaveiroSessoes(None, cifra)
+        handshake = chaveiro.inicia("sensor:5000")
+        aceite, sessao_sensor = aceita_handshake(handshake.ola, chave_privada, EmissorTickets())
+        sessao_cliente = chaveiro.conclui(handshake, aceite[CABECALHO.size:])
+        externo, interno = DecodificadorQuadros(), DecodificadorQuadros()
+
+        def passo():
+            for _, payload in externo.alimenta(sessao_sensor.sela(registro)):
+                interno.alimenta(sessao_cliente.abre(payload))
+
+    registros_por_s = mede(passo, max(args.leituras // lote, 1))
+    return {
+        "leituras_por_s": round(registros_por_s * lote),
+        "mb_por_s": round(registros_por_s * len(registro) / 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do canal seguro cliente-sensor")
+    parser.add_argument("--handshakes", type=int, default=300)
+    parser.add_argument("--leituras", type=int, default=100000)
+    parser.add_argument("--lote", type=int, default=16, help="leituras por registro no modo agrupado")
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    chave_privada = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    resultado_handshakes = handshakes(args, chave_privada)
+    print(f"Handshakes por segundo ({args.handshakes} de cada):")
+    print(f"  RSA-OAEP (esquema antigo):      {resultado_handshakes['rsa_oaep_por_s']}")
+    print(f"  X25519 + RSA-PSS (completo):    {resultado_handshakes['completo_por_s']}")
+    print(f"  X25519 + ticket (retomado):     {resultado_handshakes['retomado_por_s']}")
+
+    resultado_vazao = {}
+    print(f"Vazão de leituras ({args.leituras} leituras):")
+    for nome, cifra in (("claro", None), ("aes-gcm", "aes-gcm"), ("chacha20", "chacha20")):
+        for lote in (1, args.lote):
+            chave = f"{nome}_lote_{lote}"
+            resultado_vazao[chave] = vazao(args, chave_privada, cifra, lote)
+            print(f"  {nome:9s} lote {lote:3d}: {resultado_vazao[chave]['leituras_por_s']} leituras/s, "
+                  f"{resultado_vazao[chave]['mb_por_s']} MB/s")
+
+    if args.saida:
+        grava_resultados(args.saida, "canal_seguro", vars(args),
+                         {"handshakes": resultado_handshakes, "vazao": resultado_vazao})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Gerador de carga para o Servidor Cloud do SISD.
+
+Sobe o servidor Flask (cloud_server.py) e o servidor asyncio (async_server.py) em
+subprocessos, cada um com seu próprio diretório de dados, dispara POSTs concorrentes
+em conexões keep-alive e compara requisições/s e latências p50/p99 lado a lado.
+
+Uso:
+    python benchmarks/carga_cloud.py --conexoes 64 --requisicoes 200 [--lote 0] [--saida resultado.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from _comum import SRC, grava_resultados, percentil
+
+SERVIDORES = {
+    "flask": os.path.join(SRC, "cloud", "cloud_server.py"),
+    "asyncio": os.path.join(SRC, "cloud", "async_server.py"),
+}
+
+
+def aguarda_porta(porta, timeout=20.0):
+    """
+    Aguarda até o servidor aceitar conexões na porta.
+    """
+    limite = time.time() + timeout
+    while time.time() < limite:
+        try:
+            socket.create_connection(("127.0.0.1", porta), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Servidor não respondeu na porta {porta}")
+
+
+def inicia_servidor(nome, porta, diretorio, backend):
+    ambiente = dict(os.environ, PYTHONPATH=SRC, SISD_CLOUD_PORTA=str(porta),
+                    SISD_CLOUD_DADOS=diretorio, SISD_CLOUD_BACKEND=backend)
+    processo = subprocess.Popen([sys.executable, "-u", SERVIDORES[nome]], env=ambiente,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    aguarda_porta(porta)
+    return processo
+
+
+async def le_resposta(reader):
+    """
+    Lê uma resposta HTTP; retorna (status, manter_conexao).
+    """
+    linha_status = await reader.readline()
+    if not linha_status:
+        raise ConnectionError("Conexão fechada pelo servidor")
+    versao, status = linha_status.decode("latin-1").split()[:2]
+    cabecalhos = {}
+    while True:
+        linha = await reader.readline()
+        if linha in (b"\r\n", b"\n", b""):
+            break
+        chave, _, valor = linha.decode("latin-1").partition(":")
+        cabecalhos[chave.strip().lower()] = valor.strip()
+    conexao = cabecalhos.get("connection", "").lower()
+    manter = conexao != "close" if versao == "HTTP/1.1" else conexao == "keep-alive"
+    if "content-length" in cabecalhos:
+        await reader.readexactly(int(cabecalhos["content-length"]))
+    else:
+        await reader.read()
+        manter = False
+    return int(status), manter
+
+
+async def cliente(porta, requisicoes, lote, indice, latencias, erros):
+    """
+    Envia ``requisicoes`` POSTs reaproveitando a conexão sempre que o servidor permitir.
+    """
+    caminho = "/replica/batch" if lote else "/replica"
+    reader = writer = None
+    for i in range(requisicoes):
+        registro = {"id": f"carga_{indice}", "timestamp": time.time(), "mensagem": f"[Carga] leitura {i}"}
+        corpo = json.dumps([registro] * lote if lote else registro).encode()
+        requisicao = (f"POST {caminho} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                      f"Content-Length: {len(corpo)}\r\n\r\n").encode() + corpo
+        inicio = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", porta)
+            writer.write(requisicao)
+            await writer.drain()
+            status, manter = await le_resposta(reader)
+            if status != 200:
+                erros.append(status)
+        except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+            erros.append(str(e))
+            manter = False
+        latencias.append(time.perf_counter() - inicio)
+        if not manter and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def executa_carga(porta, conexoes, requisicoes, lote):
+    latencias, erros = [], []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(porta, requisicoes, lote, i, latencias, erros) for i in range(conexoes)))
+    duracao = time.perf_counter() - inicio
+    return {
+        "requisicoes": len(latencias),
+        "erros": len(erros),
+        "duracao_s": round(duracao, 3),
+        "req_por_s": round(len(latencias) / duracao, 1),
+        "p50_ms": round((percentil(latencias, 50) or 0.0) * 1000, 2),
+        "p99_ms": round((percentil(latencias, 99) or 0.0) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga no Servidor Cloud (Flask x asyncio)")
+    parser.add_argument("--conexoes", type=int, default=64)
+    parser.add_argument("--requisicoes", type=int, default=200, help="requisições por conexão")
+    parser.add_argument("--lote", type=int, default=0, help="registros por POST /replica/batch (0 = POST /replica)")
+    parser.add_argument("--backend", default="sqlite")
+    parser.add_argument("--servidores", default="flask,asyncio")
+    parser.add_argument("--porta", type=int, default=16000)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    resultados = {}
+    for deslocamento, nome in enumerate(args.servidores.split(",")):
+        porta = args.porta + deslocamento
+        with tempfile.TemporaryDirectory() as diretorio:
+            processo = inicia_servidor(nome, porta, diretorio, args.backend)
+            try:
+                resultados[nome] = asyncio.run(executa_carga(porta, args.conexoes, args.requisicoes, args.lote))
+            finally:
+                processo.terminate()
+                processo.wait()
+
+    print(f"{'servidor':<10}{'req/s':>10}{'p50 (ms)':>12}{'p99 (ms)':>12}{'erros':>8}")
+    for nome, r in resultados.items():
+        print(f"{nome:<10}{r['req_por_s']:>10}{r['p50_ms']:>12}{r['p99_ms']:>12}{r['erros']:>8}")
+    if args.saida:
+        grava_resultados(args.saida, "carga_cloud", vars(args), resultados)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Benchmark do detector de falhas (phi accrual) do SISD.
+
+Um nó observador recebe os batimentos de um nó monitorado por um relé UDP que injeta
+atraso (base + jitter exponencial) e perda de pacotes. Para cada limiar de phi e nível
+de jitter, mede:
+
+- falsos positivos por minuto durante uma fase estável (o monitorado nunca cai);
+- latência de detecção: do instante em que o monitorado para até a suspeita (p50/p99),
+  repetindo queda e reinício várias vezes.
+
+Uso:
+    python benchmarks/detector_falhas.py [--limiares 1,3,8,12] [--jitters-ms 0,20,50] [--intervalo 0.1]
+                                         [--estavel 20] [--quedas 10] [--perda 0.0] [--saida resultado.json]
+"""
+
+import argparse
+import heapq
+import random
+import socket
+import threading
+import time
+
+from _comum import grava_resultados, percentil
+
+from common.detector_falhas import BatimentosPares, DetectorFalhas
+
+OBSERVADOR, MONITORADO = 1, 2
+
+
+class ReleAtraso:
+    """
+    Encaminha datagramas UDP para ``destino`` com atraso e perda injetados.
+    """
+
+    def __init__(self, porta, destino, atraso_base, jitter, perda, semente=1):
+        self.destino = destino
+        self.atraso_base = atraso_base
+        self.jitter = jitter
+        self.perda = perda
+        self.aleatorio = random.Random(semente)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", porta))
+        self._agenda = []
+        self._cond = threading.Condition()
+        for alvo in (self._recebe, self._encaminha):
+            t = threading.Thread(target=alvo)
+            t.daemon = True
+            t.start()
+
+    def _recebe(self):
+        while True:
+            try:
+                dados, _ = self.sock.recvfrom(64)
+            except OSError:
+                return
+            if self.aleatorio.random() < self.perda:
+                continue
+            atraso = self.atraso_base + (self.aleatorio.expovariate(1 / self.jitter) if self.jitter else 0)
+            with self._cond:
+                heapq.heappush(self._agenda, (time.monotonic() + atraso, dados))
+                self._cond.notify()
+
+    def _encaminha(self):
+        while True:
+            with self._cond:
+                while not self._agenda or self._agenda[0][0] > time.monotonic():
+                    espera = self._agenda[0][0] - time.monotonic() if self._agenda else None
+                    self._cond.wait(espera)
+                _, dados = heapq.heappop(self._agenda)
+            try:
+                self.sock.sendto(dados, self.destino)
+            except OSError:
+                return
+
+    def fecha(self):
+        self.sock.close()
+
+
+def aguarda(condicao, timeout):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicao():
+            return True
+        time.sleep(0.002)
+    return False
+
+
+def mede(limiar, jitter, args, porta_base):
+    intervalo = args.intervalo
+    porta_observador, porta_monitorado, porta_rele = porta_base, porta_base + 1, porta_base + 2
+    suspeitas = []
+    detector = DetectorFalhas(intervalo_esperado=intervalo, limiar=limiar)
+    observador = BatimentosPares(OBSERVADOR, porta_observador, lambda: {}, detector=detector,
+                                 intervalo=intervalo, ao_suspeitar=lambda par: suspeitas.append(time.monotonic()))
+    observador.inicia()
+    rele = ReleAtraso(porta_rele, ("127.0.0.1", porta_observador), args.atraso_base_ms / 1000,
+                      jitter, args.perda)
+
+    def inicia_monitorado():
+        no = BatimentosPares(MONITORADO, porta_monitorado, lambda: {OBSERVADOR: ("127.0.0.1", porta_rele)},
+                             intervalo=intervalo)
+        no.inicia()
+        return no
+
+    # Fase estável: qualquer suspeita é um falso positivo
+    monitorado = inicia_monitorado()
+    time.sleep(args.estavel)
+    falsos_positivos = len(suspeitas)
+
+    # Fase de quedas: o monitorado para; mede até a suspeita e depois reinicia
+    latencias, nao_detectadas = [], 0
+    for _ in range(args.quedas):
+        aguarda(lambda: MONITORADO not in detector.suspeitos, 10 * intervalo)
+        time.sleep(20 * intervalo)
+        antes = len(suspeitas)
+        monitorado.para()
+        queda = time.monotonic()
+        if aguarda(lambda: len(suspeitas) > antes, 200 * intervalo):
+            latencias.append(suspeitas[antes] - queda)
+        else:
+            nao_detectadas += 1
+        monitorado = inicia_monitorado()
+
+    monitorado.para()
+    observador.para()
+    rele.fecha()
+
+    def ms(valor):
+        return round(valor * 1000, 1) if valor is not None else None
+
+    return {
+        "limiar_phi": limiar,
+        "jitter_ms": round(jitter * 1000, 1),
+        "atraso_base_ms": args.atraso_base_ms,
+        "perda": args.perda,
+        "intervalo_s": intervalo,
+        "falsos_positivos": falsos_positivos,
+        "falsos_positivos_por_min": round(falsos_positivos * 60 / args.estavel, 2),
+        "deteccao_p50_ms": ms(percentil(latencias, 50)),
+        "deteccao_p99_ms": ms(percentil(latencias, 99)),
+        "nao_detectadas": nao_detectadas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do detector de falhas phi accrual")
+    parser.add_argument("--limiares", default="1,3,8,12")
+    parser.add_argument("--jitters-ms", default="0,20,50", help="média do jitter exponencial injetado")
+    parser.add_argument("--atraso-base-ms", type=float, default=1.0)
+    parser.add_argument("--perda", type=float, default=0.0, help="fração de batimentos descartados")
+    parser.add_argument("--intervalo", type=float, default=0.1, help="intervalo entre batimentos (s)")
+    parser.add_argument("--estavel", type=float, default=20.0, help="segundos da fase estável")
+    parser.add_argument("--quedas", type=int, default=10)
+    parser.add_argument("--porta-base", type=int, default=33000)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    resultados = []
+    porta_base = args.porta_base
+    print(f"{'phi':>5} {'jitter':>8} {'FP/min':>8} {'detecção p50':>13} {'detecção p99':>13}")
+    for jitter_ms in (float(j) for j in args.jitters_ms.split(",")):
+        for limiar in (float(x) for x in args.limiares.split(",")):
+            r = mede(limiar, jitter_ms / 1000, args, porta_base)
+            resultados.append(r)
+            print(f"{limiar:>5} {jitter_ms:>6}ms {r['falsos_positivos_por_min']:>8} "
+                  f"{r['deteccao_p50_ms']:>11}ms {r['deteccao_p99_ms']:>11}ms")
+            porta_base += 3
+
+    if args.saida:
+        grava_resultados(args.saida, "detector_falhas", vars(args), resultados)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark da eleição Bully do SISD.
+
+Sobe N nós Bully (servidor gRPC + EleicaoBully, cada um com seu próprio pool de canais)
+em loopback, deixa os F nós de maior id fora do ar e mede o tempo até todos os nós vivos
+conhecerem o novo coordenador (o maior id vivo), a partir de uma eleição convocada pelo
+nó de menor id.
+
+Os nós fora do ar podem recusar a conexão (``--falha recusa``, processo morto) ou aceitá-la
+e nunca responder (``--falha silencio``, host travado: as chamadas esgotam o timeout).
+
+Uso:
+    python benchmarks/eleicao_bully.py [--tamanhos 3,5,10,20] [--falhas 0,1,2] [--repeticoes 5]
+                                       [--falha recusa|silencio] [--timeout-rpc 2] [--saida resultado.json]
+"""
+
+import argparse
+import contextlib
+import io
+import socket
+import statistics
+import sys
+import time
+from concurrent import futures
+
+from _comum import PROTOS, grava_resultados
+
+sys.path.insert(0, PROTOS)  # stubs gRPC importados sem o pacote
+
+import grpc
+from middleware.protos import bully_pb2_grpc
+
+from common.bully import EleicaoBully
+from common.canais_grpc import PoolCanais
+
+
+def inicia_no(s_id, porta, pares, timeout_rpc):
+    eleicao = EleicaoBully(s_id, lambda: pares, pool=PoolCanais(), timeout_rpc=timeout_rpc, timeout_anuncio=30.0)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    bully_pb2_grpc.add_BullyServiceServicer_to_server(eleicao.servicer(), server)
+    server.add_insecure_port(f"127.0.0.1:{porta}")
+    server.start()
+    return eleicao, server
+
+
+def inicia_silencioso(porta):
+    """
+    Par travado: aceita conexões TCP e nunca responde.
+    """
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    s.bind(("127.0.0.1", porta))
+    s.listen(128)
+    return s
+
+
+def mede(n, f, porta_base, repeticoes, falha, timeout_rpc):
+    ids = [f"sensor_{porta_base + i}" for i in range(n)]
+    pares = {s_id: ("127.0.0.1", porta_base + i) for i, s_id in enumerate(ids)}
+    vivos, mortos = ids[:n - f], ids[n - f:]
+    esperado = vivos[-1]
+    nos, servidores, silenciosos = {}, [], []
+    for s_id in vivos:
+        eleicao, server = inicia_no(s_id, pares[s_id][1], pares, timeout_rpc)
+        nos[s_id] = eleicao
+        servidores.append(server)
+    if falha == "silencio":
+        silenciosos = [inicia_silencioso(pares[s_id][1]) for s_id in mortos]
+    for eleicao in nos.values():
+        eleicao.aquece()
+
+    tempos = []
+    # A primeira rodada (aquecimento dos canais) é descartada
+    for rodada in range(repeticoes + 1):
+        for eleicao in nos.values():
+            eleicao.coordenador = None
+        inicio = time.perf_counter()
+        nos[vivos[0]].inicia_eleicao_assincrona()
+        limite = inicio + 60
+        while not all(e.coordenador == esperado for e in nos.values()):
+            if time.perf_counter() > limite:
+                raise RuntimeError(f"Eleição não convergiu (N={n}, F={f})")
+            time.sleep(0.001)
+        if rodada:
+            tempos.append(time.perf_counter() - inicio)
+        # Espera as eleições em cascata terminarem antes da próxima rodada
+        while any(e.em_andamento for e in nos.values()):
+            time.sleep(0.005)
+
+    for server in servidores:
+        server.stop(0)
+    # Fechar um canal com conectividade observada é lento: os pools são fechados em paralelo
+    with futures.ThreadPoolExecutor(max_workers=len(nos)) as executor:
+        list(executor.map(lambda eleicao: eleicao.pool.fecha(), nos.values()))
+    for s in silenciosos:
+        s.close()
+    return {
+        "n": n,
+        "falhas": f,
+        "tipo_falha": falha,
+        "timeout_rpc_s": timeout_rpc,
+        "repeticoes": repeticoes,
+        "coordenador_p50_ms": round(statistics.median(tempos) * 1000, 2),
+        "coordenador_max_ms": round(max(tempos) * 1000, 2),
+        "coordenador_media_ms": round(statistics.mean(tempos) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de tempo até coordenador (Bully)")
+    parser.add_argument("--tamanhos", default="3,5,10,20")
+    parser.add_argument("--falhas", default="0,1,2", help="quantidade de nós de maior id fora do ar")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--falha", choices=("recusa", "silencio"), default="recusa")
+    parser.add_argument("--timeout-rpc", type=float, default=2.0)
+    parser.add_argument("--porta-base", type=int, default=27000)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    resultados = []
+    porta_base = args.porta_base
+    print(f"{'N':>4} {'falhas':>7} {'p50':>10} {'média':>10} {'máx':>10}")
+    for n in (int(t) for t in args.tamanhos.split(",")):
+        for f in (int(x) for x in args.falhas.split(",")):
+            if f >= n:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                r = mede(n, f, porta_base, args.repeticoes, args.falha, args.timeout_rpc)
+            resultados.append(r)
+            print(f"{n:>4} {f:>7} {r['coordenador_p50_ms']:>8}ms {r['coordenador_media_ms']:>8}ms "
+                  f"{r['coordenador_max_ms']:>8}ms")
+            porta_base += n + 5
+
+    if args.saida:
+        parametros = {"falha": args.falha, "timeout_rpc": args.timeout_rpc, "repeticoes": args.repeticoes}
+        grava_resultados(args.saida, "eleicao_bully", parametros, resultados)
+
+
+if __name__ == "__main__":
+    main()
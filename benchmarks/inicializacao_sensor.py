@@ -0,0 +1,168 @@
+"""
+Benchmark da inicialização do sensor do SISD.
+
+Mede:
+
+- o tempo de importação de ``sensor.sensor`` com ``python -X importtime`` (total e os
+  módulos mais caros);
+- o tempo até o sensor aceitar conexões TCP (time-to-listening) para N sensores
+  iniciados ao mesmo tempo, com o diretório de chaves vazio (primeira execução, chave
+  RSA gerada) e já preenchido;
+- o tempo até o primeiro handshake do canal cifrado completar (depende da chave estar
+  carregada ou gerada);
+- se cada sensor ficou com o seu próprio par de chaves (sem disputa pelo mesmo arquivo).
+
+Os sensores rodam a partir de uma cópia temporária de ``src/``, para que snapshots, logs
+e chaves não sejam gravados no repositório. O monitor e o cloud não precisam estar no ar.
+
+Uso:
+    python benchmarks/inicializacao_sensor.py [--sensores 3] [--porta-base 15000] [--saida resultado.json]
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from _comum import SRC, grava_resultados
+
+from common.canal_seguro import ChaveiroSessoes
+from common.framing import (MODO_CIFRADO, TIPO_CANAL_ACEITE, VERSAO_CIFRADA,
+                            negocia_como_cliente)
+
+
+def ambiente(src, chaves_dir, sensores_conhecidos):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([src, os.path.join(src, "middleware", "protos")])
+    env["SISD_CHAVES_DIR"] = chaves_dir
+    env["SISD_SENSORES_CONHECIDOS"] = sensores_conhecidos
+    return env
+
+
+def mede_importacao(src):
+    """
+    Roda ``python -X importtime -c "import sensor.sensor"`` e resume a saída.
+    """
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import sensor.sensor"],
+        env=ambiente(src, tempfile.mkdtemp(prefix="sisd_chaves_"), ""),
+        stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True, check=True)
+    modulos = []
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        # "import time:  próprio (us) | acumulado (us) | módulo"
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        modulos.append((int(acumulado), int(proprio), nome.rstrip()))
+    total = next(acumulado for acumulado, _, nome in modulos if nome.strip() == "sensor.sensor")
+    mais_caros = sorted((m for m in modulos if m[2].strip() != "sensor.sensor"), reverse=True)[:10]
+    return {
+        "total_ms": round(total / 1000, 1),
+        "mais_caros": [{"modulo": nome.strip(), "acumulado_ms": round(acumulado / 1000, 1)}
+                       for acumulado, _, nome in mais_caros],
+    }
+
+
+def aguarda_porta(porta, limite):
+    while time.monotonic() < limite:
+        try:
+            socket.create_connection(("127.0.0.1", porta), timeout=0.2).close()
+            return True
+        except OSError:
+            time.sleep(0.005)
+    return False
+
+
+def primeiro_handshake(porta, chaveiro):
+    sock = socket.create_connection(("127.0.0.1", porta), timeout=30)
+    try:
+        modo, decodificador, quadros = negocia_como_cliente(sock, versao=VERSAO_CIFRADA)
+        if modo != MODO_CIFRADO:
+            raise RuntimeError(f"Sensor na porta {porta} não negociou o canal cifrado")
+        handshake = chaveiro.inicia(f"127.0.0.1:{porta}")
+        sock.sendall(handshake.quadro())
+        while not quadros:
+            quadros = decodificador.recebe(sock)
+        tipo, payload = quadros[0]
+        if tipo != TIPO_CANAL_ACEITE:
+            raise RuntimeError(f"Resposta inesperada do sensor na porta {porta}: {tipo}")
+        chaveiro.conclui(handshake, payload)
+    finally:
+        sock.close()
+
+
+def mede_inicializacao(args, src, chaves_dir):
+    """
+    Inicia os N sensores juntos e mede, para cada um, o tempo até aceitar conexões e até
+    concluir o primeiro handshake cifrado.
+    """
+    # Espaçadas de 10: cada sensor também usa porta + 1 (Bully), + 1000, + 2000 e + 3000
+    portas = [args.porta_base + 10 * i for i in range(args.sensores)]
+    conhecidos = ",".join(f"sensor_{p}=127.0.0.1:{p + 1}" for p in portas)
+    env = ambiente(src, chaves_dir, conhecidos)
+    inicio = time.monotonic()
+    processos = [subprocess.Popen([sys.executable, "-u", os.path.join(src, "sensor", "sensor.py"), str(p)],
+                                  env=env, cwd=src, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                 for p in portas]
+    escuta, handshake = [], []
+    try:
+        for porta in portas:
+            if not aguarda_porta(porta, inicio + 60):
+                raise RuntimeError(f"Sensor na porta {porta} não abriu o listener")
+            escuta.append(time.monotonic() - inicio)
+        chaveiro = ChaveiroSessoes(None)
+        for porta in portas:
+            primeiro_handshake(porta, chaveiro)
+            handshake.append(time.monotonic() - inicio)
+    finally:
+        for processo in processos:
+            processo.terminate()
+        for processo in processos:
+            processo.wait()
+    return {
+        "escuta_ms": [round(t * 1000) for t in escuta],
+        "primeiro_handshake_ms": [round(t * 1000) for t in handshake],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da inicialização do sensor")
+    parser.add_argument("--sensores", type=int, default=3)
+    parser.add_argument("--porta-base", type=int, default=15000)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    temporario = tempfile.mkdtemp(prefix="sisd_inicializacao_")
+    src = os.path.join(temporario, "src")
+    shutil.copytree(SRC, src, ignore=shutil.ignore_patterns("__pycache__", "snapshots", "logs", "chaves",
+                                                            "*.pem", "*.db"))
+    chaves_dir = os.path.join(temporario, "chaves")
+    try:
+        importacao = mede_importacao(src)
+        print(f"Importação de sensor.sensor: {importacao['total_ms']} ms")
+        for item in importacao["mais_caros"][:5]:
+            print(f"  {item['modulo']}: {item['acumulado_ms']} ms")
+
+        frio = mede_inicializacao(args, src, chaves_dir)
+        chaves = sorted(os.path.basename(c) for c in glob.glob(os.path.join(chaves_dir, "*_private.pem")))
+        quente = mede_inicializacao(args, src, chaves_dir)
+        for nome, resultado in (("sem chaves (gera RSA)", frio), ("com chaves", quente)):
+            print(f"{args.sensores} sensores {nome}: escutando em {resultado['escuta_ms']} ms, "
+                  f"primeiro handshake em {resultado['primeiro_handshake_ms']} ms")
+        print(f"Chaves privadas geradas: {len(chaves)} ({', '.join(chaves)})")
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+    if args.saida:
+        grava_resultados(args.saida, "inicializacao_sensor", vars(args),
+                         {"importacao": importacao, "sem_chaves": frio, "com_chaves": quente,
+                          "chaves_geradas": chaves})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Benchmark do armazenamento colunar de leituras do cloud do SISD.
+
+Grava leituras sintéticas de vários sensores ("[Sensor] Dados enviados: t,u,p|lamport")
+no backend de réplicas e no ``ArmazemLeituras`` (``src/cloud/leituras.py``) e mede:
+
+- leituras/s na ingestão colunar e bytes em disco (colunas vs. backend de réplicas);
+- uma consulta de agregados por faixa de tempo de um sensor: pelo backend (consulta
+  filtrada e interpretação das mensagens, como seria sem o armazenamento colunar) vs.
+  pelas colunas (resumos dos blocos inteiros + fatias por mmap nas bordas), conferindo
+  que os resultados são os mesmos;
+- a mesma faixa agregada por intervalo (``step``);
+- a recuperação do bloco aberto ao reabrir o armazenamento.
+
+Uso:
+    python benchmarks/leituras_cloud.py [--sensores 3] [--leituras 200000] [--bloco 16384]
+                                        [--backend sqlite] [--consultas 20] [--saida resultado.json]
+"""
+
+import argparse
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from _comum import grava_resultados, percentil
+
+from cloud.leituras import GRANDEZAS, PREFIXO_LEITURA, ArmazemLeituras, interpreta_leitura
+from cloud.storage import cria_backend
+
+
+def gera_registros(args, aleatorio):
+    """
+    Leituras intercaladas dos sensores (uma por segundo cada) e algumas mensagens de controle.
+    """
+    atuais = [[25.0, 55.0, 1005.0] for _ in range(args.sensores)]
+    registros = []
+    for i in range(args.leituras // args.sensores):
+        for s, atual in enumerate(atuais):
+            for j in range(3):
+                atual[j] += aleatorio.gauss(0, 0.1)
+            registros.append({"id": f"sensor_{5000 + s}", "timestamp": 1.7e9 + i,
+                              "mensagem": f"{PREFIXO_LEITURA}{atual[0]:.1f},{atual[1]:.1f},{atual[2]:.1f}|{i}"})
+        if i % 100 == 0:
+            registros.append({"id": "client", "timestamp": 1.7e9 + i, "mensagem": "[Cliente] Snapshot global gravado"})
+    return registros
+
+
+def tamanho_diretorio(caminho):
+    if os.path.isfile(caminho):
+        return os.path.getsize(caminho)
+    return sum(os.path.getsize(os.path.join(raiz, nome)) for raiz, _, nomes in os.walk(caminho) for nome in nomes)
+
+
+def agrega_pelo_backend(backend, sensor, desde, ate):
+    """
+    Agregados calculados como sem o armazenamento colunar: consulta filtrada + parse das mensagens.
+    """
+    valores = [[], [], []]
+    for _, registro in backend.consulta(sender_id=sensor, desde=desde, ate=ate, prefixo=PREFIXO_LEITURA):
+        leitura = interpreta_leitura(registro)
+        for j in range(3):
+            valores[j].append(leitura[2 + j])
+    resultado = {"n": len(valores[0])}
+    for j, grandeza in enumerate(GRANDEZAS):
+        media = math.fsum(valores[j]) / len(valores[j])
+        resultado[grandeza] = {"min": min(valores[j]), "max": max(valores[j]), "media": media,
+                               "desvio": math.sqrt(math.fsum((v - media) ** 2 for v in valores[j]) / len(valores[j]))}
+    return resultado
+
+
+def conferem(a, b):
+    # As colunas guardam float32 (como o protocolo binário): diferenças de arredondamento
+    if a["n"] != b["n"]:
+        return False
+    return all(abs(a[g][k] - b[g][k]) <= 1e-3 * max(1.0, abs(b[g][k])) for g in GRANDEZAS for k in b[g])
+
+
+def mede(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return {"p50_ms": round(percentil(tempos, 50) * 1e3, 3), "p99_ms": round(percentil(tempos, 99) * 1e3, 3)}, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do armazenamento colunar de leituras do cloud")
+    parser.add_argument("--sensores", type=int, default=3)
+    parser.add_argument("--leituras", type=int, default=200000)
+    parser.add_argument("--bloco", type=int, default=16384, help="leituras por bloco selado")
+    parser.add_argument("--backend", default="sqlite", choices=("sqlite", "segmentos"))
+    parser.add_argument("--consultas", type=int, default=20)
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    registros = gera_registros(args, random.Random(args.semente))
+    diretorio = tempfile.mkdtemp(prefix="sisd_leituras_")
+    try:
+        backend = cria_backend(args.backend, diretorio)
+        for i in range(0, len(registros), 5000):
+            backend.insere_lote(registros[i:i + 5000])
+        armazem = ArmazemLeituras(os.path.join(diretorio, "cloud_leituras"), tamanho_bloco=args.bloco,
+                                  idade_bloco=math.inf)
+        inicio = time.perf_counter()
+        for i in range(0, len(registros), 500):
+            armazem.ingere(registros[i:i + 500])
+        duracao = time.perf_counter() - inicio
+        leituras = armazem.ingeridas
+        caminho_backend = os.path.join(diretorio, "cloud_db.sqlite" if args.backend == "sqlite" else "cloud_segmentos")
+        ingestao = {
+            "leituras": leituras, "leituras_por_s": round(leituras / duracao),
+            "bytes_colunas": tamanho_diretorio(os.path.join(diretorio, "cloud_leituras")),
+            "bytes_backend": tamanho_diretorio(caminho_backend),
+        }
+
+        # Últimos três quartos do período de um sensor (uma borda, blocos inteiros e o bloco aberto)
+        sensor = "sensor_5000"
+        total = args.leituras // args.sensores
+        desde, ate = 1.7e9 + total * 0.25 + 0.5, 1.7e9 + total
+        pelo_backend, esperado = mede(lambda: agrega_pelo_backend(backend, sensor, desde, ate), max(args.consultas // 4, 3))
+        pelas_colunas, obtido = mede(lambda: armazem.consulta(sensor, desde, ate), args.consultas)
+        por_intervalo, serie = mede(lambda: armazem.consulta(sensor, desde, ate, passo=3600), args.consultas)
+        consulta = {"leituras_na_faixa": esperado["n"], "backend": pelo_backend, "colunas": pelas_colunas,
+                    "colunas_por_hora": por_intervalo, "intervalos": len(serie["series"]),
+                    "conferem": conferem(obtido, esperado),
+                    "intervalos_somam": sum(item["n"] for item in serie["series"]) == esperado["n"]}
+
+        # Reabertura: o bloco aberto (não selado) volta a partir do backend
+        pendentes = sum(armazem.sensores().values())
+        reaberto = ArmazemLeituras(os.path.join(diretorio, "cloud_leituras"), tamanho_bloco=args.bloco)
+        inicio = time.perf_counter()
+        recuperadas = reaberto.recupera(backend)
+        recuperacao = {"recuperadas": recuperadas, "segundos": round(time.perf_counter() - inicio, 3),
+                       "total_confere": sum(reaberto.sensores().values()) == pendentes}
+        backend.fecha()
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    print(f"{leituras} leituras de {args.sensores} sensores em blocos de {args.bloco} (backend {args.backend})")
+    print(f"  ingestão colunar: {ingestao['leituras_por_s']} leituras/s; em disco: colunas {ingestao['bytes_colunas']} "
+          f"bytes, backend {ingestao['bytes_backend']} bytes")
+    print(f"  agregados de {consulta['leituras_na_faixa']} leituras de {sensor}: backend (parse das mensagens) "
+          f"p50 {pelo_backend['p50_ms']} ms, colunas p50 {pelas_colunas['p50_ms']} ms "
+          f"(p99 {pelas_colunas['p99_ms']} ms); mesmos resultados: {consulta['conferem']}")
+    print(f"  por hora ({consulta['intervalos']} intervalos): p50 {por_intervalo['p50_ms']} ms; "
+          f"contagens somam o total: {consulta['intervalos_somam']}")
+    print(f"  reabertura: {recuperacao['recuperadas']} leituras do bloco aberto recuperadas em "
+          f"{recuperacao['segundos']} s; total confere: {recuperacao['total_confere']}")
+
+    if args.saida:
+        grava_resultados(args.saida, "leituras_cloud", vars(args),
+                         {"ingestao": ingestao, "consulta": consulta, "recuperacao": recuperacao})
+
+
+if __name__ == "__main__":
+    main()
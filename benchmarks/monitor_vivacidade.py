@@ -0,0 +1,181 @@
+"""
+Benchmark do rastreador de vivacidade do monitor do SISD.
+
+Simula N sensores em tempo virtual: cada um envia batimentos no intervalo configurado
+(com jitter) e uma fração deles para de enviar no meio da execução. Compara o
+RastreadorVivacidade (prazos em heap) com a varredura completa do dicionário usada
+antes, medindo:
+
+- custo por batimento registrado;
+- custo por verificação (p50/p99) e número de sensores examinados;
+- transições emitidas e latência de detecção (em tempo virtual);
+- vazão com várias threads registrando enquanto a thread de verificação roda.
+
+Uso:
+    python benchmarks/monitor_vivacidade.py [--sensores 10000] [--duracao 120] [--intervalo 10]
+                                            [--falhas 0.05] [--threads 8] [--saida resultado.json]
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from _comum import grava_resultados, percentil
+
+from middleware.vivacidade import DOWN, SUSPECT, RastreadorVivacidade
+
+
+def agenda_batimentos(args, aleatorio):
+    """
+    Gera os eventos de batimento em tempo virtual: [(instante, sensor_id)] e os instantes de queda.
+    """
+    quedas = {}
+    for i in aleatorio.sample(range(args.sensores), int(args.sensores * args.falhas)):
+        quedas[f"sensor_{i}"] = aleatorio.uniform(args.duracao * 0.2, args.duracao * 0.5)
+    eventos = []
+    for i in range(args.sensores):
+        sensor_id = f"sensor_{i}"
+        fim = quedas.get(sensor_id, args.duracao)
+        t = aleatorio.uniform(0, args.intervalo)
+        while t < fim:
+            eventos.append((t, sensor_id))
+            t += args.intervalo * aleatorio.uniform(0.9, 1.1)
+    eventos.sort()
+    return eventos, quedas
+
+
+def varredura_completa(status, agora, timeout, avisados):
+    # Verificador antigo: percorre todos os sensores a cada passagem
+    for sensor_id, ultimo in status.items():
+        if agora - ultimo > timeout and sensor_id not in avisados:
+            avisados.add(sensor_id)
+    return len(status)
+
+
+def mede_sequencial(args, eventos, quedas):
+    transicoes = []
+    rastreador = RastreadorVivacidade(args.timeout_suspeita, args.timeout_queda,
+                                      ao_transicionar=lambda *t: transicoes.append(t))
+    status, avisados = {}, set()
+    custo_heap, custo_varredura, examinados = [], [], []
+    tempo_registro = 0.0
+    proxima_verificacao = args.passo
+    indice = 0
+    while proxima_verificacao <= args.duracao:
+        inicio = time.perf_counter()
+        while indice < len(eventos) and eventos[indice][0] < proxima_verificacao:
+            instante, sensor_id = eventos[indice]
+            rastreador.registra(sensor_id, instante)
+            status[sensor_id] = instante
+            indice += 1
+        tempo_registro += time.perf_counter() - inicio
+
+        vencidos_antes = rastreador.estatisticas()["vencidos"]
+        inicio = time.perf_counter()
+        rastreador.verifica(proxima_verificacao)
+        custo_heap.append(time.perf_counter() - inicio)
+        examinados.append(rastreador.estatisticas()["vencidos"] - vencidos_antes)
+
+        inicio = time.perf_counter()
+        varredura_completa(status, proxima_verificacao, args.timeout_suspeita, avisados)
+        custo_varredura.append(time.perf_counter() - inicio)
+        proxima_verificacao += args.passo
+
+    latencias = []
+    for sensor_id, anterior, novo, silencio in transicoes:
+        if novo == SUSPECT and sensor_id in quedas:
+            latencias.append(silencio - args.timeout_suspeita)
+
+    def us(valor):
+        return round(valor * 1e6, 1) if valor is not None else None
+
+    return {
+        "batimentos": len(eventos),
+        "registro_us_por_batimento": us(tempo_registro / max(len(eventos), 1)),
+        "verificacao_heap_p50_us": us(percentil(custo_heap, 50)),
+        "verificacao_heap_p99_us": us(percentil(custo_heap, 99)),
+        "verificacao_varredura_p50_us": us(percentil(custo_varredura, 50)),
+        "verificacao_varredura_p99_us": us(percentil(custo_varredura, 99)),
+        "examinados_por_verificacao_heap": round(sum(examinados) / max(len(examinados), 1), 1),
+        "examinados_por_verificacao_varredura": args.sensores,
+        "falhas_injetadas": len(quedas),
+        "suspeitas": sum(1 for t in transicoes if t[2] == SUSPECT),
+        "quedas": sum(1 for t in transicoes if t[2] == DOWN),
+        "atraso_deteccao_max_s": round(max(latencias), 3) if latencias else None,
+    }
+
+
+def mede_concorrente(args):
+    """
+    Várias threads registram batimentos em tempo real enquanto a thread de verificação roda.
+    """
+    rastreador = RastreadorVivacidade(args.timeout_suspeita, args.timeout_queda)
+    rastreador.inicia()
+    sensores = [f"sensor_{i}" for i in range(args.sensores)]
+    por_thread = args.batimentos_concorrentes // args.threads
+    erros = []
+
+    def produtor(semente):
+        aleatorio = random.Random(semente)
+        try:
+            for _ in range(por_thread):
+                rastreador.registra(aleatorio.choice(sensores))
+        except Exception as e:
+            erros.append(repr(e))
+
+    threads = [threading.Thread(target=produtor, args=(i,)) for i in range(args.threads)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+    rastreador.para()
+    return {
+        "threads": args.threads,
+        "batimentos": por_thread * args.threads,
+        "batimentos_por_s": round(por_thread * args.threads / duracao),
+        "erros": erros,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do rastreador de vivacidade do monitor")
+    parser.add_argument("--sensores", type=int, default=10000)
+    parser.add_argument("--duracao", type=float, default=120.0, help="segundos de tempo virtual")
+    parser.add_argument("--intervalo", type=float, default=10.0, help="intervalo entre batimentos (s)")
+    parser.add_argument("--falhas", type=float, default=0.05, help="fração de sensores que param")
+    parser.add_argument("--timeout-suspeita", type=float, default=20.0)
+    parser.add_argument("--timeout-queda", type=float, default=60.0)
+    parser.add_argument("--passo", type=float, default=1.0, help="intervalo entre verificações (s virtuais)")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--batimentos-concorrentes", type=int, default=200000)
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    eventos, quedas = agenda_batimentos(args, random.Random(args.semente))
+    sequencial = mede_sequencial(args, eventos, quedas)
+    print(f"{args.sensores} sensores, {sequencial['batimentos']} batimentos em {args.duracao:.0f}s virtuais")
+    print(f"  registro: {sequencial['registro_us_por_batimento']} us/batimento")
+    print(f"  verificação heap:      p50 {sequencial['verificacao_heap_p50_us']} us, "
+          f"p99 {sequencial['verificacao_heap_p99_us']} us, "
+          f"{sequencial['examinados_por_verificacao_heap']} sensores examinados")
+    print(f"  verificação varredura: p50 {sequencial['verificacao_varredura_p50_us']} us, "
+          f"p99 {sequencial['verificacao_varredura_p99_us']} us, "
+          f"{sequencial['examinados_por_verificacao_varredura']} sensores examinados")
+    print(f"  falhas injetadas {sequencial['falhas_injetadas']}: {sequencial['suspeitas']} SUSPECT, "
+          f"{sequencial['quedas']} DOWN, atraso máximo {sequencial['atraso_deteccao_max_s']}s")
+
+    concorrente = mede_concorrente(args)
+    print(f"  concorrente: {concorrente['batimentos_por_s']} batimentos/s com {args.threads} threads, "
+          f"{len(concorrente['erros'])} erros")
+
+    if args.saida:
+        grava_resultados(args.saida, "monitor_vivacidade", vars(args),
+                         {"sequencial": sequencial, "concorrente": concorrente})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark do motor de regras de clima extremo do sensor do SISD.
+
+Carrega centenas de regras sintéticas (limiar, variação e janelas de vários tamanhos
+sobre as três grandezas) e mede o custo de avaliação por leitura:
+
+- ``MotorRegras``: agregados de janela incrementais, em O(1) por leitura, compartilhados
+  entre as regras com a mesma grandeza e tamanho de janela;
+- avaliação ingênua: as mesmas regras, recalculando cada agregado de janela sobre o
+  histórico a cada leitura.
+
+Confere que as duas avaliações produzem as mesmas transições de estado.
+
+Uso:
+    python benchmarks/regras_alerta.py [--regras 300] [--leituras 5000] [--semente 1] [--saida resultado.json]
+"""
+
+import argparse
+import collections
+import math
+import random
+import time
+
+from _comum import grava_resultados, percentil
+
+from multicast.regras import AGREGADOS, GRANDEZAS, MotorRegras, Regra
+
+FAIXAS = {"temperatura": (15.0, 35.0), "umidade": (30.0, 80.0), "pressao": (990.0, 1020.0)}
+TAMANHOS_JANELA = (10, 30, 60, 300, 600)
+
+
+def gera_regras(quantidade, aleatorio):
+    definicoes = []
+    for i in range(quantidade):
+        grandeza = aleatorio.choice(GRANDEZAS)
+        minimo, maximo = FAIXAS[grandeza]
+        definicao = {"id": i + 1, "grandeza": grandeza, "operador": aleatorio.choice((">", "<")),
+                     "histerese": 0.5, "severidade": aleatorio.choice(("aviso", "critico"))}
+        tipo = aleatorio.choice(("limiar", "variacao", "janela", "janela"))
+        definicao["tipo"] = tipo
+        if tipo == "limiar":
+            definicao["valor"] = aleatorio.uniform(minimo, maximo)
+        elif tipo == "variacao":
+            definicao["valor"] = aleatorio.uniform(-1.0, 1.0) * (maximo - minimo) / 20
+        else:
+            definicao["agregado"] = aleatorio.choice(AGREGADOS)
+            definicao["leituras"] = aleatorio.choice(TAMANHOS_JANELA)
+            amplitude = (maximo - minimo) / 4
+            definicao["valor"] = {"desvio": aleatorio.uniform(0, amplitude / 2),
+                                  "amplitude": aleatorio.uniform(0, amplitude)}.get(
+                definicao["agregado"], aleatorio.uniform(minimo, maximo))
+        definicoes.append(definicao)
+    return definicoes
+
+
+def gera_leituras(quantidade, aleatorio):
+    # Passeio aleatório dentro das faixas, para que as regras mudem de estado
+    atual = [sum(FAIXAS[g]) / 2 for g in GRANDEZAS]
+    leituras = []
+    for i in range(quantidade):
+        for j, grandeza in enumerate(GRANDEZAS):
+            minimo, maximo = FAIXAS[grandeza]
+            atual[j] = min(max(atual[j] + aleatorio.gauss(0, (maximo - minimo) / 50), minimo), maximo)
+        leituras.append((atual[0], atual[1], atual[2], float(i)))
+    return leituras
+
+
+class AvaliacaoIngenua:
+    """
+    Mesmas regras e histerese, recalculando os agregados sobre o histórico a cada leitura.
+    """
+
+    def __init__(self, regras):
+        self.regras = regras
+        self.historico = collections.deque(maxlen=max([r.leituras for r in regras] + [1]))
+        self.anterior = None
+
+    def avalia(self, temperatura, umidade, pressao, timestamp):
+        valores = (temperatura, umidade, pressao)
+        self.historico.append(valores)
+        transicoes = []
+        for regra in self.regras:
+            indice = GRANDEZAS.index(regra.grandeza)
+            if regra.tipo == "limiar":
+                x = valores[indice]
+            elif regra.tipo == "variacao":
+                if self.anterior is None:
+                    continue
+                x = (valores[indice] - self.anterior[1][indice]) / (timestamp - self.anterior[0])
+            else:
+                if len(self.historico) < regra.leituras:
+                    continue
+                janela = [v[indice] for v in list(self.historico)[-regra.leituras:]]
+                media = math.fsum(janela) / len(janela)
+                x = {"media": lambda: media, "min": lambda: min(janela), "max": lambda: max(janela),
+                     "desvio": lambda: math.sqrt(math.fsum((v - media) ** 2 for v in janela) / len(janela)),
+                     "amplitude": lambda: max(janela) - min(janela)}[regra.agregado]()
+            if regra.ativa:
+                if regra.sinal * x <= regra.normal:
+                    regra.ativa = False
+                    transicoes.append((regra.id, False))
+            elif regra.sinal * x > regra.disparo:
+                regra.ativa = True
+                transicoes.append((regra.id, True))
+        self.anterior = (timestamp, valores)
+        return transicoes
+
+
+def mede(avaliar, leituras):
+    tempos, transicoes = [], []
+    for leitura in leituras:
+        inicio = time.perf_counter()
+        resultado = avaliar(*leitura)
+        tempos.append(time.perf_counter() - inicio)
+        transicoes.append(resultado)
+    return {
+        "p50_us": round(percentil(tempos, 50) * 1e6, 1),
+        "p99_us": round(percentil(tempos, 99) * 1e6, 1),
+        "media_us": round(sum(tempos) / len(tempos) * 1e6, 1),
+        "leituras_por_s": round(len(tempos) / sum(tempos)),
+    }, transicoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do motor de regras de clima extremo")
+    parser.add_argument("--regras", type=int, default=300)
+    parser.add_argument("--leituras", type=int, default=5000)
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    aleatorio = random.Random(args.semente)
+    definicoes = gera_regras(args.regras, aleatorio)
+    leituras = gera_leituras(args.leituras, aleatorio)
+
+    motor = MotorRegras([Regra(d) for d in definicoes])
+    incremental, transicoes_motor = mede(motor.avalia, leituras)
+    ingenua, transicoes_ingenuas = mede(AvaliacaoIngenua([Regra(d) for d in definicoes]).avalia, leituras)
+    # Os agregados incrementais diferem do recálculo só por arredondamento
+    confere = [[(r.id, a) for r, a, _ in t] for t in transicoes_motor] == transicoes_ingenuas
+    total_transicoes = sum(len(t) for t in transicoes_motor)
+
+    tipos = collections.Counter(d["tipo"] for d in definicoes)
+    print(f"{args.regras} regras ({dict(tipos)}, {len(motor.janelas)} janelas compartilhadas), "
+          f"{args.leituras} leituras, {total_transicoes} mudanças de estado")
+    for nome, resultado in (("incremental", incremental), ("ingênua    ", ingenua)):
+        print(f"  {nome}: p50 {resultado['p50_us']} µs, p99 {resultado['p99_us']} µs por leitura "
+              f"({resultado['leituras_por_s']} leituras/s)")
+    print(f"  mesmas transições nas duas avaliações: {confere}")
+
+    if args.saida:
+        grava_resultados(args.saida, "regras_alerta", vars(args),
+                         {"incremental": incremental, "ingenua": ingenua,
+                          "transicoes": total_transicoes, "transicoes_conferem": confere})
+
+
+if __name__ == "__main__":
+    main()
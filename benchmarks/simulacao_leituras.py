@@ -0,0 +1,174 @@
+"""
+Benchmark da geração de leituras simuladas do sensor do SISD.
+
+Mede:
+
+- leituras/s do gerador antigo (três ``random.uniform`` e uma string formatada por
+  leitura), do ``GeradorLeituras`` leitura a leitura (``proxima`` + ``codifica_leitura``)
+  e em blocos (``bloco`` + ``codifica_bloco``);
+- se a mesma semente gera a mesma sequência com tamanhos de bloco diferentes;
+- ponta a ponta: um sensor real no modo ``modelo`` com ``SISD_TAXA_LEITURAS`` alto, lido
+  por um cliente binário em loopback (leituras/s recebidas e lacunas de sequência).
+
+O sensor roda a partir de uma cópia temporária de ``src/``, para que logs e snapshots não
+sejam gravados no repositório.
+
+Uso:
+    python benchmarks/simulacao_leituras.py [--leituras 200000] [--bloco 1024] [--taxa 20000]
+                                            [--duracao 5] [--porta 15300] [--saida resultado.json]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from _comum import SRC, grava_resultados
+
+from common.framing import TIPO_LEITURA, VERSAO_BINARIO, codifica_leitura, decodifica_leitura
+from common.framing import negocia_como_cliente
+from common.simulacao import GeradorLeituras, codifica_bloco
+
+
+def mede_antigo(leituras):
+    inicio = time.perf_counter()
+    for i in range(leituras):
+        temperatura = round(random.uniform(15.0, 35.0), 1)
+        umidade = round(random.uniform(30.0, 80.0), 1)
+        pressao = round(random.uniform(990.0, 1020.0), 1)
+        f"{temperatura},{umidade},{pressao}|{i}".encode()
+    return leituras / (time.perf_counter() - inicio)
+
+
+def mede_por_leitura(leituras):
+    gerador = GeradorLeituras(5000, semente=1, inicio=0)
+    inicio = time.perf_counter()
+    for i in range(leituras):
+        codifica_leitura(*gerador.proxima(), i, 5000, i)
+    return leituras / (time.perf_counter() - inicio)
+
+
+def mede_em_blocos(leituras, bloco):
+    gerador = GeradorLeituras(5000, semente=1, inicio=0)
+    inicio = time.perf_counter()
+    for primeira in range(0, leituras, bloco):
+        _, temperatura, umidade, pressao = gerador.bloco(min(bloco, leituras - primeira))
+        codifica_bloco(temperatura, umidade, pressao, primeira, 5000, primeira)
+    return leituras / (time.perf_counter() - inicio)
+
+
+def confere_reprodutivel(leituras, bloco):
+    inteiro = GeradorLeituras(5000, semente=42, inicio=0).bloco(leituras)
+    gerador = GeradorLeituras(5000, semente=42, inicio=0)
+    partes = [gerador.bloco(min(bloco, leituras - i)) for i in range(0, leituras, bloco)]
+    return all(np.array_equal(inteiro[k], np.concatenate([parte[k] for parte in partes])) for k in range(4))
+
+
+def mede_ponta_a_ponta(args):
+    """
+    Sobe um sensor no modo "modelo" na taxa pedida, conecta um cliente binário, injeta o
+    token e conta as leituras recebidas durante ``--duracao`` segundos.
+    """
+    temporario = tempfile.mkdtemp(prefix="sisd_simulacao_")
+    src = os.path.join(temporario, "src")
+    shutil.copytree(SRC, src, ignore=shutil.ignore_patterns("__pycache__", "snapshots", "logs", "chaves"))
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join([src, os.path.join(src, "middleware", "protos")]),
+        "SISD_SIMULACAO": "modelo",
+        "SISD_TAXA_LEITURAS": str(args.taxa),
+        # Sensor sozinho no anel, com posse do token sem limite de leituras
+        "SISD_SENSORES_CONHECIDOS": f"sensor_{args.porta}=127.0.0.1:{args.porta + 1}",
+        "SISD_TOKEN_MAX_LEITURAS": "",
+        "SISD_CHAVES_DIR": os.path.join(temporario, "chaves"),
+        "SISD_LOG_FSYNC": "nenhum",
+    })
+    processo = subprocess.Popen([sys.executable, "-u", os.path.join(src, "sensor", "sensor.py"), str(args.porta)],
+                                env=env, cwd=src, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        limite = time.monotonic() + 30
+        while True:
+            try:
+                sock = socket.create_connection(("127.0.0.1", args.porta), timeout=1)
+                break
+            except OSError:
+                if time.monotonic() > limite:
+                    raise RuntimeError("O sensor não abriu o listener")
+                time.sleep(0.05)
+        _, decodificador, quadros = negocia_como_cliente(sock, versao=VERSAO_BINARIO)
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", args.porta + 2000), timeout=1).sendall(b"TOKEN")
+                break
+            except OSError:
+                if time.monotonic() > limite:
+                    raise RuntimeError("O sensor não abriu a porta do token")
+                time.sleep(0.05)
+        sock.settimeout(5)
+        recebidas, lacunas, anterior = 0, 0, None
+        inicio = None
+        while inicio is None or time.monotonic() - inicio < args.duracao:
+            for tipo, payload in quadros:
+                if tipo != TIPO_LEITURA:
+                    continue
+                if inicio is None:
+                    # Mede a partir da primeira leitura (o token leva um instante para chegar)
+                    inicio = time.monotonic()
+                leitura = decodifica_leitura(payload)
+                if anterior is not None and leitura.sequencia != anterior + 1:
+                    lacunas += 1
+                anterior = leitura.sequencia
+                recebidas += 1
+            quadros = decodificador.recebe(sock)
+            if quadros is None:
+                raise RuntimeError("O sensor fechou a conexão")
+        duracao = time.monotonic() - inicio
+        sock.close()
+    finally:
+        processo.terminate()
+        processo.wait()
+        shutil.rmtree(temporario, ignore_errors=True)
+    return {"taxa_pedida": args.taxa, "recebidas": recebidas,
+            "recebidas_por_s": round(recebidas / duracao), "lacunas": lacunas}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da geração de leituras simuladas")
+    parser.add_argument("--leituras", type=int, default=200000)
+    parser.add_argument("--bloco", type=int, default=1024)
+    parser.add_argument("--taxa", type=float, default=20000, help="SISD_TAXA_LEITURAS do sensor ponta a ponta")
+    parser.add_argument("--duracao", type=float, default=5.0)
+    parser.add_argument("--porta", type=int, default=15300)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    geracao = {
+        "antigo_por_s": round(mede_antigo(args.leituras)),
+        "por_leitura_por_s": round(mede_por_leitura(args.leituras)),
+        "em_blocos_por_s": round(mede_em_blocos(args.leituras, args.bloco)),
+        "reprodutivel": confere_reprodutivel(args.leituras, args.bloco),
+    }
+    print(f"Geração de {args.leituras} leituras:")
+    print(f"  antigo (uniform + texto):          {geracao['antigo_por_s']} leituras/s")
+    print(f"  modelo, leitura a leitura:          {geracao['por_leitura_por_s']} leituras/s")
+    print(f"  modelo em blocos de {args.bloco:5d} (NumPy): {geracao['em_blocos_por_s']} leituras/s")
+    print(f"  mesma semente, mesma sequência com blocos diferentes: {geracao['reprodutivel']}")
+
+    ponta_a_ponta = mede_ponta_a_ponta(args)
+    print(f"Sensor em loopback com SISD_TAXA_LEITURAS={args.taxa:g}: {ponta_a_ponta['recebidas_por_s']} leituras/s "
+          f"recebidas ({ponta_a_ponta['recebidas']} em {args.duracao:g} s, {ponta_a_ponta['lacunas']} lacunas)")
+
+    if args.saida:
+        grava_resultados(args.saida, "simulacao_leituras", vars(args),
+                         {"geracao": geracao, "ponta_a_ponta": ponta_a_ponta})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark dos snapshots locais do SISD.
+
+Monta um estado de nó com N leituras em buffer (além do relógio, anel de token e
+coordenador) e compara:
+
+- o caminho antigo: JSON com ``indent=4`` serializado e gravado na thread que segura a
+  trava do estado;
+- o caminho novo: cópia do estado sob a trava (``SnapshotStore.captura``) e serialização
+  binária + escrita na thread de gravação (``SnapshotStore.agenda``).
+
+Para cada um mede a pausa (tempo com a trava presa), o tempo de serialização e o tamanho
+do arquivo, e confere que o snapshot binário lido de volta é igual ao estado capturado.
+
+Uso:
+    python benchmarks/snapshot_estado.py [--leituras 10000] [--repeticoes 20] [--saida resultado.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from _comum import grava_resultados, percentil
+
+from common.snapshot_store import FORMATO_BINARIO, SnapshotStore, grava_atomico
+
+
+def monta_estado(leituras, aleatorio):
+    """
+    Estado vivo do nó: as leituras em buffer são mutadas pelo benchmark entre snapshots.
+    """
+    return {
+        "id": "sensor_5000",
+        "lamport_clock": 0,
+        "buffer": [
+            {"sequencia": i, "lamport": i, "valores": [aleatorio.uniform(15, 35), aleatorio.uniform(30, 80),
+                                                       aleatorio.uniform(990, 1020)]}
+            for i in range(leituras)
+        ],
+        "token": {"possui": True, "leituras": 3, "geracao": [4, 1]},
+        "coordenador": "sensor_5002",
+    }
+
+
+def copia_estado(estado):
+    # Cópia rasa por nível: as leituras já enviadas ao buffer não são mais alteradas
+    return {
+        "id": estado["id"],
+        "timestamp": time.time(),
+        "lamport_clock": estado["lamport_clock"],
+        "buffer": list(estado["buffer"]),
+        "token": dict(estado["token"]),
+        "coordenador": estado["coordenador"],
+    }
+
+
+def mede_sincrono(args, estado, trava, diretorio):
+    pausas, serializacoes, tamanho = [], [], 0
+    for i in range(args.repeticoes):
+        inicio = time.perf_counter()
+        with trava:
+            estado["lamport_clock"] += 1
+            dados = json.dumps(estado, indent=4).encode("utf-8")
+            meio = time.perf_counter()
+            grava_atomico(os.path.join(diretorio, f"snapshot_{i}.json"), dados)
+        fim = time.perf_counter()
+        pausas.append(fim - inicio)
+        serializacoes.append(meio - inicio)
+        tamanho = len(dados)
+    return pausas, serializacoes, tamanho
+
+
+def mede_assincrono(args, estado, trava, diretorio):
+    store = SnapshotStore(diretorio, "bench", manter_ultimos=args.repeticoes, formato=FORMATO_BINARIO)
+    pausas, serializacoes = [], []
+
+    def ao_gravar(_caminho, metricas):
+        serializacoes.append(metricas["serializacao_ms"] / 1000)
+
+    ultimo = None
+    for _ in range(args.repeticoes):
+        with trava:
+            estado["lamport_clock"] += 1
+        ultimo, pausa_ms = store.captura(lambda: copia_estado(estado), trava)
+        store.agenda(ultimo, ultimo["timestamp"], pausa_ms, ao_gravar=ao_gravar)
+        pausas.append(pausa_ms / 1000)
+        # O estado vivo continua mudando enquanto a gravação acontece
+        with trava:
+            estado["buffer"].append({"sequencia": -1, "lamport": -1, "valores": [0.0, 0.0, 0.0]})
+            estado["buffer"].pop()
+    store.aguarda()
+    _, lido = store.ultimo()
+    return pausas, serializacoes, store.estatisticas()["bytes"], lido == ultimo
+
+
+def resume(pausas, serializacoes, tamanho):
+    def ms(valor):
+        return round(valor * 1000, 3)
+    return {
+        "pausa_p50_ms": ms(percentil(pausas, 50)),
+        "pausa_max_ms": ms(max(pausas)),
+        "serializacao_p50_ms": ms(percentil(serializacoes, 50)),
+        "bytes": tamanho,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos snapshots locais")
+    parser.add_argument("--leituras", type=int, default=10000, help="leituras em buffer no estado")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    estado = monta_estado(args.leituras, random.Random(args.semente))
+    trava = threading.Lock()
+    diretorio = tempfile.mkdtemp(prefix="sisd_snapshot_")
+    try:
+        sincrono = resume(*mede_sincrono(args, estado, trava, diretorio))
+        pausas, serializacoes, tamanho, confere = mede_assincrono(args, estado, trava, diretorio)
+        assincrono = resume(pausas, serializacoes, tamanho)
+        assincrono["leitura_confere"] = confere
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    print(f"Estado com {args.leituras} leituras em buffer, {args.repeticoes} snapshots")
+    for nome, resultado in (("JSON síncrono  ", sincrono), ("binário em fundo", assincrono)):
+        print(f"  {nome}: pausa p50 {resultado['pausa_p50_ms']} ms (máx {resultado['pausa_max_ms']} ms), "
+              f"serialização p50 {resultado['serializacao_p50_ms']} ms, {resultado['bytes']} bytes")
+    print(f"  snapshot binário lido de volta igual ao capturado: {assincrono['leitura_confere']}")
+
+    if args.saida:
+        grava_resultados(args.saida, "snapshot_estado", vars(args),
+                         {"sincrono": sincrono, "assincrono": assincrono})
+
+
+if __name__ == "__main__":
+    main()
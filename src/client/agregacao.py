@@ -0,0 +1,257 @@
+"""
+Agregação em fluxo das leituras recebidas pelo cliente do SISD.
+
+Responsabilidades:
+- Manter, por sensor, agregados em janelas fixas (tumbling) de 1 s, 1 min e 1 h:
+  contagem e mínimo/máximo/média/desvio padrão de temperatura, umidade e pressão.
+- Atualizar a janela de 1 s a cada leitura pelo método de Welford e formar as janelas
+  maiores combinando as menores já fechadas (fórmula de Chan), sem guardar leituras.
+- Guardar as janelas fechadas em buffers circulares de ``array`` por sensor e resolução.
+- Responder a janelas deslizantes (últimos N segundos) combinando as janelas guardadas.
+- Avisar (``ao_fechar``) cada janela fechada, para log, exibição e replicação no cloud.
+
+Layout de uma janela (``CAMPOS`` doubles):
+    início | n | por grandeza: mínimo, máximo, média, M2 (soma dos quadrados dos desvios)
+"""
+
+import math
+import os
+import threading
+import time
+from array import array
+
+GRANDEZAS = ("temperatura", "umidade", "pressao")
+RESOLUCOES = (("1s", 1.0), ("1min", 60.0), ("1h", 3600.0))
+CAMPOS = 2 + 4 * len(GRANDEZAS)
+RETENCAO_PADRAO = {"1s": 3600, "1min": 1440, "1h": 168}   # janelas fechadas guardadas por sensor
+
+
+def nova_janela(inicio):
+    return [inicio, 0] + [math.inf, -math.inf, 0.0, 0.0] * len(GRANDEZAS)
+
+
+def acumula(janela, valores):
+    """
+    Acrescenta uma leitura à janela (Welford).
+    """
+    n = janela[1] + 1
+    janela[1] = n
+    for i, x in enumerate(valores):
+        b = 2 + 4 * i
+        if x < janela[b]:
+            janela[b] = x
+        if x > janela[b + 1]:
+            janela[b + 1] = x
+        delta = x - janela[b + 2]
+        janela[b + 2] += delta / n
+        janela[b + 3] += delta * (x - janela[b + 2])
+
+
+def combina(destino, origem):
+    """
+    Junta os agregados de ``origem`` em ``destino`` (Chan et al.).
+    """
+    na, nb = destino[1], origem[1]
+    if nb == 0:
+        return
+    n = na + nb
+    for i in range(len(GRANDEZAS)):
+        b = 2 + 4 * i
+        destino[b] = min(destino[b], origem[b])
+        destino[b + 1] = max(destino[b + 1], origem[b + 1])
+        delta = origem[b + 2] - destino[b + 2]
+        destino[b + 2] += delta * nb / n
+        destino[b + 3] += origem[b + 3] + delta * delta * na * nb / n
+    destino[1] = n
+
+
+def descreve_janela(janela, sensor, resolucao, duracao):
+    """
+    Converte a janela em dicionário (desvio padrão populacional).
+    """
+    n = int(janela[1])
+    descricao = {"sensor": sensor, "resolucao": resolucao, "inicio": janela[0],
+                 "fim": janela[0] + duracao, "n": n}
+    for i, grandeza in enumerate(GRANDEZAS):
+        b = 2 + 4 * i
+        descricao[grandeza] = {
+            "min": janela[b], "max": janela[b + 1], "media": janela[b + 2],
+            "desvio": math.sqrt(janela[b + 3] / n) if n else 0.0,
+        } if n else None
+    return descricao
+
+
+class JanelasCirculares:
+    """
+    Janelas fechadas de uma resolução em um ``array('d')`` circular de ``capacidade``
+    janelas; o array cresce até a capacidade e depois sobrescreve as mais antigas.
+    """
+
+    def __init__(self, capacidade):
+        self.capacidade = capacidade
+        self._dados = array("d")
+        self._inicio = 0
+        self.tamanho = 0
+
+    def adiciona(self, janela):
+        if self.tamanho < self.capacidade:
+            self._dados.extend(janela)
+            self.tamanho += 1
+            return
+        posicao = self._inicio * CAMPOS
+        self._dados[posicao:posicao + CAMPOS] = array("d", janela)
+        self._inicio = (self._inicio + 1) % self.capacidade
+
+    def janelas(self, desde=-math.inf):
+        """
+        Retorna as janelas com início em ``desde`` ou depois, da mais antiga para a mais recente.
+        """
+        resultado = []
+        for k in range(self.tamanho):
+            posicao = ((self._inicio + k) % self.capacidade) * CAMPOS
+            if self._dados[posicao] >= desde:
+                resultado.append(self._dados[posicao:posicao + CAMPOS].tolist())
+        return resultado
+
+    def __len__(self):
+        return self.tamanho
+
+
+class AgregadosSensor:
+    """
+    Janelas abertas e fechadas de um sensor. Não é thread-safe: o Agregador serializa o acesso.
+    """
+
+    def __init__(self, sensor, retencao):
+        self.sensor = sensor
+        self.abertas = [None] * len(RESOLUCOES)
+        self.fechadas = [JanelasCirculares(retencao[nome]) for nome, _ in RESOLUCOES]
+
+    def registra(self, instante, valores, fechadas):
+        inicio = math.floor(instante)
+        aberta = self.abertas[0]
+        if aberta is not None and inicio > aberta[0]:
+            self._fecha(0, fechadas)
+            aberta = None
+        if aberta is None:
+            aberta = self.abertas[0] = nova_janela(inicio)
+        # Leitura atrasada (instante anterior à janela aberta) entra na janela aberta
+        acumula(aberta, valores)
+
+    def fecha_vencidas(self, agora, fechadas):
+        for nivel, (_, duracao) in enumerate(RESOLUCOES):
+            aberta = self.abertas[nivel]
+            if aberta is not None and aberta[0] + duracao <= agora:
+                self._fecha(nivel, fechadas)
+
+    def _fecha(self, nivel, fechadas):
+        janela = self.abertas[nivel]
+        self.abertas[nivel] = None
+        self.fechadas[nivel].adiciona(janela)
+        nome, duracao = RESOLUCOES[nivel]
+        fechadas.append(descreve_janela(janela, self.sensor, nome, duracao))
+        if nivel + 1 < len(RESOLUCOES):
+            duracao_acima = RESOLUCOES[nivel + 1][1]
+            inicio_acima = math.floor(janela[0] / duracao_acima) * duracao_acima
+            acima = self.abertas[nivel + 1]
+            if acima is not None and acima[0] != inicio_acima:
+                self._fecha(nivel + 1, fechadas)
+                acima = None
+            if acima is None:
+                acima = self.abertas[nivel + 1] = nova_janela(inicio_acima)
+            combina(acima, janela)
+
+    def deslizante(self, segundos, agora):
+        """
+        Combina os últimos ``segundos``: janelas fechadas da menor resolução que ainda cobre
+        o intervalo, mais as janelas abertas até essa resolução.
+        """
+        desde = agora - segundos
+        nivel = 0
+        while (nivel + 1 < len(RESOLUCOES)
+               and segundos > self.fechadas[nivel].capacidade * RESOLUCOES[nivel][1]):
+            nivel += 1
+        resultado = nova_janela(desde)
+        for janela in self.fechadas[nivel].janelas(desde):
+            combina(resultado, janela)
+        for aberta in self.abertas[:nivel + 1]:
+            if aberta is not None:
+                combina(resultado, aberta)
+        return resultado
+
+
+class Agregador:
+    """
+    Agregados em fluxo de todos os sensores.
+
+    ``registra`` recebe cada leitura; ``fecha_vencidas`` (chamado periodicamente) fecha as
+    janelas cujo tempo acabou mesmo sem novas leituras. ``ao_fechar(janela)`` recebe cada
+    janela fechada como dicionário (``descreve_janela``).
+    """
+
+    def __init__(self, ao_fechar=None, retencao=None, relogio=time.time):
+        self.ao_fechar = ao_fechar
+        self.retencao = dict(RETENCAO_PADRAO, **(retencao or {}))
+        self.relogio = relogio
+        self._lock = threading.Lock()
+        self._sensores = {}
+
+    def _sensor(self, sensor):
+        agregados = self._sensores.get(sensor)
+        if agregados is None:
+            agregados = self._sensores[sensor] = AgregadosSensor(sensor, self.retencao)
+        return agregados
+
+    def registra(self, sensor, temperatura, umidade, pressao, instante=None):
+        instante = self.relogio() if instante is None else instante
+        fechadas = []
+        with self._lock:
+            self._sensor(sensor).registra(instante, (temperatura, umidade, pressao), fechadas)
+        self._avisa(fechadas)
+
+    def fecha_vencidas(self, agora=None):
+        agora = self.relogio() if agora is None else agora
+        fechadas = []
+        with self._lock:
+            for agregados in self._sensores.values():
+                agregados.fecha_vencidas(agora, fechadas)
+        self._avisa(fechadas)
+
+    def _avisa(self, fechadas):
+        if self.ao_fechar is not None:
+            for janela in fechadas:
+                self.ao_fechar(janela)
+
+    def deslizante(self, sensor, segundos, agora=None):
+        """
+        Agregados dos últimos ``segundos`` do sensor (com a granularidade das janelas fixas).
+        """
+        agora = self.relogio() if agora is None else agora
+        with self._lock:
+            janela = self._sensor(sensor).deslizante(segundos, agora)
+        return descreve_janela(janela, sensor, f"{segundos:g}s", segundos)
+
+    def ultimas(self, sensor, resolucao="1min", quantidade=60):
+        """
+        Últimas ``quantidade`` janelas fechadas do sensor na resolução pedida.
+        """
+        nivel, duracao = next((i, d) for i, (nome, d) in enumerate(RESOLUCOES) if nome == resolucao)
+        with self._lock:
+            janelas = self._sensor(sensor).fechadas[nivel].janelas()[-quantidade:]
+        return [descreve_janela(janela, sensor, resolucao, duracao) for janela in janelas]
+
+    def sensores(self):
+        with self._lock:
+            return sorted(self._sensores)
+
+
+def abre_agregador(ao_fechar=None):
+    """
+    Cria o Agregador com a retenção de SISD_AGREGACAO_RETENCAO ("1s=3600,1min=1440,1h=168").
+    """
+    retencao = {}
+    for item in os.environ.get("SISD_AGREGACAO_RETENCAO", "").split(","):
+        if "=" in item:
+            nome, capacidade = item.split("=", 1)
+            retencao[nome.strip()] = int(capacidade)
+    return Agregador(ao_fechar=ao_fechar, retencao=retencao)
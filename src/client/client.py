@@ -2,24 +2,34 @@
 Módulo principal do Cliente do sistema SISD.
 
 Responsabilidades:
-- Conectar-se aos sensores via TCP e receber dados climáticos.
-- Orquestrar snapshots globais e enviar marcadores para os sensores.
+- Conectar-se aos sensores via TCP (event loop único) e receber dados climáticos.
+- Orquestrar snapshots globais consistentes (Chandy-Lamport): marcadores em paralelo,
+  gravação do estado dos canais de dados e manifesto global atômico.
 - Implementar checkpoint/rollback (snapshots) para tolerância a falhas.
 - Replicar logs para o serviço cloud.
 - Participar do Token Ring (envio inicial do token).
-- Autenticar sensores usando criptografia assimétrica (RSA).
+- Estabelecer canais cifrados com os sensores (autenticados pela chave RSA de cada
+  sensor, fixada no primeiro contato, com retomada de sessão por ticket).
+- Assinar os alertas climáticos multicast dos sensores.
+- Agregar as leituras por sensor em janelas de 1 s, 1 min e 1 h e, opcionalmente,
+  replicar para o cloud só os agregados em vez das leituras brutas.
 """
 
 import socket
 import threading
 import time
-import json
 import os
-import requests
-import glob
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import padding
-from cryptography.hazmat.primitives import hashes
+from common.log_store import abre_log_store, migrar_log_json
+from common.snapshot_store import abre_snapshot_store
+from common.replication import cria_replicador
+from common.framing import TIPO_LEITURA, TIPO_MARCADOR, decodifica_leitura, decodifica_marcador
+from common.snapshot_global import CoordenadorSnapshot
+from common.canal_seguro import abre_chaveiro
+# Executado como script (src/client/client.py), o diretório do cliente vem primeiro no
+# sys.path e "client" seria este arquivo, não o pacote: os módulos vizinhos são importados direto
+from ingestao import MotorIngestao, carrega_sensores, observa_config
+from agregacao import abre_agregador
+from multicast.sensor_alert import abre_assinante, descreve_alerta
 
 # Inicializa o relógio de Lamport e um lock para ele
 relogio_de_lamport = 0
@@ -30,93 +40,112 @@ SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), "snapshots")
 if not os.path.exists(SNAPSHOT_DIR):
     os.makedirs(SNAPSHOT_DIR)
 
+# Snapshots do cliente em SNAPSHOT_DIR/cliente, com manifesto e retenção
+SNAPSHOT_STORE = abre_snapshot_store(SNAPSHOT_DIR, "cliente")
+# Snapshots globais (estado do cliente, dos sensores e dos canais) em SNAPSHOT_DIR/global
+SNAPSHOT_GLOBAL_STORE = abre_snapshot_store(SNAPSHOT_DIR, "global")
+coordenador = None  # CoordenadorSnapshot (criado em main)
+
 LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 
-LOG_FILE = os.path.join(LOG_DIR, "client_log.json")
-# Garante que o arquivo de log existe
-if not os.path.exists(LOG_FILE):
-    with open(LOG_FILE, "w") as f:
-        json.dump([], f, indent=4)
+# Log append-only do cliente; o antigo client_log.json é migrado na primeira execução
+LOG_STORE = abre_log_store(LOG_DIR, "client_log")
+migrar_log_json(os.path.join(LOG_DIR, "client_log.json"), LOG_STORE)
+
+# Replicação em lote para o cloud, fora do caminho de recebimento de dados
+REPLICADOR = cria_replicador(LOG_DIR, "client")
+
+# O que vai para o cloud: "brutas" (cada leitura), "agregados" (só as janelas fechadas
+# nas resoluções de SISD_AGREGACAO_RESOLUCOES_REPLICADAS; leituras só no log local) ou "ambos"
+REPLICACAO_LEITURAS = os.environ.get("SISD_REPLICACAO_LEITURAS", "brutas")
+RESOLUCOES_REPLICADAS = set(os.environ.get("SISD_AGREGACAO_RESOLUCOES_REPLICADAS", "1min,1h").split(","))
 
-def criar_snapshot_local():
+def captura_estado_local():
     """
-    Cria um snapshot do estado atual do cliente.
+    Estado do cliente registrado no snapshot (chamado com a trava do coordenador presa).
     """
-    snapshot = {
+    return {
         "id": "cliente",
         "timestamp": time.time(),
-        "lamport_clock": relogio_de_lamport
+        "lamport_clock": relogio_de_lamport,
+        "ultima_sequencia": dict(ultima_sequencia),
     }
-    nome_arquivo = os.path.join(SNAPSHOT_DIR, f"snapshot_cliente_{int(time.time())}.json")
-    with open(nome_arquivo, "w") as f:
-        json.dump(snapshot, f, indent=4)
-    print(f"[Cliente] Snapshot local criado: {nome_arquivo}")
 
-def registrar_mensagem(id, mensagem):
+def criar_snapshot_local(snapshot=None, pausa_ms=None):
+    """
+    Agenda a gravação em segundo plano do estado do cliente (capturado agora ou já registrado).
+    """
+    if snapshot is None:
+        snapshot, pausa_ms = SNAPSHOT_STORE.captura(captura_estado_local, coordenador.trava)
+    SNAPSHOT_STORE.agenda(snapshot, snapshot["timestamp"], pausa_ms or 0.0, ao_gravar=snapshot_gravado)
+
+def snapshot_gravado(caminho, metricas):
     """
-    Registra uma mensagem no log local e replica para a nuvem.
+    Chamada pela thread de gravação com os tempos de captura e de serialização.
+    """
+    print(f"[Cliente] Snapshot local criado: {caminho} (pausa {metricas['pausa_ms']:.3f} ms, "
+          f"serialização {metricas['serializacao_ms']:.3f} ms, {metricas['bytes']} bytes)")
+
+def registrar_mensagem(id, mensagem, replicar=True, **extras):
+    """
+    Registra uma mensagem no log local e, se ``replicar``, replica para a nuvem.
     """
     log_entry = {
         "id": id,
         "timestamp": time.time(),
         "mensagem": mensagem
     }
+    log_entry.update(extras)
 
-    # Se o arquivo não existir, cria um novo com uma lista vazia
-    if not os.path.exists(LOG_FILE):
-        with open(LOG_FILE, "w") as f:
-            json.dump([], f, indent=4)
-
-    # Adiciona a nova entrada ao arquivo
-    with open(LOG_FILE, "r+") as f:
-        logs = json.load(f)
-        logs.append(log_entry)
-        f.seek(0)
-        json.dump(logs, f, indent=4)
-        f.truncate()  # <-- ESSA LINHA É FUNDAMENTAL
+    # Acrescenta a nova entrada ao log local (append-only)
+    LOG_STORE.append(log_entry)
 
     # Replica para a nuvem
-    replica_para_cloud(log_entry)
+    if replicar:
+        replica_para_cloud(log_entry)
 
-def enviar_mensagens(sensores):
+def agregado_fechado(agregado):
     """
-    Envia marcadores de snapshot para todos os sensores.
+    Chamada pelo agregador a cada janela fechada: registra (e replica, conforme
+    SISD_REPLICACAO_LEITURAS) as resoluções de RESOLUCOES_REPLICADAS.
     """
-    novo_clock = incrementa_relogio_de_lamport()
-    marcador = f"MARKER|{novo_clock}"
-    print(f"[Cliente] Enviando marcador: {marcador}")
+    if agregado["resolucao"] not in RESOLUCOES_REPLICADAS or not agregado["n"]:
+        return
+    resumo = ", ".join(f"{grandeza} {agregado[grandeza]['media']:.1f}±{agregado[grandeza]['desvio']:.1f} "
+                       f"[{agregado[grandeza]['min']:.1f}, {agregado[grandeza]['max']:.1f}]"
+                       for grandeza in ("temperatura", "umidade", "pressao"))
+    mensagem = f"[Agregado] {agregado['sensor']} {agregado['resolucao']} n={agregado['n']}: {resumo}"
+    print(f"[Cliente] {mensagem}")
+    registrar_mensagem("client", mensagem, replicar=REPLICACAO_LEITURAS != "brutas", agregado=agregado)
 
-    for sensor in sensores:
-        host = sensor["host"]
-        porta_base = sensor["porta"]
-        # Considerando que o servidor de snapshot nos sensores está na porta (porta_base + 1000)
-        porta_marker = porta_base + 1000
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(5)
-            s.connect((host, porta_marker))
-            s.sendall(marcador.encode())
-            print(f"[Cliente] Marcador enviado para {host}:{porta_marker}")
-            mensagem = f"[Cliente] Marcador enviado para {host}:{porta_marker}"
-            registrar_mensagem("client", mensagem)
-        except Exception as e:
-            print(f"[Cliente] Erro ao enviar marcador para {host}:{porta_marker}: {e}")
+# Agregados por sensor em janelas de 1 s, 1 min e 1 h
+AGREGADOR = abre_agregador(agregado_fechado)
 
-        finally:
-            s.close()
+def fecha_agregados_periodico(intervalo=1.0):
+    """
+    Fecha as janelas vencidas mesmo quando um sensor para de enviar leituras.
+    """
+    while True:
+        time.sleep(intervalo)
+        AGREGADOR.fecha_vencidas()
 
-def snapshot_global_periodico(sensores):
+def snapshot_global_periodico(intervalo=10):
     """
-    Periodicamente cria snapshot local e envia marcadores para os sensores.
+    Periodicamente inicia um snapshot global: o cliente registra seu estado, os marcadores
+    seguem em paralelo para os sensores e o estado dos canais é gravado até cada marcador.
     """
     while True:
-        # Cria o snapshot local do cliente
-        criar_snapshot_local()
-        # Envia os marcadores para os sensores
-        enviar_mensagens(sensores)
-        time.sleep(10)
+        documento = coordenador.inicia()
+        criar_snapshot_local(documento["cliente"], documento["pausa_captura_ms"])
+        canais = sum(len(canal["mensagens"]) for canal in documento["canais"].values())
+        print(f"[Cliente] Snapshot global {documento['snapshot_id']} "
+              f"{'completo' if documento['completo'] else 'incompleto'} em {documento['duracao_ms']} ms, "
+              f"pausa de captura {documento['pausa_captura_ms']} ms "
+              f"({len(documento['sensores'])} sensores, {canais} mensagens em trânsito)")
+        registrar_mensagem("client", f"[Cliente] Snapshot global {documento['snapshot_id']} gravado")
+        time.sleep(intervalo)
 
 def atualizar_relogio_de_lamport(timestamp_recebido):
     """
@@ -137,56 +166,77 @@ def incrementa_relogio_de_lamport():
         print(f"[Cliente] Relógio de Lamport incrementado: {relogio_de_lamport}")
         return relogio_de_lamport
 
-def receber_dados(s, host, porta):
+# Última sequência recebida por sensor (modo binário), para detectar leituras perdidas
+ultima_sequencia = {}
+
+def processa_leitura(host, porta, dados_climaticos, sensor_timestamp):
     """
-    Recebe dados do sensor enquanto a conexão estiver ativa.
+    Registra uma leitura recebida e atualiza o relógio de Lamport.
     """
+    print(f"[Cliente] Dados recebidos de {host}:{porta} -> {dados_climaticos}")
+    registrar_mensagem(f"{host}:{porta}", dados_climaticos, replicar=REPLICACAO_LEITURAS != "agregados")
     try:
-        while True:
-            dados = s.recv(1024)
-            if not dados:
-                break
-            mensagem = dados.decode()
-            partes = mensagem.split("|")
-            if len(partes) == 2:
-                dados_climaticos = partes[0]
-                try:
-                    sensor_timestamp = int(partes[1])
-                except ValueError:
-                    sensor_timestamp = None
-            else:
-                dados_climaticos = mensagem
-                sensor_timestamp = None
-
-            print(f"[Cliente] Dados recebidos de {host}:{porta} -> {dados_climaticos}")
-            registrar_mensagem(f"{host}:{porta}", dados_climaticos)
-            
-            if sensor_timestamp is not None:
-                atualizar_relogio_de_lamport(sensor_timestamp)
-            else:
-                incrementa_relogio_de_lamport()
-    except Exception as e:
-        print(f"[Cliente] Erro ao receber dados de {host}:{porta}: {e}")
+        temperatura, umidade, pressao = (float(valor) for valor in dados_climaticos.split(","))
+    except ValueError:
+        print(f"[Cliente] Leitura fora do formato temp,umid,press de {host}:{porta}: {dados_climaticos}")
+    else:
+        AGREGADOR.registra(f"{host}:{porta}", temperatura, umidade, pressao)
 
-def conecta_sensor(host, porta):
+    if sensor_timestamp is not None:
+        atualizar_relogio_de_lamport(sensor_timestamp)
+    else:
+        incrementa_relogio_de_lamport()
+
+def processa_quadro(host, porta, tipo, payload):
     """
-    Estabelece conexão com o sensor e chama o método de receber dados.
+    Trata um quadro do protocolo binário recebido de um sensor.
     """
-    while True:
+    canal = f"{host}:{porta}"
+    if tipo == TIPO_MARCADOR:
+        snapshot_id, _ = decodifica_marcador(payload)
+        with coordenador.trava:
+            coordenador.recebe_marcador(canal, snapshot_id)
+        return
+    if tipo != TIPO_LEITURA:
+        print(f"[Cliente] Quadro de tipo {tipo} ignorado de {host}:{porta}")
+        return
+    leitura = decodifica_leitura(payload)
+    # A leitura entra no estado do canal e no estado local atomicamente em relação ao snapshot
+    with coordenador.trava:
+        coordenador.grava_mensagem(canal, leitura._asdict())
+        anterior = ultima_sequencia.get(leitura.sensor_id)
+        if anterior is not None and leitura.sequencia != anterior + 1:
+            print(f"[Cliente] Lacuna na sequência do sensor {leitura.sensor_id}: {anterior} -> {leitura.sequencia}")
+        ultima_sequencia[leitura.sensor_id] = leitura.sequencia
+        dados_climaticos = f"{leitura.temperatura:.1f},{leitura.umidade:.1f},{leitura.pressao:.1f}"
+        processa_leitura(host, porta, dados_climaticos, leitura.lamport)
+
+def processa_alerta(alerta):
+    """
+    Registra um alerta climático recebido pelo grupo multicast.
+    """
+    print(f"[Cliente] Alerta climático: {descreve_alerta(alerta)}")
+    registrar_mensagem(f"sensor_{alerta.sensor_id}", f"[Alerta] {descreve_alerta(alerta)}")
+
+def alertas_perdidos(sensor_id, de, ate):
+    print(f"[Cliente] Alertas perdidos de sensor_{sensor_id}: sequências {de}..{ate}")
+
+def processa_texto(host, porta, mensagem):
+    """
+    Trata uma mensagem de um sensor legado (protocolo texto "temp,umid,press|lamport").
+    """
+    partes = mensagem.split("|")
+    if len(partes) == 2:
+        dados_climaticos = partes[0]
         try:
-            print(f"[Cliente] Tentando conectar a {host}:{porta} ...")
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.connect((host, porta))
-            print(f"[Cliente] Conectado ao sensor {host}:{porta}")
-            receber_dados(s, host, porta)
-        except Exception as e:
-            print(f"[Cliente] Erro ao conectar-se a {host}:{porta}: {e}. Tentando novamente em 5 segundos...")
-            time.sleep(5)  # Aguarda 5 segundos antes de tentar novamente
-        finally:
-            try:
-                s.close()
-            except Exception:
-                pass
+            sensor_timestamp = int(partes[1])
+        except ValueError:
+            sensor_timestamp = None
+    else:
+        dados_climaticos = mensagem
+        sensor_timestamp = None
+    with coordenador.trava:
+        processa_leitura(host, porta, dados_climaticos, sensor_timestamp)
 
 def enviar_token_para_maior_id(sensores):
     """
@@ -212,73 +262,75 @@ def enviar_token_para_maior_id(sensores):
 
 def replica_para_cloud(log_entry):
     """
-    Replica uma entrada de log para o serviço cloud.
+    Enfileira uma entrada de log para replicação assíncrona no serviço cloud.
     """
-    try:
-        requests.post("http://cloud:6000/replica", json=log_entry, timeout=2)
-    except Exception as e:
-        print(f"[Cloud] Falha ao replicar para nuvem: {e}")
+    REPLICADOR.enfileira(log_entry)
 
 def restaurar_estado_do_ultimo_snapshot():
     """
-    Restaura o estado do cliente a partir do último snapshot salvo.
+    Restaura o estado do cliente a partir do último snapshot global completo (estado do
+    cliente mais as leituras em trânsito nos canais) ou, sem ele, do último snapshot local.
     """
     global relogio_de_lamport
-    arquivos = glob.glob(os.path.join(SNAPSHOT_DIR, "snapshot_cliente_*.json"))
-    if not arquivos:
+    caminho, snapshot = SNAPSHOT_GLOBAL_STORE.ultimo()
+    if snapshot is not None and snapshot.get("completo"):
+        relogio_de_lamport = snapshot["cliente"].get("lamport_clock", 0)
+        for canal in snapshot["canais"].values():
+            for mensagem in canal["mensagens"]:
+                relogio_de_lamport = max(relogio_de_lamport, mensagem["lamport"]) + 1
+                ultima_sequencia[mensagem["sensor_id"]] = mensagem["sequencia"]
+        print(f"[Cliente] Estado restaurado do snapshot global {snapshot['snapshot_id']}: {caminho} "
+              f"(Lamport={relogio_de_lamport})")
+        return
+    caminho, snapshot = SNAPSHOT_STORE.ultimo()
+    if snapshot is None:
         print("[Cliente] Nenhum snapshot encontrado para restaurar.")
         return
-    ultimo_snapshot = max(arquivos, key=os.path.getmtime)
-    with open(ultimo_snapshot, "r") as f:
-        snapshot = json.load(f)
-        relogio_de_lamport = snapshot.get("lamport_clock", 0)
-    print(f"[Cliente] Estado restaurado do snapshot: {ultimo_snapshot} (Lamport={relogio_de_lamport})")
-
-def load_sensor_public_key(pub_path):
-    """
-    Carrega a chave pública do sensor.
-    """
-    with open(pub_path, "rb") as f:
-        return serialization.load_pem_public_key(f.read())
-
-def autentica_com_sensor(sock, sensor_pubkey):
-    """
-    Autentica o sensor usando criptografia assimétrica.
-    """
-    segredo = os.urandom(16)
-    segredo_cifrado = sensor_pubkey.encrypt(
-        segredo,
-        padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
-    )
-    sock.sendall(segredo_cifrado)
-    resposta = sock.recv(256)
-    if resposta == segredo:
-        print("[Cliente] Sensor autenticado com sucesso!")
-        return True
-    else:
-        print("[Cliente] Falha na autenticação do sensor.")
-        return False
+    relogio_de_lamport = snapshot.get("lamport_clock", 0)
+    print(f"[Cliente] Estado restaurado do snapshot: {caminho} (Lamport={relogio_de_lamport})")
 
 def main():
     """
     Função principal do cliente: inicializa threads, conexões e snapshots.
     """
     restaurar_estado_do_ultimo_snapshot()
-    # Sensores disponíveis (nomes de host e porta para conexão de dados)
-    sensores = [
-        {"host": "sensor1", "porta": 5000},
-        {"host": "sensor2", "porta": 5001},
-        {"host": "sensor3", "porta": 5002},
-    ]
-
-    # Inicia threads para conectar aos sensores e receber dados
-    for sensor in sensores:
-        t = threading.Thread(target=conecta_sensor, args=(sensor["host"], sensor["porta"]))
-        t.daemon = True
-        t.start()
-
-    # Inicia thread para o snapshot global com envio de marcadores
-    t_snapshot = threading.Thread(target=snapshot_global_periodico, args=(sensores,))
+    # Sensores disponíveis (arquivo sensores.json, SISD_SENSORES_ARQUIVO ou SISD_SENSORES)
+    sensores = carrega_sensores()
+
+    # Um único event loop mantém as conexões com todos os sensores
+    motor = MotorIngestao(processa_quadro, processa_texto, chaveiro=abre_chaveiro(os.path.dirname(__file__)))
+
+    global coordenador
+    coordenador = CoordenadorSnapshot(
+        captura_estado_local,
+        lambda: sensores,
+        motor.binarios,
+        SNAPSHOT_GLOBAL_STORE,
+        timeout=float(os.environ.get("SISD_SNAPSHOT_TIMEOUT", 10.0)),
+    )
+    motor.inicia(sensores)
+
+    def ao_recarregar(novos_sensores):
+        sensores[:] = novos_sensores
+        motor.atualiza_sensores(novos_sensores)
+
+    if not os.environ.get("SISD_SENSORES"):
+        observa_config(ao_recarregar)
+
+    # Alertas climáticos multicast (SISD_MULTICAST_ASSINAR=0 desliga)
+    if os.environ.get("SISD_MULTICAST_ASSINAR", "1") != "0":
+        try:
+            abre_assinante(processa_alerta, alertas_perdidos).inicia()
+        except OSError as e:
+            print(f"[Cliente] Não foi possível assinar os alertas multicast: {e}")
+
+    # Fecha as janelas de agregação vencidas
+    t_agregados = threading.Thread(target=fecha_agregados_periodico)
+    t_agregados.daemon = True
+    t_agregados.start()
+
+    # Inicia thread para o snapshot global (Chandy-Lamport) com envio de marcadores
+    t_snapshot = threading.Thread(target=snapshot_global_periodico)
     t_snapshot.daemon = True
     t_snapshot.start()
 
@@ -0,0 +1,243 @@
+"""
+Motor de ingestão multiplexada do Cliente do SISD.
+
+Responsabilidades:
+- Manter as conexões com todos os sensores em um único event loop asyncio
+  (em vez de uma thread bloqueante por sensor).
+- Reconectar sem bloquear, com backoff exponencial e jitter por sensor.
+- Negociar o protocolo binário e decodificar os quadros com um buffer por conexão.
+- Estabelecer o canal cifrado (handshake X25519 com retomada por ticket) com sensores
+  que falam a versão 2 do protocolo e decifrar os registros recebidos.
+- Entregar leituras a um estágio de processamento em thread separada, por meio de
+  uma fila limitada (quando cheia, a leitura dos sockets é pausada).
+- Carregar a lista de sensores de um arquivo de configuração ou de variável de
+  ambiente, recarregando-a quando o arquivo muda.
+"""
+
+import asyncio
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+from common.framing import (MODO_CIFRADO, MODO_TEXTO, TIPO_CANAL_ACEITE, TIPO_CIFRADO,
+                            VERSAO_BINARIO, VERSAO_CIFRADA, DecodificadorQuadros, ErroProtocolo,
+                            negocia_como_cliente_async)
+
+CONFIG_PADRAO = os.path.join(os.path.dirname(__file__), "sensores.json")
+
+
+def carrega_sensores(caminho=None):
+    """
+    Retorna a lista de sensores ``[{"host": ..., "porta": ...}]``.
+
+    Ordem de precedência: variável SISD_SENSORES ("host:porta,host:porta"),
+    arquivo indicado (ou SISD_SENSORES_ARQUIVO) e o sensores.json padrão.
+    """
+    lista = os.environ.get("SISD_SENSORES")
+    if lista:
+        sensores = []
+        for item in lista.split(","):
+            host, _, porta = item.strip().rpartition(":")
+            sensores.append({"host": host, "porta": int(porta)})
+        return sensores
+    caminho = caminho or os.environ.get("SISD_SENSORES_ARQUIVO", CONFIG_PADRAO)
+    with open(caminho) as f:
+        return [{"host": s["host"], "porta": int(s["porta"])} for s in json.load(f)]
+
+
+class MotorIngestao:
+    """
+    Event loop único que mantém uma tarefa de conexão por sensor.
+
+    ``processa_quadro(host, porta, tipo, payload)`` e ``processa_texto(host, porta, mensagem)``
+    são chamados na thread de processamento, nunca no event loop.
+    Com um ``chaveiro`` (ChaveiroSessoes) o cliente oferece o canal cifrado aos sensores.
+    """
+
+    def __init__(self, processa_quadro, processa_texto, capacidade_fila=10000,
+                 backoff_inicial=0.5, backoff_max=30.0, timeout_conexao=5.0, chaveiro=None):
+        self.processa_quadro = processa_quadro
+        self.processa_texto = processa_texto
+        self.chaveiro = chaveiro
+        self.backoff_inicial = backoff_inicial
+        self.backoff_max = backoff_max
+        self.timeout_conexao = timeout_conexao
+        self.fila = queue.Queue(maxsize=capacidade_fila)
+        self.loop = asyncio.new_event_loop()
+        self._tarefas = {}          # (host, porta) -> asyncio.Task
+        self._legados = set()       # sensores que só falam o protocolo texto
+        self._conectados = set()
+
+    # --- Ciclo de vida ---
+    def inicia(self, sensores):
+        """
+        Inicia o event loop e a thread de processamento em segundo plano.
+        """
+        processador = threading.Thread(target=self._processa, name="ingestao-processamento")
+        processador.daemon = True
+        processador.start()
+        thread_loop = threading.Thread(target=self.loop.run_forever, name="ingestao-loop")
+        thread_loop.daemon = True
+        thread_loop.start()
+        self.atualiza_sensores(sensores)
+
+    def atualiza_sensores(self, sensores):
+        """
+        Sincroniza as conexões com a lista de sensores (pode ser chamado de qualquer thread).
+        """
+        chaves = {(s["host"], s["porta"]) for s in sensores}
+        self.loop.call_soon_threadsafe(self._sincroniza, chaves)
+
+    def conectados(self):
+        """
+        Retorna os sensores com conexão ativa.
+        """
+        return set(self._conectados)
+
+    def binarios(self):
+        """
+        Retorna os sensores conectados no protocolo binário (que transportam marcadores).
+        """
+        return set(self._conectados) - set(self._legados)
+
+    def _sincroniza(self, chaves):
+        for chave in list(self._tarefas):
+            if chave not in chaves:
+                print(f"[Cliente] Removendo sensor {chave[0]}:{chave[1]}")
+                self._tarefas.pop(chave).cancel()
+        for chave in chaves:
+            if chave not in self._tarefas:
+                self._tarefas[chave] = self.loop.create_task(self._mantem_conexao(*chave))
+
+    # --- Conexões ---
+    async def _mantem_conexao(self, host, porta):
+        backoff = self.backoff_inicial
+        while True:
+            print(f"[Cliente] Tentando conectar a {host}:{porta} ...")
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, porta), self.timeout_conexao)
+            except (OSError, asyncio.TimeoutError) as e:
+                espera = random.uniform(backoff / 2, backoff)
+                print(f"[Cliente] Erro ao conectar-se a {host}:{porta}: {e}. "
+                      f"Tentando novamente em {espera:.1f} segundos...")
+                await asyncio.sleep(espera)
+                backoff = min(backoff * 2, self.backoff_max)
+                continue
+            backoff = self.backoff_inicial
+            print(f"[Cliente] Conectado ao sensor {host}:{porta}")
+            self._conectados.add((host, porta))
+            try:
+                await self._atende(host, porta, reader, writer)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Cliente] Erro ao receber dados de {host}:{porta}: {e}")
+            finally:
+                self._conectados.discard((host, porta))
+                writer.close()
+
+    async def _atende(self, host, porta, reader, writer):
+        decodificador = DecodificadorQuadros()
+        sessao = None
+        modo = MODO_TEXTO
+        if (host, porta) not in self._legados:
+            versao = VERSAO_CIFRADA if self.chaveiro else VERSAO_BINARIO
+            modo, quadros = await negocia_como_cliente_async(reader, writer, decodificador, versao=versao)
+            if modo == MODO_TEXTO:
+                # Sensor legado descartou o HELLO: a próxima conexão já usa o modo texto
+                print(f"[Cliente] Sensor {host}:{porta} não suporta o protocolo binário, usando texto")
+                self._legados.add((host, porta))
+                return
+            if modo == MODO_CIFRADO:
+                sessao, quadros = await self._handshake(host, porta, reader, writer, decodificador, quadros)
+            interno = DecodificadorQuadros()
+            await self._entrega_quadros(host, porta, quadros, sessao, interno)
+        while True:
+            dados = await reader.read(65536)
+            if not dados:
+                return
+            if modo == MODO_TEXTO:
+                await self._entrega((self.processa_texto, host, porta, dados.decode()))
+            else:
+                await self._entrega_quadros(host, porta, decodificador.alimenta(dados), sessao, interno)
+
+    async def _handshake(self, host, porta, reader, writer, decodificador, quadros):
+        """
+        Handshake do canal seguro; retorna a sessão e os quadros que chegaram depois do aceite.
+        """
+        handshake = self.chaveiro.inicia(f"{host}:{porta}")
+        writer.write(handshake.quadro())
+        await writer.drain()
+        while not quadros:
+            dados = await asyncio.wait_for(reader.read(65536), self.timeout_conexao)
+            if not dados:
+                raise ConnectionResetError("Sensor encerrou a conexão durante o handshake")
+            quadros = decodificador.alimenta(dados)
+        tipo, payload = quadros[0]
+        if tipo != TIPO_CANAL_ACEITE:
+            raise ErroProtocolo(f"Quadro de tipo {tipo} no lugar do aceite do canal")
+        sessao = self.chaveiro.conclui(handshake, payload)
+        print(f"[Cliente] Canal cifrado com {host}:{porta} "
+              f"({'sessão retomada' if sessao.retomada else 'handshake completo'})")
+        return sessao, quadros[1:]
+
+    async def _entrega_quadros(self, host, porta, quadros, sessao, interno):
+        for tipo, payload in quadros:
+            if sessao is None:
+                await self._entrega((self.processa_quadro, host, porta, tipo, payload))
+                continue
+            # Canal cifrado: quadros em claro não são aceitos depois do handshake
+            if tipo != TIPO_CIFRADO:
+                raise ErroProtocolo(f"Quadro de tipo {tipo} sem cifra em canal cifrado")
+            for tipo_interno, payload_interno in interno.alimenta(sessao.abre(payload)):
+                await self._entrega((self.processa_quadro, host, porta, tipo_interno, payload_interno))
+
+    async def _entrega(self, item):
+        # Fila cheia: pausa a leitura desta conexão (o TCP aplica backpressure no sensor)
+        while True:
+            try:
+                self.fila.put_nowait(item)
+                return
+            except queue.Full:
+                await asyncio.sleep(0.01)
+
+    # --- Estágio de processamento ---
+    def _processa(self):
+        while True:
+            funcao, *args = self.fila.get()
+            try:
+                funcao(*args)
+            except Exception as e:
+                print(f"[Cliente] Erro ao processar dados de {args[0]}:{args[1]}: {e}")
+
+
+def observa_config(ao_recarregar, caminho=None, intervalo=10.0):
+    """
+    Chama ``ao_recarregar(sensores)`` sempre que o arquivo de configuração muda.
+    Retorna a thread de observação (daemon).
+    """
+    caminho = caminho or os.environ.get("SISD_SENSORES_ARQUIVO", CONFIG_PADRAO)
+
+    def observa():
+        ultima_modificacao = os.path.getmtime(caminho) if os.path.exists(caminho) else None
+        while True:
+            time.sleep(intervalo)
+            if not os.path.exists(caminho):
+                continue
+            modificacao = os.path.getmtime(caminho)
+            if modificacao != ultima_modificacao:
+                ultima_modificacao = modificacao
+                try:
+                    ao_recarregar(carrega_sensores(caminho))
+                    print(f"[Cliente] Configuração de sensores recarregada de {caminho}")
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"[Cliente] Configuração de sensores inválida em {caminho}: {e}")
+
+    t = threading.Thread(target=observa, name="ingestao-config")
+    t.daemon = True
+    t.start()
+    return t
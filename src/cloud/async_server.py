@@ -0,0 +1,365 @@
+"""
+Servidor Cloud assíncrono (asyncio) do SISD.
+
+Responsabilidades:
+- Atender o mesmo contrato do cloud_server.py (POST /replica, POST /replica/batch, GET /replica)
+  com muitas conexões keep-alive simultâneas em um único event loop.
+- Serializar as escritas em uma única tarefa escritora que agrupa as requisições
+  pendentes em um só commit (group commit), dividindo o custo de flush do disco.
+- Guardar as leituras dos sensores em colunas tipadas (cloud/leituras.py), na mesma tarefa
+  escritora, e responder a agregados por faixa de tempo (GET /readings).
+- Expor a aplicação como ASGI (``app``), para uso com um servidor ASGI externo, além de
+  um servidor HTTP/1.1 próprio baseado em asyncio.start_server (sem dependências extras).
+"""
+
+import asyncio
+import http
+import json
+import os
+import sys
+import threading
+import time
+from concurrent import futures
+from urllib.parse import parse_qs
+
+from cloud.leituras import abre_armazem_leituras, interpreta_consulta_leituras
+from cloud.storage import cria_backend, etag_consulta, importa_json_legado, interpreta_consulta
+
+DATA_DIR = os.environ.get("SISD_CLOUD_DADOS", os.path.dirname(__file__))
+DB_FILE = os.path.join(DATA_DIR, "cloud_db.json")
+
+backend = cria_backend(os.environ.get("SISD_CLOUD_BACKEND", "sqlite"), DATA_DIR)
+importa_json_legado(DB_FILE, backend)
+# Leituras em colunas por sensor (SISD_CLOUD_LEITURAS=0 desliga)
+leituras = abre_armazem_leituras(DATA_DIR, backend)
+
+# Leituras bloqueantes do backend rodam fora do event loop
+leitores = futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="cloud-leitor")
+
+JSON = ("Content-Type", "application/json")
+
+
+class EscritorAgrupado:
+    """
+    Tarefa única de escrita com group commit.
+
+    Cada requisição de escrita entra em uma fila com um future; a tarefa retira tudo
+    o que estiver pendente (até ``max_grupo`` registros) e grava em uma só transação.
+    Enquanto um commit está em andamento, as novas requisições se acumulam para o próximo.
+    """
+
+    def __init__(self, backend, max_grupo=5000):
+        self.backend = backend
+        self.max_grupo = max_grupo
+        self.fila = asyncio.Queue()
+        self.executor = futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="cloud-escritor")
+        self.grupos = 0
+        self.registros = 0
+        self.requisicoes = 0
+        self._tarefa = asyncio.get_running_loop().create_task(self._loop())
+
+    async def grava(self, registros):
+        """
+        Enfileira registros para o próximo commit e aguarda sua conclusão.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.fila.put((registros, future))
+        await future
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pendentes = [await self.fila.get()]
+            total = len(pendentes[0][0])
+            while not self.fila.empty() and total < self.max_grupo:
+                item = self.fila.get_nowait()
+                pendentes.append(item)
+                total += len(item[0])
+            lote = [registro for registros, _ in pendentes for registro in registros]
+            try:
+                await loop.run_in_executor(self.executor, self.backend.insere_lote, lote)
+                erro = None
+            except Exception as e:
+                erro = e
+            if erro is None and leituras is not None:
+                try:
+                    await loop.run_in_executor(self.executor, leituras.ingere, lote)
+                except Exception as e:
+                    print(f"[Cloud] Erro ao guardar leituras no armazenamento colunar: {e}")
+            self.grupos += 1
+            self.registros += len(lote)
+            self.requisicoes += len(pendentes)
+            for _, future in pendentes:
+                if future.done():
+                    continue
+                if erro is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(erro)
+
+    def estatisticas(self):
+        """
+        Retorna os contadores de group commit.
+        """
+        return {
+            "grupos": self.grupos,
+            "registros": self.registros,
+            "requisicoes": self.requisicoes,
+            "requisicoes_por_grupo": round(self.requisicoes / self.grupos, 2) if self.grupos else 0,
+        }
+
+
+escritor = None
+
+
+def _escritor():
+    global escritor
+    if escritor is None:
+        escritor = EscritorAgrupado(backend)
+    return escritor
+
+
+def _json(status, corpo, extras=()):
+    return status, [JSON] + list(extras), json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+
+
+async def _grava(registros):
+    try:
+        if registros:
+            await _escritor().grava(registros)
+    except Exception as e:
+        return _json(500, {"status": "error", "error": str(e)})
+    return None
+
+
+async def _stream_ndjson(parametros, limite):
+    """
+    Gera o corpo NDJSON em blocos; a consulta roda inteira em uma thread leitora
+    e entrega os blocos por uma fila limitada (backpressure para clientes lentos).
+    Se o cliente desconectar, o gerador é fechado e a thread leitora desiste da
+    entrega pendente e termina, liberando o worker de ``leitores``.
+    """
+    loop = asyncio.get_running_loop()
+    fila = asyncio.Queue(maxsize=8)
+    parar = threading.Event()
+
+    def entrega(item):
+        # Espera a vaga na fila em fatias curtas, para notar o fim do consumidor
+        futuro = asyncio.run_coroutine_threadsafe(fila.put(item), loop)
+        while True:
+            try:
+                futuro.result(timeout=0.5)
+                return True
+            except futures.TimeoutError:
+                if parar.is_set():
+                    futuro.cancel()
+                    return False
+
+    def produz():
+        bloco = []
+        try:
+            for _, registro in backend.consulta(limite=limite, **parametros):
+                bloco.append(json.dumps(registro, ensure_ascii=False) + "\n")
+                if len(bloco) >= 500:
+                    if parar.is_set() or not entrega("".join(bloco).encode("utf-8")):
+                        return
+                    bloco = []
+            if bloco:
+                entrega("".join(bloco).encode("utf-8"))
+        finally:
+            if not parar.is_set():
+                entrega(None)
+
+    produtor = loop.run_in_executor(leitores, produz)
+    try:
+        while True:
+            bloco = await fila.get()
+            if bloco is None:
+                break
+            yield bloco
+        await produtor
+    finally:
+        parar.set()
+
+
+def _consulta_lista(parametros, limite):
+    registros, ultimo_seq = [], None
+    for seq, registro in backend.consulta(limite=limite, **parametros):
+        registros.append(registro)
+        ultimo_seq = seq
+    return registros, ultimo_seq
+
+
+async def trata_requisicao(metodo, caminho, query_string, cabecalhos, corpo):
+    """
+    Trata uma requisição HTTP e retorna ``(status, cabeçalhos, corpo)``.
+    O corpo é ``bytes`` ou um gerador assíncrono de ``bytes`` (streaming).
+    """
+    if caminho == "/replica" and metodo == "POST":
+        try:
+            data = json.loads(corpo)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return _json(400, {"status": "error", "error": "Esperado um objeto JSON"})
+        return await _grava([data]) or _json(200, {"status": "ok"})
+
+    if caminho == "/replica/batch" and metodo == "POST":
+        try:
+            data = json.loads(corpo)
+        except ValueError:
+            data = None
+        if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+            return _json(400, {"status": "error", "error": "Esperada uma lista de objetos JSON"})
+        return await _grava(data) or _json(200, {"status": "ok", "recebidos": len(data)})
+
+    if caminho == "/replica" and metodo == "GET":
+        args = {chave: valores[0] for chave, valores in parse_qs(query_string).items()}
+        try:
+            parametros, limite, ndjson = interpreta_consulta(
+                args, "application/x-ndjson" in cabecalhos.get("accept", ""))
+        except ValueError as e:
+            return _json(400, {"status": "error", "error": f"Parâmetro inválido: {e}"})
+        loop = asyncio.get_running_loop()
+        versao_etag = await loop.run_in_executor(leitores, etag_consulta, backend, query_string, ndjson)
+        etag = ("ETag", f'"{versao_etag}"')
+        if f'"{versao_etag}"' in cabecalhos.get("if-none-match", ""):
+            return 304, [etag], b""
+        if ndjson:
+            return 200, [("Content-Type", "application/x-ndjson"), etag], _stream_ndjson(parametros, limite)
+        registros, ultimo_seq = await loop.run_in_executor(leitores, _consulta_lista, parametros, limite)
+        extras = [etag]
+        if ultimo_seq is not None and len(registros) == limite:
+            extras.append(("X-Proximo-Cursor", str(ultimo_seq)))
+        return _json(200, registros, extras)
+
+    if caminho == "/readings" and metodo == "GET":
+        if leituras is None:
+            return _json(503, {"status": "error", "error": "Armazenamento de leituras desativado"})
+        args = {chave: valores[0] for chave, valores in parse_qs(query_string).items()}
+        loop = asyncio.get_running_loop()
+        if not args.get("sensor"):
+            return _json(200, await loop.run_in_executor(leitores, leituras.sensores))
+        try:
+            parametros = interpreta_consulta_leituras(args)
+        except ValueError as e:
+            return _json(400, {"status": "error", "error": f"Parâmetro inválido: {e}"})
+        return _json(200, await loop.run_in_executor(leitores, lambda: leituras.consulta(**parametros)))
+
+    if caminho == "/estatisticas" and metodo == "GET":
+        return _json(200, _escritor().estatisticas())
+
+    if caminho in ("/replica", "/replica/batch", "/readings", "/estatisticas"):
+        return _json(405, {"status": "error", "error": "Método não permitido"})
+    return _json(404, {"status": "error", "error": "Não encontrado"})
+
+
+# --- Adaptador ASGI ---
+async def app(scope, receive, send):
+    """
+    Aplicação ASGI com o mesmo contrato do servidor Flask.
+    """
+    if scope["type"] == "lifespan":
+        while True:
+            mensagem = await receive()
+            if mensagem["type"] == "lifespan.startup":
+                _escritor()
+                await send({"type": "lifespan.startup.complete"})
+            elif mensagem["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+    corpo = b""
+    while True:
+        mensagem = await receive()
+        corpo += mensagem.get("body", b"")
+        if not mensagem.get("more_body"):
+            break
+    cabecalhos = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+    status, headers, resposta = await trata_requisicao(
+        scope["method"], scope["path"], scope["query_string"].decode("latin-1"), cabecalhos, corpo)
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]})
+    if isinstance(resposta, bytes):
+        await send({"type": "http.response.body", "body": resposta})
+        return
+    try:
+        async for bloco in resposta:
+            await send({"type": "http.response.body", "body": bloco, "more_body": True})
+    finally:
+        # Cliente desconectado: fecha o gerador agora, sem esperar o coletor de lixo
+        await resposta.aclose()
+    await send({"type": "http.response.body", "body": b""})
+
+
+# --- Servidor HTTP/1.1 asyncio ---
+async def atende_conexao(reader, writer):
+    """
+    Atende uma conexão HTTP/1.1 com keep-alive (várias requisições por conexão).
+    """
+    try:
+        while True:
+            linha = await reader.readline()
+            if not linha:
+                break
+            metodo, alvo, versao = linha.decode("latin-1").split()
+            cabecalhos = {}
+            while True:
+                linha = await reader.readline()
+                if linha in (b"\r\n", b"\n", b""):
+                    break
+                chave, _, valor = linha.decode("latin-1").partition(":")
+                cabecalhos[chave.strip().lower()] = valor.strip()
+            tamanho = int(cabecalhos.get("content-length", 0))
+            corpo = await reader.readexactly(tamanho) if tamanho else b""
+            caminho, _, query_string = alvo.partition("?")
+
+            status, headers, resposta = await trata_requisicao(metodo, caminho, query_string, cabecalhos, corpo)
+
+            conexao = cabecalhos.get("connection", "").lower()
+            manter = conexao != "close" if versao == "HTTP/1.1" else conexao == "keep-alive"
+            cabecalho = [f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}"]
+            cabecalho += [f"{k}: {v}" for k, v in headers]
+            cabecalho.append("Connection: " + ("keep-alive" if manter else "close"))
+            if isinstance(resposta, bytes):
+                cabecalho.append(f"Content-Length: {len(resposta)}")
+                writer.write(("\r\n".join(cabecalho) + "\r\n\r\n").encode("latin-1") + resposta)
+            else:
+                cabecalho.append("Transfer-Encoding: chunked")
+                writer.write(("\r\n".join(cabecalho) + "\r\n\r\n").encode("latin-1"))
+                try:
+                    async for bloco in resposta:
+                        writer.write(b"%x\r\n%s\r\n" % (len(bloco), bloco))
+                        await writer.drain()
+                finally:
+                    await resposta.aclose()
+                writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            if not manter:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+        print(f"[Cloud] Conexão encerrada com erro: {e}")
+    finally:
+        writer.close()
+
+
+async def serve(porta=6000):
+    """
+    Inicia o servidor HTTP asyncio e a tarefa escritora.
+    """
+    _escritor()
+    server = await asyncio.start_server(atende_conexao, "0.0.0.0", porta, backlog=1024)
+    print(f"[Cloud] Servidor asyncio iniciado na porta {porta} (backend {backend.nome})")
+    inicio = time.time()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        print(f"[Cloud] Servidor encerrado após {time.time() - inicio:.0f}s: {escritor.estatisticas()}")
+
+
+if __name__ == "__main__":
+    # Ponto de entrada do servidor cloud assíncrono
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.environ.get("SISD_CLOUD_PORTA", 6000))
+    asyncio.run(serve(porta))
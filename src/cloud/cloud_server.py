@@ -3,23 +3,41 @@ Servidor Cloud do SISD.
 
 Responsabilidades:
 - Receber e armazenar réplicas de logs/snapshots enviados por sensores e cliente.
-- Disponibilizar os logs via API REST (GET).
-- Concorrência garantida via filelock.
+- Receber réplicas em lote (POST /replica/batch).
+- Disponibilizar os logs via API REST (GET), com filtros, paginação por cursor,
+  streaming NDJSON e ETag/If-None-Match.
+- Persistência em backend plugável (SQLite WAL, segmentos append-only ou JSON legado).
+- Guardar as leituras dos sensores em colunas tipadas (cloud/leituras.py) e responder a
+  agregados por faixa de tempo (GET /readings).
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 import json
 import os
-from filelock import FileLock
+from cloud.storage import cria_backend, etag_consulta, importa_json_legado, interpreta_consulta
+from cloud.leituras import abre_armazem_leituras, interpreta_consulta_leituras
 
 app = Flask(__name__)
-DB_FILE = os.path.join(os.path.dirname(__file__), "cloud_db.json")
-LOCK_FILE = DB_FILE + ".lock"
+DATA_DIR = os.environ.get("SISD_CLOUD_DADOS", os.path.dirname(__file__))
+DB_FILE = os.path.join(DATA_DIR, "cloud_db.json")
 
-# Garante que o arquivo existe
-if not os.path.exists(DB_FILE):
-    with open(DB_FILE, "w") as f:
-        json.dump([], f)
+# Backend escolhido via SISD_CLOUD_BACKEND ("sqlite", "segmentos" ou "json")
+backend = cria_backend(os.environ.get("SISD_CLOUD_BACKEND", "sqlite"), DATA_DIR)
+# Importa o banco JSON legado na primeira execução com um backend novo
+importa_json_legado(DB_FILE, backend)
+# Leituras em colunas por sensor (SISD_CLOUD_LEITURAS=0 desliga)
+leituras = abre_armazem_leituras(DATA_DIR, backend)
+
+def ingere_leituras(registros):
+    """
+    Guarda as leituras de registros já persistidos; uma falha aqui não desfaz a réplica.
+    """
+    if leituras is None:
+        return
+    try:
+        leituras.ingere(registros)
+    except Exception as e:
+        print(f"[Cloud] Erro ao guardar leituras no armazenamento colunar: {e}")
 
 @app.route("/replica", methods=["POST"])
 def replica():
@@ -27,30 +45,90 @@ def replica():
     Endpoint para receber réplicas de logs/snapshots.
     """
     data = request.json
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "error": "Esperado um objeto JSON"}), 400
     try:
-        with FileLock(LOCK_FILE):
-            with open(DB_FILE, "r+") as f:
-                try:
-                    logs = json.load(f)
-                except Exception as e:
-                    return jsonify({"status": "error", "error": f"Erro ao ler o banco de dados: {e}"}), 500
-                logs.append(data)
-                f.seek(0)
-                json.dump(logs, f, indent=4)
-                f.truncate()
+        backend.insere_lote([data])
     except Exception as e:
         return jsonify({"status": "error", "error": str(e)}), 500
+    ingere_leituras([data])
     return jsonify({"status": "ok"})
 
+@app.route("/replica/batch", methods=["POST"])
+def replica_batch():
+    """
+    Endpoint para receber um lote de réplicas (lista JSON) em uma única transação.
+    """
+    data = request.json
+    if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+        return jsonify({"status": "error", "error": "Esperada uma lista de objetos JSON"}), 400
+    try:
+        if data:
+            backend.insere_lote(data)
+    except Exception as e:
+        return jsonify({"status": "error", "error": str(e)}), 500
+    ingere_leituras(data)
+    return jsonify({"status": "ok", "recebidos": len(data)})
+
 @app.route("/replica", methods=["GET"])
 def get_replica():
     """
-    Endpoint para consultar todos os logs/snapshots armazenados.
+    Endpoint para consultar os logs/snapshots armazenados.
+
+    Parâmetros: id, desde, ate (timestamps epoch), prefixo (da mensagem),
+    limite, cursor (valor de X-Proximo-Cursor da página anterior) e formato=ndjson.
+    No formato JSON a resposta é uma lista limitada a ``limite`` registros; no
+    NDJSON os registros são transmitidos em streaming (sem limite padrão).
+    """
+    try:
+        parametros, limite, ndjson = interpreta_consulta(
+            request.args, request.accept_mimetypes.best == "application/x-ndjson")
+    except ValueError as e:
+        return jsonify({"status": "error", "error": f"Parâmetro inválido: {e}"}), 400
+
+    # A versão do backend só muda com novas gravações: pollers recebem 304 sem consultar registros
+    etag = etag_consulta(backend, request.query_string.decode(), ndjson)
+    if etag in request.if_none_match:
+        resposta = Response(status=304)
+        resposta.set_etag(etag)
+        return resposta
+
+    if ndjson:
+        def gera():
+            for _, registro in backend.consulta(limite=limite, **parametros):
+                yield json.dumps(registro, ensure_ascii=False) + "\n"
+        resposta = Response(stream_with_context(gera()), mimetype="application/x-ndjson")
+    else:
+        registros = []
+        ultimo_seq = None
+        for seq, registro in backend.consulta(limite=limite, **parametros):
+            registros.append(registro)
+            ultimo_seq = seq
+        resposta = jsonify(registros)
+        if ultimo_seq is not None and len(registros) == limite:
+            resposta.headers["X-Proximo-Cursor"] = str(ultimo_seq)
+    resposta.set_etag(etag)
+    return resposta
+
+@app.route("/readings", methods=["GET"])
+def get_readings():
+    """
+    Agregados das leituras de um sensor em uma faixa de tempo, a partir das colunas.
+
+    Parâmetros: sensor (id do remetente, ex. sensor_5000; sem ele, lista os sensores e o
+    total de leituras), from e to (timestamps epoch), agg (lista de min, max, media,
+    desvio, contagem; padrão todos) e step (segundos, para uma série por intervalo).
     """
-    with open(DB_FILE) as f:
-        logs = json.load(f)
-    return jsonify(logs)
+    if leituras is None:
+        return jsonify({"status": "error", "error": "Armazenamento de leituras desativado"}), 503
+    if not request.args.get("sensor"):
+        return jsonify(leituras.sensores())
+    try:
+        parametros = interpreta_consulta_leituras(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "error": f"Parâmetro inválido: {e}"}), 400
+    return jsonify(leituras.consulta(**parametros))
 
 if __name__ == "__main__":
     # Ponto de entrada do servidor cloud
-    app.run(host="0.0.0.0", port=6000)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=int(os.environ.get("SISD_CLOUD_PORTA", 6000)))
@@ -0,0 +1,465 @@
+"""
+Armazenamento colunar das leituras climáticas no Servidor Cloud do SISD.
+
+Responsabilidades:
+- Reconhecer, na ingestão, as réplicas que são leituras ("[Sensor] Dados enviados:
+  temp,umid,press|lamport", ou "[Sensor] Lote de n leituras" com os valores em colunas
+  no campo ``leituras``) e guardá-las tipadas por sensor, em colunas: timestamp
+  (float64), temperatura, umidade e pressão (float32, como no protocolo binário) e
+  Lamport (uint64).
+- Acumular as leituras de cada sensor em um bloco aberto (``array``) e selá-lo em disco
+  ao atingir ``tamanho_bloco`` leituras ou ``idade_bloco`` segundos: um arquivo ``.npy``
+  por coluna, ordenado por timestamp, e um resumo do bloco (faixa de timestamps,
+  contagem, mínimo/máximo/média/M2 por grandeza) no índice do sensor.
+- Responder a agregados por faixa de tempo (``consulta``) sem carregar tudo: blocos
+  inteiramente dentro da faixa entram pelo resumo; nos das bordas, as colunas são
+  abertas com ``mmap`` e só a fatia da faixa (``searchsorted``) é lida.
+- Na abertura, recuperar do backend de réplicas as leituras que estavam no bloco aberto
+  (ou importar todas, na primeira execução).
+
+Layout em disco:
+    cloud_leituras/<sensor>/indice.json
+    cloud_leituras/<sensor>/<bloco:08d>/{timestamp,temperatura,umidade,pressao,lamport}.npy
+"""
+
+import json
+import math
+import os
+import shutil
+import threading
+import time
+from array import array
+
+import numpy as np
+
+PREFIXO_SENSOR = "[Sensor] "
+PREFIXO_LEITURA = PREFIXO_SENSOR + "Dados enviados: "
+PREFIXO_LOTE = PREFIXO_SENSOR + "Lote de "
+GRANDEZAS = ("temperatura", "umidade", "pressao")
+COLUNAS = (("timestamp", "d", np.float64), ("temperatura", "f", np.float32), ("umidade", "f", np.float32),
+           ("pressao", "f", np.float32), ("lamport", "Q", np.uint64))
+AGREGADOS = ("min", "max", "media", "desvio", "contagem")
+
+
+def interpreta_leitura(registro):
+    """
+    Retorna ``(sensor, timestamp, temperatura, umidade, pressao, lamport)`` se o registro
+    for uma leitura enviada por um sensor, ou None.
+    """
+    mensagem = registro.get("mensagem")
+    timestamp = registro.get("timestamp")
+    if not isinstance(mensagem, str) or not mensagem.startswith(PREFIXO_LEITURA) or timestamp is None:
+        return None
+    valores, _, lamport = mensagem[len(PREFIXO_LEITURA):].partition("|")
+    try:
+        temperatura, umidade, pressao = (float(v) for v in valores.split(","))
+        return registro.get("id"), float(timestamp), temperatura, umidade, pressao, int(lamport or 0)
+    except ValueError:
+        return None
+
+
+def interpreta_lote(registro):
+    """
+    Retorna as leituras ``(sensor, timestamp, temperatura, umidade, pressao, lamport)`` de
+    um lote enviado por um sensor ("[Sensor] Lote de ..." com o campo ``leituras``), ou [].
+    O timestamp do registro é o da última leitura; as anteriores recuam ``intervalo`` segundos.
+    """
+    mensagem = registro.get("mensagem")
+    timestamp = registro.get("timestamp")
+    lote = registro.get("leituras")
+    if (not isinstance(mensagem, str) or not mensagem.startswith(PREFIXO_LOTE) or timestamp is None
+            or not isinstance(lote, dict)):
+        return []
+    try:
+        colunas = [[float(v) for v in lote[grandeza]] for grandeza in GRANDEZAS]
+        lamport, intervalo, final = int(lote.get("lamport", 0)), float(lote.get("intervalo", 0.0)), float(timestamp)
+    except (KeyError, TypeError, ValueError):
+        return []
+    n = len(colunas[0])
+    if any(len(coluna) != n for coluna in colunas):
+        return []
+    sensor = registro.get("id")
+    return [(sensor, final - (n - 1 - i) * intervalo, temperatura, umidade, pressao, lamport + i)
+            for i, (temperatura, umidade, pressao) in enumerate(zip(*colunas))]
+
+
+def interpreta_leituras(registros):
+    """
+    Leituras de uma sequência de réplicas, expandindo os lotes.
+    """
+    leituras = []
+    for registro in registros:
+        leitura = interpreta_leitura(registro)
+        if leitura is not None:
+            leituras.append(leitura)
+        elif "leituras" in registro:
+            leituras.extend(interpreta_lote(registro))
+    return leituras
+
+
+def resumo_vazio():
+    return {"n": 0, "min": [math.inf] * 3, "max": [-math.inf] * 3, "media": [0.0] * 3, "m2": [0.0] * 3}
+
+
+def resume(colunas):
+    """
+    Resumo (contagem, mínimo, máximo, média, M2) de uma fatia das três grandezas.
+    """
+    n = len(colunas[0])
+    if n == 0:
+        return resumo_vazio()
+    resumo = {"n": n, "min": [], "max": [], "media": [], "m2": []}
+    for valores in colunas:
+        valores = np.asarray(valores, dtype=np.float64)
+        media = float(valores.mean())
+        resumo["min"].append(float(valores.min()))
+        resumo["max"].append(float(valores.max()))
+        resumo["media"].append(media)
+        resumo["m2"].append(float(np.square(valores - media).sum()))
+    return resumo
+
+
+def combina(destino, origem):
+    """
+    Junta o resumo ``origem`` em ``destino`` (fórmula paralela de Chan).
+    """
+    na, nb = destino["n"], origem["n"]
+    if nb == 0:
+        return destino
+    n = na + nb
+    for i in range(3):
+        delta = origem["media"][i] - destino["media"][i]
+        destino["min"][i] = min(destino["min"][i], origem["min"][i])
+        destino["max"][i] = max(destino["max"][i], origem["max"][i])
+        destino["media"][i] += delta * nb / n
+        destino["m2"][i] += origem["m2"][i] + delta * delta * na * nb / n
+    destino["n"] = n
+    return destino
+
+
+def descreve(resumo, agregados=AGREGADOS):
+    """
+    Converte um resumo nos agregados pedidos por grandeza (desvio padrão populacional).
+    """
+    n = resumo["n"]
+    descricao = {"n": n}
+    if not any(nome != "contagem" for nome in agregados):
+        return descricao
+    for i, grandeza in enumerate(GRANDEZAS):
+        if not n:
+            descricao[grandeza] = None
+            continue
+        valores = {"min": resumo["min"][i], "max": resumo["max"][i], "media": resumo["media"][i],
+                   "desvio": math.sqrt(resumo["m2"][i] / n)}
+        descricao[grandeza] = {nome: valores[nome] for nome in agregados if nome in valores}
+    return descricao
+
+
+class SerieSensor:
+    """
+    Leituras de um sensor: blocos selados em disco (com o índice ``blocos``) e o bloco
+    aberto em memória. O acesso é serializado pelo ArmazemLeituras.
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+        self.caminho_indice = os.path.join(diretorio, "indice.json")
+        self.blocos = []
+        if os.path.exists(self.caminho_indice):
+            with open(self.caminho_indice) as f:
+                self.blocos = json.load(f)
+        self.aberto = [array(codigo) for _, codigo, _ in COLUNAS]
+        self.aberto_desde = None
+
+    @property
+    def ultimo_selado(self):
+        """
+        Maior timestamp já selado em disco (None sem blocos).
+        """
+        return max((bloco["ts_max"] for bloco in self.blocos), default=None)
+
+    def adiciona(self, timestamp, temperatura, umidade, pressao, lamport):
+        if self.aberto_desde is None:
+            self.aberto_desde = time.monotonic()
+        for coluna, valor in zip(self.aberto, (timestamp, temperatura, umidade, pressao, lamport)):
+            coluna.append(valor)
+
+    def pendentes(self):
+        return len(self.aberto[0])
+
+    def sela(self):
+        """
+        Grava o bloco aberto como colunas ``.npy`` ordenadas por timestamp e o registra no índice.
+        """
+        if not self.pendentes():
+            return
+        colunas = [np.frombuffer(coluna, dtype=tipo) for coluna, (_, _, tipo) in zip(self.aberto, COLUNAS)]
+        ordem = np.argsort(colunas[0], kind="stable")
+        colunas = [coluna[ordem] for coluna in colunas]
+        numero = self.blocos[-1]["bloco"] + 1 if self.blocos else 1
+        destino = os.path.join(self.diretorio, f"{numero:08d}")
+        temporario = destino + ".tmp"
+        shutil.rmtree(temporario, ignore_errors=True)
+        # Bloco renomeado mas fora do índice (queda antes de _grava_indice): suas leituras
+        # continuam no backend de réplicas e voltaram pelo bloco aberto
+        shutil.rmtree(destino, ignore_errors=True)
+        os.makedirs(temporario)
+        for (nome, _, _), coluna in zip(COLUNAS, colunas):
+            np.save(os.path.join(temporario, nome + ".npy"), coluna)
+        os.replace(temporario, destino)
+        bloco = {"bloco": numero, "ts_min": float(colunas[0][0]), "ts_max": float(colunas[0][-1])}
+        bloco.update(resume(colunas[1:4]))
+        self.blocos.append(bloco)
+        self._grava_indice()
+        self.aberto = [array(codigo) for _, codigo, _ in COLUNAS]
+        self.aberto_desde = None
+
+    def _grava_indice(self):
+        temporario = self.caminho_indice + ".tmp"
+        with open(temporario, "w") as f:
+            json.dump(self.blocos, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.caminho_indice)
+
+    def fatias(self, desde, ate):
+        """
+        Separa o que cobre [desde, ate]: resumos dos blocos inteiros, blocos de borda
+        (lidos depois por mmap) e uma cópia da parte do bloco aberto dentro da faixa.
+        """
+        inteiros, bordas = [], []
+        for bloco in self.blocos:
+            if bloco["ts_max"] < desde or bloco["ts_min"] > ate:
+                continue
+            if desde <= bloco["ts_min"] and bloco["ts_max"] <= ate:
+                inteiros.append(bloco)
+            else:
+                bordas.append(os.path.join(self.diretorio, f"{bloco['bloco']:08d}"))
+        aberto = [np.frombuffer(coluna, dtype=tipo) for coluna, (_, _, tipo) in zip(self.aberto[:4], COLUNAS)]
+        dentro = (aberto[0] >= desde) & (aberto[0] <= ate)
+        return inteiros, bordas, [coluna[dentro] for coluna in aberto]
+
+
+def le_fatia(diretorio_bloco, desde, ate):
+    """
+    Abre as colunas de um bloco selado com mmap e retorna só as linhas em [desde, ate].
+    """
+    timestamps = np.load(os.path.join(diretorio_bloco, "timestamp.npy"), mmap_mode="r")
+    inicio = int(np.searchsorted(timestamps, desde, side="left"))
+    fim = int(np.searchsorted(timestamps, ate, side="right"))
+    colunas = [timestamps[inicio:fim]]
+    for grandeza in GRANDEZAS:
+        colunas.append(np.load(os.path.join(diretorio_bloco, grandeza + ".npy"), mmap_mode="r")[inicio:fim])
+    return colunas
+
+
+def agrupa(colunas, desde, passo):
+    """
+    Agregados por intervalo de ``passo`` segundos a partir de ``desde``.
+    """
+    if not len(colunas[0]):
+        return []
+    ordem = np.argsort(colunas[0], kind="stable")
+    grupos = np.floor((colunas[0][ordem] - desde) / passo).astype(np.int64)
+    inicios = np.flatnonzero(np.r_[True, grupos[1:] != grupos[:-1]])
+    contagens = np.diff(np.r_[inicios, len(grupos)])
+    resumos = [{"n": int(n), "min": [], "max": [], "media": [], "m2": []} for n in contagens]
+    for valores in colunas[1:]:
+        valores = np.asarray(valores, dtype=np.float64)[ordem]
+        medias = np.add.reduceat(valores, inicios) / contagens
+        m2 = np.add.reduceat(np.square(valores - np.repeat(medias, contagens)), inicios)
+        for resumo, minimo, maximo, media, quadrados in zip(
+                resumos, np.minimum.reduceat(valores, inicios), np.maximum.reduceat(valores, inicios), medias, m2):
+            resumo["min"].append(float(minimo))
+            resumo["max"].append(float(maximo))
+            resumo["media"].append(float(media))
+            resumo["m2"].append(float(quadrados))
+    return [(desde + int(grupo) * passo, resumo) for grupo, resumo in zip(grupos[inicios], resumos)]
+
+
+class ArmazemLeituras:
+    """
+    Séries colunares de leituras de todos os sensores.
+    """
+
+    def __init__(self, diretorio, tamanho_bloco=65536, idade_bloco=300.0):
+        self.diretorio = diretorio
+        self.tamanho_bloco = tamanho_bloco
+        self.idade_bloco = idade_bloco
+        self._lock = threading.Lock()
+        self._series = {}
+        self.ingeridas = 0
+        os.makedirs(diretorio, exist_ok=True)
+        for nome in sorted(os.listdir(diretorio)):
+            if os.path.isdir(os.path.join(diretorio, nome)):
+                self._series[nome] = SerieSensor(os.path.join(diretorio, nome))
+
+    @staticmethod
+    def nome_serie(sensor):
+        """
+        Nome do diretório (e chave da série) para o id do remetente; é o mesmo na
+        ingestão, na consulta e ao reabrir o armazenamento.
+        """
+        return "".join(c if c.isalnum() or c in "-_." else "_" for c in str(sensor))
+
+    def _serie(self, sensor):
+        nome = self.nome_serie(sensor)
+        serie = self._series.get(nome)
+        if serie is None:
+            serie = self._series[nome] = SerieSensor(os.path.join(self.diretorio, nome))
+        return serie
+
+    def ingere(self, registros, apos=None):
+        """
+        Guarda as leituras de um lote de réplicas; as demais réplicas são ignoradas.
+        Com ``apos`` ({nome da série: timestamp}), leituras até esse timestamp são descartadas.
+        Retorna o número de leituras guardadas.
+        """
+        leituras = interpreta_leituras(registros)
+        if not leituras:
+            return 0
+        agora = time.monotonic()
+        guardadas = 0
+        with self._lock:
+            for sensor, timestamp, temperatura, umidade, pressao, lamport in leituras:
+                if apos is not None:
+                    limite = apos.get(self.nome_serie(sensor))
+                    if limite is not None and timestamp <= limite:
+                        continue
+                serie = self._serie(sensor)
+                serie.adiciona(timestamp, temperatura, umidade, pressao, lamport)
+                guardadas += 1
+                # Se selar falhar, tenta de novo a cada tamanho_bloco leituras a mais
+                if serie.pendentes() % self.tamanho_bloco == 0:
+                    self._sela(sensor, serie)
+            for sensor, serie in self._series.items():
+                if serie.aberto_desde is not None and agora - serie.aberto_desde >= self.idade_bloco:
+                    self._sela(sensor, serie)
+            self.ingeridas += guardadas
+        return guardadas
+
+    @staticmethod
+    def _sela(sensor, serie):
+        """
+        Sela o bloco aberto de uma série; uma falha não interrompe o restante do lote
+        (as leituras continuam no bloco aberto).
+        """
+        try:
+            serie.sela()
+        except Exception as e:
+            serie.aberto_desde = time.monotonic()
+            print(f"[Cloud] Erro ao selar bloco de leituras de {sensor}: {e}")
+
+    def recupera(self, backend, tamanho_lote=10000):
+        """
+        Reingere do backend de réplicas as leituras posteriores ao último bloco selado de
+        cada sensor (o bloco aberto perdido ao reiniciar, ou tudo na primeira execução).
+        """
+        with self._lock:
+            apos = {sensor: serie.ultimo_selado for sensor, serie in self._series.items()}
+        desde = None
+        if apos and all(ts is not None for ts in apos.values()):
+            desde = min(apos.values())
+        lote, total = [], 0
+        for _, registro in backend.consulta(desde=desde, prefixo=PREFIXO_SENSOR):
+            lote.append(registro)
+            if len(lote) >= tamanho_lote:
+                total += self.ingere(lote, apos)
+                lote = []
+        total += self.ingere(lote, apos)
+        if total:
+            print(f"[Cloud] {total} leituras recuperadas do backend {backend.nome} para o armazenamento colunar")
+        return total
+
+    def sela(self):
+        """
+        Sela os blocos abertos de todos os sensores.
+        """
+        with self._lock:
+            for serie in self._series.values():
+                serie.sela()
+
+    def sensores(self):
+        with self._lock:
+            return {sensor: sum(b["n"] for b in serie.blocos) + serie.pendentes()
+                    for sensor, serie in sorted(self._series.items())}
+
+    def consulta(self, sensor, desde=None, ate=None, agregados=AGREGADOS, passo=None):
+        """
+        Agregados das leituras do sensor em [desde, ate]; com ``passo``, uma série de
+        agregados por intervalo de ``passo`` segundos.
+        """
+        desde = -math.inf if desde is None else desde
+        ate = math.inf if ate is None else ate
+        with self._lock:
+            serie = self._series.get(self.nome_serie(sensor))
+            if serie is None:
+                diretorio, inteiros, bordas, aberto = None, [], [], [np.empty(0)] * 4
+            else:
+                diretorio = serie.diretorio
+                inteiros, bordas, aberto = serie.fatias(desde, ate)
+        resposta = {"sensor": sensor, "from": None if math.isinf(desde) else desde,
+                    "to": None if math.isinf(ate) else ate}
+        if passo is None:
+            resumo = resumo_vazio()
+            for bloco in inteiros:
+                combina(resumo, bloco)
+            for caminho in bordas:
+                combina(resumo, resume(le_fatia(caminho, desde, ate)[1:]))
+            combina(resumo, resume(aberto[1:]))
+            resposta.update(descreve(resumo, agregados))
+            return resposta
+        # Agregados por intervalo: lê por mmap só as fatias da faixa de todos os blocos envolvidos
+        partes = [le_fatia(os.path.join(diretorio, f"{bloco['bloco']:08d}"), desde, ate)
+                  for bloco in inteiros] + [le_fatia(caminho, desde, ate) for caminho in bordas] + [aberto]
+        colunas = [np.concatenate([parte[k] for parte in partes]) for k in range(4)]
+        origem = desde if not math.isinf(desde) else (math.floor(colunas[0].min() / passo) * passo
+                                                      if len(colunas[0]) else 0.0)
+        resposta["step"] = passo
+        resposta["series"] = [dict(inicio=inicio, **descreve(resumo, agregados))
+                              for inicio, resumo in agrupa(colunas, origem, passo)]
+        return resposta
+
+
+def interpreta_consulta_leituras(args):
+    """
+    Converte os parâmetros de /readings (sensor, from, to, agg, step) nos argumentos de
+    ``ArmazemLeituras.consulta``. Lança ValueError se algum parâmetro for inválido.
+    """
+    sensor = args.get("sensor")
+    if not sensor:
+        raise ValueError("sensor é obrigatório")
+    agregados = tuple(args.get("agg", ",".join(AGREGADOS)).split(","))
+    invalidos = [nome for nome in agregados if nome not in AGREGADOS]
+    if invalidos:
+        raise ValueError(f"agregado desconhecido {invalidos[0]} (use {', '.join(AGREGADOS)})")
+    passo = args.get("step")
+    passo = float(passo) if passo is not None else None
+    if passo is not None and passo <= 0:
+        raise ValueError("step deve ser positivo")
+    return {
+        "sensor": sensor,
+        "desde": float(args["from"]) if args.get("from") is not None else None,
+        "ate": float(args["to"]) if args.get("to") is not None else None,
+        "agregados": agregados,
+        "passo": passo,
+    }
+
+
+def abre_armazem_leituras(diretorio_dados, backend):
+    """
+    Cria o ArmazemLeituras em ``diretorio_dados``/cloud_leituras e recupera as leituras do
+    backend. SISD_LEITURAS_BLOCO (leituras por bloco, padrão 65536) e
+    SISD_LEITURAS_IDADE_BLOCO (segundos, padrão 300) controlam quando um bloco é selado;
+    SISD_CLOUD_LEITURAS=0 desliga o armazenamento colunar (retorna None).
+    """
+    if os.environ.get("SISD_CLOUD_LEITURAS", "1") == "0":
+        return None
+    armazem = ArmazemLeituras(
+        os.path.join(diretorio_dados, "cloud_leituras"),
+        tamanho_bloco=int(os.environ.get("SISD_LEITURAS_BLOCO", 65536)),
+        idade_bloco=float(os.environ.get("SISD_LEITURAS_IDADE_BLOCO", 300.0)),
+    )
+    armazem.recupera(backend)
+    return armazem
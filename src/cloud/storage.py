@@ -0,0 +1,419 @@
+"""
+Backends de armazenamento do Servidor Cloud do SISD.
+
+Responsabilidades:
+- Definir a interface comum de armazenamento das réplicas (inserção em lote e leitura).
+- SQLite em modo WAL com inserções em lote e índices por remetente e timestamp.
+- Segmentos append-only (common.log_store) com índices em memória por remetente e timestamp.
+- Arquivo JSON legado (array único protegido por filelock), mantido por compatibilidade.
+- Consultas filtradas (remetente, faixa de timestamp, prefixo da mensagem) paginadas por cursor.
+- Importação única do cloud_db.json legado para um backend novo.
+"""
+
+import bisect
+import collections
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from filelock import FileLock
+
+from common.log_store import FORMATO_BINARIO, LogStore
+
+CAMPOS_PRINCIPAIS = ("id", "timestamp", "mensagem")
+
+LIMITE_PADRAO = 1000
+LIMITE_MAXIMO = 10000
+
+
+def interpreta_consulta(args, aceita_ndjson=False):
+    """
+    Converte os parâmetros de query string (id, desde, ate, prefixo, cursor, limite,
+    formato) em ``(argumentos de consulta, limite, ndjson)``.
+    Lança ValueError se algum parâmetro for inválido.
+    """
+    desde = args.get("desde")
+    ate = args.get("ate")
+    parametros = {
+        "sender_id": args.get("id"),
+        "desde": float(desde) if desde is not None else None,
+        "ate": float(ate) if ate is not None else None,
+        "prefixo": args.get("prefixo"),
+        "apos": int(args.get("cursor", 0)),
+    }
+    if parametros["apos"] < 0:
+        raise ValueError(f"cursor inválido: {parametros['apos']}")
+    ndjson = args.get("formato") == "ndjson" or aceita_ndjson
+    limite = args.get("limite")
+    if limite is not None:
+        limite = int(limite)
+        if limite < 1:
+            raise ValueError(f"limite deve ser positivo: {limite}")
+        limite = min(limite, LIMITE_MAXIMO)
+    elif not ndjson:
+        limite = LIMITE_PADRAO
+    return parametros, limite, ndjson
+
+
+def etag_consulta(backend, query_string, ndjson):
+    """
+    Calcula o ETag de uma consulta a partir da versão do backend e dos parâmetros.
+    """
+    return hashlib.sha1(f"{backend.versao()}|{query_string}|{ndjson}".encode()).hexdigest()
+
+
+def _filtra(registros_com_seq, sender_id, desde, ate, prefixo, limite):
+    """
+    Aplica os filtros de consulta sobre um iterador de ``(seq, registro)``.
+    """
+    entregues = 0
+    for seq, registro in registros_com_seq:
+        if limite is not None and entregues >= limite:
+            return
+        if sender_id is not None and registro.get("id") != sender_id:
+            continue
+        timestamp = registro.get("timestamp")
+        if desde is not None and (timestamp is None or timestamp < desde):
+            continue
+        if ate is not None and (timestamp is None or timestamp > ate):
+            continue
+        if prefixo is not None and not str(registro.get("mensagem", "")).startswith(prefixo):
+            continue
+        entregues += 1
+        yield seq, registro
+
+
+def _separa_registro(registro):
+    """
+    Separa os campos indexados de um registro dos campos extras (serializados em JSON).
+    """
+    extras = {k: v for k, v in registro.items() if k not in CAMPOS_PRINCIPAIS}
+    return (
+        registro.get("id"),
+        registro.get("timestamp"),
+        registro.get("mensagem"),
+        json.dumps(extras, ensure_ascii=False) if extras else None,
+    )
+
+
+class BackendArmazenamento:
+    """
+    Interface dos backends de armazenamento do cloud.
+    """
+    nome = None
+
+    def insere_lote(self, registros):
+        """
+        Persiste uma lista de registros (dicts) de forma atômica.
+        """
+        raise NotImplementedError
+
+    def itera(self):
+        """
+        Itera todos os registros armazenados, em ordem de chegada.
+        """
+        raise NotImplementedError
+
+    def total(self):
+        """
+        Retorna o número de registros armazenados.
+        """
+        raise NotImplementedError
+
+    def consulta(self, sender_id=None, desde=None, ate=None, prefixo=None, apos=0, limite=None):
+        """
+        Itera ``(seq, registro)`` em ordem de chegada, com ``seq > apos`` e os filtros informados.
+        ``seq`` é crescente e serve de cursor para a próxima página.
+        """
+        raise NotImplementedError
+
+    def versao(self):
+        """
+        Retorna um identificador que muda sempre que novos registros são gravados.
+        """
+        raise NotImplementedError
+
+    def fecha(self):
+        """
+        Libera os recursos do backend.
+        """
+
+
+class BackendSQLite(BackendArmazenamento):
+    """
+    Backend SQLite em modo WAL.
+
+    Há uma conexão por thread (leitores concorrentes no WAL) e um lock de escrita,
+    já que o SQLite admite um único escritor por vez.
+    """
+    nome = "sqlite"
+
+    SQL_INSERE = "INSERT INTO replicas (id, timestamp, mensagem, extras) VALUES (?, ?, ?, ?)"
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+        self._lock_escrita = threading.Lock()
+        conn = self._conexao()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS replicas (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT,
+                timestamp REAL,
+                mensagem TEXT,
+                extras TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_replicas_id ON replicas (id, seq);
+            CREATE INDEX IF NOT EXISTS idx_replicas_timestamp ON replicas (timestamp);
+        """)
+
+    def _conexao(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def insere_lote(self, registros):
+        linhas = [_separa_registro(r) for r in registros]
+        conn = self._conexao()
+        with self._lock_escrita:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(self.SQL_INSERE, linhas)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _para_registro(linha):
+        _, sender_id, timestamp, mensagem, extras = linha
+        registro = json.loads(extras) if extras else {}
+        registro.update({"id": sender_id, "timestamp": timestamp, "mensagem": mensagem})
+        return registro
+
+    def itera(self):
+        cursor = self._conexao().execute(
+            "SELECT seq, id, timestamp, mensagem, extras FROM replicas ORDER BY seq")
+        for linha in cursor:
+            yield self._para_registro(linha)
+
+    def total(self):
+        return self._conexao().execute("SELECT COUNT(*) FROM replicas").fetchone()[0]
+
+    def consulta(self, sender_id=None, desde=None, ate=None, prefixo=None, apos=0, limite=None):
+        condicoes, parametros = ["seq > ?"], [apos]
+        if sender_id is not None:
+            condicoes.append("id = ?")
+            parametros.append(sender_id)
+        if desde is not None:
+            condicoes.append("timestamp >= ?")
+            parametros.append(desde)
+        if ate is not None:
+            condicoes.append("timestamp <= ?")
+            parametros.append(ate)
+        if prefixo is not None:
+            condicoes.append("substr(mensagem, 1, ?) = ?")
+            parametros.extend([len(prefixo), prefixo])
+        sql = ("SELECT seq, id, timestamp, mensagem, extras FROM replicas WHERE "
+               + " AND ".join(condicoes) + " ORDER BY seq")
+        if limite is not None:
+            sql += " LIMIT ?"
+            parametros.append(limite)
+        for linha in self._conexao().execute(sql, parametros):
+            yield linha[0], self._para_registro(linha)
+
+    def versao(self):
+        return self._conexao().execute("SELECT COALESCE(MAX(seq), 0) FROM replicas").fetchone()[0]
+
+    def fecha(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class BackendSegmentos(BackendArmazenamento):
+    """
+    Backend de segmentos append-only binários.
+
+    Os índices (posição de cada registro, registros por remetente e faixa de
+    timestamps por segmento) ficam em memória e são reconstruídos na abertura
+    com uma leitura sequencial dos segmentos.
+    """
+    nome = "segmentos"
+
+    def __init__(self, diretorio):
+        self.store = LogStore(diretorio, "cloud", formato=FORMATO_BINARIO,
+                              tamanho_max_segmento=64 * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._posicoes = []                              # ordinal -> (sequencia, offset)
+        self._por_id = collections.defaultdict(list)     # id -> [ordinal, ...]
+        self._faixa_segmento = {}                        # sequencia -> [ts_min, ts_max, primeiro_ordinal]
+        for caminho in self.store.segmentos():
+            sequencia = self.store.sequencia_do_caminho(caminho)
+            for offset, registro in self.store.ler_segmento_com_posicao(caminho):
+                self._indexa(registro, (sequencia, offset))
+
+    def _indexa(self, registro, posicao):
+        ordinal = len(self._posicoes)
+        self._posicoes.append(posicao)
+        self._por_id[registro.get("id")].append(ordinal)
+        timestamp = registro.get("timestamp")
+        faixa = self._faixa_segmento.setdefault(posicao[0], [timestamp, timestamp, ordinal])
+        if timestamp is not None:
+            faixa[0] = timestamp if faixa[0] is None else min(faixa[0], timestamp)
+            faixa[1] = timestamp if faixa[1] is None else max(faixa[1], timestamp)
+
+    def insere_lote(self, registros):
+        with self._lock:
+            posicoes = self.store.append_lote(registros)
+            for registro, posicao in zip(registros, posicoes):
+                self._indexa(registro, posicao)
+
+    def ordinais_do_remetente(self, sender_id, apos=-1):
+        """
+        Retorna os ordinais dos registros de um remetente posteriores a ``apos``.
+        """
+        ordinais = self._por_id.get(sender_id, [])
+        return ordinais[bisect.bisect_right(ordinais, apos):]
+
+    def itera(self):
+        for caminho in self.store.segmentos():
+            yield from self.store.ler_segmento(caminho)
+
+    def total(self):
+        return len(self._posicoes)
+
+    def versao(self):
+        return len(self._posicoes)
+
+    def _registros_apos(self, apos, desde, ate):
+        """
+        Itera ``(seq, registro)`` a partir do ordinal ``apos`` (seq = ordinal + 1),
+        pulando segmentos inteiros cuja faixa de timestamps não intersecta [desde, ate].
+        """
+        with self._lock:
+            total = len(self._posicoes)
+            faixas = sorted(self._faixa_segmento.items())
+        for i, (sequencia, (ts_min, ts_max, primeiro)) in enumerate(faixas):
+            ultimo = faixas[i + 1][1][2] - 1 if i + 1 < len(faixas) else total - 1
+            if ultimo < apos or ultimo < primeiro:
+                continue
+            if desde is not None and ts_max is not None and ts_max < desde:
+                continue
+            if ate is not None and ts_min is not None and ts_min > ate:
+                continue
+            ordinal = max(primeiro, apos)
+            caminho = self.store.caminho_segmento(sequencia)
+            for _, registro in self.store.ler_segmento_com_posicao(caminho, self._posicoes[ordinal][1]):
+                if ordinal > ultimo:
+                    break
+                ordinal += 1
+                yield ordinal, registro
+
+    def _registros_do_remetente(self, sender_id, apos):
+        # Ordinais agrupados por segmento: cada segmento é aberto uma vez e lido em ordem
+        ordinais = self.ordinais_do_remetente(sender_id, apos - 1)
+        for sequencia, grupo in itertools.groupby(ordinais, key=lambda ordinal: self._posicoes[ordinal][0]):
+            grupo = list(grupo)
+            offsets = [self._posicoes[ordinal][1] for ordinal in grupo]
+            for ordinal, registro in zip(grupo, self.store.ler_registros(sequencia, offsets)):
+                yield ordinal + 1, registro
+
+    def consulta(self, sender_id=None, desde=None, ate=None, prefixo=None, apos=0, limite=None):
+        if sender_id is not None:
+            registros = self._registros_do_remetente(sender_id, apos)
+        else:
+            registros = self._registros_apos(apos, desde, ate)
+        return _filtra(registros, sender_id, desde, ate, prefixo, limite)
+
+    def fecha(self):
+        self.store.fecha()
+
+
+class BackendJSONLegado(BackendArmazenamento):
+    """
+    Backend legado: um único array JSON regravado a cada lote, sob FileLock.
+    """
+    nome = "json"
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.lock_file = caminho + ".lock"
+        if not os.path.exists(caminho):
+            with open(caminho, "w") as f:
+                json.dump([], f)
+
+    def insere_lote(self, registros):
+        with FileLock(self.lock_file):
+            with open(self.caminho, "r+") as f:
+                logs = json.load(f)
+                logs.extend(registros)
+                f.seek(0)
+                json.dump(logs, f, indent=4)
+                f.truncate()
+
+    def _carrega(self):
+        with open(self.caminho) as f:
+            return json.load(f)
+
+    def itera(self):
+        return iter(self._carrega())
+
+    def total(self):
+        return len(self._carrega())
+
+    def consulta(self, sender_id=None, desde=None, ate=None, prefixo=None, apos=0, limite=None):
+        registros = enumerate(self._carrega()[apos:], start=apos + 1)
+        return _filtra(registros, sender_id, desde, ate, prefixo, limite)
+
+    def versao(self):
+        estado = os.stat(self.caminho)
+        return f"{estado.st_mtime_ns}-{estado.st_size}"
+
+
+def cria_backend(nome, diretorio):
+    """
+    Instancia o backend pelo nome ("sqlite", "segmentos" ou "json") dentro do diretório.
+    """
+    if nome == BackendSQLite.nome:
+        return BackendSQLite(os.path.join(diretorio, "cloud_db.sqlite"))
+    if nome == BackendSegmentos.nome:
+        return BackendSegmentos(os.path.join(diretorio, "cloud_segmentos"))
+    if nome == BackendJSONLegado.nome:
+        return BackendJSONLegado(os.path.join(diretorio, "cloud_db.json"))
+    raise ValueError(f"Backend de armazenamento desconhecido: {nome}")
+
+
+def importa_json_legado(caminho_json, backend, tamanho_lote=1000):
+    """
+    Importa (uma única vez) o cloud_db.json legado para o backend informado.
+    O arquivo é renomeado para ``.importado`` ao final. Retorna o número de registros importados.
+    """
+    if isinstance(backend, BackendJSONLegado) or not os.path.exists(caminho_json):
+        return 0
+    with FileLock(caminho_json + ".lock"):
+        with open(caminho_json) as f:
+            registros = json.load(f)
+        for i in range(0, len(registros), tamanho_lote):
+            backend.insere_lote(registros[i:i + tamanho_lote])
+        os.replace(caminho_json, caminho_json + ".importado")
+    print(f"[Cloud] {len(registros)} registros importados de {caminho_json} para o backend {backend.nome}")
+    return len(registros)
+
+
+if __name__ == "__main__":
+    # Uso: python storage.py importar <cloud_db.json> <backend> [diretorio]
+    if len(sys.argv) >= 4 and sys.argv[1] == "importar":
+        diretorio = sys.argv[4] if len(sys.argv) > 4 else os.path.dirname(os.path.abspath(sys.argv[2]))
+        importa_json_legado(sys.argv[2], cria_backend(sys.argv[3], diretorio))
+    else:
+        print("Uso: storage.py importar <cloud_db.json> <sqlite|segmentos> [diretorio]")
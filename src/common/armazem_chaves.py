@@ -0,0 +1,121 @@
+"""
+Armazém das chaves RSA dos nós do SISD.
+
+Responsabilidades:
+- Guardar o par de chaves de cada nó em ``<diretorio>/<no_id>_private.pem`` e
+  ``<no_id>_public.pem`` (diretório configurável, fora do código-fonte), em vez de um
+  único par gravado no diretório do módulo e disputado pelos sensores que usam a mesma imagem.
+- Gerar a chave só quando ela é pedida pela primeira vez, sob um lock de arquivo por nó,
+  com escrita atômica; quem perde a disputa carrega a chave gravada pelo outro processo.
+- Manter em memória as chaves já desserializadas.
+- Importar ``cryptography`` e ``filelock`` apenas no primeiro uso.
+"""
+
+import os
+import threading
+
+
+class ArmazemChaves:
+    """
+    Chaves RSA por nó, carregadas (ou geradas) sob demanda e mantidas em cache.
+    """
+
+    def __init__(self, diretorio, tamanho_chave=2048):
+        self.diretorio = diretorio
+        self.tamanho_chave = tamanho_chave
+        self._lock = threading.Lock()
+        self._privadas = {}
+
+    def caminho_privada(self, no_id):
+        return os.path.join(self.diretorio, f"{no_id}_private.pem")
+
+    def caminho_publica(self, no_id):
+        return os.path.join(self.diretorio, f"{no_id}_public.pem")
+
+    def chave_privada(self, no_id):
+        """
+        Retorna a chave privada de ``no_id``, carregando ou gerando no primeiro pedido.
+        """
+        chave = self._privadas.get(no_id)
+        if chave is not None:
+            return chave
+        with self._lock:
+            chave = self._privadas.get(no_id)
+            if chave is None:
+                chave = self._privadas[no_id] = self._carrega_ou_gera(no_id)
+        return chave
+
+    def chave_publica(self, no_id):
+        return self.chave_privada(no_id).public_key()
+
+    def aquece(self, no_id):
+        """
+        Carrega (ou gera) a chave em segundo plano, para que a primeira conexão não espere.
+        """
+        t = threading.Thread(target=self.chave_privada, args=(no_id,), name="armazem-chaves", daemon=True)
+        t.start()
+        return t
+
+    def _carrega_ou_gera(self, no_id):
+        from filelock import FileLock
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self.caminho_privada(no_id)
+        chave = self._carrega(caminho)
+        if chave is not None:
+            return chave
+        # Outro processo pode estar gerando a mesma chave: confere de novo com o lock preso
+        with FileLock(os.path.join(self.diretorio, f"{no_id}.lock")):
+            chave = self._carrega(caminho)
+            if chave is None:
+                chave = self._gera(no_id)
+        return chave
+
+    def _carrega(self, caminho):
+        from cryptography.hazmat.primitives import serialization
+
+        try:
+            with open(caminho, "rb") as f:
+                return serialization.load_pem_private_key(f.read(), password=None)
+        except FileNotFoundError:
+            return None
+
+    def _gera(self, no_id):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        print(f"[Chaves] Gerando chave RSA-{self.tamanho_chave} para {no_id} em {self.diretorio}")
+        chave = rsa.generate_private_key(public_exponent=65537, key_size=self.tamanho_chave)
+        privada = chave.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+        publica = chave.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        # A pública primeiro: quem encontra a privada pode contar com as duas
+        self._grava(self.caminho_publica(no_id), publica, 0o644)
+        self._grava(self.caminho_privada(no_id), privada, 0o600)
+        return chave
+
+    def _grava(self, caminho, dados, modo):
+        temporario = f"{caminho}.tmp"
+        descritor = os.open(temporario, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, modo)
+        with os.fdopen(descritor, "wb") as f:
+            f.write(dados)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+
+
+def abre_armazem_chaves(diretorio_padrao):
+    """
+    Cria o ArmazemChaves em SISD_CHAVES_DIR (ou ``diretorio_padrao``), com o tamanho de
+    chave de SISD_CHAVES_TAMANHO.
+    """
+    return ArmazemChaves(
+        os.environ.get("SISD_CHAVES_DIR", diretorio_padrao),
+        tamanho_chave=int(os.environ.get("SISD_CHAVES_TAMANHO", 2048)),
+    )
@@ -0,0 +1,195 @@
+"""
+Eleição de coordenador pelo algoritmo Bully (gRPC) do SISD.
+
+Responsabilidades:
+- Atender StartElection/AnnounceCoordinator (BullyServiceServicer).
+- Contactar todos os pares de id maior em paralelo, encerrando a espera no primeiro OK.
+- Anunciar o coordenador a todos os pares em paralelo.
+- Reutilizar canais gRPC por par (PoolCanais) em vez de abrir um canal a cada chamada.
+"""
+
+import threading
+import time
+
+import grpc
+
+from middleware.protos import bully_pb2
+from middleware.protos import bully_pb2_grpc
+
+from common.canais_grpc import PoolCanais, dispara
+
+
+def numero_do_id(s_id):
+    """
+    Extrai a parte numérica do id ("sensor_5002" -> 5002), usada para comparar prioridades.
+    """
+    return int(s_id.split("_")[-1])
+
+
+def descreve_erro(erro):
+    """
+    Resume um erro de RPC pelo código de status gRPC, quando houver.
+    """
+    if isinstance(erro, grpc.RpcError):
+        return erro.code().name
+    return str(erro)
+
+
+class EleicaoBully:
+    """
+    Estado da eleição Bully de um nó.
+
+    ``pares()`` retorna ``{id: (host, porta_bully)}`` (pode incluir o próprio nó) e
+    ``ao_eleger(coordenador)`` é chamado sempre que um coordenador é definido.
+    """
+
+    def __init__(self, id_no, pares, pool=None, timeout_rpc=2.0, timeout_anuncio=10.0, ao_eleger=None):
+        self.id_no = id_no
+        self.pares = pares
+        self.pool = pool or PoolCanais()
+        self.timeout_rpc = timeout_rpc
+        self.timeout_anuncio = timeout_anuncio
+        self.ao_eleger = ao_eleger
+        self.coordenador = None
+        self.em_andamento = False
+        self._lock = threading.Lock()
+        self._cond_anuncio = threading.Condition()
+        self._anuncios = 0             # anúncios de coordenador recebidos até agora
+        self.convocacoes = 0           # eleições convocadas por suspeita do coordenador
+        self.convocacoes_descartadas = 0
+
+    def _stub(self, host, porta):
+        return self.pool.stub(f"{host}:{porta}", bully_pb2_grpc.BullyServiceStub)
+
+    def aquece(self):
+        """
+        Abre antecipadamente os canais para todos os pares.
+        """
+        self.pool.aquece(f"{host}:{porta}" for s_id, (host, porta) in self.pares().items() if s_id != self.id_no)
+
+    def inicia_eleicao_assincrona(self):
+        """
+        Inicia a eleição em outra thread, se nenhuma estiver em andamento.
+        """
+        # A marca é tomada agora: um anúncio que chegue antes de a thread rodar já conta
+        t = threading.Thread(target=self.inicia_eleicao, args=(self._anuncios,))
+        t.daemon = True
+        t.start()
+
+    def convoca_por_suspeita(self, suspeito, atraso=0.0):
+        """
+        Convoca uma eleição porque o coordenador ``suspeito`` parou de responder.
+
+        A convocação espera ``atraso`` segundos (menor para ids maiores) e é descartada se,
+        nesse meio tempo, outra eleição começou neste nó ou um coordenador foi anunciado:
+        vários detectores suspeitando ao mesmo tempo não geram uma tempestade de eleições.
+        """
+        marca = self._anuncios
+
+        def convoca():
+            time.sleep(atraso)
+            if self.coordenador != suspeito or self._anuncios > marca or self.em_andamento:
+                self.convocacoes_descartadas += 1
+                print(f"[Bully] Eleição por suspeita de {suspeito} dispensada (já tratada)")
+                return
+            self.convocacoes += 1
+            self.inicia_eleicao(marca)
+
+        t = threading.Thread(target=convoca)
+        t.daemon = True
+        t.start()
+
+    def inicia_eleicao(self, marca=None):
+        """
+        Executa a eleição: pede OK a todos os pares de id maior ao mesmo tempo; sem OK,
+        este nó se declara coordenador; com OK, aguarda um anúncio posterior a ``marca``
+        (refazendo a eleição se ele não chegar a tempo).
+        """
+        with self._lock:
+            if self.em_andamento:
+                return
+            self.em_andamento = True
+        if marca is None:
+            marca = self._anuncios
+        try:
+            while True:
+                print(f"[Bully] {self.id_no} iniciando eleição...")
+                maiores = {s_id: endereco for s_id, endereco in self.pares().items()
+                           if numero_do_id(s_id) > numero_do_id(self.id_no)}
+                req = bully_pb2.ElectionRequest(sensor_id=self.id_no)
+                chamadas = {s_id: (lambda host=host, porta=porta:
+                                   self._stub(host, porta).StartElection.future(req, timeout=self.timeout_rpc))
+                            for s_id, (host, porta) in maiores.items()}
+                quem_respondeu, resultados = dispara(chamadas, self.timeout_rpc, aceita=lambda r: r.ok)
+                for s_id, resultado in resultados.items():
+                    if isinstance(resultado, Exception):
+                        print(f"[Bully] Erro ao contactar {s_id}: {descreve_erro(resultado)}")
+                if quem_respondeu is None:
+                    print(f"[Bully] {self.id_no} se declara o novo coordenador!")
+                    self.define_coordenador(self.id_no)
+                    self.anuncia_coordenador()
+                    return
+                print(f"[Bully] Recebi OK de {quem_respondeu}; {self.id_no} aguardando anúncio do coordenador...")
+                with self._cond_anuncio:
+                    if self._cond_anuncio.wait_for(lambda: self._anuncios > marca, self.timeout_anuncio):
+                        return
+                    marca = self._anuncios
+                print("[Bully] Tempo esgotado sem anúncio de coordenador, reiniciando eleição...")
+        finally:
+            with self._lock:
+                self.em_andamento = False
+
+    def anuncia_coordenador(self):
+        """
+        Anuncia este nó como coordenador a todos os demais pares, em paralelo.
+        """
+        notificacao = bully_pb2.CoordinatorNotification(coordinator_id=self.id_no)
+        chamadas = {s_id: (lambda host=host, porta=porta:
+                           self._stub(host, porta).AnnounceCoordinator.future(notificacao, timeout=self.timeout_rpc))
+                    for s_id, (host, porta) in self.pares().items() if s_id != self.id_no}
+        _, resultados = dispara(chamadas, self.timeout_rpc)
+        for s_id, resultado in resultados.items():
+            if isinstance(resultado, Exception):
+                print(f"[Bully] Erro ao anunciar para {s_id}: {descreve_erro(resultado)}")
+            elif resultado.ok:
+                print(f"[Bully] {s_id} confirmou o novo coordenador")
+
+    def define_coordenador(self, coordenador):
+        """
+        Registra o coordenador e libera quem aguarda o anúncio.
+        """
+        with self._cond_anuncio:
+            self.coordenador = coordenador
+            self._anuncios += 1
+            self._cond_anuncio.notify_all()
+        if self.ao_eleger is not None:
+            self.ao_eleger(coordenador)
+
+    def servicer(self):
+        """
+        Retorna o servicer gRPC ligado a esta eleição.
+        """
+        return BullyServiceServicer(self)
+
+
+class BullyServiceServicer(bully_pb2_grpc.BullyServiceServicer):
+    """
+    Serviço gRPC para eleição Bully.
+    """
+
+    def __init__(self, eleicao):
+        self.eleicao = eleicao
+
+    def StartElection(self, request, context):
+        caller_id = request.sensor_id
+        print(f"[Bully] Recebido pedido de eleição de '{caller_id}'")
+        if numero_do_id(self.eleicao.id_no) > numero_do_id(caller_id):
+            if not self.eleicao.em_andamento:
+                self.eleicao.inicia_eleicao_assincrona()
+            return bully_pb2.ElectionResponse(ok=True, message="OK")
+        return bully_pb2.ElectionResponse(ok=False, message="Meu id é menor")
+
+    def AnnounceCoordinator(self, request, context):
+        print(f"[Bully] Novo coordenador anunciado: {request.coordinator_id}")
+        self.eleicao.define_coordenador(request.coordinator_id)
+        return bully_pb2.ElectionResponse(ok=True, message="Coordenador recebido")
@@ -0,0 +1,137 @@
+"""
+Pool de canais gRPC do SISD.
+
+Responsabilidades:
+- Reutilizar um canal (e seus stubs) por endereço em todo o processo, em vez de abrir
+  um canal novo a cada chamada.
+- Acompanhar o estado de conectividade de cada canal (IDLE, CONNECTING, READY,
+  TRANSIENT_FAILURE), já iniciando a conexão ao criar o canal.
+- Disparar chamadas para vários pares em paralelo e retornar assim que a primeira
+  resposta aceita chegar (ou todas terminarem).
+"""
+
+import threading
+import time
+
+import grpc
+
+OPCOES_PADRAO = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.initial_reconnect_backoff_ms", 200),
+    ("grpc.max_reconnect_backoff_ms", 5000),
+]
+
+
+class PoolCanais:
+    """
+    Canais gRPC compartilhados, indexados por endereço "host:porta".
+    """
+
+    def __init__(self, opcoes=None):
+        self.opcoes = OPCOES_PADRAO if opcoes is None else opcoes
+        self._lock = threading.Lock()
+        self._canais = {}       # endereco -> grpc.Channel
+        self._stubs = {}        # (endereco, classe do stub) -> stub
+        self._estados = {}      # endereco -> grpc.ChannelConnectivity
+
+    def canal(self, endereco):
+        """
+        Retorna o canal do endereço, criando-o (e iniciando a conexão) na primeira vez.
+        """
+        with self._lock:
+            canal = self._canais.get(endereco)
+            if canal is None:
+                canal = grpc.insecure_channel(endereco, options=self.opcoes)
+                canal.subscribe(lambda estado, endereco=endereco: self._atualiza_estado(endereco, estado),
+                                try_to_connect=True)
+                self._canais[endereco] = canal
+            return canal
+
+    def stub(self, endereco, classe_stub):
+        """
+        Retorna um stub em cache para o endereço.
+        """
+        chave = (endereco, classe_stub)
+        with self._lock:
+            stub = self._stubs.get(chave)
+        if stub is None:
+            stub = classe_stub(self.canal(endereco))
+            with self._lock:
+                stub = self._stubs.setdefault(chave, stub)
+        return stub
+
+    def aquece(self, enderecos):
+        """
+        Cria os canais antecipadamente para que a primeira chamada não pague a conexão.
+        """
+        for endereco in enderecos:
+            self.canal(endereco)
+
+    def _atualiza_estado(self, endereco, estado):
+        self._estados[endereco] = estado
+
+    def estado(self, endereco):
+        """
+        Último estado de conectividade observado (None se o canal ainda não existe).
+        """
+        return self._estados.get(endereco)
+
+    def estados(self):
+        """
+        Retorna ``{endereco: nome do estado}`` de todos os canais.
+        """
+        return {endereco: estado.name for endereco, estado in list(self._estados.items())}
+
+    def fecha(self, endereco=None):
+        """
+        Fecha o canal de um endereço (ou todos) e descarta seus stubs.
+        """
+        with self._lock:
+            enderecos = [endereco] if endereco is not None else list(self._canais)
+            for e in enderecos:
+                canal = self._canais.pop(e, None)
+                self._estados.pop(e, None)
+                for chave in [c for c in self._stubs if c[0] == e]:
+                    del self._stubs[chave]
+                if canal is not None:
+                    canal.close()
+
+
+def dispara(chamadas, timeout, aceita=None):
+    """
+    Executa as chamadas em paralelo (futures gRPC).
+
+    ``chamadas`` é ``{chave: funcao_que_retorna_future}``. Retorna ``(chave_aceita, resultados)``
+    assim que ``aceita(resposta)`` for verdadeiro para alguma resposta, todas terminarem ou o
+    timeout expirar; ``resultados`` mapeia cada chave concluída para a resposta ou a exceção.
+    """
+    cond = threading.Condition()
+    resultados = {}
+    aceitas = []
+
+    def concluida(chave, future):
+        try:
+            resultado = future.result()
+        except Exception as e:
+            resultado = e
+        with cond:
+            resultados[chave] = resultado
+            if aceita is not None and not isinstance(resultado, Exception) and aceita(resultado):
+                aceitas.append(chave)
+            cond.notify_all()
+
+    for chave, chamada in chamadas.items():
+        try:
+            future = chamada()
+        except Exception as e:
+            with cond:
+                resultados[chave] = e
+            continue
+        future.add_done_callback(lambda f, chave=chave: concluida(chave, f))
+
+    limite = time.monotonic() + timeout
+    with cond:
+        cond.wait_for(lambda: aceitas or len(resultados) == len(chamadas),
+                      max(0.0, limite - time.monotonic()))
+        # As chamadas ainda pendentes seguem até o próprio deadline; o resultado é ignorado
+        return (aceitas[0] if aceitas else None), dict(resultados)
@@ -0,0 +1,347 @@
+"""
+Canal seguro entre cliente e sensor do SISD (versão 2 do protocolo binário).
+
+Responsabilidades:
+- Handshake com troca de chaves efêmeras X25519 e derivação das chaves de sessão por
+  HKDF-SHA256 (uma chave por sentido, mais a chave de confirmação e o segredo de retomada).
+- Autenticar o sensor com a chave RSA que ele já possui: no handshake completo o sensor
+  assina (RSA-PSS) a transcrição; o cliente fixa a chave pública do sensor no primeiro
+  contato (arquivo SISD_CHAVES_CONHECIDAS) e recusa uma chave diferente depois.
+- Retomar sessões com tickets: o sensor entrega um ticket cifrado com uma chave só dele;
+  na reconexão o cliente o apresenta e o handshake dispensa a operação com a chave
+  privada RSA (uma rajada de reconexões custa só trocas X25519).
+- Cifrar os quadros após o handshake com AES-GCM ou ChaCha20-Poly1305 (nonce implícito
+  por contador em cada sentido), em registros TIPO_CIFRADO que carregam um ou mais
+  quadros em claro.
+
+Mensagens do handshake (big-endian), após o HELLO versão 2:
+    TIPO_CANAL_OLA:    uint8 versão | uint8 cifra | X25519 (32) | nonce (16) | ticket (uint16 + bytes)
+    TIPO_CANAL_ACEITE: uint8 versão | uint8 retomada | X25519 (32) | nonce (16)
+                       | chave pública DER | assinatura | novo ticket (cada um uint16 + bytes)
+                       | HMAC-SHA256 da transcrição (32)
+"""
+
+import base64
+import hmac
+import json
+import os
+import struct
+import threading
+import time
+
+from cryptography.exceptions import InvalidSignature, InvalidTag
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey, X25519PublicKey
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from common.framing import TIPO_CANAL_ACEITE, TIPO_CANAL_OLA, TIPO_CIFRADO, ErroProtocolo, codifica_quadro
+
+VERSAO_HANDSHAKE = 1
+CIFRA_AES_GCM = 1
+CIFRA_CHACHA20 = 2
+CIFRAS = {"aes-gcm": CIFRA_AES_GCM, "chacha20": CIFRA_CHACHA20}
+_AEAD = {CIFRA_AES_GCM: AESGCM, CIFRA_CHACHA20: ChaCha20Poly1305}
+
+OLA = struct.Struct(">BB32s16s")
+ACEITE = struct.Struct(">BB32s16s")
+_BLOB = struct.Struct(">H")
+_NONCE = struct.Struct(">4xQ")         # 12 bytes: contador de registros do sentido
+_TICKET = struct.Struct(">d32s")       # validade (epoch) | segredo de retomada
+TAMANHO_CONFIRMACAO = 32
+INFO_HKDF = b"sisd canal v1"
+AAD_TICKET = b"sisd ticket v1"
+
+_PSS = padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH)
+
+
+class ErroCanal(ErroProtocolo):
+    """
+    Handshake recusado ou registro cifrado inválido.
+    """
+
+
+def _anexa_blob(saida, dados):
+    saida += _BLOB.pack(len(dados))
+    saida += dados
+
+
+def _le_blob(dados, pos):
+    if pos + _BLOB.size > len(dados):
+        raise ErroCanal("Mensagem de handshake truncada")
+    (tamanho,) = _BLOB.unpack_from(dados, pos)
+    pos += _BLOB.size
+    if pos + tamanho > len(dados):
+        raise ErroCanal("Mensagem de handshake truncada")
+    return bytes(dados[pos:pos + tamanho]), pos + tamanho
+
+
+def _bytes_publicos(chave_efemera):
+    return chave_efemera.public_key().public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+
+
+def _deriva(compartilhado, segredo_retomada, nonce_cliente, nonce_sensor, retomada):
+    material = HKDF(
+        algorithm=hashes.SHA256(),
+        length=128,
+        salt=nonce_cliente + nonce_sensor,
+        info=INFO_HKDF + bytes([retomada]),
+    ).derive(compartilhado + (segredo_retomada or b""))
+    # cliente -> sensor, sensor -> cliente, confirmação, próximo segredo de retomada
+    return material[:32], material[32:64], material[64:96], material[96:]
+
+
+def _confirmacao(chave, transcricao):
+    return hmac.new(chave, transcricao, "sha256").digest()
+
+
+class Sessao:
+    """
+    Chaves de um canal estabelecido. ``sela`` e ``abre`` mantêm um contador por sentido,
+    usado como nonce; cada lado só pode selar de uma thread por vez.
+    """
+
+    def __init__(self, cifra, chave_envio, chave_recebimento, retomada=False):
+        self.cifra = cifra
+        self.retomada = retomada
+        self._envio = _AEAD[cifra](chave_envio)
+        self._recebimento = _AEAD[cifra](chave_recebimento)
+        self._contador_envio = 0
+        self._contador_recebimento = 0
+
+    def sela(self, dados):
+        """
+        Cifra ``dados`` (um ou mais quadros em claro) e retorna o quadro TIPO_CIFRADO.
+        """
+        nonce = _NONCE.pack(self._contador_envio)
+        self._contador_envio += 1
+        return codifica_quadro(TIPO_CIFRADO, self._envio.encrypt(nonce, bytes(dados), None))
+
+    def abre(self, payload):
+        """
+        Decifra o payload de um quadro TIPO_CIFRADO e retorna os bytes em claro.
+        """
+        nonce = _NONCE.pack(self._contador_recebimento)
+        try:
+            dados = self._recebimento.decrypt(nonce, payload, None)
+        except InvalidTag:
+            raise ErroCanal("Registro cifrado inválido (adulterado ou fora de ordem)")
+        self._contador_recebimento += 1
+        return dados
+
+
+class ConexaoCifrada:
+    """
+    Envolve o socket de dados do sensor: ``sendall`` recebe quadros em claro e os envia
+    como um registro cifrado. A trava mantém a ordem dos contadores igual à do fio.
+    """
+
+    def __init__(self, conn, sessao):
+        self.conn = conn
+        self.sessao = sessao
+        self._lock = threading.Lock()
+
+    def sendall(self, dados):
+        with self._lock:
+            self.conn.sendall(self.sessao.sela(dados))
+
+    def close(self):
+        self.conn.close()
+
+    def fileno(self):
+        return self.conn.fileno()
+
+
+# --- Sensor ---
+class EmissorTickets:
+    """
+    Emite e abre os tickets de retomada do sensor. A chave dos tickets fica só em memória:
+    reiniciar o sensor invalida os tickets e a próxima conexão faz o handshake completo.
+    """
+
+    def __init__(self, validade=3600.0):
+        self.validade = validade
+        self._aead = AESGCM(AESGCM.generate_key(bit_length=256))
+
+    def emite(self, segredo):
+        nonce = os.urandom(12)
+        return nonce + self._aead.encrypt(nonce, _TICKET.pack(time.time() + self.validade, segredo), AAD_TICKET)
+
+    def abre(self, ticket):
+        """
+        Retorna o segredo de retomada do ticket, ou None se for inválido ou estiver vencido.
+        """
+        if len(ticket) < 12:
+            return None
+        try:
+            validade, segredo = _TICKET.unpack(self._aead.decrypt(ticket[:12], ticket[12:], AAD_TICKET))
+        except (InvalidTag, struct.error):
+            return None
+        return segredo if time.time() < validade else None
+
+
+def aceita_handshake(ola, chave_privada, emissor):
+    """
+    Lado do sensor: processa o payload de TIPO_CANAL_OLA e retorna ``(quadro_aceite, sessao)``.
+    Com um ticket válido o handshake é retomado sem usar ``chave_privada``.
+    """
+    if len(ola) < OLA.size:
+        raise ErroCanal("Mensagem de handshake truncada")
+    versao, cifra, efemera_cliente, nonce_cliente = OLA.unpack_from(ola)
+    if versao != VERSAO_HANDSHAKE or cifra not in _AEAD:
+        raise ErroCanal(f"Handshake não suportado (versão {versao}, cifra {cifra})")
+    ticket, _ = _le_blob(ola, OLA.size)
+    segredo = emissor.abre(ticket) if ticket else None
+    retomada = segredo is not None
+
+    efemera = X25519PrivateKey.generate()
+    nonce_sensor = os.urandom(16)
+    compartilhado = efemera.exchange(X25519PublicKey.from_public_bytes(efemera_cliente))
+    chave_c2s, chave_s2c, chave_confirmacao, proximo_segredo = _deriva(
+        compartilhado, segredo, nonce_cliente, nonce_sensor, retomada)
+
+    aceite = bytearray(ACEITE.pack(VERSAO_HANDSHAKE, retomada, _bytes_publicos(efemera), nonce_sensor))
+    if retomada:
+        _anexa_blob(aceite, b"")
+        _anexa_blob(aceite, b"")
+    else:
+        publica = chave_privada.public_key().public_bytes(
+            serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+        _anexa_blob(aceite, publica)
+        _anexa_blob(aceite, chave_privada.sign(bytes(ola) + bytes(aceite), _PSS, hashes.SHA256()))
+    _anexa_blob(aceite, emissor.emite(proximo_segredo))
+    aceite += _confirmacao(chave_confirmacao, bytes(ola) + bytes(aceite))
+    return codifica_quadro(TIPO_CANAL_ACEITE, bytes(aceite)), Sessao(cifra, chave_s2c, chave_c2s, retomada)
+
+
+# --- Cliente ---
+class HandshakeCliente:
+    """
+    Handshake em andamento do lado do cliente (chave efêmera, nonce e OLA enviado).
+    """
+
+    def __init__(self, destino, cifra, ticket, segredo):
+        self.destino = destino
+        self.cifra = cifra
+        self.segredo = segredo
+        self.efemera = X25519PrivateKey.generate()
+        self.nonce = os.urandom(16)
+        ola = bytearray(OLA.pack(VERSAO_HANDSHAKE, cifra, _bytes_publicos(self.efemera), self.nonce))
+        _anexa_blob(ola, ticket or b"")
+        self.ola = bytes(ola)
+
+    def quadro(self):
+        return codifica_quadro(TIPO_CANAL_OLA, self.ola)
+
+
+class ChaveiroSessoes:
+    """
+    Estado do cliente para o canal seguro: chaves públicas fixadas por sensor
+    (``arquivo``, JSON ``{"host:porta": DER em base64}``) e tickets de retomada em memória.
+    """
+
+    def __init__(self, arquivo=None, cifra="aes-gcm"):
+        if cifra not in CIFRAS:
+            raise ValueError(f"Cifra do canal inválida: {cifra}")
+        self.arquivo = arquivo
+        self.cifra = CIFRAS[cifra]
+        self._lock = threading.Lock()
+        self._tickets = {}            # destino -> (ticket, segredo)
+        self._fixadas = self._carrega()
+        self.contadores = {"completos": 0, "retomados": 0, "recusados": 0}
+
+    def _carrega(self):
+        if not self.arquivo or not os.path.exists(self.arquivo):
+            return {}
+        try:
+            with open(self.arquivo) as f:
+                return {destino: base64.b64decode(der) for destino, der in json.load(f).items()}
+        except (OSError, ValueError) as e:
+            print(f"[Canal] Arquivo de chaves conhecidas inválido em {self.arquivo}: {e}")
+            return {}
+
+    def _fixa(self, destino, der):
+        self._fixadas[destino] = der
+        if not self.arquivo:
+            return
+        dados = {chave: base64.b64encode(valor).decode() for chave, valor in self._fixadas.items()}
+        temporario = f"{self.arquivo}.tmp"
+        with open(temporario, "w") as f:
+            json.dump(dados, f, indent=2)
+        os.replace(temporario, self.arquivo)
+
+    def inicia(self, destino):
+        """
+        Começa um handshake com ``destino`` ("host:porta"), oferecendo o ticket guardado.
+        """
+        with self._lock:
+            ticket, segredo = self._tickets.pop(destino, (None, None))
+        return HandshakeCliente(destino, self.cifra, ticket, segredo)
+
+    def conclui(self, handshake, aceite):
+        """
+        Verifica o payload de TIPO_CANAL_ACEITE e retorna a Sessao do cliente.
+        """
+        try:
+            return self._conclui(handshake, aceite)
+        except ErroCanal:
+            with self._lock:
+                self.contadores["recusados"] += 1
+            raise
+
+    def _conclui(self, handshake, aceite):
+        if len(aceite) < ACEITE.size + TAMANHO_CONFIRMACAO:
+            raise ErroCanal("Mensagem de handshake truncada")
+        versao, retomada, efemera_sensor, nonce_sensor = ACEITE.unpack_from(aceite)
+        if versao != VERSAO_HANDSHAKE:
+            raise ErroCanal(f"Versão de handshake não suportada: {versao}")
+        publica, pos = _le_blob(aceite, ACEITE.size)
+        assinatura, pos = _le_blob(aceite, pos)
+        inicio_assinatura = pos - _BLOB.size - len(assinatura)
+        ticket, pos = _le_blob(aceite, pos)
+        if pos + TAMANHO_CONFIRMACAO != len(aceite):
+            raise ErroCanal("Mensagem de handshake com tamanho inválido")
+        if retomada and handshake.segredo is None:
+            raise ErroCanal("Sensor retomou uma sessão que o cliente não ofereceu")
+
+        compartilhado = handshake.efemera.exchange(X25519PublicKey.from_public_bytes(efemera_sensor))
+        chave_c2s, chave_s2c, chave_confirmacao, proximo_segredo = _deriva(
+            compartilhado, handshake.segredo if retomada else None, handshake.nonce, nonce_sensor, bool(retomada))
+        esperado = _confirmacao(chave_confirmacao, handshake.ola + bytes(aceite[:pos]))
+        if not hmac.compare_digest(esperado, bytes(aceite[pos:])):
+            raise ErroCanal("Confirmação do handshake não confere")
+
+        if not retomada:
+            self._verifica_sensor(handshake, publica, assinatura, bytes(aceite[:inicio_assinatura]))
+        with self._lock:
+            self._tickets[handshake.destino] = (ticket, proximo_segredo)
+            self.contadores["retomados" if retomada else "completos"] += 1
+        return Sessao(handshake.cifra, chave_c2s, chave_s2c, bool(retomada))
+
+    def _verifica_sensor(self, handshake, publica, assinatura, assinado):
+        with self._lock:
+            fixada = self._fixadas.get(handshake.destino)
+        if fixada is not None and fixada != publica:
+            raise ErroCanal(f"Chave pública de {handshake.destino} difere da fixada")
+        try:
+            chave = serialization.load_der_public_key(publica)
+            chave.verify(assinatura, handshake.ola + assinado, _PSS, hashes.SHA256())
+        except (InvalidSignature, ValueError, TypeError, AttributeError):
+            raise ErroCanal(f"Assinatura do sensor {handshake.destino} inválida")
+        if fixada is None:
+            with self._lock:
+                self._fixa(handshake.destino, publica)
+            print(f"[Canal] Chave pública de {handshake.destino} fixada no primeiro contato")
+
+
+def abre_chaveiro(diretorio):
+    """
+    Cria o ChaveiroSessoes do cliente a partir de SISD_CANAL_CIFRA ("aes-gcm", "chacha20"
+    ou "nenhuma") e SISD_CHAVES_CONHECIDAS. Retorna None se o canal cifrado estiver desligado.
+    """
+    cifra = os.environ.get("SISD_CANAL_CIFRA", "aes-gcm")
+    if cifra == "nenhuma":
+        return None
+    arquivo = os.environ.get("SISD_CHAVES_CONHECIDAS", os.path.join(diretorio, "chaves_sensores.json"))
+    return ChaveiroSessoes(arquivo, cifra)
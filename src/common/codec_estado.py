@@ -0,0 +1,172 @@
+"""
+Codificação binária compacta do estado dos snapshots do SISD.
+
+Responsabilidades:
+- Serializar o estado de um nó (dicionários, listas, textos, números, bytes, None e
+  booleanos) em um formato binário com tipos marcados, sem dependências externas.
+- Usar a menor largura que cabe em cada inteiro e ``float64`` para reais.
+- Envolver o payload em um cabeçalho com magia, versão e CRC32, para que um arquivo
+  truncado ou corrompido seja detectado na leitura.
+
+Formato (big-endian): ``"SNAP" | uint8 versão | uint32 CRC32 | payload``, onde cada valor
+do payload é um byte de tipo seguido do conteúdo. Tuplas voltam como listas.
+"""
+
+import struct
+import zlib
+
+MAGIA = b"SNAP"
+VERSAO = 1
+CABECALHO = struct.Struct(">4sBI")
+
+NULO = 0x00
+VERDADEIRO = 0x01
+FALSO = 0x02
+INT8 = 0x03
+INT32 = 0x04
+INT64 = 0x05
+INT_GRANDE = 0x06     # uint32 tamanho | inteiro com sinal em complemento de dois
+REAL = 0x07
+TEXTO = 0x08
+BYTES = 0x09
+LISTA = 0x0A
+DICIONARIO = 0x0B
+
+_B = struct.Struct(">b")
+_I = struct.Struct(">i")
+_Q = struct.Struct(">q")
+_D = struct.Struct(">d")
+_TAMANHO = struct.Struct(">I")
+
+
+class ErroCodec(ValueError):
+    """
+    Estado não serializável ou arquivo de snapshot inválido.
+    """
+
+
+def _codifica_valor(valor, saida):
+    # bool antes de int: True/False também são int
+    if valor is None:
+        saida.append(NULO)
+    elif valor is True:
+        saida.append(VERDADEIRO)
+    elif valor is False:
+        saida.append(FALSO)
+    elif isinstance(valor, int):
+        if -0x80 <= valor < 0x80:
+            saida.append(INT8)
+            saida += _B.pack(valor)
+        elif -0x80000000 <= valor < 0x80000000:
+            saida.append(INT32)
+            saida += _I.pack(valor)
+        elif -0x8000000000000000 <= valor < 0x8000000000000000:
+            saida.append(INT64)
+            saida += _Q.pack(valor)
+        else:
+            dados = valor.to_bytes((valor.bit_length() + 8) // 8, "big", signed=True)
+            saida.append(INT_GRANDE)
+            saida += _TAMANHO.pack(len(dados))
+            saida += dados
+    elif isinstance(valor, float):
+        saida.append(REAL)
+        saida += _D.pack(valor)
+    elif isinstance(valor, str):
+        dados = valor.encode("utf-8")
+        saida.append(TEXTO)
+        saida += _TAMANHO.pack(len(dados))
+        saida += dados
+    elif isinstance(valor, (bytes, bytearray, memoryview)):
+        saida.append(BYTES)
+        saida += _TAMANHO.pack(len(valor))
+        saida += valor
+    elif isinstance(valor, (list, tuple)):
+        saida.append(LISTA)
+        saida += _TAMANHO.pack(len(valor))
+        for item in valor:
+            _codifica_valor(item, saida)
+    elif isinstance(valor, dict):
+        saida.append(DICIONARIO)
+        saida += _TAMANHO.pack(len(valor))
+        for chave, item in valor.items():
+            _codifica_valor(chave, saida)
+            _codifica_valor(item, saida)
+    else:
+        raise ErroCodec(f"Tipo não serializável no snapshot: {type(valor).__name__}")
+
+
+def _decodifica_valor(dados, pos):
+    tipo = dados[pos]
+    pos += 1
+    if tipo == NULO:
+        return None, pos
+    if tipo == VERDADEIRO:
+        return True, pos
+    if tipo == FALSO:
+        return False, pos
+    if tipo == INT8:
+        return _B.unpack_from(dados, pos)[0], pos + 1
+    if tipo == INT32:
+        return _I.unpack_from(dados, pos)[0], pos + 4
+    if tipo == INT64:
+        return _Q.unpack_from(dados, pos)[0], pos + 8
+    if tipo == REAL:
+        return _D.unpack_from(dados, pos)[0], pos + 8
+    if tipo in (TEXTO, BYTES, INT_GRANDE):
+        (tamanho,) = _TAMANHO.unpack_from(dados, pos)
+        pos += 4
+        bruto = bytes(dados[pos:pos + tamanho])
+        pos += tamanho
+        if tipo == TEXTO:
+            return bruto.decode("utf-8"), pos
+        if tipo == BYTES:
+            return bruto, pos
+        return int.from_bytes(bruto, "big", signed=True), pos
+    if tipo == LISTA:
+        (quantidade,) = _TAMANHO.unpack_from(dados, pos)
+        pos += 4
+        lista = []
+        for _ in range(quantidade):
+            item, pos = _decodifica_valor(dados, pos)
+            lista.append(item)
+        return lista, pos
+    if tipo == DICIONARIO:
+        (quantidade,) = _TAMANHO.unpack_from(dados, pos)
+        pos += 4
+        dicionario = {}
+        for _ in range(quantidade):
+            chave, pos = _decodifica_valor(dados, pos)
+            item, pos = _decodifica_valor(dados, pos)
+            dicionario[chave] = item
+        return dicionario, pos
+    raise ErroCodec(f"Tipo desconhecido no snapshot: {tipo:#x}")
+
+
+def codifica(estado):
+    """
+    Serializa ``estado`` no formato binário com cabeçalho e CRC32.
+    """
+    payload = bytearray()
+    _codifica_valor(estado, payload)
+    return CABECALHO.pack(MAGIA, VERSAO, zlib.crc32(payload)) + payload
+
+
+def decodifica(dados):
+    """
+    Reconstrói o estado a partir de ``codifica``; levanta ErroCodec se o arquivo for inválido.
+    """
+    if len(dados) < CABECALHO.size:
+        raise ErroCodec("Snapshot truncado")
+    magia, versao, crc = CABECALHO.unpack_from(dados)
+    if magia != MAGIA or versao != VERSAO:
+        raise ErroCodec("Cabeçalho de snapshot inválido")
+    payload = memoryview(dados)[CABECALHO.size:]
+    if zlib.crc32(payload) != crc:
+        raise ErroCodec("CRC do snapshot não confere")
+    try:
+        estado, pos = _decodifica_valor(payload, 0)
+    except (IndexError, struct.error, UnicodeDecodeError) as e:
+        raise ErroCodec(f"Snapshot corrompido: {e}")
+    if pos != len(payload):
+        raise ErroCodec("Bytes sobrando no final do snapshot")
+    return estado
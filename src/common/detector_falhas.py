@@ -0,0 +1,253 @@
+"""
+Detecção de falhas entre sensores do SISD (phi accrual).
+
+Responsabilidades:
+- Trocar batimentos (heartbeats) leves entre os sensores por UDP.
+- Estimar, por par, a distribuição dos intervalos entre batimentos (média e desvio em
+  janela deslizante, atualizados em O(1)) e calcular o nível de suspeita phi.
+- Emitir apenas transições: suspeita quando phi passa do limiar e recuperação quando o
+  par volta a enviar batimentos.
+- Contabilizar latência de detecção e falsos positivos (o par suspeito volta com a mesma
+  sequência de batimentos, ou seja, nunca caiu).
+
+Formato do batimento (big-endian):
+    4s magia | uint32 id do nó | uint64 sequência
+"""
+
+import collections
+import math
+import socket
+import struct
+import threading
+import time
+
+BATIMENTO = struct.Struct(">4sIQ")
+MAGIA_BATIMENTO = b"SIHB"
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+class HistoricoChegadas:
+    """
+    Janela deslizante dos intervalos entre batimentos de um par.
+    """
+
+    def __init__(self, janela, intervalo_inicial):
+        self.janela = janela
+        self.intervalos = collections.deque()
+        self.soma = 0.0
+        self.soma_quadrados = 0.0
+        self.ultimo = None
+        # Estimativa inicial (média = intervalo esperado, desvio = 1/4 do intervalo)
+        desvio = intervalo_inicial / 4
+        self._adiciona(intervalo_inicial - desvio)
+        self._adiciona(intervalo_inicial + desvio)
+
+    def _adiciona(self, intervalo):
+        if len(self.intervalos) >= self.janela:
+            antigo = self.intervalos.popleft()
+            self.soma -= antigo
+            self.soma_quadrados -= antigo * antigo
+        self.intervalos.append(intervalo)
+        self.soma += intervalo
+        self.soma_quadrados += intervalo * intervalo
+
+    def registra(self, agora):
+        if self.ultimo is not None:
+            self._adiciona(agora - self.ultimo)
+        self.ultimo = agora
+
+    def phi(self, agora, desvio_minimo):
+        """
+        Nível de suspeita: -log10 da probabilidade de o próximo batimento chegar
+        depois de ``agora`` (aproximação logística da normal, como no Akka).
+        """
+        n = len(self.intervalos)
+        media = self.soma / n
+        variancia = max(self.soma_quadrados / n - media * media, 0.0)
+        desvio = max(math.sqrt(variancia), desvio_minimo)
+        y = (agora - self.ultimo - media) / desvio
+        e = math.exp(-y * (1.5976 + 0.070566 * y * y))
+        if agora - self.ultimo > media:
+            return -math.log10(e / (1.0 + e))
+        return -math.log10(1.0 - 1.0 / (1.0 + e))
+
+
+class DetectorFalhas:
+    """
+    Detector phi accrual para um conjunto de pares.
+
+    ``registra(par, seq)`` alimenta o detector (e indica recuperações); ``avalia()``
+    retorna os pares que passaram a ser suspeitos desde a última avaliação.
+    """
+
+    def __init__(self, intervalo_esperado=1.0, limiar=8.0, janela=100, desvio_minimo=None):
+        self.intervalo_esperado = intervalo_esperado
+        self.limiar = limiar
+        self.janela = janela
+        self.desvio_minimo = intervalo_esperado / 10 if desvio_minimo is None else desvio_minimo
+        self._lock = threading.Lock()
+        self._historicos = {}        # par -> HistoricoChegadas
+        self._sequencias = {}        # par -> última sequência recebida
+        self.suspeitos = {}          # par -> (instante da suspeita, sequência na suspeita)
+        self.latencias_deteccao = collections.deque(maxlen=1000)
+        self.contadores = {"batimentos": 0, "suspeitas": 0, "recuperacoes": 0,
+                           "falsos_positivos": 0, "reinicios": 0}
+
+    def registra(self, par, seq=None, agora=None):
+        """
+        Registra um batimento do par. Retorna "recuperado" se ele estava sob suspeita.
+        """
+        agora = time.monotonic() if agora is None else agora
+        with self._lock:
+            self.contadores["batimentos"] += 1
+            historico = self._historicos.get(par)
+            if historico is None:
+                historico = self._historicos[par] = HistoricoChegadas(self.janela, self.intervalo_esperado)
+            anterior = self._sequencias.get(par)
+            if seq is not None:
+                if seq == anterior:
+                    return None          # batimento duplicado
+                self._sequencias[par] = seq
+            suspeita = self.suspeitos.pop(par, None)
+            if suspeita is None:
+                historico.registra(agora)
+                return None
+            self.contadores["recuperacoes"] += 1
+            if seq is not None and suspeita[1] is not None and seq > suspeita[1]:
+                # Mesma encarnação do processo: a suspeita era um falso positivo
+                self.contadores["falsos_positivos"] += 1
+            else:
+                self.contadores["reinicios"] += 1
+            # Após uma pausa longa o histórico não representa mais o par: recomeça
+            historico = self._historicos[par] = HistoricoChegadas(self.janela, self.intervalo_esperado)
+            historico.registra(agora)
+            return "recuperado"
+
+    def phi(self, par, agora=None):
+        agora = time.monotonic() if agora is None else agora
+        with self._lock:
+            historico = self._historicos.get(par)
+            if historico is None or historico.ultimo is None:
+                return 0.0
+            return historico.phi(agora, self.desvio_minimo)
+
+    def avalia(self, agora=None):
+        """
+        Retorna os pares que passaram a ser suspeitos desde a última avaliação.
+        """
+        agora = time.monotonic() if agora is None else agora
+        novos = []
+        with self._lock:
+            for par, historico in self._historicos.items():
+                if par in self.suspeitos or historico.ultimo is None:
+                    continue
+                if historico.phi(agora, self.desvio_minimo) >= self.limiar:
+                    self.suspeitos[par] = (agora, self._sequencias.get(par))
+                    self.contadores["suspeitas"] += 1
+                    self.latencias_deteccao.append(agora - historico.ultimo)
+                    novos.append(par)
+        return novos
+
+    def estatisticas(self):
+        """
+        Contadores e latência de detecção (ms desde o último batimento até a suspeita).
+        """
+        with self._lock:
+            estatisticas = dict(self.contadores)
+            latencias = list(self.latencias_deteccao)
+            estatisticas["suspeitos"] = sorted(self.suspeitos)
+        for p in (50, 99):
+            valor = _percentil(latencias, p)
+            estatisticas[f"deteccao_p{p}_ms"] = round(valor * 1000, 1) if valor is not None else None
+        return estatisticas
+
+
+class BatimentosPares:
+    """
+    Troca de batimentos por UDP com os pares e avaliação periódica do detector.
+
+    ``pares()`` retorna ``{id_no: (host, porta_udp)}``; ``ao_suspeitar(id_no)`` e
+    ``ao_recuperar(id_no)`` são chamados nas transições.
+    """
+
+    def __init__(self, id_no, porta, pares, detector=None, intervalo=1.0,
+                 ao_suspeitar=None, ao_recuperar=None):
+        self.id_no = id_no
+        self.porta = porta
+        self.pares = pares
+        self.intervalo = intervalo
+        self.detector = detector or DetectorFalhas(intervalo_esperado=intervalo)
+        self.ao_suspeitar = ao_suspeitar
+        self.ao_recuperar = ao_recuperar
+        self.ativo = True
+        self._sequencia = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(("0.0.0.0", porta))
+        # Timeout na recepção para a thread perceber o encerramento
+        self._sock.settimeout(max(intervalo, 0.05))
+        self._threads = []
+
+    def inicia(self):
+        for alvo, nome in ((self._envia, "batimentos-envio"), (self._recebe, "batimentos-recepcao"),
+                           (self._avalia, "batimentos-avaliacao")):
+            t = threading.Thread(target=alvo, name=nome)
+            t.daemon = True
+            t.start()
+            self._threads.append(t)
+
+    def para(self):
+        """
+        Interrompe envio, recepção e avaliação (o nó deixa de emitir batimentos) e
+        libera a porta UDP.
+        """
+        self.ativo = False
+        for t in self._threads:
+            t.join()
+        self._sock.close()
+
+    def _envia(self):
+        destinos_resolvidos = {}
+        while self.ativo:
+            self._sequencia += 1
+            mensagem = BATIMENTO.pack(MAGIA_BATIMENTO, self.id_no, self._sequencia)
+            for id_par, (host, porta) in self.pares().items():
+                if id_par == self.id_no:
+                    continue
+                try:
+                    destino = destinos_resolvidos.get((host, porta))
+                    if destino is None:
+                        destino = destinos_resolvidos[(host, porta)] = (socket.gethostbyname(host), porta)
+                    self._sock.sendto(mensagem, destino)
+                except OSError:
+                    # Host ainda não resolvível ou rede indisponível: tenta no próximo ciclo
+                    destinos_resolvidos.pop((host, porta), None)
+            time.sleep(self.intervalo)
+
+    def _recebe(self):
+        while self.ativo:
+            try:
+                dados, _ = self._sock.recvfrom(64)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if len(dados) != BATIMENTO.size:
+                continue
+            magia, id_par, seq = BATIMENTO.unpack(dados)
+            if magia != MAGIA_BATIMENTO or id_par == self.id_no:
+                continue
+            if self.detector.registra(id_par, seq) == "recuperado" and self.ao_recuperar is not None:
+                self.ao_recuperar(id_par)
+
+    def _avalia(self):
+        while self.ativo:
+            time.sleep(self.intervalo / 4)
+            for id_par in self.detector.avalia():
+                if self.ao_suspeitar is not None:
+                    self.ao_suspeitar(id_par)
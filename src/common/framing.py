@@ -0,0 +1,256 @@
+"""
+Protocolo binário com enquadramento (framing) para o fluxo sensor → cliente.
+
+Responsabilidades:
+- Definir o formato dos quadros: prefixo de tamanho + tipo + payload.
+- Definir o layout fixo das leituras (3 x float32, Lamport uint64, id do sensor, sequência).
+- Decodificar o fluxo TCP em quadros completos a partir de um buffer reutilizável,
+  tratando leituras parciais e quadros agrupados em um mesmo recv.
+- Negociar o modo binário com sensores legados (texto "temp,umid,press|lamport") e,
+  na versão 2 do HELLO, o canal cifrado (``common/canal_seguro.py``).
+
+Formato de um quadro (big-endian):
+    uint32 tamanho do payload | uint8 tipo | payload
+"""
+
+import collections
+import socket
+import struct
+
+CABECALHO = struct.Struct(">IB")
+LEITURA = struct.Struct(">fffQIQ")   # temperatura, umidade, pressão, lamport, id do sensor, sequência
+HELLO = struct.Struct(">4sB")        # magia, versão
+MARCADOR = struct.Struct(">QQ")      # id do snapshot global, Lamport do remetente
+
+TIPO_HELLO = 1
+TIPO_LEITURA = 2
+TIPO_TEXTO = 3
+TIPO_TOKEN = 4
+TIPO_TOKEN_ACK = 5
+TIPO_MARCADOR = 6
+TIPO_ESTADO_LOCAL = 7
+TIPO_CANAL_OLA = 8
+TIPO_CANAL_ACEITE = 9
+TIPO_CIFRADO = 10
+
+MAGIA = b"SISD"
+VERSAO_BINARIO = 1   # quadros em claro
+VERSAO_CIFRADA = 2   # handshake do canal seguro e quadros cifrados
+VERSAO = VERSAO_CIFRADA
+TAMANHO_MAX_QUADRO = 1024 * 1024
+
+Leitura = collections.namedtuple("Leitura", "temperatura umidade pressao lamport sensor_id sequencia")
+
+MODO_BINARIO = "binario"
+MODO_TEXTO = "texto"
+MODO_CIFRADO = "cifrado"
+
+
+class ErroProtocolo(Exception):
+    """
+    Quadro malformado ou fora do protocolo.
+    """
+
+
+def codifica_quadro(tipo, payload):
+    """
+    Monta um quadro com o prefixo de tamanho e o tipo.
+    """
+    return CABECALHO.pack(len(payload), tipo) + payload
+
+
+def codifica_leitura(temperatura, umidade, pressao, lamport, sensor_id, sequencia):
+    """
+    Codifica uma leitura como quadro TIPO_LEITURA de tamanho fixo.
+    """
+    return codifica_quadro(TIPO_LEITURA, LEITURA.pack(temperatura, umidade, pressao, lamport, sensor_id, sequencia))
+
+
+def decodifica_leitura(payload):
+    """
+    Decodifica o payload de um quadro TIPO_LEITURA.
+    """
+    if len(payload) != LEITURA.size:
+        raise ErroProtocolo(f"Leitura com tamanho inválido: {len(payload)}")
+    return Leitura(*LEITURA.unpack(payload))
+
+
+def codifica_marcador(snapshot_id, lamport):
+    """
+    Quadro de marcador do snapshot global (Chandy-Lamport).
+    """
+    return codifica_quadro(TIPO_MARCADOR, MARCADOR.pack(snapshot_id, lamport))
+
+
+def decodifica_marcador(payload):
+    """
+    Retorna ``(snapshot_id, lamport)`` de um quadro TIPO_MARCADOR.
+    """
+    if len(payload) != MARCADOR.size:
+        raise ErroProtocolo(f"Marcador com tamanho inválido: {len(payload)}")
+    return MARCADOR.unpack(payload)
+
+
+def codifica_hello(versao=VERSAO):
+    """
+    Quadro de negociação do modo binário.
+    """
+    return codifica_quadro(TIPO_HELLO, HELLO.pack(MAGIA, versao))
+
+
+def versao_hello(tipo, payload):
+    """
+    Retorna a versão anunciada por um HELLO, ou None se o quadro não for um HELLO válido.
+    """
+    if tipo != TIPO_HELLO or len(payload) != HELLO.size:
+        return None
+    magia, versao = HELLO.unpack(payload)
+    return versao if magia == MAGIA and versao >= 1 else None
+
+
+def hello_valido(tipo, payload):
+    """
+    Indica se o quadro é um HELLO compatível com esta versão do protocolo.
+    """
+    return versao_hello(tipo, payload) is not None
+
+
+def _modo_da_versao(versao):
+    return MODO_CIFRADO if versao >= VERSAO_CIFRADA else MODO_BINARIO
+
+
+class DecodificadorQuadros:
+    """
+    Decodificador de quadros em streaming.
+
+    Os bytes são recebidos com ``recv_into`` em um bloco pré-alocado e acumulados
+    em um único bytearray; quadros completos são extraídos e o buffer é compactado
+    uma vez por chamada, sem realocar a cada leitura.
+    """
+
+    def __init__(self, tamanho_bloco=65536):
+        self._bloco = bytearray(tamanho_bloco)
+        self._visao = memoryview(self._bloco)
+        self._buffer = bytearray()
+
+    def alimenta(self, dados):
+        """
+        Acrescenta bytes recebidos e retorna a lista de quadros ``(tipo, payload)`` completos.
+        """
+        self._buffer += dados
+        return self._extrai()
+
+    def recebe(self, sock):
+        """
+        Lê do socket e retorna os quadros completos. Retorna None se a conexão foi fechada.
+        """
+        n = sock.recv_into(self._bloco)
+        if n == 0:
+            return None
+        self._buffer += self._visao[:n]
+        return self._extrai()
+
+    def pendente(self):
+        """
+        Retorna os bytes ainda não consumidos (quadro parcial).
+        """
+        return bytes(self._buffer)
+
+    def _extrai(self):
+        quadros = []
+        inicio = 0
+        tamanho_buffer = len(self._buffer)
+        while tamanho_buffer - inicio >= CABECALHO.size:
+            tamanho, tipo = CABECALHO.unpack_from(self._buffer, inicio)
+            if tamanho > TAMANHO_MAX_QUADRO:
+                raise ErroProtocolo(f"Quadro de {tamanho} bytes excede o limite")
+            fim = inicio + CABECALHO.size + tamanho
+            if fim > tamanho_buffer:
+                break
+            quadros.append((tipo, bytes(self._buffer[inicio + CABECALHO.size:fim])))
+            inicio = fim
+        if inicio:
+            del self._buffer[:inicio]
+        return quadros
+
+
+def negocia_como_cliente(sock, timeout=3.0, versao=VERSAO_BINARIO):
+    """
+    Envia o HELLO (``versao`` 2 oferece o canal cifrado) e aguarda a confirmação do sensor.
+    Retorna ``(modo, decodificador, quadros)``, onde ``quadros`` são os quadros que
+    chegaram junto com a confirmação. Sensores legados não respondem e ficam em MODO_TEXTO.
+    """
+    decodificador = DecodificadorQuadros()
+    sock.sendall(codifica_hello(versao))
+    sock.settimeout(timeout)
+    try:
+        quadros = []
+        while not quadros:
+            quadros = decodificador.recebe(sock)
+            if quadros is None:
+                return MODO_TEXTO, None, []
+    except socket.timeout:
+        return MODO_TEXTO, None, []
+    finally:
+        sock.settimeout(None)
+    tipo, payload = quadros[0]
+    acordada = versao_hello(tipo, payload)
+    if acordada is None:
+        raise ErroProtocolo("Resposta de negociação inválida")
+    return _modo_da_versao(min(acordada, versao)), decodificador, quadros[1:]
+
+
+def negocia_como_sensor(conn, timeout=2.0, versao_max=VERSAO):
+    """
+    Aguarda o HELLO do cliente e responde com a maior versão comum (até ``versao_max``).
+    Retorna ``(modo, bytes_iniciais)``: MODO_CIFRADO se ambos falam a versão 2, MODO_BINARIO
+    para clientes da versão 1; se o cliente não enviar HELLO (cliente legado), o modo é
+    texto e os bytes já lidos são devolvidos.
+    """
+    esperado = CABECALHO.size + HELLO.size
+    dados = b""
+    conn.settimeout(timeout)
+    try:
+        while len(dados) < esperado:
+            parte = conn.recv(esperado - len(dados))
+            if not parte:
+                break
+            dados += parte
+    except socket.timeout:
+        pass
+    finally:
+        conn.settimeout(None)
+    if len(dados) == esperado:
+        tamanho, tipo = CABECALHO.unpack_from(dados)
+        versao = versao_hello(tipo, dados[CABECALHO.size:]) if tamanho == HELLO.size else None
+        if versao is not None:
+            acordada = min(versao, versao_max)
+            conn.sendall(codifica_hello(acordada))
+            return _modo_da_versao(acordada), b""
+    return MODO_TEXTO, dados
+
+
+async def negocia_como_cliente_async(reader, writer, decodificador, timeout=3.0, versao=VERSAO_BINARIO):
+    """
+    Versão asyncio de negocia_como_cliente (StreamReader/StreamWriter).
+    Retorna ``(modo, quadros)``; os quadros que chegarem junto com a confirmação são devolvidos.
+    """
+    # asyncio só é importado pelo cliente (os sensores não usam esta função)
+    import asyncio
+
+    writer.write(codifica_hello(versao))
+    await writer.drain()
+    quadros = []
+    try:
+        while not quadros:
+            dados = await asyncio.wait_for(reader.read(65536), timeout)
+            if not dados:
+                return MODO_TEXTO, []
+            quadros = decodificador.alimenta(dados)
+    except asyncio.TimeoutError:
+        return MODO_TEXTO, []
+    tipo, payload = quadros[0]
+    acordada = versao_hello(tipo, payload)
+    if acordada is None:
+        raise ErroProtocolo("Resposta de negociação inválida")
+    return _modo_da_versao(min(acordada, versao)), quadros[1:]
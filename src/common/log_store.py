@@ -0,0 +1,398 @@
+"""
+Log local append-only e segmentado do SISD.
+
+Responsabilidades:
+- Gravar entradas de log em segmentos append-only (JSON-lines ou binário com prefixo de tamanho).
+- Rotacionar segmentos por tamanho e/ou idade.
+- Aplicar a política de fsync configurada (sempre, em lote ou nenhum).
+- Ler os segmentos antigos em streaming, sem carregar o log inteiro em memória.
+- Migrar os logs legados (arquivo único com um array JSON) para o novo formato.
+"""
+
+import glob
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+FORMATO_JSONL = "jsonl"
+FORMATO_BINARIO = "bin"
+FORMATOS = (FORMATO_JSONL, FORMATO_BINARIO)
+
+FSYNC_SEMPRE = "sempre"
+FSYNC_LOTE = "lote"
+FSYNC_NENHUM = "nenhum"
+POLITICAS_FSYNC = (FSYNC_SEMPRE, FSYNC_LOTE, FSYNC_NENHUM)
+
+# Cabeçalho de cada registro binário: tamanho do payload e CRC32 (big-endian)
+CABECALHO_BINARIO = struct.Struct(">II")
+
+
+class LogStore:
+    """
+    Log append-only dividido em segmentos numerados.
+
+    Cada segmento é nomeado ``<nome>.<sequencia>.<formato>``; o segmento de maior
+    sequência é o ativo e recebe as novas entradas. Registros incompletos no final
+    de um segmento (queda no meio da escrita) são ignorados na leitura.
+    """
+
+    def __init__(self, diretorio, nome, formato=FORMATO_JSONL, tamanho_max_segmento=8 * 1024 * 1024,
+                 idade_max_segmento=None, politica_fsync=FSYNC_LOTE, intervalo_fsync=1.0):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de log inválido: {formato}")
+        if politica_fsync not in POLITICAS_FSYNC:
+            raise ValueError(f"Política de fsync inválida: {politica_fsync}")
+        self.diretorio = diretorio
+        self.nome = nome
+        self.formato = formato
+        self.tamanho_max_segmento = tamanho_max_segmento
+        self.idade_max_segmento = idade_max_segmento
+        self.politica_fsync = politica_fsync
+        self.intervalo_fsync = intervalo_fsync
+        self._lock = threading.Lock()
+        self._arquivo = None
+        self._sequencia = 0
+        self._tamanho = 0
+        self._criado_em = 0.0
+        self._ultimo_fsync = time.time()
+        self._pendente_fsync = False
+        if not os.path.exists(diretorio):
+            os.makedirs(diretorio, exist_ok=True)
+        self._abre_segmento_ativo()
+
+    # --- Segmentos ---
+    def segmentos(self):
+        """
+        Retorna os caminhos dos segmentos existentes, em ordem de sequência.
+        """
+        padrao = os.path.join(self.diretorio, f"{glob.escape(self.nome)}.*.{self.formato}")
+        encontrados = []
+        for caminho in glob.glob(padrao):
+            sequencia = self._sequencia_do_caminho(caminho)
+            if sequencia is not None:
+                encontrados.append((sequencia, caminho))
+        return [caminho for _, caminho in sorted(encontrados)]
+
+    def _sequencia_do_caminho(self, caminho):
+        meio = os.path.basename(caminho)[len(self.nome) + 1:-(len(self.formato) + 1)]
+        return int(meio) if meio.isdigit() else None
+
+    def caminho_segmento(self, sequencia):
+        """
+        Retorna o caminho do segmento com o número de sequência informado.
+        """
+        return os.path.join(self.diretorio, f"{self.nome}.{sequencia:08d}.{self.formato}")
+
+    def _abre_segmento_ativo(self):
+        existentes = self.segmentos()
+        if existentes:
+            self._sequencia = self._sequencia_do_caminho(existentes[-1])
+            caminho = existentes[-1]
+            self._criado_em = os.path.getmtime(caminho)
+            self._repara_cauda(caminho)
+        else:
+            self._sequencia = 1
+            caminho = self.caminho_segmento(self._sequencia)
+            self._criado_em = time.time()
+        self._arquivo = open(caminho, "ab")
+        self._tamanho = self._arquivo.tell()
+
+    def _repara_cauda(self, caminho):
+        """
+        Trunca um registro incompleto no final do segmento (queda no meio da escrita),
+        para que as próximas entradas não fiquem coladas a ele.
+        """
+        valido = 0
+        with open(caminho, "rb") as f:
+            cabecalho = CABECALHO_BINARIO.size if self.formato == FORMATO_BINARIO else 0
+            for offset, payload in self._registros(f):
+                valido = offset + cabecalho + len(payload)
+        if valido < os.path.getsize(caminho):
+            print(f"[Log] Registro incompleto descartado no final de {caminho}")
+            with open(caminho, "r+b") as f:
+                f.truncate(valido)
+
+    def _rotaciona(self):
+        self._sincroniza(forcar=True)
+        self._arquivo.close()
+        self._sequencia += 1
+        self._arquivo = open(self.caminho_segmento(self._sequencia), "ab")
+        self._tamanho = 0
+        self._criado_em = time.time()
+
+    def _precisa_rotacionar(self):
+        if self._tamanho == 0:
+            return False
+        if self.tamanho_max_segmento and self._tamanho >= self.tamanho_max_segmento:
+            return True
+        if self.idade_max_segmento and time.time() - self._criado_em >= self.idade_max_segmento:
+            return True
+        return False
+
+    # --- Escrita ---
+    def _codifica(self, entrada):
+        payload = json.dumps(entrada, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if self.formato == FORMATO_JSONL:
+            return payload + b"\n"
+        return CABECALHO_BINARIO.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def _sincroniza(self, forcar=False):
+        if self.politica_fsync == FSYNC_NENHUM and not forcar:
+            return
+        if not self._pendente_fsync:
+            return
+        self._arquivo.flush()
+        if self.politica_fsync != FSYNC_NENHUM:
+            os.fsync(self._arquivo.fileno())
+        self._ultimo_fsync = time.time()
+        self._pendente_fsync = False
+
+    def append(self, entrada):
+        """
+        Acrescenta uma entrada ao segmento ativo, rotacionando se necessário.
+        Retorna a posição ``(sequencia, offset)`` do registro gravado.
+        """
+        return self.append_lote([entrada])[0]
+
+    def append_lote(self, entradas):
+        """
+        Acrescenta várias entradas com uma única aplicação da política de fsync.
+        Retorna a lista de posições ``(sequencia, offset)`` dos registros.
+        """
+        codificados = [self._codifica(entrada) for entrada in entradas]
+        posicoes = []
+        with self._lock:
+            for dados in codificados:
+                if self._precisa_rotacionar():
+                    self._rotaciona()
+                posicoes.append((self._sequencia, self._tamanho))
+                self._arquivo.write(dados)
+                self._tamanho += len(dados)
+            self._pendente_fsync = True
+            if self.politica_fsync == FSYNC_SEMPRE:
+                self._sincroniza()
+            elif self.politica_fsync == FSYNC_LOTE:
+                if time.time() - self._ultimo_fsync >= self.intervalo_fsync:
+                    self._sincroniza()
+                else:
+                    self._arquivo.flush()
+            else:
+                self._arquivo.flush()
+        return posicoes
+
+    def sela_segmentos(self):
+        """
+        Fecha o segmento ativo (se tiver conteúdo) e retorna os segmentos selados,
+        que não recebem mais escritas e podem ser consumidos/removidos com segurança.
+        """
+        with self._lock:
+            if self._tamanho > 0:
+                self._rotaciona()
+            return [caminho for caminho in self.segmentos()
+                    if self._sequencia_do_caminho(caminho) < self._sequencia]
+
+    def vazio(self):
+        """
+        Indica se nenhum segmento possui entradas.
+        """
+        with self._lock:
+            return all(os.path.getsize(caminho) == 0 for caminho in self.segmentos())
+
+    def tamanho_bytes(self):
+        """
+        Retorna o tamanho total dos segmentos em disco (sem contar o buffer ainda não descarregado).
+        """
+        with self._lock:
+            return sum(os.path.getsize(caminho) for caminho in self.segmentos())
+
+    def sincroniza(self, duravel=False):
+        """
+        Força o flush/fsync das escritas pendentes; com ``duravel``, faz fsync mesmo
+        com a política "nenhum".
+        """
+        with self._lock:
+            self._sincroniza(forcar=True)
+            if duravel and self.politica_fsync == FSYNC_NENHUM and self._arquivo is not None:
+                os.fsync(self._arquivo.fileno())
+
+    def posicao(self):
+        """
+        Retorna a posição ``(sequencia, offset)`` onde a próxima entrada será gravada.
+        """
+        with self._lock:
+            return self._sequencia, self._tamanho
+
+    def conta_desde(self, posicao):
+        """
+        Conta as entradas gravadas a partir de ``posicao`` (de ``posicao()``).
+        """
+        sequencia, offset = posicao
+        total = 0
+        for caminho in self.segmentos():
+            atual = self._sequencia_do_caminho(caminho)
+            if atual >= sequencia:
+                total += sum(1 for _ in self.ler_segmento_com_posicao(caminho, offset if atual == sequencia else 0))
+        return total
+
+    def fecha(self):
+        """
+        Sincroniza e fecha o segmento ativo.
+        """
+        with self._lock:
+            if self._arquivo is not None:
+                self._sincroniza(forcar=True)
+                self._arquivo.close()
+                self._arquivo = None
+
+    # --- Leitura ---
+    def _registros(self, f):
+        """
+        Itera ``(offset, payload)`` dos registros completos de um segmento aberto.
+        """
+        offset = f.tell()
+        if self.formato == FORMATO_JSONL:
+            for linha in f:
+                if not linha.endswith(b"\n"):
+                    break  # Registro incompleto no final do segmento
+                yield offset, linha
+                offset += len(linha)
+        else:
+            while True:
+                cabecalho = f.read(CABECALHO_BINARIO.size)
+                if len(cabecalho) < CABECALHO_BINARIO.size:
+                    break
+                tamanho, crc = CABECALHO_BINARIO.unpack(cabecalho)
+                payload = f.read(tamanho)
+                if len(payload) < tamanho or zlib.crc32(payload) != crc:
+                    break
+                yield offset, payload
+                offset += CABECALHO_BINARIO.size + tamanho
+
+    def ler_segmento_com_posicao(self, caminho, offset=0):
+        """
+        Itera ``(offset, entrada)`` de um único segmento, a partir do offset informado.
+        """
+        with open(caminho, "rb") as f:
+            f.seek(offset)
+            for posicao, payload in self._registros(f):
+                if payload.strip():
+                    yield posicao, json.loads(payload)
+
+    def ler_segmento(self, caminho):
+        """
+        Itera as entradas de um único segmento.
+        """
+        for _, entrada in self.ler_segmento_com_posicao(caminho):
+            yield entrada
+
+    def ler_registro(self, sequencia, offset):
+        """
+        Lê diretamente o registro gravado na posição ``(sequencia, offset)``.
+        """
+        return next(self.ler_registros(sequencia, [offset]))
+
+    def ler_registros(self, sequencia, offsets):
+        """
+        Itera os registros de um segmento nos offsets informados (em ordem crescente),
+        abrindo o arquivo uma única vez; None para um offset sem registro completo.
+        """
+        with open(self.caminho_segmento(sequencia), "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                registro = None
+                for _, payload in self._registros(f):
+                    registro = json.loads(payload)
+                    break
+                yield registro
+
+    def sequencia_do_caminho(self, caminho):
+        """
+        Retorna o número de sequência de um caminho de segmento.
+        """
+        return self._sequencia_do_caminho(caminho)
+
+    def ler(self):
+        """
+        Itera todas as entradas do log, do segmento mais antigo ao mais novo.
+        """
+        with self._lock:
+            if self._arquivo is not None:
+                self._arquivo.flush()
+        for caminho in self.segmentos():
+            yield from self.ler_segmento(caminho)
+
+
+def abre_log_store(diretorio, nome):
+    """
+    Cria um LogStore usando a configuração das variáveis de ambiente SISD_LOG_*.
+    """
+    idade = os.environ.get("SISD_LOG_SEGMENTO_SEGUNDOS")
+    return LogStore(
+        diretorio,
+        nome,
+        formato=os.environ.get("SISD_LOG_FORMATO", FORMATO_JSONL),
+        tamanho_max_segmento=int(os.environ.get("SISD_LOG_SEGMENTO_BYTES", 8 * 1024 * 1024)),
+        idade_max_segmento=float(idade) if idade else None,
+        politica_fsync=os.environ.get("SISD_LOG_FSYNC", FSYNC_LOTE),
+        intervalo_fsync=float(os.environ.get("SISD_LOG_FSYNC_INTERVALO", 1.0)),
+    )
+
+
+def migrar_log_json(caminho_json, store):
+    """
+    Migra um log legado (array JSON em um único arquivo) para o LogStore.
+
+    As entradas são gravadas em um único lote e o arquivo original só é renomeado para
+    ``.migrado`` depois do fsync. Antes do lote, a posição do store é registrada em
+    ``<arquivo>.migrando``: se o processo cair no meio, a próxima execução conta as
+    entradas já gravadas a partir dessa posição e grava só o restante.
+    Retorna o número de entradas migradas.
+    """
+    marcador = caminho_json + ".migrando"
+    if not os.path.exists(caminho_json):
+        if os.path.exists(marcador):
+            # Queda entre o rename e a remoção do marcador
+            os.remove(marcador)
+        return 0
+    try:
+        with open(caminho_json, "r") as f:
+            entradas = json.load(f)
+    except ValueError as e:
+        print(f"[Log] Log legado inválido em {caminho_json}: {e}")
+        return 0
+    ja_migradas = 0
+    if os.path.exists(marcador):
+        with open(marcador) as f:
+            ja_migradas = min(store.conta_desde(tuple(json.load(f))), len(entradas))
+        print(f"[Log] Retomando migração de {caminho_json}: {ja_migradas} entradas já gravadas")
+    else:
+        store.sincroniza(duravel=True)
+        temporario = marcador + ".tmp"
+        with open(temporario, "w") as f:
+            json.dump(list(store.posicao()), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, marcador)
+    if entradas[ja_migradas:]:
+        store.append_lote(entradas[ja_migradas:])
+    store.sincroniza(duravel=True)
+    os.replace(caminho_json, caminho_json + ".migrado")
+    os.remove(marcador)
+    print(f"[Log] {len(entradas)} entradas migradas de {caminho_json}")
+    return len(entradas)
+
+
+if __name__ == "__main__":
+    # Uso: python log_store.py migrar <arquivo.json> <diretorio> <nome>
+    #      python log_store.py ler <diretorio> <nome>
+    if len(sys.argv) >= 5 and sys.argv[1] == "migrar":
+        migrar_log_json(sys.argv[2], abre_log_store(sys.argv[3], sys.argv[4]))
+    elif len(sys.argv) >= 4 and sys.argv[1] == "ler":
+        for item in abre_log_store(sys.argv[2], sys.argv[3]).ler():
+            print(json.dumps(item, ensure_ascii=False))
+    else:
+        print("Uso: log_store.py migrar <arquivo.json> <diretorio> <nome> | ler <diretorio> <nome>")
@@ -0,0 +1,278 @@
+"""
+Pipeline assíncrono de replicação para o serviço cloud.
+
+Responsabilidades:
+- Desacoplar o caminho de dados (envio/recebimento de leituras) da replicação HTTP.
+- Manter uma fila em memória limitada, com política de overflow configurável
+  (descartar o mais antigo, bloquear o produtor ou derramar no log local).
+- Agrupar entradas em lotes por tamanho e por tempo e enviá-las ao endpoint de lote.
+- Reutilizar conexões keep-alive via requests.Session com pool (``requests`` só é
+  importado pela thread de envio, fora da inicialização do nó).
+- Repetir envios com backoff exponencial e expor contadores de operação.
+"""
+
+import collections
+import os
+import random
+import threading
+import time
+
+from common.log_store import LogStore
+
+OVERFLOW_DESCARTA_ANTIGO = "descarta_antigo"
+OVERFLOW_BLOQUEIA = "bloqueia"
+OVERFLOW_DERRAMA = "derrama"
+POLITICAS_OVERFLOW = (OVERFLOW_DESCARTA_ANTIGO, OVERFLOW_BLOQUEIA, OVERFLOW_DERRAMA)
+
+
+class ReplicadorCloud:
+    """
+    Worker em segundo plano que replica entradas de log para o cloud em lotes.
+
+    ``enfileira`` nunca faz I/O de rede: apenas coloca a entrada na fila limitada.
+    A thread de envio é iniciada na primeira entrada enfileirada.
+    """
+
+    def __init__(self, url_base="http://cloud:6000", capacidade=10000, tamanho_lote=200,
+                 intervalo_lote=0.5, politica_overflow=OVERFLOW_DESCARTA_ANTIGO, diretorio_spill=None,
+                 nome="replica", max_tentativas=5, backoff_inicial=0.2, backoff_max=10.0, timeout=5):
+        if politica_overflow not in POLITICAS_OVERFLOW:
+            raise ValueError(f"Política de overflow inválida: {politica_overflow}")
+        if politica_overflow == OVERFLOW_DERRAMA and not diretorio_spill:
+            raise ValueError("A política 'derrama' exige um diretório de spill")
+        self.url_lote = url_base.rstrip("/") + "/replica/batch"
+        self.url_unitaria = url_base.rstrip("/") + "/replica"
+        self.capacidade = capacidade
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_lote = intervalo_lote
+        self.politica_overflow = politica_overflow
+        self.max_tentativas = max_tentativas
+        self.backoff_inicial = backoff_inicial
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self._fila = collections.deque()
+        self._cond = threading.Condition()
+        self._worker = None
+        self._parar = False
+        self._suporta_lote = True
+        self._spill = LogStore(diretorio_spill, f"{nome}_spill") if diretorio_spill else None
+        self._spill_pendente = bool(self._spill and not self._spill.vazio())
+        self._proxima_drenagem = 0.0
+        self._contadores = {
+            "enfileiradas": 0,
+            "enviadas": 0,
+            "descartadas": 0,
+            "derramadas": 0,
+            "em_voo": 0,
+            "falhas_envio": 0,
+        }
+        self._sessao = None
+
+    @property
+    def sessao(self):
+        """
+        requests.Session com pool keep-alive, criada no primeiro envio.
+        """
+        if self._sessao is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            sessao.mount("http://", adaptador)
+            sessao.mount("https://", adaptador)
+            self._sessao = sessao
+        return self._sessao
+
+    # --- Produtor ---
+    def enfileira(self, entrada):
+        """
+        Coloca uma entrada na fila de replicação aplicando a política de overflow.
+        """
+        with self._cond:
+            self._garante_worker()
+            if len(self._fila) >= self.capacidade:
+                if self.politica_overflow == OVERFLOW_BLOQUEIA:
+                    while len(self._fila) >= self.capacidade and not self._parar:
+                        self._cond.wait()
+                elif self.politica_overflow == OVERFLOW_DESCARTA_ANTIGO:
+                    self._fila.popleft()
+                    self._contadores["descartadas"] += 1
+                else:
+                    self._spill.append(entrada)
+                    self._spill_pendente = True
+                    self._contadores["derramadas"] += 1
+                    return
+            self._fila.append(entrada)
+            self._contadores["enfileiradas"] += 1
+            if len(self._fila) >= self.tamanho_lote:
+                self._cond.notify_all()
+
+    def estatisticas(self):
+        """
+        Retorna uma cópia dos contadores e o tamanho atual da fila.
+        """
+        with self._cond:
+            stats = dict(self._contadores)
+            stats["na_fila"] = len(self._fila)
+        return stats
+
+    def para(self, timeout=5.0):
+        """
+        Solicita o término do worker após esvaziar a fila (até o timeout).
+        """
+        with self._cond:
+            self._parar = True
+            self._cond.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        if self._spill is not None:
+            self._spill.fecha()
+
+    # --- Worker ---
+    def _garante_worker(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._loop, name="replicador-cloud")
+            self._worker.daemon = True
+            self._worker.start()
+
+    def _proximo_lote(self):
+        with self._cond:
+            limite = time.time() + self.intervalo_lote
+            while len(self._fila) < self.tamanho_lote and not self._parar:
+                restante = limite - time.time()
+                if restante <= 0:
+                    break
+                self._cond.wait(restante)
+            lote = []
+            while self._fila and len(lote) < self.tamanho_lote:
+                lote.append(self._fila.popleft())
+            self._contadores["em_voo"] = len(lote)
+            self._cond.notify_all()  # Libera produtores bloqueados
+            return lote
+
+    def _loop(self):
+        while True:
+            lote = self._proximo_lote()
+            if lote:
+                self._envia_com_retry(lote)
+            elif self._spill_pendente and time.time() >= self._proxima_drenagem:
+                self._drena_spill()
+            elif self._parar:
+                return
+
+    def _envia_com_retry(self, lote, derrama=True):
+        espera = self.backoff_inicial
+        for tentativa in range(1, self.max_tentativas + 1):
+            try:
+                self._envia(lote)
+                with self._cond:
+                    self._contadores["enviadas"] += len(lote)
+                    self._contadores["em_voo"] = 0
+                return True
+            except Exception as e:
+                with self._cond:
+                    self._contadores["falhas_envio"] += 1
+                print(f"[Cloud] Falha ao replicar lote de {len(lote)} entradas "
+                      f"(tentativa {tentativa}/{self.max_tentativas}): {e}")
+                if tentativa < self.max_tentativas and not self._parar:
+                    time.sleep(espera * random.uniform(0.5, 1.0))
+                    espera = min(espera * 2, self.backoff_max)
+        if derrama:
+            self._desiste(lote)
+        else:
+            with self._cond:
+                self._contadores["em_voo"] = 0
+        return False
+
+    def _envia(self, lote):
+        if self._suporta_lote:
+            resposta = self.sessao.post(self.url_lote, json=lote, timeout=self.timeout)
+            if resposta.status_code not in (404, 405):
+                resposta.raise_for_status()
+                return
+            # Cloud antigo sem o endpoint de lote: passa a enviar entrada a entrada
+            print("[Cloud] Endpoint de lote indisponível, usando /replica unitário")
+            self._suporta_lote = False
+        for entrada in lote:
+            self.sessao.post(self.url_unitaria, json=entrada, timeout=self.timeout).raise_for_status()
+
+    def _desiste(self, lote):
+        with self._cond:
+            self._contadores["em_voo"] = 0
+            if self._spill is not None:
+                for entrada in lote:
+                    self._spill.append(entrada)
+                self._spill_pendente = True
+                self._contadores["derramadas"] += len(lote)
+            else:
+                self._contadores["descartadas"] += len(lote)
+
+    def _drena_spill(self):
+        """
+        Reenvia as entradas derramadas no log local quando a fila esvazia.
+        Apenas segmentos selados são lidos; novos derramamentos vão para o segmento ativo.
+        No primeiro lote que falha a drenagem para: o segmento e os seguintes ficam em
+        disco, na ordem, e a próxima tentativa só ocorre após ``backoff_max``.
+        """
+        with self._cond:
+            self._spill_pendente = False
+        for caminho in self._spill.sela_segmentos():
+            if not self._drena_segmento(caminho):
+                with self._cond:
+                    self._spill_pendente = True
+                    self._proxima_drenagem = time.time() + self.backoff_max
+                return
+            # Sem o marcador, uma queda aqui só reenvia o segmento (entrega ao menos uma vez)
+            marcador = caminho + ".enviado"
+            if os.path.exists(marcador):
+                os.remove(marcador)
+            os.remove(caminho)
+
+    def _drena_segmento(self, caminho):
+        """
+        Reenvia um segmento selado em lotes, a partir do offset gravado em
+        ``<segmento>.enviado`` (primeiro registro ainda não confirmado pelo cloud).
+        Retorna False no primeiro lote que falhar.
+        """
+        marcador = caminho + ".enviado"
+        inicio = 0
+        if os.path.exists(marcador):
+            with open(marcador) as f:
+                inicio = int(f.read().strip() or 0)
+        lote = []
+        for offset, entrada in self._spill.ler_segmento_com_posicao(caminho, inicio):
+            if len(lote) >= self.tamanho_lote:
+                if not self._reenvia(lote):
+                    return False
+                self._grava_offset(marcador, offset)
+                lote = []
+            lote.append(entrada)
+        return not lote or self._reenvia(lote)
+
+    @staticmethod
+    def _grava_offset(marcador, offset):
+        temporario = marcador + ".tmp"
+        with open(temporario, "w") as f:
+            f.write(str(offset))
+        os.replace(temporario, marcador)
+
+    def _reenvia(self, lote):
+        with self._cond:
+            self._contadores["em_voo"] = len(lote)
+        # Falhas não voltam ao spill: o lote continua no segmento selado
+        return self._envia_com_retry(lote, derrama=False)
+
+def cria_replicador(diretorio_spill, nome):
+    """
+    Cria um ReplicadorCloud usando a configuração das variáveis de ambiente SISD_REPLICACAO_*.
+    """
+    return ReplicadorCloud(
+        url_base=os.environ.get("SISD_CLOUD_URL", "http://cloud:6000"),
+        capacidade=int(os.environ.get("SISD_REPLICACAO_CAPACIDADE", 10000)),
+        tamanho_lote=int(os.environ.get("SISD_REPLICACAO_LOTE", 200)),
+        intervalo_lote=float(os.environ.get("SISD_REPLICACAO_INTERVALO", 0.5)),
+        politica_overflow=os.environ.get("SISD_REPLICACAO_OVERFLOW", OVERFLOW_DERRAMA),
+        diretorio_spill=diretorio_spill,
+        nome=nome,
+    )
@@ -0,0 +1,122 @@
+"""
+Simulação de leituras climáticas em blocos com NumPy.
+
+Responsabilidades:
+- Gerar as leituras de um sensor em blocos vetorizados a partir de um modelo simples e
+  plausível: ciclo diário (temperatura com pico às 15h, umidade em oposição de fase, maré
+  semidiurna na pressão) somado a ruído AR(1) por grandeza, com características do local
+  sorteadas por sensor.
+- Ser reprodutível: a mesma semente, o mesmo sensor e o mesmo instante inicial geram a
+  mesma sequência, independentemente do tamanho dos blocos pedidos.
+- Codificar um bloco de leituras como quadros TIPO_LEITURA (``common/framing.py``) de uma
+  vez, sem ``struct.pack`` por leitura.
+
+NumPy só é necessário para este módulo; o sensor o importa apenas no modo ``modelo``.
+"""
+
+import math
+import time
+
+import numpy as np
+
+from common.framing import CABECALHO, LEITURA, TIPO_LEITURA
+
+# Mesmo layout de CABECALHO + LEITURA (big-endian, sem alinhamento)
+QUADRO_LEITURA = np.dtype([
+    ("tamanho", ">u4"), ("tipo", "u1"),
+    ("temperatura", ">f4"), ("umidade", ">f4"), ("pressao", ">f4"),
+    ("lamport", ">u8"), ("sensor_id", ">u4"), ("sequencia", ">u8"),
+])
+assert QUADRO_LEITURA.itemsize == CABECALHO.size + LEITURA.size
+
+DIA = 86400.0
+# Coeficientes AR(1) e desvios do ruído por passo: temperatura, umidade, pressão
+PHI = np.array([0.98, 0.97, 0.999])
+SIGMA = np.array([0.15, 0.8, 0.05])
+# Comprimento dos trechos do AR(1) vetorizado: PHI ** 256 ainda é representável
+TRECHO_AR = 256
+TAMANHO_BUFFER = 256   # leituras geradas de uma vez por ``proxima``
+
+
+def ar1(ruido, phi, inicial):
+    """
+    Aplica ``x[t] = phi * x[t-1] + ruido[t]`` por coluna, a partir de ``inicial``.
+
+    Dentro de um trecho, ``x[t] = phi**t * (inicial + soma(ruido[j] / phi**j))``, o que
+    troca o laço por potências e soma acumulada.
+    """
+    saida = np.empty_like(ruido)
+    anterior = inicial
+    for inicio in range(0, len(ruido), TRECHO_AR):
+        trecho = ruido[inicio:inicio + TRECHO_AR]
+        potencias = phi ** np.arange(1, len(trecho) + 1)[:, None]
+        saida[inicio:inicio + len(trecho)] = potencias * (anterior + np.cumsum(trecho / potencias, axis=0))
+        anterior = saida[inicio + len(trecho) - 1]
+    return saida
+
+
+class GeradorLeituras:
+    """
+    Leituras de um sensor: ``bloco(n)`` gera as próximas ``n`` (instantes simulados e as
+    três grandezas) e ``proxima()`` entrega uma de cada vez a partir de um buffer.
+
+    Cada leitura avança ``passo`` segundos no relógio simulado, a partir de ``inicio``
+    (padrão: agora); um passo maior acelera o ciclo diário.
+    """
+
+    def __init__(self, numero_sensor, semente=0, inicio=None, passo=1.0):
+        self._rng = np.random.default_rng([semente, numero_sensor])
+        # Características do local do sensor
+        self.temperatura_media = 22.0 + self._rng.uniform(-4.0, 4.0)
+        self.amplitude_diaria = self._rng.uniform(4.0, 8.0)
+        self.umidade_media = 60.0 + self._rng.uniform(-10.0, 10.0)
+        self.pressao_media = 1013.0 + self._rng.uniform(-5.0, 5.0)
+        self.instante = time.time() if inicio is None else float(inicio)
+        self.passo = passo
+        self._ruido = np.zeros(3)
+        self._buffer = []
+
+    def bloco(self, n):
+        """
+        Retorna ``(instantes, temperatura, umidade, pressao)``, arrays de ``n`` leituras
+        arredondadas a uma casa decimal.
+        """
+        instantes = self.instante + self.passo * np.arange(n)
+        self.instante += self.passo * n
+        ruido = ar1(self._rng.standard_normal((n, 3)) * SIGMA, PHI, self._ruido)
+        self._ruido = ruido[-1]
+        fase = 2 * math.pi * (instantes % DIA) / DIA
+        # Pico da temperatura às 15h (seno máximo em fase - 9h = 6h)
+        ciclo = np.sin(fase - 2 * math.pi * 9 / 24)
+        temperatura = self.temperatura_media + self.amplitude_diaria * ciclo + ruido[:, 0]
+        umidade = np.clip(self.umidade_media - 2.5 * self.amplitude_diaria * ciclo + ruido[:, 1], 5.0, 100.0)
+        pressao = self.pressao_media + 0.6 * np.sin(2 * fase) + ruido[:, 2]
+        return instantes, np.round(temperatura, 1), np.round(umidade, 1), np.round(pressao, 1)
+
+    def proxima(self):
+        """
+        Retorna a próxima leitura ``(temperatura, umidade, pressao)`` como floats.
+        """
+        if not self._buffer:
+            _, temperatura, umidade, pressao = self.bloco(TAMANHO_BUFFER)
+            self._buffer = list(zip(temperatura.tolist(), umidade.tolist(), pressao.tolist()))
+            self._buffer.reverse()
+        return self._buffer.pop()
+
+
+def codifica_bloco(temperatura, umidade, pressao, lamport_inicial, sensor_id, sequencia_inicial):
+    """
+    Codifica um bloco de leituras como quadros TIPO_LEITURA consecutivos, com Lamport e
+    sequência crescendo de um em um a partir dos valores iniciais.
+    """
+    n = len(temperatura)
+    quadros = np.empty(n, dtype=QUADRO_LEITURA)
+    quadros["tamanho"] = LEITURA.size
+    quadros["tipo"] = TIPO_LEITURA
+    quadros["temperatura"] = temperatura
+    quadros["umidade"] = umidade
+    quadros["pressao"] = pressao
+    quadros["lamport"] = np.arange(lamport_inicial, lamport_inicial + n, dtype=np.uint64)
+    quadros["sensor_id"] = sensor_id
+    quadros["sequencia"] = np.arange(sequencia_inicial, sequencia_inicial + n, dtype=np.uint64)
+    return quadros.tobytes()
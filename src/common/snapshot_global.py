@@ -0,0 +1,370 @@
+"""
+Snapshot global consistente (Chandy-Lamport) do SISD.
+
+Responsabilidades:
+- No cliente (iniciador): registrar o estado local, gravar as mensagens que chegam por
+  cada canal de dados sensor -> cliente até o marcador daquele canal, enviar os
+  marcadores em paralelo por enlaces de controle persistentes, coletar o estado local
+  de cada sensor e gravar o snapshot global de forma atômica com um manifesto.
+- No sensor (participante): ao receber o marcador, registrar o estado local e enviar o
+  marcador por todas as conexões de dados antes de qualquer nova leitura, devolvendo o
+  estado local ao iniciador pelo enlace de controle.
+- Manter compatibilidade com o marcador texto legado ("MARKER|clock" em uma conexão avulsa).
+
+Os canais cliente -> sensor (enlaces de controle) só transportam marcadores, portanto
+têm estado vazio. Os enlaces do anel de token entre sensores não são registrados.
+
+Formato do estado local (quadro TIPO_ESTADO_LOCAL): JSON ``{"snapshot_id": ..., "estado": {...}}``.
+"""
+
+import json
+import socket
+import threading
+import time
+
+from common.framing import (TIPO_ESTADO_LOCAL, TIPO_MARCADOR, DecodificadorQuadros,
+                            codifica_marcador, codifica_quadro, decodifica_marcador)
+
+MARCADOR_LEGADO = b"MARKER"
+
+
+def _chave(host, porta):
+    return f"{host}:{porta}"
+
+
+# --- Participante (sensor) ---
+class ParticipanteSnapshot:
+    """
+    Lado do sensor: conexões de dados registradas e tratamento dos marcadores.
+
+    ``trava`` deve envolver, nas threads de envio, a atualização do estado e o envio de
+    cada leitura, para que o marcador nunca fique entre as duas.
+    ``captura_estado(snapshot_id, lamport_marcador)`` registra e retorna o estado local.
+    """
+
+    def __init__(self, captura_estado, ao_receber_marcador=None):
+        self.captura_estado = captura_estado
+        self.ao_receber_marcador = ao_receber_marcador
+        self.trava = threading.RLock()
+        self._conexoes = set()       # conexões de dados no modo binário
+        self._ultimo_id = None
+        self._ultimo_estado = None
+
+    def registra_conexao(self, conn):
+        with self.trava:
+            self._conexoes.add(conn)
+
+    def remove_conexao(self, conn):
+        with self.trava:
+            self._conexoes.discard(conn)
+
+    def recebe_marcador(self, snapshot_id, lamport):
+        """
+        Registra o estado local e propaga o marcador pelas conexões de dados.
+        Um marcador repetido (mesmo id) devolve o estado sem registrar de novo.
+        """
+        with self.trava:
+            if snapshot_id is not None and snapshot_id == self._ultimo_id:
+                return self._ultimo_estado
+            estado = self.captura_estado(snapshot_id, lamport)
+            if snapshot_id is not None:
+                self._ultimo_id, self._ultimo_estado = snapshot_id, estado
+                quadro = codifica_marcador(snapshot_id, estado.get("lamport_clock", 0))
+                for conn in list(self._conexoes):
+                    try:
+                        conn.sendall(quadro)
+                    except OSError:
+                        self._conexoes.discard(conn)
+        return estado
+
+    def escuta(self, porta):
+        """
+        Inicia o listener dos enlaces de controle (marcadores) em uma thread.
+        """
+        servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        servidor.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        servidor.bind(("0.0.0.0", porta))
+        servidor.listen(16)
+
+        def aceita():
+            while True:
+                conn, _ = servidor.accept()
+                threading.Thread(target=self.atende_controle, args=(conn,), daemon=True).start()
+
+        threading.Thread(target=aceita, daemon=True).start()
+        return servidor
+
+    def atende_controle(self, conn):
+        """
+        Atende um enlace de controle: marcadores enquadrados (persistentes) ou um
+        marcador texto legado em conexão avulsa.
+        """
+        try:
+            dados = conn.recv(64)
+            if not dados:
+                return
+            if dados.startswith(MARCADOR_LEGADO):
+                self._marcador_legado(dados.decode().strip())
+                return
+            decodificador = DecodificadorQuadros()
+            quadros = decodificador.alimenta(dados)
+            while quadros is not None:
+                for tipo, payload in quadros:
+                    if tipo != TIPO_MARCADOR:
+                        continue
+                    snapshot_id, lamport = decodifica_marcador(payload)
+                    if self.ao_receber_marcador:
+                        self.ao_receber_marcador(f"MARKER|{lamport}|{snapshot_id}")
+                    estado = self.recebe_marcador(snapshot_id, lamport)
+                    resposta = json.dumps({"snapshot_id": snapshot_id, "estado": estado}).encode("utf-8")
+                    conn.sendall(codifica_quadro(TIPO_ESTADO_LOCAL, resposta))
+                quadros = decodificador.recebe(conn)
+        except (OSError, ValueError) as e:
+            print(f"[Snapshot] Enlace de controle encerrado: {e}")
+        finally:
+            conn.close()
+
+    def _marcador_legado(self, mensagem):
+        if self.ao_receber_marcador:
+            self.ao_receber_marcador(mensagem)
+        partes = mensagem.split("|")
+        try:
+            lamport = int(partes[1]) if len(partes) == 2 else None
+        except ValueError:
+            lamport = None
+        self.recebe_marcador(None, lamport)
+
+
+# --- Iniciador (cliente) ---
+class EnlaceControle:
+    """
+    Conexão persistente do cliente com a porta de marcadores de um sensor.
+    As respostas (estado local) são lidas por uma thread e entregues a ``ao_receber_estado``.
+    """
+
+    def __init__(self, host, porta, ao_receber_estado, timeout_conexao=2.0):
+        self.host = host
+        self.porta = porta
+        self.ao_receber_estado = ao_receber_estado
+        self.timeout_conexao = timeout_conexao
+        self._lock = threading.Lock()
+        self._sock = None
+
+    def envia(self, dados):
+        """
+        Envia ``dados``, reconectando uma vez se o enlace caiu.
+        """
+        with self._lock:
+            for tentativa in range(2):
+                if self._sock is None:
+                    self._conecta()
+                try:
+                    self._sock.sendall(dados)
+                    return
+                except OSError:
+                    self._fecha()
+                    if tentativa:
+                        raise
+
+    def _conecta(self):
+        sock = socket.create_connection((self.host, self.porta), timeout=self.timeout_conexao)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        threading.Thread(target=self._le_respostas, args=(sock,), daemon=True).start()
+
+    def _le_respostas(self, sock):
+        decodificador = DecodificadorQuadros()
+        try:
+            while True:
+                quadros = decodificador.recebe(sock)
+                if quadros is None:
+                    break
+                for tipo, payload in quadros:
+                    if tipo == TIPO_ESTADO_LOCAL:
+                        resposta = json.loads(payload)
+                        self.ao_receber_estado(resposta["snapshot_id"], resposta["estado"])
+        except (OSError, ValueError):
+            pass
+        with self._lock:
+            if self._sock is sock:
+                self._fecha()
+
+    def _fecha(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def fecha(self):
+        with self._lock:
+            self._fecha()
+
+
+class _SnapshotEmAndamento:
+    def __init__(self, snapshot_id, estado_local, canais, participantes):
+        self.snapshot_id = snapshot_id
+        self.iniciado_em = time.time()
+        self.inicio = time.monotonic()
+        self.estado_local = estado_local
+        # canal -> {"mensagens": [...], "fechado": bool, "motivo": str|None}
+        self.canais = canais
+        self.participantes = participantes
+        self.estados = {}
+        self.pausa_ms = 0.0
+        self.terminou = threading.Event()
+
+    def completo(self):
+        return (len(self.estados) == len(self.participantes)
+                and all(canal["fechado"] for canal in self.canais.values()))
+
+
+class CoordenadorSnapshot:
+    """
+    Iniciador do snapshot global (cliente).
+
+    - ``captura_estado()`` retorna o estado local do cliente; é chamada com ``trava`` presa.
+    - ``sensores()`` retorna a lista ``[{"host": ..., "porta": ...}]`` atual.
+    - ``canais_binarios()`` retorna os pares ``(host, porta)`` das conexões de dados no modo
+      binário (as demais não transportam marcadores e ficam como indisponíveis).
+    - ``store`` é um SnapshotStore onde os snapshots globais são gravados.
+
+    A thread que processa as mensagens recebidas deve chamar ``grava_mensagem`` e
+    ``recebe_marcador`` com ``trava`` presa, junto com a atualização do estado local.
+    """
+
+    def __init__(self, captura_estado, sensores, canais_binarios, store, timeout=10.0,
+                 deslocamento_porta=1000, max_paralelo=32):
+        self.captura_estado = captura_estado
+        self.sensores = sensores
+        self.canais_binarios = canais_binarios
+        self.store = store
+        self.timeout = timeout
+        self.deslocamento_porta = deslocamento_porta
+        self.trava = threading.RLock()
+        self._enlaces = {}
+        # concurrent.futures só é importado pelo iniciador (cliente), não pelos sensores
+        from concurrent import futures
+        self._pool = futures.ThreadPoolExecutor(max_workers=max_paralelo)
+        self._ativos = {}
+        _, ultimo = store.ultimo()
+        self._proximo_id = (ultimo or {}).get("snapshot_id", 0) + 1
+
+    def _enlace(self, host, porta):
+        chave = _chave(host, porta)
+        enlace = self._enlaces.get(chave)
+        if enlace is None:
+            enlace = self._enlaces[chave] = EnlaceControle(
+                host, porta + self.deslocamento_porta,
+                lambda snapshot_id, estado, chave=chave: self._recebe_estado(chave, snapshot_id, estado))
+        return enlace
+
+    # --- Chamadas pela thread de processamento (com trava) ---
+    def grava_mensagem(self, canal, mensagem):
+        """
+        Grava a mensagem no estado de ``canal`` para cada snapshot que ainda espera o marcador dele.
+        """
+        for ativo in self._ativos.values():
+            estado_canal = ativo.canais.get(canal)
+            if estado_canal is not None and not estado_canal["fechado"]:
+                estado_canal["mensagens"].append(mensagem)
+
+    def recebe_marcador(self, canal, snapshot_id):
+        """
+        Fecha o estado de ``canal`` no snapshot ``snapshot_id``.
+        """
+        ativo = self._ativos.get(snapshot_id)
+        if ativo is None or canal not in ativo.canais:
+            return
+        ativo.canais[canal]["fechado"] = True
+        if ativo.completo():
+            ativo.terminou.set()
+
+    def _recebe_estado(self, canal, snapshot_id, estado):
+        with self.trava:
+            ativo = self._ativos.get(snapshot_id)
+            if ativo is None:
+                return
+            ativo.estados[canal] = estado
+            if ativo.completo():
+                ativo.terminou.set()
+
+    # --- Iniciação ---
+    def inicia(self):
+        """
+        Executa um snapshot global completo e retorna o documento gravado.
+        """
+        sensores = list(self.sensores())
+        inicio_captura = time.perf_counter()
+        with self.trava:
+            snapshot_id = self._proximo_id
+            self._proximo_id += 1
+            estado_local = self.captura_estado()
+            binarios = self.canais_binarios()
+            canais = {}
+            for sensor in sensores:
+                chave = _chave(sensor["host"], sensor["porta"])
+                gravavel = (sensor["host"], sensor["porta"]) in binarios
+                canais[chave] = {"mensagens": [], "fechado": not gravavel,
+                                 "motivo": None if gravavel else "canal sem suporte a marcador"}
+            participantes = [_chave(s["host"], s["porta"]) for s in sensores]
+            ativo = _SnapshotEmAndamento(snapshot_id, estado_local, canais, participantes)
+            self._ativos[snapshot_id] = ativo
+        ativo.pausa_ms = (time.perf_counter() - inicio_captura) * 1000
+
+        # Marcadores em paralelo pelos enlaces persistentes (o estado local já foi registrado)
+        from concurrent import futures
+        quadro = codifica_marcador(snapshot_id, estado_local.get("lamport_clock", 0))
+        envios = {}
+        for sensor in sensores:
+            enlace = self._enlace(sensor["host"], sensor["porta"])
+            envios[self._pool.submit(enlace.envia, quadro)] = _chave(sensor["host"], sensor["porta"])
+        falhas = {}
+        for future in futures.as_completed(envios):
+            try:
+                future.result()
+            except OSError as e:
+                falhas[envios[future]] = str(e)
+        with self.trava:
+            for chave, erro in falhas.items():
+                # Sem marcador enviado, o sensor não participa: o canal não tem como ser fechado
+                canal = ativo.canais[chave]
+                if not canal["fechado"]:
+                    canal["fechado"], canal["motivo"] = True, f"marcador não entregue: {erro}"
+                ativo.participantes.remove(chave)
+            if ativo.completo():
+                ativo.terminou.set()
+
+        ativo.terminou.wait(self.timeout)
+        with self.trava:
+            self._ativos.pop(snapshot_id, None)
+            documento = self._monta_documento(ativo, falhas)
+        # Serialização e escrita ficam com a thread de gravação do store
+        self.store.agenda(documento, documento["iniciado_em"], ativo.pausa_ms)
+        return documento
+
+    def _monta_documento(self, ativo, falhas):
+        canais = {}
+        for chave, canal in ativo.canais.items():
+            motivo = canal["motivo"]
+            if not canal["fechado"]:
+                motivo = "marcador não recebido no prazo"
+            canais[chave] = {"mensagens": list(canal["mensagens"]), "completo": motivo is None, "motivo": motivo}
+        sensores = {chave: ativo.estados.get(chave) for chave in list(ativo.participantes) + list(falhas)}
+        return {
+            "snapshot_id": ativo.snapshot_id,
+            "iniciado_em": ativo.iniciado_em,
+            "duracao_ms": round((time.monotonic() - ativo.inicio) * 1000, 2),
+            "pausa_captura_ms": round(ativo.pausa_ms, 3),
+            "completo": ativo.completo() and not falhas and all(c["completo"] for c in canais.values()),
+            "cliente": ativo.estado_local,
+            "sensores": sensores,
+            "canais": canais,
+        }
+
+    def fecha(self):
+        for enlace in self._enlaces.values():
+            enlace.fecha()
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,286 @@
+"""
+Armazenamento local de snapshots (checkpoints) do SISD.
+
+Responsabilidades:
+- Gravar cada snapshot de forma atômica (arquivo temporário + fsync + rename).
+- Manter, por nó, um manifesto com o ponteiro para o último snapshot e a lista dos
+  snapshots retidos, de modo que a restauração leia só o manifesto e um arquivo,
+  sem listar o diretório nem consultar o mtime de cada arquivo.
+- Separar os snapshots de cada nó em um subdiretório próprio (os sensores compartilham
+  o mesmo volume no docker-compose).
+- Aplicar a política de retenção: os últimos N snapshots e um por hora nas últimas H horas.
+- Migrar uma única vez os snapshots legados (``snapshot_<no>_<epoch>.json`` soltos no
+  diretório base).
+- Separar a captura do estado da gravação: o estado é copiado sob uma trava breve e a
+  serialização (binária compacta, ``common/codec_estado.py``) e a escrita acontecem em
+  uma thread de fundo, com o tempo de pausa e o de serialização medidos separadamente.
+"""
+
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+from common import codec_estado
+
+MANIFESTO = "MANIFEST.json"
+
+FORMATO_JSON = "json"
+FORMATO_BINARIO = "snap"
+FORMATOS = (FORMATO_JSON, FORMATO_BINARIO)
+
+
+def grava_atomico(caminho, dados):
+    """
+    Grava ``dados`` (bytes) em ``caminho`` via arquivo temporário, fsync e rename.
+    """
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "wb") as f:
+        f.write(dados)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+def serializa(estado, formato):
+    """
+    Serializa o estado no formato do snapshot (binário compacto ou JSON).
+    """
+    if formato == FORMATO_BINARIO:
+        return codec_estado.codifica(estado)
+    return json.dumps(estado, separators=(",", ":")).encode("utf-8")
+
+
+def desserializa(dados, caminho):
+    """
+    Lê um snapshot pelo formato indicado na extensão do arquivo.
+    """
+    if caminho.endswith(f".{FORMATO_BINARIO}"):
+        return codec_estado.decodifica(dados)
+    return json.loads(dados)
+
+
+class SnapshotStore:
+    """
+    Snapshots de um nó em ``<diretorio>/<no_id>/`` com manifesto e retenção.
+
+    ``salva`` serializa e grava na própria thread; ``captura`` + ``agenda`` copiam o estado
+    sob a trava do chamador e deixam serialização e escrita para a thread de gravação.
+    """
+
+    def __init__(self, diretorio, no_id, manter_ultimos=10, manter_horas=24, formato=FORMATO_BINARIO):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de snapshot inválido: {formato}")
+        self.diretorio_base = diretorio
+        self.no_id = no_id
+        self.diretorio = os.path.join(diretorio, no_id)
+        self.manter_ultimos = manter_ultimos
+        self.manter_horas = manter_horas
+        self.formato = formato
+        self._lock = threading.Lock()  # Manifesto
+        self._lock_metricas = threading.Lock()  # Métricas e thread de gravação (tomada por agenda)
+        self._fila = queue.Queue()
+        self._gravador = None
+        self._metricas = {"capturas": 0, "gravados": 0, "falhas": 0, "pausa_ms": 0.0, "pausa_max_ms": 0.0,
+                          "serializacao_ms": 0.0, "serializacao_max_ms": 0.0, "gravacao_ms": 0.0, "bytes": 0}
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._manifesto = self._le_manifesto()
+        migrar = self._manifesto is None
+        if migrar:
+            self._manifesto = {"no": no_id, "sequencia": 0, "ultimo": None, "snapshots": []}
+        # Última sequência reservada por _grava (pode estar à frente do manifesto durante uma escrita)
+        self._reservada = self._manifesto["sequencia"]
+        if migrar:
+            self._migra_legado()
+
+    # --- Manifesto ---
+    def _caminho_manifesto(self):
+        return os.path.join(self.diretorio, MANIFESTO)
+
+    def _le_manifesto(self):
+        try:
+            with open(self._caminho_manifesto(), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            print(f"[Snapshot] Manifesto inválido em {self.diretorio}: {e}")
+            return None
+
+    def _grava_manifesto(self):
+        grava_atomico(self._caminho_manifesto(),
+                      json.dumps(self._manifesto, separators=(",", ":")).encode("utf-8"))
+
+    def _migra_legado(self):
+        # Executada apenas quando não há manifesto: importa o snapshot legado mais recente
+        legados = glob.glob(os.path.join(self.diretorio_base, f"snapshot_{self.no_id}_*.json"))
+        if not legados:
+            return
+        mais_recente = max(legados, key=os.path.getmtime)
+        try:
+            with open(mais_recente, "r") as f:
+                estado = json.load(f)
+        except ValueError as e:
+            print(f"[Snapshot] Snapshot legado inválido {mais_recente}: {e}")
+            return
+        self.salva(estado, timestamp=os.path.getmtime(mais_recente))
+        print(f"[Snapshot] Snapshot legado {mais_recente} importado ({len(legados)} arquivos legados ignorados)")
+
+    # --- Escrita ---
+    def salva(self, estado, timestamp=None):
+        """
+        Grava um snapshot e atualiza o manifesto. Retorna o caminho do arquivo.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        return self._grava(serializa(estado, self.formato), timestamp)
+
+    def captura(self, funcao_estado, trava=None):
+        """
+        Chama ``funcao_estado`` (sob ``trava``, se houver) e mede a pausa.
+        Retorna ``(estado, pausa_ms)``. A função deve devolver cópias dos contêineres
+        mutáveis (``dict(...)``, ``list(...)``): a serialização acontece depois, fora da
+        trava, enquanto o estado vivo continua mudando.
+        """
+        inicio = time.perf_counter()
+        if trava is None:
+            estado = funcao_estado()
+        else:
+            with trava:
+                estado = funcao_estado()
+        return estado, (time.perf_counter() - inicio) * 1000
+
+    def agenda(self, estado, timestamp=None, pausa_ms=0.0, ao_gravar=None):
+        """
+        Enfileira um estado já capturado para serialização e escrita em segundo plano.
+        ``ao_gravar(caminho, metricas)`` é chamada pela thread de gravação ao terminar.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock_metricas:
+            self._metricas["capturas"] += 1
+            self._metricas["pausa_ms"] = pausa_ms
+            self._metricas["pausa_max_ms"] = max(self._metricas["pausa_max_ms"], pausa_ms)
+            if self._gravador is None:
+                self._gravador = threading.Thread(target=self._executa_gravador, daemon=True)
+                self._gravador.start()
+        self._fila.put((estado, timestamp, pausa_ms, ao_gravar))
+
+    def aguarda(self):
+        """
+        Bloqueia até que todos os snapshots agendados estejam no disco.
+        """
+        self._fila.join()
+
+    def estatisticas(self):
+        """
+        Pausa de captura, tempo de serialização e de escrita (último e máximo) e contadores.
+        """
+        with self._lock_metricas:
+            metricas = dict(self._metricas)
+        metricas["pendentes"] = self._fila.unfinished_tasks
+        return metricas
+
+    def _executa_gravador(self):
+        while True:
+            estado, timestamp, pausa_ms, ao_gravar = self._fila.get()
+            try:
+                inicio = time.perf_counter()
+                dados = serializa(estado, self.formato)
+                serializacao_ms = (time.perf_counter() - inicio) * 1000
+                caminho = self._grava(dados, timestamp)
+                gravacao_ms = (time.perf_counter() - inicio) * 1000 - serializacao_ms
+                with self._lock_metricas:
+                    self._metricas["gravados"] += 1
+                    self._metricas["serializacao_ms"] = serializacao_ms
+                    self._metricas["serializacao_max_ms"] = max(self._metricas["serializacao_max_ms"],
+                                                                serializacao_ms)
+                    self._metricas["gravacao_ms"] = gravacao_ms
+                    self._metricas["bytes"] = len(dados)
+                if ao_gravar:
+                    ao_gravar(caminho, {"pausa_ms": pausa_ms, "serializacao_ms": serializacao_ms,
+                                        "gravacao_ms": gravacao_ms, "bytes": len(dados)})
+            except Exception as e:
+                with self._lock_metricas:
+                    self._metricas["falhas"] += 1
+                print(f"[Snapshot] Falha ao gravar snapshot de {self.no_id}: {e}")
+            finally:
+                self._fila.task_done()
+
+    def _grava(self, dados, timestamp):
+        # A trava só reserva a sequência e atualiza o manifesto; a escrita do snapshot fica fora dela
+        with self._lock:
+            self._reservada += 1
+            sequencia = self._reservada
+        nome = f"snapshot_{self.no_id}_{sequencia:08d}.{self.formato}"
+        grava_atomico(os.path.join(self.diretorio, nome), dados)
+        with self._lock:
+            snapshots = self._manifesto["snapshots"]
+            snapshots.append({"arquivo": nome, "sequencia": sequencia, "timestamp": timestamp})
+            snapshots.sort(key=lambda item: item["sequencia"])  # Escritas concorrentes fora de ordem
+            self._manifesto["sequencia"] = max(self._manifesto["sequencia"], sequencia)
+            descartados = self._aplica_retencao(timestamp)
+            self._manifesto["ultimo"] = self._manifesto["snapshots"][-1]["arquivo"]
+            # O manifesto só é trocado depois que o snapshot está no disco
+            self._grava_manifesto()
+        for nome_descartado in descartados:
+            try:
+                os.remove(os.path.join(self.diretorio, nome_descartado))
+            except FileNotFoundError:
+                pass
+        return os.path.join(self.diretorio, nome)
+
+    def _aplica_retencao(self, agora):
+        """
+        Mantém os últimos N e o mais recente de cada hora nas últimas H horas.
+        Retorna os nomes dos arquivos removidos do manifesto.
+        """
+        snapshots = self._manifesto["snapshots"]
+        retidos = {item["sequencia"] for item in snapshots[-self.manter_ultimos:]} if self.manter_ultimos else set()
+        por_hora = {}
+        for item in snapshots:
+            hora = int(item["timestamp"] // 3600)
+            if agora - item["timestamp"] < self.manter_horas * 3600:
+                por_hora[hora] = item["sequencia"]
+        retidos.update(por_hora.values())
+        retidos.add(snapshots[-1]["sequencia"])
+        self._manifesto["snapshots"] = [item for item in snapshots if item["sequencia"] in retidos]
+        return [item["arquivo"] for item in snapshots if item["sequencia"] not in retidos]
+
+    # --- Leitura ---
+    def ultimo(self):
+        """
+        Retorna ``(caminho, estado)`` do último snapshot válido, ou ``(None, None)``.
+        Lê o manifesto em memória; se o último arquivo estiver ilegível, tenta os anteriores.
+        """
+        with self._lock:
+            candidatos = [item["arquivo"] for item in reversed(self._manifesto["snapshots"])]
+        for nome in candidatos:
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                with open(caminho, "rb") as f:
+                    return caminho, desserializa(f.read(), caminho)
+            except (OSError, ValueError) as e:
+                print(f"[Snapshot] Snapshot {caminho} ilegível, tentando o anterior: {e}")
+        return None, None
+
+    def lista(self):
+        """
+        Retorna as entradas retidas no manifesto (da mais antiga para a mais recente).
+        """
+        with self._lock:
+            return list(self._manifesto["snapshots"])
+
+
+def abre_snapshot_store(diretorio, no_id):
+    """
+    Cria um SnapshotStore com a retenção de SISD_SNAPSHOT_MANTER e SISD_SNAPSHOT_MANTER_HORAS
+    e o formato de SISD_SNAPSHOT_FORMATO ("snap", binário, ou "json").
+    """
+    return SnapshotStore(
+        diretorio,
+        no_id,
+        manter_ultimos=int(os.environ.get("SISD_SNAPSHOT_MANTER", 10)),
+        manter_horas=float(os.environ.get("SISD_SNAPSHOT_MANTER_HORAS", 24)),
+        formato=os.environ.get("SISD_SNAPSHOT_FORMATO", FORMATO_BINARIO),
+    )
@@ -0,0 +1,165 @@
+"""
+Canal de status do sensor para o monitor do SISD.
+
+Responsabilidades:
+- Manter um único stream gRPC bidirecional (StreamStatus) aberto com o monitor, em vez
+  de uma chamada unária por batimento.
+- Enviar batimentos compactos com métricas de carga (fila de replicação, relógio de
+  Lamport, tempo de posse do token e tamanho do log).
+- Aplicar a configuração devolvida pelo monitor (intervalo entre batimentos) sem
+  reabrir o stream.
+- Reconectar com backoff exponencial e, se o monitor não implementar o stream,
+  voltar ao SendStatus unário.
+"""
+
+import random
+import threading
+import time
+
+import grpc
+
+from middleware.protos import sensor_status_pb2
+
+METRICAS_VAZIAS = {"queue_depth": 0, "lamport_clock": 0, "token_hold_ms": 0, "log_size_bytes": 0}
+
+
+class CanalStatus:
+    """
+    Envia batimentos ao monitor por um stream persistente.
+
+    ``coleta_metricas`` é chamada a cada batimento e retorna um dicionário com as
+    chaves de ``METRICAS_VAZIAS`` (as ausentes são enviadas como 0).
+    """
+
+    def __init__(self, sensor_id, stub, coleta_metricas=None, intervalo=10.0,
+                 backoff_inicial=1.0, backoff_max=30.0):
+        self.sensor_id = sensor_id
+        self.stub = stub
+        self.coleta_metricas = coleta_metricas or (lambda: {})
+        self.intervalo = intervalo
+        self.backoff_inicial = backoff_inicial
+        self.backoff_max = backoff_max
+        self.legado = False          # monitor sem StreamStatus: usa SendStatus
+        self._acorda = threading.Event()   # acorda o gerador de batimentos
+        self._fim = threading.Event()
+        self._lock = threading.Lock()
+        self._sessao = 0             # incrementada a cada stream aberto
+        self._seq = 0
+        self._parar = False
+        self._thread = None
+        self._contadores = {"enviados": 0, "configuracoes": 0, "reconexoes": 0, "falhas": 0}
+
+    def inicia(self):
+        self._thread = threading.Thread(target=self._executa, daemon=True)
+        self._thread.start()
+
+    def para(self):
+        self._parar = True
+        self._fim.set()
+        self._acorda.set()
+
+    def estatisticas(self):
+        with self._lock:
+            stats = dict(self._contadores)
+        stats["intervalo"] = self.intervalo
+        stats["legado"] = self.legado
+        return stats
+
+    def _executa(self):
+        backoff = self.backoff_inicial
+        while not self._parar:
+            if self.legado:
+                self._envia_unario()
+                self._fim.wait(self.intervalo)
+                continue
+            try:
+                for config in self.stub.StreamStatus(self._batimentos()):
+                    self.aplica_config(config)
+                    backoff = self.backoff_inicial
+            except grpc.RpcError as e:
+                if e.code() == grpc.StatusCode.UNIMPLEMENTED:
+                    print("[Sensor] Monitor sem StreamStatus; usando SendStatus")
+                    self.legado = True
+                    continue
+                print(f"[Sensor] Stream de status com o monitor interrompido: {e.code().name}")
+            with self._lock:
+                self._contadores["reconexoes"] += 1
+            # Encerra o gerador do stream anterior antes de abrir outro
+            self._encerra_sessao()
+            self._fim.wait(backoff * random.uniform(0.5, 1.0))
+            backoff = min(backoff * 2, self.backoff_max)
+
+    def _encerra_sessao(self):
+        with self._lock:
+            self._sessao += 1
+        self._acorda.set()
+
+    def _espera_batimento(self, sessao):
+        # O prazo é recalculado quando o intervalo muda, contando a partir do último batimento
+        inicio = time.monotonic()
+        while not self._parar and sessao == self._sessao:
+            restante = inicio + self.intervalo - time.monotonic()
+            if restante <= 0:
+                return
+            self._acorda.wait(restante)
+            self._acorda.clear()
+
+    def _batimentos(self):
+        """
+        Gerador de requisições do stream: um batimento a cada intervalo.
+        O sensor_id vai apenas no primeiro batimento de cada stream.
+        """
+        with self._lock:
+            sessao = self._sessao
+        primeiro = True
+        while not self._parar:
+            with self._lock:
+                if sessao != self._sessao:
+                    return
+            yield self._monta_batimento(self.sensor_id if primeiro else "")
+            primeiro = False
+            self._espera_batimento(sessao)
+
+    def _monta_batimento(self, sensor_id):
+        metricas = dict(METRICAS_VAZIAS)
+        try:
+            metricas.update(self.coleta_metricas())
+        except Exception as e:
+            print(f"[Sensor] Erro ao coletar métricas de status: {e}")
+        with self._lock:
+            self._seq += 1
+            self._contadores["enviados"] += 1
+            seq = self._seq
+        return sensor_status_pb2.Heartbeat(
+            sensor_id=sensor_id,
+            seq=seq,
+            timestamp_ms=int(time.time() * 1000),
+            queue_depth=int(metricas["queue_depth"]),
+            lamport_clock=int(metricas["lamport_clock"]),
+            token_hold_ms=int(metricas["token_hold_ms"]),
+            log_size_bytes=int(metricas["log_size_bytes"]),
+        )
+
+    def aplica_config(self, config):
+        """
+        Aplica a configuração enviada pelo monitor; um novo intervalo vale já a partir
+        do próximo batimento.
+        """
+        with self._lock:
+            self._contadores["configuracoes"] += 1
+        if config.heartbeat_interval_ms and config.heartbeat_interval_ms / 1000 != self.intervalo:
+            self.intervalo = config.heartbeat_interval_ms / 1000
+            print(f"[Sensor] Monitor definiu intervalo de status: {self.intervalo:.1f}s")
+            self._acorda.set()
+
+    def _envia_unario(self):
+        request = sensor_status_pb2.Status(sensor_id=self.sensor_id, status="Operando normalmente",
+                                           timestamp=int(time.time()))
+        try:
+            self.stub.SendStatus(request)
+            with self._lock:
+                self._contadores["enviados"] += 1
+        except grpc.RpcError as e:
+            with self._lock:
+                self._contadores["falhas"] += 1
+            print(f"[Sensor] Erro ao enviar status para o monitor: {e.code().name}")
@@ -0,0 +1,345 @@
+"""
+Estado do token do anel lógico (exclusão mútua) do SISD.
+
+Responsabilidades:
+- Guardar a posse do token em uma primitiva de sincronização (Condition), acordando
+  imediatamente as threads que aguardam o token, sem espera ativa.
+- Garantir que apenas uma thread de envio use o token por vez.
+- Aplicar a política de posse: liberar após N leituras, após T ms de posse ou
+  imediatamente quando não houver leitura pendente.
+- Manter enlaces TCP persistentes entre vizinhos do anel, pular sucessores fora do ar,
+  regenerar o token perdido e medir o tempo de ida e volta por salto e por rotação.
+"""
+
+import collections
+import os
+import socket
+import struct
+import threading
+import time
+
+from common.detector_falhas import _percentil
+from common.framing import CABECALHO, TIPO_TOKEN, TIPO_TOKEN_ACK, codifica_quadro
+
+
+class PoliticaPosse:
+    """
+    Política de posse do token.
+
+    - ``max_leituras``: libera após enviar N leituras (None = sem limite).
+    - ``max_posse_ms``: libera após T ms de posse (None = sem limite).
+    - ``liberar_se_vazio``: libera assim que não houver leitura pendente, sem
+      esperar a próxima leitura ficar pronta.
+    """
+
+    def __init__(self, max_leituras=1, max_posse_ms=None, liberar_se_vazio=False):
+        self.max_leituras = max_leituras
+        self.max_posse_ms = max_posse_ms
+        self.liberar_se_vazio = liberar_se_vazio
+
+    @classmethod
+    def do_ambiente(cls):
+        """
+        Lê a política das variáveis SISD_TOKEN_MAX_LEITURAS, SISD_TOKEN_MAX_POSSE_MS
+        e SISD_TOKEN_LIBERAR_SE_VAZIO.
+        """
+        max_leituras = os.environ.get("SISD_TOKEN_MAX_LEITURAS", "1")
+        max_posse_ms = os.environ.get("SISD_TOKEN_MAX_POSSE_MS")
+        return cls(
+            max_leituras=int(max_leituras) if max_leituras else None,
+            max_posse_ms=float(max_posse_ms) if max_posse_ms else None,
+            liberar_se_vazio=os.environ.get("SISD_TOKEN_LIBERAR_SE_VAZIO", "0") in ("1", "true", "sim"),
+        )
+
+
+class EstadoToken:
+    """
+    Posse do token de um nó do anel.
+
+    O listener chama ``recebe`` quando o token chega; as threads de envio usam
+    ``adquire``/``solta`` para ter uso exclusivo e ``libera`` ao passar o token adiante.
+    """
+
+    def __init__(self, politica=None):
+        self.politica = politica or PoliticaPosse()
+        self._cond = threading.Condition()
+        self.possui = False
+        self._em_uso = False
+        self.remetentes = 0          # threads de envio registradas (conexões com clientes)
+        self.recebido_em = None
+        self.leituras = 0
+
+    def recebe(self):
+        """
+        Marca a chegada do token e acorda as threads que o aguardam.
+        """
+        with self._cond:
+            self.possui = True
+            self.recebido_em = time.monotonic()
+            self.leituras = 0
+            self._cond.notify_all()
+
+    def registra_remetente(self, delta):
+        """
+        Incrementa (+1) ou decrementa (-1) o número de threads de envio ativas.
+        """
+        with self._cond:
+            self.remetentes += delta
+
+    def adquire(self, timeout=None):
+        """
+        Bloqueia até possuir o token e tê-lo livre para uso exclusivo.
+        Retorna False se o timeout expirar.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.possui and not self._em_uso, timeout):
+                return False
+            self._em_uso = True
+            return True
+
+    def solta(self):
+        """
+        Encerra o uso exclusivo (o token pode continuar com este nó).
+        """
+        with self._cond:
+            self._em_uso = False
+            self._cond.notify_all()
+
+    def registra_leitura(self, quantidade=1):
+        with self._cond:
+            self.leituras += quantidade
+
+    def tempo_de_posse(self):
+        """
+        Retorna há quantos segundos o token está com este nó (0 se não o possui).
+        """
+        with self._cond:
+            return time.monotonic() - self.recebido_em if self.possui else 0.0
+
+    def deve_liberar(self, leitura_pendente):
+        """
+        Decide, pela política de posse, se o token deve seguir para o próximo nó.
+        """
+        politica = self.politica
+        if politica.max_leituras is not None and self.leituras >= politica.max_leituras:
+            return True
+        if politica.max_posse_ms is not None and self.tempo_de_posse() * 1000 >= politica.max_posse_ms:
+            return True
+        return politica.liberar_se_vazio and not leitura_pendente
+
+    def libera(self):
+        """
+        Marca que o token deixou este nó. Retorna o tempo de posse em segundos.
+        """
+        with self._cond:
+            posse = time.monotonic() - self.recebido_em if self.possui else 0.0
+            self.possui = False
+            return posse
+
+
+# --- Enlaces persistentes do anel ---
+GERACAO = struct.Struct(">QI")   # contador de geração, id do nó que gerou o token
+TOKEN_LEGADO = b"TOKEN"           # injeção de token em texto (cliente), mesmo tamanho do cabeçalho de quadro
+
+
+def _recebe_exato(sock, tamanho):
+    dados = b""
+    while len(dados) < tamanho:
+        parte = sock.recv(tamanho - len(dados))
+        if not parte:
+            raise ConnectionResetError("Conexão encerrada pelo par")
+        dados += parte
+    return dados
+
+
+class AnelToken:
+    """
+    Enlaces persistentes entre vizinhos do anel, com quadros de token numerados por geração.
+
+    - Cada nó mantém uma conexão TCP de longa duração com o sucessor (reconectada sob demanda)
+      e confirma cada token recebido com um ACK no mesmo enlace.
+    - Se o sucessor não confirmar, ele é pulado por ``reintenta_morto`` segundos e o token
+      segue para o próximo sucessor vivo com a geração incrementada (o sucessor pulado
+      pode ter recebido o token e perdido só o ACK; essa cópia morre no próximo salto).
+    - Se o token não passar por este nó por ``timeout_perda`` segundos (depois de ter
+      circulado ao menos uma vez), ele é regenerado com uma geração maior; tokens de
+      gerações antigas são descartados ao chegar, eliminando duplicatas.
+
+    ``sucessores()`` deve retornar ``[(id_no, host, porta_token), ...]`` na ordem do anel,
+    sem incluir este nó.
+    """
+
+    def __init__(self, estado, id_no, sucessores, porta, timeout_ack=2.0, timeout_perda=15.0,
+                 reintenta_morto=10.0, ao_receber=None):
+        self.estado = estado
+        self.id_no = id_no
+        self.sucessores = sucessores
+        self.porta = porta
+        self.timeout_ack = timeout_ack
+        self.timeout_perda = timeout_perda
+        self.reintenta_morto = reintenta_morto
+        self.ao_receber = ao_receber
+        self.geracao = (0, 0)
+        self._lock = threading.Lock()
+        self._lock_envio = threading.Lock()
+        self._enlaces = {}                 # id_no -> socket do enlace de saída
+        self._mortos = {}                  # id_no -> instante até o qual o nó é pulado
+        self._ultimo_token = None
+        self._ultima_passagem = None
+        self.rtt_saltos = collections.deque(maxlen=1000)
+        self.rotacoes = collections.deque(maxlen=1000)
+        self.contadores = {"recebidos": 0, "passados": 0, "falhas_envio": 0,
+                           "regenerados": 0, "descartados": 0}
+
+    # --- Ciclo de vida ---
+    def inicia(self):
+        """
+        Inicia as threads do listener e do detector de perda do token.
+        """
+        for alvo, nome in ((self._escuta, "token-listener"), (self._vigia, "token-vigia")):
+            t = threading.Thread(target=alvo, name=nome)
+            t.daemon = True
+            t.start()
+
+    def _escuta(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(("0.0.0.0", self.porta))
+        server.listen(16)
+        print(f"[Token] Nó {self.id_no} escutando token na porta {self.porta}")
+        while True:
+            conn, _ = server.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            t = threading.Thread(target=self._atende_enlace, args=(conn,))
+            t.daemon = True
+            t.start()
+
+    def _atende_enlace(self, conn):
+        """
+        Lê quadros de token de um enlace de entrada até ele ser fechado.
+        """
+        try:
+            while True:
+                cabecalho = _recebe_exato(conn, CABECALHO.size)
+                if cabecalho == TOKEN_LEGADO:
+                    # Injeção do token pelo cliente (protocolo texto de uma única mensagem)
+                    with self._lock:
+                        geracao = (self.geracao[0] + 1, 0)
+                    self._recebe_token(geracao)
+                    return
+                tamanho, tipo = CABECALHO.unpack(cabecalho)
+                payload = _recebe_exato(conn, tamanho)
+                if tipo != TIPO_TOKEN or tamanho != GERACAO.size:
+                    print(f"[Token] Quadro inesperado no enlace do anel (tipo {tipo})")
+                    return
+                conn.sendall(codifica_quadro(TIPO_TOKEN_ACK, payload))
+                self._recebe_token(GERACAO.unpack(payload))
+        except (OSError, ConnectionResetError):
+            pass
+        finally:
+            conn.close()
+
+    def _recebe_token(self, geracao):
+        agora = time.monotonic()
+        with self._lock:
+            if geracao < self.geracao:
+                self.contadores["descartados"] += 1
+                print(f"[Token] Token duplicado de geração {geracao} descartado (atual {self.geracao})")
+                return
+            self.geracao = geracao
+            self.contadores["recebidos"] += 1
+            if self._ultimo_token is not None:
+                self.rotacoes.append(agora - self._ultimo_token)
+            self._ultimo_token = agora
+        self.estado.recebe()
+        if self.ao_receber is not None:
+            self.ao_receber()
+
+    # --- Passagem do token ---
+    def passa(self):
+        """
+        Envia o token ao próximo sucessor vivo. Retorna o id do destino, ou None se
+        nenhum sucessor respondeu (nesse caso o token permanece com este nó).
+        """
+        agora = time.monotonic()
+        candidatos = self.sucessores()
+        vivos = [c for c in candidatos if self._mortos.get(c[0], 0) <= agora]
+        self.estado.libera()
+        for id_destino, host, porta in vivos or candidatos:
+            try:
+                rtt = self._envia(id_destino, host, porta)
+            except (OSError, ConnectionResetError, ValueError) as e:
+                self.contadores["falhas_envio"] += 1
+                self._mortos[id_destino] = time.monotonic() + self.reintenta_morto
+                # O sucessor pode ter recebido o quadro e perdido só o ACK: o token seguinte
+                # sai com geração nova, e a cópia antiga é descartada no próximo salto
+                with self._lock:
+                    self.geracao = (self.geracao[0] + 1, self.id_no)
+                print(f"[Token] Sucessor {id_destino} ({host}:{porta}) indisponível: {e}. "
+                      f"Pulando com a geração {self.geracao}...")
+                continue
+            self._mortos.pop(id_destino, None)
+            self.rtt_saltos.append(rtt)
+            self.contadores["passados"] += 1
+            self._ultima_passagem = time.monotonic()
+            return id_destino
+        # Nenhum sucessor vivo: o token continua neste nó
+        self.estado.recebe()
+        return None
+
+    def _envia(self, id_destino, host, porta):
+        with self._lock_envio:
+            sock = self._enlaces.get(id_destino)
+            try:
+                if sock is None:
+                    sock = socket.create_connection((host, porta), timeout=self.timeout_ack)
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    self._enlaces[id_destino] = sock
+                sock.settimeout(self.timeout_ack)
+                with self._lock:
+                    payload = GERACAO.pack(*self.geracao)
+                inicio = time.perf_counter()
+                sock.sendall(codifica_quadro(TIPO_TOKEN, payload))
+                tamanho, tipo = CABECALHO.unpack(_recebe_exato(sock, CABECALHO.size))
+                resposta = _recebe_exato(sock, tamanho)
+                if tipo != TIPO_TOKEN_ACK or resposta != payload:
+                    raise ValueError("ACK de token inválido")
+                return time.perf_counter() - inicio
+            except Exception:
+                self._enlaces.pop(id_destino, None)
+                if sock is not None:
+                    sock.close()
+                raise
+
+    # --- Detecção de perda ---
+    def _vigia(self):
+        while True:
+            time.sleep(min(1.0, self.timeout_perda / 4))
+            with self._lock:
+                ultimo = self._ultimo_token
+                perdido = (ultimo is not None and not self.estado.possui
+                           and time.monotonic() - ultimo > self.timeout_perda)
+                if perdido:
+                    self.geracao = (self.geracao[0] + 1, self.id_no)
+                    self.contadores["regenerados"] += 1
+                    self._ultimo_token = time.monotonic()
+            if perdido:
+                print(f"[Token] Token perdido há mais de {self.timeout_perda:.0f}s; "
+                      f"nó {self.id_no} regenerou o token (geração {self.geracao})")
+                self.estado.recebe()
+                if self.ao_receber is not None:
+                    self.ao_receber()
+
+    def metricas(self):
+        """
+        Retorna contadores e tempos (ms) de ida e volta por salto e de rotação do anel.
+        """
+        saltos = list(self.rtt_saltos)
+        rotacoes = list(self.rotacoes)
+        metricas = dict(self.contadores)
+        metricas["geracao"] = list(self.geracao)
+        for nome, valores in (("rtt_salto", saltos), ("rotacao", rotacoes)):
+            p50, p99 = _percentil(valores, 50), _percentil(valores, 99)
+            metricas[f"{nome}_p50_ms"] = round(p50 * 1000, 3) if p50 is not None else None
+            metricas[f"{nome}_p99_ms"] = round(p99 * 1000, 3) if p99 is not None else None
+        return metricas
@@ -2,20 +2,35 @@
 Servidor Monitor do SISD.
 
 Responsabilidades:
-- Receber status/heartbeat dos sensores via gRPC.
-- Detectar falhas de sensores (timeout).
-- Exibir status e falhas detectadas.
+- Receber status/heartbeat dos sensores via gRPC (SendStatus unário ou stream StreamStatus
+  com métricas de carga).
+- Devolver a configuração de batimentos (intervalo) pelo mesmo stream.
+- Detectar falhas de sensores (timeouts por sensor, prazos em heap) e exibir apenas as
+  transições de estado UP -> SUSPECT -> DOWN -> UP.
+- Reter as séries temporais de batimentos em memória e expô-las pelo serviço gRPC de
+  consulta (MonitorQueryService) e por um endpoint texto no formato do Prometheus.
 """
 
-import time
+import os
 from concurrent import futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
 import grpc
 
 from middleware.protos import sensor_status_pb2
 from middleware.protos import sensor_status_pb2_grpc
+from middleware.vivacidade import RastreadorVivacidade, timeouts_do_ambiente
+from middleware.series_temporais import ArmazemSeries
 
-# Dicionário para registrar o último horário de status recebido por sensor
-sensors_status = {}  # { sensor_id: timestamp }
+# Séries de batimentos e métricas de carga por sensor (buffers circulares em memória)
+series = ArmazemSeries(
+    retencao_bruta=int(os.environ.get("SISD_MONITOR_RETENCAO_BRUTA", 1024)),
+    retencao_minutos=int(os.environ.get("SISD_MONITOR_RETENCAO_MINUTOS", 1440)),
+)
+
+# Intervalo de batimentos enviado aos sensores (pode ser alterado por sensor em intervalos_status)
+INTERVALO_STATUS_MS = int(os.environ.get("SISD_MONITOR_INTERVALO_MS", 10000))
+intervalos_status = {}  # { sensor_id: intervalo em ms }
 
 class MonitorServiceServicer(sensor_status_pb2_grpc.MonitorServiceServicer):
     """
@@ -23,35 +38,152 @@ class MonitorServiceServicer(sensor_status_pb2_grpc.MonitorServiceServicer):
     """
     def SendStatus(self, request, context):
         sensor_id = request.sensor_id
-        sensors_status[sensor_id] = time.time()
+        rastreador.registra(sensor_id)
+        series.registra_batimento(sensor_id)
         print(f"[Monitor] Recebido status de '{sensor_id}': '{request.status}' em {request.timestamp}")
         return sensor_status_pb2.Ack(mensagem="Status recebido")
 
-def monitor_failure_checker():
+    def StreamStatus(self, request_iterator, context):
+        """
+        Recebe os batimentos de um sensor pelo stream e devolve a configuração
+        sempre que ela muda (a primeira vez no primeiro batimento).
+        """
+        sensor_id = None
+        intervalo_enviado = None
+        for batimento in request_iterator:
+            if sensor_id is None:
+                sensor_id = batimento.sensor_id or context.peer()
+                print(f"[Monitor] Stream de status aberto por '{sensor_id}'")
+            rastreador.registra(sensor_id)
+            series.registra_batimento(sensor_id, {
+                "queue_depth": batimento.queue_depth,
+                "lamport_clock": batimento.lamport_clock,
+                "token_hold_ms": batimento.token_hold_ms,
+                "log_size_bytes": batimento.log_size_bytes,
+            })
+            intervalo = intervalos_status.get(sensor_id, INTERVALO_STATUS_MS)
+            if intervalo != intervalo_enviado:
+                intervalo_enviado = intervalo
+                yield sensor_status_pb2.MonitorConfig(heartbeat_interval_ms=intervalo,
+                                                      mensagem="Configuração de status")
+        print(f"[Monitor] Stream de status de '{sensor_id}' encerrado")
+
+def _ms(segundos):
+    return segundos * 1000 if segundos is not None else 0.0
+
+class MonitorQueryServiceServicer(sensor_status_pb2_grpc.MonitorQueryServiceServicer):
+    """
+    Serviço gRPC de consulta: resumo dos sensores e séries de batimentos.
+    """
+    def ListSensors(self, request, context):
+        resumos = series.resumo()
+        return sensor_status_pb2.SensorList(sensors=[
+            sensor_status_pb2.SensorSummary(
+                sensor_id=sensor_id,
+                state=resumo["estado"],
+                last_seen_ms=int(_ms(resumo["ultimo"])),
+                heartbeats=resumo["batimentos"],
+                interarrival_min_ms=_ms(resumo["intervalo_min"]),
+                interarrival_avg_ms=_ms(resumo["intervalo_medio"]),
+                interarrival_max_ms=_ms(resumo["intervalo_max"]),
+                jitter_ms=_ms(resumo["jitter"]),
+                uptime_pct=resumo["uptime"],
+                queue_depth=resumo["queue_depth"],
+                lamport_clock=resumo["lamport_clock"],
+                token_hold_ms=resumo["token_hold_ms"],
+                log_size_bytes=resumo["log_size_bytes"],
+            )
+            for sensor_id, resumo in sorted(resumos.items())
+        ])
+
+    def GetSeries(self, request, context):
+        por_minuto = request.resolution == sensor_status_pb2.MINUTE
+        pontos = series.pontos(request.sensor_id, request.since_ms / 1000, por_minuto=por_minuto)
+        if pontos is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"Sensor '{request.sensor_id}' desconhecido")
+        resposta = sensor_status_pb2.SeriesResponse(sensor_id=request.sensor_id)
+        if por_minuto:
+            for inicio, contagem, minimo, medio, maximo in pontos:
+                resposta.points.add(timestamp_ms=int(inicio * 1000), count=contagem,
+                                    interarrival_min_ms=_ms(minimo), interarrival_avg_ms=_ms(medio),
+                                    interarrival_max_ms=_ms(maximo))
+        else:
+            for instante, intervalo, metricas in pontos:
+                resposta.points.add(timestamp_ms=int(instante * 1000), count=1,
+                                    interarrival_min_ms=_ms(intervalo), interarrival_avg_ms=_ms(intervalo),
+                                    interarrival_max_ms=_ms(intervalo),
+                                    queue_depth=metricas["queue_depth"],
+                                    token_hold_ms=metricas["token_hold_ms"],
+                                    log_size_bytes=metricas["log_size_bytes"])
+        return resposta
+
+class MetricasHandler(BaseHTTPRequestHandler):
+    """
+    Endpoint HTTP com os agregados no formato texto do Prometheus (GET /metrics).
+    """
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        corpo = series.texto_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+def inicia_servidor_metricas(porta):
+    """
+    Inicia o endpoint de métricas em uma thread.
+    """
+    servidor = ThreadingHTTPServer(("0.0.0.0", porta), MetricasHandler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    print(f"[Monitor] Métricas (Prometheus) em http://0.0.0.0:{porta}/metrics")
+    return servidor
+
+def ao_transicionar(sensor_id, anterior, novo, silencio):
     """
-    Thread que verifica falhas dos sensores se não houver status em 20 segundos.
+    Exibe as transições de estado dos sensores (apenas quando o estado muda).
     """
-    while True:
-        agora = time.time()
-        for sensor_id, ultimo in sensors_status.items():
-            if agora - ultimo > 20:
-                print(f"[Monitor] Falha detectada: Sensor '{sensor_id}' não enviou status nos últimos {agora - ultimo:.1f} segundos!")
-        time.sleep(5)
+    series.registra_transicao(sensor_id, novo)
+    if anterior is None:
+        print(f"[Monitor] Sensor '{sensor_id}' registrado ({novo})")
+    elif novo == "UP":
+        print(f"[Monitor] Sensor '{sensor_id}' voltou: {anterior} -> UP após {silencio:.1f} segundos sem status")
+    else:
+        print(f"[Monitor] Falha detectada: Sensor '{sensor_id}' {anterior} -> {novo} "
+              f"(sem status nos últimos {silencio:.1f} segundos)")
+
+# Vivacidade dos sensores: SISD_MONITOR_TIMEOUT_SUSPEITA/QUEDA em segundos e
+# SISD_MONITOR_TIMEOUTS="sensor_5000=5:15,..." para timeouts por sensor
+rastreador = RastreadorVivacidade(
+    timeout_suspeita=float(os.environ.get("SISD_MONITOR_TIMEOUT_SUSPEITA", 20.0)),
+    timeout_queda=float(os.environ.get("SISD_MONITOR_TIMEOUT_QUEDA", 60.0)),
+    timeouts=timeouts_do_ambiente(os.environ.get("SISD_MONITOR_TIMEOUTS")),
+    ao_transicionar=ao_transicionar,
+)
 
 def serve():
     """
     Inicializa o servidor gRPC do monitor e a thread de verificação de falhas.
     """
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    # Cada stream de status ocupa uma thread do pool enquanto estiver aberto
+    max_workers = int(os.environ.get("SISD_MONITOR_WORKERS", 64))
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
     sensor_status_pb2_grpc.add_MonitorServiceServicer_to_server(MonitorServiceServicer(), server)
+    sensor_status_pb2_grpc.add_MonitorQueryServiceServicer_to_server(MonitorQueryServiceServicer(), server)
     server.add_insecure_port('[::]:50051')
     server.start()
     print("[Monitor] gRPC server iniciado na porta 50051")
     
-    # Inicia a thread de verificação de falhas
-    failure_checker = futures.ThreadPoolExecutor(max_workers=1)
-    failure_checker.submit(monitor_failure_checker)
-    
+    # Inicia a thread de verificação de falhas (acorda apenas no próximo prazo)
+    rastreador.inicia()
+
+    inicia_servidor_metricas(int(os.environ.get("SISD_MONITOR_METRICAS_PORTA", 9100)))
+
     server.wait_for_termination()
 
 if __name__ == '__main__':
@@ -24,17 +24,37 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13sensor_status.proto\x12\x07monitor\">\n\x06Status\x12\x11\n\tsensor_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\"\x17\n\x03\x41\x63k\x12\x10\n\x08mensagem\x18\x01 \x01(\t2=\n\x0eMonitorService\x12+\n\nSendStatus\x12\x0f.monitor.Status\x1a\x0c.monitor.Ackb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13sensor_status.proto\x12\x07monitor\">\n\x06Status\x12\x11\n\tsensor_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\"\x17\n\x03\x41\x63k\x12\x10\n\x08mensagem\x18\x01 \x01(\t\"\x9c\x01\n\tHeartbeat\x12\x11\n\tsensor_id\x18\x01 \x01(\t\x12\x0b\n\x03seq\x18\x02 \x01(\x04\x12\x14\n\x0ctimestamp_ms\x18\x03 \x01(\x03\x12\x13\n\x0bqueue_depth\x18\x04 \x01(\r\x12\x15\n\rlamport_clock\x18\x05 \x01(\x04\x12\x15\n\rtoken_hold_ms\x18\x06 \x01(\r\x12\x16\n\x0elog_size_bytes\x18\x07 \x01(\x04\"@\n\rMonitorConfig\x12\x1d\n\x15heartbeat_interval_ms\x18\x01 \x01(\r\x12\x10\n\x08mensagem\x18\x02 \x01(\t\"\x14\n\x12ListSensorsRequest\"\xb4\x02\n\rSensorSummary\x12\x11\n\tsensor_id\x18\x01 \x01(\t\x12\r\n\x05state\x18\x02 \x01(\t\x12\x14\n\x0clast_seen_ms\x18\x03 \x01(\x03\x12\x12\n\nheartbeats\x18\x04 \x01(\x04\x12\x1b\n\x13interarrival_min_ms\x18\x05 \x01(\x01\x12\x1b\n\x13interarrival_avg_ms\x18\x06 \x01(\x01\x12\x1b\n\x13interarrival_max_ms\x18\x07 \x01(\x01\x12\x11\n\tjitter_ms\x18\x08 \x01(\x01\x12\x12\n\nuptime_pct\x18\t \x01(\x01\x12\x13\n\x0bqueue_depth\x18\n \x01(\r\x12\x15\n\rlamport_clock\x18\x0b \x01(\x04\x12\x15\n\rtoken_hold_ms\x18\x0c \x01(\r\x12\x16\n\x0elog_size_bytes\x18\r \x01(\x04\"5\n\nSensorList\x12\'\n\x07sensors\x18\x01 \x03(\x0b\x32\x16.monitor.SensorSummary\"]\n\rSeriesRequest\x12\x11\n\tsensor_id\x18\x01 \x01(\t\x12\x10\n\x08since_ms\x18\x02 \x01(\x03\x12\'\n\nresolution\x18\x03 \x01(\x0e\x32\x13.monitor.Resolution\"\xcd\x01\n\x0bSeriesPoint\x12\x14\n\x0ctimestamp_ms\x18\x01 \x01(\x03\x12\r\n\x05\x63ount\x18\x02 \x01(\r\x12\x1b\n\x13interarrival_min_ms\x18\x03 \x01(\x01\x12\x1b\n\x13interarrival_avg_ms\x18\x04 \x01(\x01\x12\x1b\n\x13interarrival_max_ms\x18\x05 \x01(\x01\x12\x13\n\x0bqueue_depth\x18\x06 \x01(\r\x12\x15\n\rtoken_hold_ms\x18\x07 \x01(\r\x12\x16\n\x0elog_size_bytes\x18\x08 \x01(\x04\"I\n\x0eSeriesResponse\x12\x11\n\tsensor_id\x18\x01 \x01(\t\x12$\n\x06points\x18\x02 \x03(\x0b\x32\x14.monitor.SeriesPoint*!\n\nResolution\x12\x07\n\x03RAW\x10\x00\x12\n\n\x06MINUTE\x10\x01\x32}\n\x0eMonitorService\x12+\n\nSendStatus\x12\x0f.monitor.Status\x1a\x0c.monitor.Ack\x12>\n\x0cStreamStatus\x12\x12.monitor.Heartbeat\x1a\x16.monitor.MonitorConfig(\x01\x30\x01\x32\x94\x01\n\x13MonitorQueryService\x12?\n\x0bListSensors\x12\x1b.monitor.ListSensorsRequest\x1a\x13.monitor.SensorList\x12<\n\tGetSeries\x12\x16.monitor.SeriesRequest\x1a\x17.monitor.SeriesResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'sensor_status_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_RESOLUTION']._serialized_start=1112
+  _globals['_RESOLUTION']._serialized_end=1145
   _globals['_STATUS']._serialized_start=32
   _globals['_STATUS']._serialized_end=94
   _globals['_ACK']._serialized_start=96
   _globals['_ACK']._serialized_end=119
-  _globals['_MONITORSERVICE']._serialized_start=121
-  _globals['_MONITORSERVICE']._serialized_end=182
+  _globals['_HEARTBEAT']._serialized_start=122
+  _globals['_HEARTBEAT']._serialized_end=278
+  _globals['_MONITORCONFIG']._serialized_start=280
+  _globals['_MONITORCONFIG']._serialized_end=344
+  _globals['_LISTSENSORSREQUEST']._serialized_start=346
+  _globals['_LISTSENSORSREQUEST']._serialized_end=366
+  _globals['_SENSORSUMMARY']._serialized_start=369
+  _globals['_SENSORSUMMARY']._serialized_end=677
+  _globals['_SENSORLIST']._serialized_start=679
+  _globals['_SENSORLIST']._serialized_end=732
+  _globals['_SERIESREQUEST']._serialized_start=734
+  _globals['_SERIESREQUEST']._serialized_end=827
+  _globals['_SERIESPOINT']._serialized_start=830
+  _globals['_SERIESPOINT']._serialized_end=1035
+  _globals['_SERIESRESPONSE']._serialized_start=1037
+  _globals['_SERIESRESPONSE']._serialized_end=1110
+  _globals['_MONITORSERVICE']._serialized_start=1147
+  _globals['_MONITORSERVICE']._serialized_end=1272
+  _globals['_MONITORQUERYSERVICE']._serialized_start=1275
+  _globals['_MONITORQUERYSERVICE']._serialized_end=1423
 # @@protoc_insertion_point(module_scope)
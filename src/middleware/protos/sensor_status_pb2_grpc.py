@@ -40,6 +40,11 @@ class MonitorServiceStub(object):
                 request_serializer=sensor__status__pb2.Status.SerializeToString,
                 response_deserializer=sensor__status__pb2.Ack.FromString,
                 _registered_method=True)
+        self.StreamStatus = channel.stream_stream(
+                '/monitor.MonitorService/StreamStatus',
+                request_serializer=sensor__status__pb2.Heartbeat.SerializeToString,
+                response_deserializer=sensor__status__pb2.MonitorConfig.FromString,
+                _registered_method=True)
 
 
 class MonitorServiceServicer(object):
@@ -47,7 +52,14 @@ class MonitorServiceServicer(object):
     """
 
     def SendStatus(self, request, context):
-        """Método para envio de status via gRPC
+        """Método para envio de status via gRPC (mantido por compatibilidade)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamStatus(self, request_iterator, context):
+        """Stream bidirecional: o sensor envia batimentos e o monitor devolve configurações
         """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
@@ -61,6 +73,11 @@ def add_MonitorServiceServicer_to_server(servicer, server):
                     request_deserializer=sensor__status__pb2.Status.FromString,
                     response_serializer=sensor__status__pb2.Ack.SerializeToString,
             ),
+            'StreamStatus': grpc.stream_stream_rpc_method_handler(
+                    servicer.StreamStatus,
+                    request_deserializer=sensor__status__pb2.Heartbeat.FromString,
+                    response_serializer=sensor__status__pb2.MonitorConfig.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'monitor.MonitorService', rpc_method_handlers)
@@ -99,3 +116,148 @@ class MonitorService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def StreamStatus(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/monitor.MonitorService/StreamStatus',
+            sensor__status__pb2.Heartbeat.SerializeToString,
+            sensor__status__pb2.MonitorConfig.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+
+class MonitorQueryServiceStub(object):
+    """Serviço de consulta do monitor
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.ListSensors = channel.unary_unary(
+                '/monitor.MonitorQueryService/ListSensors',
+                request_serializer=sensor__status__pb2.ListSensorsRequest.SerializeToString,
+                response_deserializer=sensor__status__pb2.SensorList.FromString,
+                _registered_method=True)
+        self.GetSeries = channel.unary_unary(
+                '/monitor.MonitorQueryService/GetSeries',
+                request_serializer=sensor__status__pb2.SeriesRequest.SerializeToString,
+                response_deserializer=sensor__status__pb2.SeriesResponse.FromString,
+                _registered_method=True)
+
+
+class MonitorQueryServiceServicer(object):
+    """Serviço de consulta do monitor
+    """
+
+    def ListSensors(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetSeries(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_MonitorQueryServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'ListSensors': grpc.unary_unary_rpc_method_handler(
+                    servicer.ListSensors,
+                    request_deserializer=sensor__status__pb2.ListSensorsRequest.FromString,
+                    response_serializer=sensor__status__pb2.SensorList.SerializeToString,
+            ),
+            'GetSeries': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetSeries,
+                    request_deserializer=sensor__status__pb2.SeriesRequest.FromString,
+                    response_serializer=sensor__status__pb2.SeriesResponse.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'monitor.MonitorQueryService', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('monitor.MonitorQueryService', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class MonitorQueryService(object):
+    """Serviço de consulta do monitor
+    """
+
+    @staticmethod
+    def ListSensors(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/monitor.MonitorQueryService/ListSensors',
+            sensor__status__pb2.ListSensorsRequest.SerializeToString,
+            sensor__status__pb2.SensorList.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetSeries(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/monitor.MonitorQueryService/GetSeries',
+            sensor__status__pb2.SeriesRequest.SerializeToString,
+            sensor__status__pb2.SeriesResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,276 @@
+"""
+Séries temporais de batimentos mantidas em memória pelo monitor do SISD.
+
+Responsabilidades:
+- Reter, por sensor, os últimos batimentos (instante, intervalo desde o anterior e
+  métricas de carga) em buffers circulares de ``array``, com memória fixa.
+- Reduzir o histórico mais antigo a agregados por minuto (contagem e intervalo
+  mínimo/médio/máximo), também em buffers circulares.
+- Atualizar os agregados a cada batimento (intervalo mínimo/médio/máximo, jitter e
+  uptime), de modo que as consultas não percorram o histórico.
+- Exportar os agregados no formato texto do Prometheus.
+"""
+
+import math
+import threading
+import time
+from array import array
+
+from middleware.vivacidade import DOWN, SUSPECT, UP
+
+METRICAS = ("queue_depth", "lamport_clock", "token_hold_ms", "log_size_bytes")
+
+
+class BufferCircular:
+    """
+    Buffer circular de capacidade fixa sobre ``array`` (tipo ``codigo``).
+    """
+
+    def __init__(self, capacidade, codigo="d"):
+        self.capacidade = capacidade
+        self._dados = array(codigo, bytes(array(codigo).itemsize * capacidade))
+        self._inicio = 0
+        self.tamanho = 0
+
+    def adiciona(self, valor):
+        fim = (self._inicio + self.tamanho) % self.capacidade
+        self._dados[fim] = valor
+        if self.tamanho < self.capacidade:
+            self.tamanho += 1
+        else:
+            self._inicio = (self._inicio + 1) % self.capacidade
+
+    def ultimo(self):
+        return self._dados[(self._inicio + self.tamanho - 1) % self.capacidade] if self.tamanho else None
+
+    def valores(self):
+        """
+        Retorna os valores do mais antigo para o mais recente.
+        """
+        fim = self._inicio + self.tamanho
+        if fim <= self.capacidade:
+            return self._dados[self._inicio:fim].tolist()
+        return self._dados[self._inicio:].tolist() + self._dados[:fim - self.capacidade].tolist()
+
+    def __len__(self):
+        return self.tamanho
+
+
+class SerieSensor:
+    """
+    Histórico e agregados de um sensor. Não é thread-safe: o ArmazemSeries serializa o acesso.
+    """
+
+    def __init__(self, retencao_bruta=1024, retencao_minutos=1440):
+        # Batimentos brutos
+        self.instantes = BufferCircular(retencao_bruta)
+        self.intervalos = BufferCircular(retencao_bruta)
+        self.metricas = {nome: BufferCircular(retencao_bruta, "Q") for nome in METRICAS}
+        # Agregados por minuto (o minuto corrente fica em aberto até o próximo começar)
+        self.minutos = BufferCircular(retencao_minutos)
+        self.contagens = BufferCircular(retencao_minutos, "L")
+        self.n_intervalos = BufferCircular(retencao_minutos, "L")
+        self.minimos = BufferCircular(retencao_minutos)
+        self.somas = BufferCircular(retencao_minutos)
+        self.maximos = BufferCircular(retencao_minutos)
+        self._minuto = None
+        self._minuto_agregado = [0, 0, math.inf, 0.0, 0.0]   # batimentos, intervalos, mínimo, soma, máximo
+        # Agregados de toda a vida do sensor
+        self.batimentos = 0
+        self.intervalo_min = math.inf
+        self.intervalo_max = 0.0
+        self._soma = 0.0
+        self._soma_quadrados = 0.0
+        self.ultimo = None
+        self.ultimas_metricas = dict.fromkeys(METRICAS, 0)
+        # Uptime: tempo acumulado em UP desde o primeiro batimento
+        self.primeiro = None
+        self.estado = UP
+        self._estado_desde = None
+        self._tempo_up = 0.0
+
+    def registra(self, agora, metricas=None):
+        intervalo = agora - self.ultimo if self.ultimo is not None else None
+        if self.primeiro is None:
+            self.primeiro = self._estado_desde = agora
+        self.ultimo = agora
+        self.batimentos += 1
+        if metricas:
+            self.ultimas_metricas.update(metricas)
+        self.instantes.adiciona(agora)
+        self.intervalos.adiciona(intervalo if intervalo is not None else math.nan)
+        for nome in METRICAS:
+            self.metricas[nome].adiciona(int(self.ultimas_metricas[nome]))
+        if intervalo is not None:
+            self.intervalo_min = min(self.intervalo_min, intervalo)
+            self.intervalo_max = max(self.intervalo_max, intervalo)
+            self._soma += intervalo
+            self._soma_quadrados += intervalo * intervalo
+        self._agrega_minuto(agora, intervalo)
+
+    def _agrega_minuto(self, agora, intervalo):
+        minuto = int(agora // 60) * 60
+        if self._minuto is not None and minuto != self._minuto:
+            self._fecha_minuto()
+        self._minuto = minuto
+        agregado = self._minuto_agregado
+        agregado[0] += 1
+        if intervalo is not None:
+            agregado[1] += 1
+            agregado[2] = min(agregado[2], intervalo)
+            agregado[3] += intervalo
+            agregado[4] = max(agregado[4], intervalo)
+
+    def _fecha_minuto(self):
+        contagem, n_intervalos, minimo, soma, maximo = self._minuto_agregado
+        self.minutos.adiciona(self._minuto)
+        self.contagens.adiciona(contagem)
+        self.n_intervalos.adiciona(n_intervalos)
+        self.minimos.adiciona(minimo)
+        self.somas.adiciona(soma)
+        self.maximos.adiciona(maximo)
+        self._minuto_agregado = [0, 0, math.inf, 0.0, 0.0]
+
+    def transiciona(self, novo, agora):
+        if self._estado_desde is None:
+            self.estado = novo
+            return
+        if self.estado == UP:
+            self._tempo_up += agora - self._estado_desde
+        self.estado = novo
+        self._estado_desde = agora
+
+    # --- Consulta ---
+    def resumo(self, agora):
+        n = max(self.batimentos - 1, 0)
+        media = self._soma / n if n else None
+        jitter = math.sqrt(max(self._soma_quadrados / n - media * media, 0.0)) if n else None
+        tempo_up = self._tempo_up + (agora - self._estado_desde if self.estado == UP and self._estado_desde else 0.0)
+        total = agora - self.primeiro if self.primeiro is not None else 0.0
+        return {
+            "estado": self.estado,
+            "ultimo": self.ultimo,
+            "batimentos": self.batimentos,
+            "intervalo_min": self.intervalo_min if n else None,
+            "intervalo_medio": media,
+            "intervalo_max": self.intervalo_max if n else None,
+            "jitter": jitter,
+            "uptime": 100.0 * tempo_up / total if total > 0 else 100.0,
+            **self.ultimas_metricas,
+        }
+
+    def pontos_brutos(self, desde=0.0):
+        """
+        Batimentos retidos a partir de ``desde``: [(instante, intervalo, {métricas})].
+        """
+        instantes = self.instantes.valores()
+        intervalos = self.intervalos.valores()
+        metricas = {nome: buffer.valores() for nome, buffer in self.metricas.items()}
+        return [(t, None if math.isnan(intervalos[i]) else intervalos[i],
+                 {nome: valores[i] for nome, valores in metricas.items()})
+                for i, t in enumerate(instantes) if t >= desde]
+
+    def pontos_por_minuto(self, desde=0.0):
+        """
+        Minutos agregados a partir de ``desde`` (inclui o minuto corrente):
+        [(início, contagem, mínimo, médio, máximo)].
+        """
+        pontos = list(zip(self.minutos.valores(), self.contagens.valores(), self.n_intervalos.valores(),
+                          self.minimos.valores(), self.somas.valores(), self.maximos.valores()))
+        if self._minuto is not None:
+            pontos.append((self._minuto, *self._minuto_agregado))
+        return [(inicio, contagem,
+                 minimo if n_intervalos else None,
+                 soma / n_intervalos if n_intervalos else None,
+                 maximo if n_intervalos else None)
+                for inicio, contagem, n_intervalos, minimo, soma, maximo in pontos
+                if inicio + 60 > desde]
+
+
+class ArmazemSeries:
+    """
+    Séries de todos os sensores, com acesso serializado por um lock.
+    """
+
+    def __init__(self, retencao_bruta=1024, retencao_minutos=1440, relogio=time.time):
+        self.retencao_bruta = retencao_bruta
+        self.retencao_minutos = retencao_minutos
+        self.relogio = relogio
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _serie(self, sensor_id):
+        serie = self._series.get(sensor_id)
+        if serie is None:
+            serie = self._series[sensor_id] = SerieSensor(self.retencao_bruta, self.retencao_minutos)
+        return serie
+
+    def registra_batimento(self, sensor_id, metricas=None, agora=None):
+        agora = self.relogio() if agora is None else agora
+        with self._lock:
+            self._serie(sensor_id).registra(agora, metricas)
+
+    def registra_transicao(self, sensor_id, novo, agora=None):
+        agora = self.relogio() if agora is None else agora
+        with self._lock:
+            self._serie(sensor_id).transiciona(novo, agora)
+
+    def sensores(self):
+        with self._lock:
+            return sorted(self._series)
+
+    def resumo(self, sensor_id=None):
+        """
+        Resumo de um sensor (None se desconhecido) ou ``{sensor_id: resumo}`` de todos.
+        """
+        agora = self.relogio()
+        with self._lock:
+            if sensor_id is not None:
+                serie = self._series.get(sensor_id)
+                return serie.resumo(agora) if serie is not None else None
+            return {s_id: serie.resumo(agora) for s_id, serie in self._series.items()}
+
+    def pontos(self, sensor_id, desde=0.0, por_minuto=False):
+        with self._lock:
+            serie = self._series.get(sensor_id)
+            if serie is None:
+                return None
+            return serie.pontos_por_minuto(desde) if por_minuto else serie.pontos_brutos(desde)
+
+    def texto_prometheus(self):
+        """
+        Agregados de todos os sensores no formato de exposição texto do Prometheus.
+        """
+        resumos = self.resumo()
+        linhas = []
+
+        def metrica(nome, tipo, ajuda, chave, escala=1.0, inteiro=False):
+            linhas.append(f"# HELP sisd_{nome} {ajuda}")
+            linhas.append(f"# TYPE sisd_{nome} {tipo}")
+            for sensor_id in sorted(resumos):
+                valor = resumos[sensor_id][chave]
+                if valor is not None:
+                    # repr mantém a precisão total (epochs, relógios e tamanhos grandes)
+                    texto = str(int(valor)) if inteiro else repr(float(valor * escala))
+                    linhas.append(f'sisd_{nome}{{sensor="{sensor_id}"}} {texto}')
+
+        metrica("heartbeats_total", "counter", "Batimentos recebidos pelo monitor.", "batimentos", inteiro=True)
+        metrica("heartbeat_last_seen_seconds", "gauge", "Epoch do último batimento.", "ultimo")
+        metrica("heartbeat_interarrival_min_seconds", "gauge", "Menor intervalo entre batimentos.", "intervalo_min")
+        metrica("heartbeat_interarrival_avg_seconds", "gauge", "Intervalo médio entre batimentos.", "intervalo_medio")
+        metrica("heartbeat_interarrival_max_seconds", "gauge", "Maior intervalo entre batimentos.", "intervalo_max")
+        metrica("heartbeat_jitter_seconds", "gauge", "Desvio padrão dos intervalos entre batimentos.", "jitter")
+        metrica("uptime_ratio", "gauge", "Fração do tempo em UP desde o primeiro batimento.", "uptime", 0.01)
+        metrica("replication_queue_depth", "gauge", "Registros aguardando replicação para a cloud.", "queue_depth",
+                inteiro=True)
+        metrica("lamport_clock", "gauge", "Relógio de Lamport informado pelo sensor.", "lamport_clock", inteiro=True)
+        metrica("token_hold_milliseconds", "gauge", "Tempo de posse do token informado pelo sensor.", "token_hold_ms",
+                inteiro=True)
+        metrica("log_size_bytes", "gauge", "Tamanho do log local do sensor.", "log_size_bytes", inteiro=True)
+        linhas.append("# HELP sisd_sensor_state Estado de vivacidade do sensor (1 no estado atual).")
+        linhas.append("# TYPE sisd_sensor_state gauge")
+        for sensor_id in sorted(resumos):
+            for estado in (UP, SUSPECT, DOWN):
+                atual = 1 if resumos[sensor_id]["estado"] == estado else 0
+                linhas.append(f'sisd_sensor_state{{sensor="{sensor_id}",state="{estado}"}} {atual}')
+        return "\n".join(linhas) + "\n"
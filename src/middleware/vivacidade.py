@@ -0,0 +1,209 @@
+"""
+Rastreamento de vivacidade dos sensores no monitor do SISD.
+
+Responsabilidades:
+- Registrar o último batimento de cada sensor de forma segura entre as threads do gRPC.
+- Manter os prazos em um heap (um único item por sensor), de modo que cada verificação
+  custe O(prazos vencidos) em vez de percorrer todos os sensores.
+- Emitir apenas transições de estado: UP -> SUSPECT -> DOWN -> UP.
+- Aceitar timeouts por sensor (suspeita e queda).
+
+O heap é reagendado de forma preguiçosa: um batimento só atualiza o horário do último
+contato; quando o prazo antigo vence, o sensor é reinserido com o prazo real.
+"""
+
+import heapq
+import threading
+import time
+
+UP = "UP"
+SUSPECT = "SUSPECT"
+DOWN = "DOWN"
+
+
+class _Sensor:
+    __slots__ = ("ultimo", "estado", "timeout_suspeita", "timeout_queda", "prazo")
+
+    def __init__(self, agora, timeout_suspeita, timeout_queda):
+        self.ultimo = agora
+        self.estado = UP
+        self.timeout_suspeita = timeout_suspeita
+        self.timeout_queda = timeout_queda
+        self.prazo = None        # prazo da entrada válida no heap (None: fora do heap)
+
+
+class RastreadorVivacidade:
+    """
+    Estado de vivacidade dos sensores com prazos em heap.
+
+    ``ao_transicionar(sensor_id, anterior, novo, desde_ultimo)`` é chamado fora do lock a
+    cada transição (``anterior`` é None quando o sensor aparece pela primeira vez).
+    """
+
+    def __init__(self, timeout_suspeita=20.0, timeout_queda=60.0, timeouts=None,
+                 ao_transicionar=None, relogio=time.monotonic):
+        self.timeout_suspeita = timeout_suspeita
+        self.timeout_queda = timeout_queda
+        self.timeouts = dict(timeouts or {})   # sensor_id -> (suspeita, queda)
+        self.ao_transicionar = ao_transicionar
+        self.relogio = relogio
+        self._cond = threading.Condition()
+        self._sensores = {}
+        self._heap = []          # (prazo, sensor_id)
+        self._parar = False
+        self._thread = None
+        self._contadores = {"batimentos": 0, "verificacoes": 0, "vencidos": 0, "transicoes": 0}
+
+    # --- Configuração ---
+    def define_timeout(self, sensor_id, suspeita, queda=None):
+        """
+        Define os timeouts de um sensor (queda padrão: 3x a suspeita); vale a partir do próximo prazo.
+        """
+        queda = queda if queda is not None else 3 * suspeita
+        with self._cond:
+            self.timeouts[sensor_id] = (suspeita, queda)
+            sensor = self._sensores.get(sensor_id)
+            if sensor is not None:
+                sensor.timeout_suspeita, sensor.timeout_queda = suspeita, queda
+                self._agenda(sensor_id, sensor)
+
+    # --- Produtores (threads do gRPC) ---
+    def registra(self, sensor_id, agora=None):
+        """
+        Registra um batimento; emite a transição se o sensor era novo, suspeito ou caído.
+        """
+        agora = self.relogio() if agora is None else agora
+        transicao = None
+        with self._cond:
+            self._contadores["batimentos"] += 1
+            sensor = self._sensores.get(sensor_id)
+            if sensor is None:
+                suspeita, queda = self.timeouts.get(sensor_id, (self.timeout_suspeita, self.timeout_queda))
+                sensor = self._sensores[sensor_id] = _Sensor(agora, suspeita, queda)
+                transicao = (sensor_id, None, UP, 0.0)
+            else:
+                if sensor.estado != UP:
+                    transicao = (sensor_id, sensor.estado, UP, agora - sensor.ultimo)
+                    sensor.estado = UP
+                sensor.ultimo = agora
+            if sensor.prazo is None:
+                self._agenda(sensor_id, sensor)
+        if transicao is not None:
+            self._emite([transicao])
+
+    def _agenda(self, sensor_id, sensor):
+        # Chamado com o lock: prazo da próxima transição possível a partir do estado atual
+        timeout = sensor.timeout_suspeita if sensor.estado == UP else sensor.timeout_queda
+        prazo = sensor.ultimo + timeout
+        acorda = not self._heap or prazo < self._heap[0][0]
+        heapq.heappush(self._heap, (prazo, sensor_id))
+        sensor.prazo = prazo
+        if acorda:
+            self._cond.notify()
+
+    # --- Verificação ---
+    def verifica(self, agora=None):
+        """
+        Processa os prazos vencidos e retorna a lista de transições emitidas.
+        """
+        agora = self.relogio() if agora is None else agora
+        transicoes = []
+        with self._cond:
+            self._contadores["verificacoes"] += 1
+            heap = self._heap
+            while heap and heap[0][0] <= agora:
+                prazo, sensor_id = heapq.heappop(heap)
+                self._contadores["vencidos"] += 1
+                sensor = self._sensores.get(sensor_id)
+                # Entradas substituídas (define_timeout) não correspondem ao prazo atual
+                if sensor is None or sensor.prazo != prazo:
+                    continue
+                sensor.prazo = None
+                silencio = agora - sensor.ultimo
+                if silencio >= sensor.timeout_queda:
+                    novo = DOWN
+                elif silencio >= sensor.timeout_suspeita:
+                    novo = SUSPECT
+                else:
+                    novo = sensor.estado
+                if novo != sensor.estado:
+                    transicoes.append((sensor_id, sensor.estado, novo, silencio))
+                    sensor.estado = novo
+                if sensor.estado != DOWN:
+                    self._agenda(sensor_id, sensor)
+            self._contadores["transicoes"] += len(transicoes)
+        if transicoes:
+            self._emite(transicoes)
+        return transicoes
+
+    def _emite(self, transicoes):
+        if self.ao_transicionar is None:
+            return
+        for transicao in transicoes:
+            try:
+                self.ao_transicionar(*transicao)
+            except Exception as e:
+                print(f"[Monitor] Erro no callback de transição: {e}")
+
+    def proximo_prazo(self):
+        with self._cond:
+            return self._heap[0][0] if self._heap else None
+
+    # --- Thread de verificação ---
+    def inicia(self):
+        self._thread = threading.Thread(target=self._executa, daemon=True)
+        self._thread.start()
+
+    def para(self):
+        with self._cond:
+            self._parar = True
+            self._cond.notify_all()
+
+    def _executa(self):
+        while True:
+            with self._cond:
+                while not self._parar:
+                    espera = self._heap[0][0] - self.relogio() if self._heap else None
+                    if espera is not None and espera <= 0:
+                        break
+                    self._cond.wait(espera)
+                if self._parar:
+                    return
+            self.verifica()
+
+    # --- Consulta ---
+    def estado(self, sensor_id):
+        with self._cond:
+            sensor = self._sensores.get(sensor_id)
+            return sensor.estado if sensor is not None else None
+
+    def estados(self):
+        """
+        Retorna ``{sensor_id: (estado, segundos desde o último batimento)}``.
+        """
+        agora = self.relogio()
+        with self._cond:
+            return {s_id: (s.estado, agora - s.ultimo) for s_id, s in self._sensores.items()}
+
+    def estatisticas(self):
+        with self._cond:
+            stats = dict(self._contadores)
+            stats["sensores"] = len(self._sensores)
+            stats["heap"] = len(self._heap)
+            for estado in (UP, SUSPECT, DOWN):
+                stats[estado.lower()] = sum(1 for s in self._sensores.values() if s.estado == estado)
+        return stats
+
+
+def timeouts_do_ambiente(valor):
+    """
+    Lê timeouts por sensor no formato "sensor_5000=5:15,sensor_5001=8" (suspeita[:queda], em segundos).
+    """
+    timeouts = {}
+    for item in (valor or "").split(","):
+        if not item.strip():
+            continue
+        sensor_id, _, tempos = item.strip().partition("=")
+        suspeita, _, queda = tempos.partition(":")
+        timeouts[sensor_id] = (float(suspeita), float(queda) if queda else 3 * float(suspeita))
+    return timeouts
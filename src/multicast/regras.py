@@ -0,0 +1,229 @@
+"""
+Detecção de clima extremo por regras avaliadas a cada leitura do sensor.
+
+Responsabilidades:
+- Carregar as regras de um arquivo JSON: limiar sobre o valor lido, taxa de variação
+  entre leituras consecutivas e agregados em janela deslizante (média, mínimo, máximo,
+  desvio padrão ou amplitude das últimas N leituras).
+- Manter os agregados de janela de forma incremental, em O(1) por leitura (somas e
+  filas monotônicas), compartilhados entre as regras que usam a mesma grandeza e o mesmo
+  tamanho de janela, em vez de percorrer o histórico a cada avaliação.
+- Avaliar as regras com histerese e reportar apenas as mudanças de estado (a regra
+  disparou ou voltou ao normal), que o sensor publica como alertas multicast.
+
+Formato de uma regra (JSON):
+    {"id": 1, "nome": "calor_extremo", "tipo": "limiar", "grandeza": "temperatura",
+     "operador": ">", "valor": 38, "histerese": 1, "severidade": "critico"}
+    {"id": 2, "tipo": "variacao", "grandeza": "pressao", "operador": "<", "valor": -0.5}
+    {"id": 3, "tipo": "janela", "grandeza": "umidade", "agregado": "media", "leituras": 30,
+     "operador": "<", "valor": 20, "severidade": "aviso"}
+
+A variação é medida por segundo; a regra de janela só é avaliada com a janela cheia.
+"""
+
+import collections
+import json
+import math
+import os
+import threading
+
+from multicast.sensor_alert import SEVERIDADE_AVISO, SEVERIDADE_CRITICO
+
+GRANDEZAS = ("temperatura", "umidade", "pressao")
+TIPOS = ("limiar", "variacao", "janela")
+AGREGADOS = ("media", "min", "max", "desvio", "amplitude")
+SEVERIDADES = {"aviso": SEVERIDADE_AVISO, "critico": SEVERIDADE_CRITICO}
+
+
+class ErroRegra(ValueError):
+    """
+    Regra inválida no arquivo de regras.
+    """
+
+
+class JanelaDeslizante:
+    """
+    Agregados das últimas ``tamanho`` leituras de uma grandeza, atualizados em O(1).
+
+    Soma e soma dos quadrados dão média e desvio; mínimo e máximo vêm de filas monotônicas
+    de (índice, valor). As somas são recalculadas de tempos em tempos para não acumular
+    erro de arredondamento.
+    """
+
+    def __init__(self, tamanho):
+        self.tamanho = tamanho
+        self.valores = collections.deque()
+        self.soma = 0.0
+        self.soma_quadrados = 0.0
+        self._indice = 0
+        self._minimos = collections.deque()
+        self._maximos = collections.deque()
+
+    def adiciona(self, valor):
+        self._indice += 1
+        self.valores.append(valor)
+        self.soma += valor
+        self.soma_quadrados += valor * valor
+        if len(self.valores) > self.tamanho:
+            antigo = self.valores.popleft()
+            self.soma -= antigo
+            self.soma_quadrados -= antigo * antigo
+        while self._minimos and self._minimos[-1][1] >= valor:
+            self._minimos.pop()
+        self._minimos.append((self._indice, valor))
+        while self._maximos and self._maximos[-1][1] <= valor:
+            self._maximos.pop()
+        self._maximos.append((self._indice, valor))
+        limite = self._indice - self.tamanho
+        if self._minimos[0][0] <= limite:
+            self._minimos.popleft()
+        if self._maximos[0][0] <= limite:
+            self._maximos.popleft()
+        if self._indice % (self.tamanho * 64) == 0:
+            self.soma = math.fsum(self.valores)
+            self.soma_quadrados = math.fsum(v * v for v in self.valores)
+
+    def cheia(self):
+        return len(self.valores) == self.tamanho
+
+    def media(self):
+        return self.soma / len(self.valores)
+
+    def minimo(self):
+        return self._minimos[0][1]
+
+    def maximo(self):
+        return self._maximos[0][1]
+
+    def desvio(self):
+        n = len(self.valores)
+        media = self.soma / n
+        return math.sqrt(max(self.soma_quadrados / n - media * media, 0.0))
+
+    def amplitude(self):
+        return self._maximos[0][1] - self._minimos[0][1]
+
+    def agregado(self, nome):
+        return {"media": self.media, "min": self.minimo, "max": self.maximo,
+                "desvio": self.desvio, "amplitude": self.amplitude}[nome]
+
+
+class Regra:
+    """
+    Regra carregada do JSON. A condição é normalizada para ``sinal * x > disparo``
+    (dispara) e ``sinal * x <= disparo - histerese`` (volta ao normal).
+    """
+
+    def __init__(self, definicao):
+        try:
+            self.id = int(definicao["id"])
+            self.tipo = definicao["tipo"]
+            self.grandeza = definicao["grandeza"]
+            operador = definicao.get("operador", ">")
+            valor = float(definicao["valor"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ErroRegra(f"Regra incompleta {definicao}: {e}") from e
+        self.nome = definicao.get("nome", f"regra_{self.id}")
+        if not 0 < self.id < 1 << 16:
+            raise ErroRegra(f"Id de regra fora de 1..65535: {self.id}")
+        if self.tipo not in TIPOS or self.grandeza not in GRANDEZAS or operador not in (">", "<"):
+            raise ErroRegra(f"Tipo, grandeza ou operador inválido na regra {self.nome}")
+        self.severidade = SEVERIDADES.get(definicao.get("severidade", "aviso"))
+        if self.severidade is None:
+            raise ErroRegra(f"Severidade inválida na regra {self.nome}: {definicao.get('severidade')}")
+        self.agregado = definicao.get("agregado", "media")
+        self.leituras = int(definicao.get("leituras", 1))
+        if self.tipo == "janela" and (self.agregado not in AGREGADOS or self.leituras < 2):
+            raise ErroRegra(f"Janela inválida na regra {self.nome}")
+        self.sinal = 1.0 if operador == ">" else -1.0
+        self.disparo = self.sinal * valor
+        self.normal = self.disparo - abs(float(definicao.get("histerese", 0.0)))
+        self.ativa = False
+
+
+class MotorRegras:
+    """
+    Avalia as regras a cada leitura e retorna as transições de estado.
+    """
+
+    def __init__(self, regras):
+        self.regras = list(regras)
+        ids = [regra.id for regra in self.regras]
+        if len(ids) != len(set(ids)):
+            raise ErroRegra("Ids de regra repetidos")
+        self._lock = threading.Lock()
+        self._anterior = None
+        # Uma janela por (grandeza, tamanho), compartilhada pelas regras
+        self.janelas = {}
+        self._avaliacoes = []
+        for regra in self.regras:
+            indice = GRANDEZAS.index(regra.grandeza)
+            if regra.tipo == "janela":
+                chave = (indice, regra.leituras)
+                janela = self.janelas.get(chave)
+                if janela is None:
+                    janela = self.janelas[chave] = JanelaDeslizante(regra.leituras)
+                self._avaliacoes.append((regra, "janela", janela, janela.agregado(regra.agregado)))
+            else:
+                self._avaliacoes.append((regra, regra.tipo, indice, None))
+
+    def avalia(self, temperatura, umidade, pressao, timestamp):
+        """
+        Aplica uma leitura; retorna ``[(regra, ativa, valor_observado)]`` só das regras que
+        mudaram de estado.
+        """
+        valores = (temperatura, umidade, pressao)
+        transicoes = []
+        with self._lock:
+            variacoes = None
+            if self._anterior is not None and timestamp > self._anterior[0]:
+                intervalo = timestamp - self._anterior[0]
+                variacoes = [(v - a) / intervalo for v, a in zip(valores, self._anterior[1])]
+            self._anterior = (timestamp, valores)
+            for (indice, _), janela in self.janelas.items():
+                janela.adiciona(valores[indice])
+            for regra, tipo, fonte, agregado in self._avaliacoes:
+                if tipo == "limiar":
+                    x = valores[fonte]
+                elif tipo == "variacao":
+                    if variacoes is None:
+                        continue
+                    x = variacoes[fonte]
+                elif fonte.cheia():
+                    x = agregado()
+                else:
+                    continue
+                if regra.ativa:
+                    if regra.sinal * x <= regra.normal:
+                        regra.ativa = False
+                        transicoes.append((regra, False, x))
+                elif regra.sinal * x > regra.disparo:
+                    regra.ativa = True
+                    transicoes.append((regra, True, x))
+        return transicoes
+
+    def ativas(self):
+        with self._lock:
+            return [regra for regra in self.regras if regra.ativa]
+
+
+def carrega_regras(caminho):
+    """
+    Lê a lista de regras de um arquivo JSON.
+    """
+    with open(caminho, "r", encoding="utf-8") as f:
+        definicoes = json.load(f)
+    if not isinstance(definicoes, list):
+        raise ErroRegra(f"{caminho}: esperado uma lista de regras")
+    return [Regra(definicao) for definicao in definicoes]
+
+
+def abre_motor_regras(caminho_padrao):
+    """
+    Cria o MotorRegras com as regras de SISD_REGRAS_ARQUIVO (ou ``caminho_padrao``);
+    sem arquivo, o motor fica sem regras.
+    """
+    caminho = os.environ.get("SISD_REGRAS_ARQUIVO", caminho_padrao)
+    if not caminho or not os.path.exists(caminho):
+        return MotorRegras([])
+    return MotorRegras(carrega_regras(caminho))
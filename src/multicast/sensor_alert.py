@@ -1,44 +1,479 @@
 """
-Módulo de envio de alertas climáticos via UDP Multicast.
+Alertas climáticos do SISD via UDP multicast.
 
 Responsabilidades:
-- Enviar mensagens de alerta para um grupo multicast.
-- Simular detecção de clima extremo.
+- Publicar alertas em datagramas binários compactos por um socket de longa duração
+  (``PublicadorAlertas``), agrupando num mesmo datagrama os alertas disparados juntos.
+- Numerar os alertas por sensor e anunciar periodicamente a última sequência publicada,
+  para que o receptor perceba também a perda dos últimos alertas de uma rajada.
+- Receber os alertas (``AssinanteAlertas``): detectar lacunas na sequência de cada sensor,
+  descartar datagramas duplicados e limitar a repetição do mesmo alerta em uma janela.
+- Linha de comando para escutar o grupo ou simular alertas.
+
+Formato do datagrama (big-endian):
+    4s magia | uint8 versão | uint8 tipo | uint16 quantidade | uint32 época do publicador
+    TIPO_ALERTAS: quantidade x (uint32 id do sensor | uint32 sequência | uint8 severidade |
+                  uint16 regra | float64 timestamp | 3 x float32 temperatura, umidade, pressão)
+    TIPO_RESUMO:  quantidade x (uint32 id do sensor | uint32 última sequência)
+
+A época muda a cada início do publicador: o receptor reinicia a numeração do sensor em vez
+de tratar a nova sequência como duplicada.
 """
 
+import collections
+import os
+import queue
+import random
 import socket
 import struct
+import sys
+import threading
 import time
 
 # Endereço multicast e porta
-MCAST_GRP = '224.1.1.1'
-MCAST_PORT = 5007
+MCAST_GRP = os.environ.get("SISD_MULTICAST_GRUPO", "224.1.1.1")
+MCAST_PORT = int(os.environ.get("SISD_MULTICAST_PORTA", 5007))
+
+DATAGRAMA = struct.Struct(">4sBBHI")
+ALERTA = struct.Struct(">IIBHdfff")
+RESUMO = struct.Struct(">II")
+MAGIA_ALERTA = b"SIAL"
+VERSAO_ALERTA = 1
+
+TIPO_ALERTAS = 1
+TIPO_RESUMO = 2
+
+SEVERIDADE_NORMALIZADO = 0
+SEVERIDADE_AVISO = 1
+SEVERIDADE_CRITICO = 2
+NOMES_SEVERIDADE = {SEVERIDADE_NORMALIZADO: "normalizado", SEVERIDADE_AVISO: "aviso",
+                    SEVERIDADE_CRITICO: "crítico"}
+
+TAMANHO_MAX_DATAGRAMA = 1400   # cabe num quadro Ethernet sem fragmentar
+LIMITE_LACUNAS = 4096          # sequências faltantes lembradas por sensor
+
+Alerta = collections.namedtuple("Alerta", "sensor_id sequencia severidade regra timestamp temperatura umidade pressao")
+
+
+class ErroAlerta(ValueError):
+    """
+    Datagrama de alerta malformado.
+    """
+
+
+def codifica_alertas(alertas, epoca):
+    """
+    Monta um datagrama TIPO_ALERTAS com os alertas informados.
+    """
+    return DATAGRAMA.pack(MAGIA_ALERTA, VERSAO_ALERTA, TIPO_ALERTAS, len(alertas), epoca) + b"".join(
+        ALERTA.pack(*alerta) for alerta in alertas)
+
+
+def codifica_resumo(ultimas, epoca):
+    """
+    Monta um datagrama TIPO_RESUMO com ``{sensor_id: última sequência}``.
+    """
+    return DATAGRAMA.pack(MAGIA_ALERTA, VERSAO_ALERTA, TIPO_RESUMO, len(ultimas), epoca) + b"".join(
+        RESUMO.pack(sensor_id, sequencia) for sensor_id, sequencia in ultimas.items())
+
+
+def decodifica_datagrama(dados):
+    """
+    Retorna ``(tipo, epoca, itens)``: alertas (``Alerta``) ou pares (sensor_id, última sequência).
+    """
+    if len(dados) < DATAGRAMA.size:
+        raise ErroAlerta(f"Datagrama curto demais: {len(dados)} bytes")
+    magia, versao, tipo, quantidade, epoca = DATAGRAMA.unpack_from(dados)
+    if magia != MAGIA_ALERTA or versao != VERSAO_ALERTA:
+        raise ErroAlerta("Magia ou versão de alerta desconhecida")
+    formato = {TIPO_ALERTAS: ALERTA, TIPO_RESUMO: RESUMO}.get(tipo)
+    if formato is None:
+        raise ErroAlerta(f"Tipo de datagrama desconhecido: {tipo}")
+    if len(dados) != DATAGRAMA.size + quantidade * formato.size:
+        raise ErroAlerta(f"Datagrama com tamanho inválido para {quantidade} itens: {len(dados)} bytes")
+    itens = list(formato.iter_unpack(dados[DATAGRAMA.size:]))
+    if tipo == TIPO_ALERTAS:
+        itens = [Alerta(*valores) for valores in itens]
+    return tipo, epoca, itens
+
+
+def descreve_alerta(alerta):
+    return (f"sensor_{alerta.sensor_id} #{alerta.sequencia} {NOMES_SEVERIDADE.get(alerta.severidade, alerta.severidade)} "
+            f"(regra {alerta.regra}): {alerta.temperatura:.1f} °C, {alerta.umidade:.1f} %, {alerta.pressao:.1f} hPa")
+
+
+class PublicadorAlertas:
+    """
+    Publica alertas no grupo multicast por um único socket UDP.
+
+    ``publica`` só enfileira: uma thread de envio espera ``atraso_lote`` segundos a partir
+    do primeiro alerta pendente e envia todos os pendentes no menor número de datagramas.
+    Cada lote é enviado ``repeticoes`` vezes, uma rodada depois da outra (o receptor descarta
+    as cópias); ``taxa_max`` limita os datagramas por segundo, para que uma rajada não
+    transborde o buffer dos assinantes. A cada ``intervalo_resumo`` segundos sai um resumo
+    com a última sequência de cada sensor.
+    """
+
+    def __init__(self, grupo=MCAST_GRP, porta=MCAST_PORT, ttl=1, atraso_lote=0.005, repeticoes=1,
+                 taxa_max=0, intervalo_resumo=5.0, tamanho_max=TAMANHO_MAX_DATAGRAMA, max_pendentes=65536):
+        self.destino = (grupo, porta)
+        self.atraso_lote = atraso_lote
+        self.repeticoes = max(repeticoes, 1)
+        self.intervalo_datagramas = 1.0 / taxa_max if taxa_max > 0 else 0.0
+        self._proximo_envio = 0.0
+        self.intervalo_resumo = intervalo_resumo
+        self.alertas_por_datagrama = max((tamanho_max - DATAGRAMA.size) // ALERTA.size, 1)
+        self.max_pendentes = max_pendentes
+        self.epoca = random.getrandbits(32)
+        self.ativo = True
+        self._cond = threading.Condition()
+        self._pendentes = []
+        self._sequencias = {}
+        self._contadores = collections.Counter()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        # TTL 1 restringe os alertas à rede local
+        self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, struct.pack("b", ttl))
+        self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        self._thread = threading.Thread(target=self._envia, name="alertas-envio", daemon=True)
+        self._thread.start()
+
+    def publica(self, sensor_id, severidade, temperatura, umidade, pressao, regra=0, timestamp=None):
+        """
+        Enfileira um alerta do sensor (id numérico) e retorna a sequência atribuída.
+        """
+        with self._cond:
+            sequencia = self._sequencias.get(sensor_id, 0) + 1
+            self._sequencias[sensor_id] = sequencia
+            if len(self._pendentes) >= self.max_pendentes:
+                # Fila cheia: o mais antigo é perdido e o receptor vê a lacuna
+                self._pendentes.pop(0)
+                self._contadores["descartados"] += 1
+            self._pendentes.append((sensor_id, sequencia, severidade, regra,
+                                    time.time() if timestamp is None else timestamp,
+                                    temperatura, umidade, pressao))
+            self._contadores["publicados"] += 1
+            if len(self._pendentes) == 1 or len(self._pendentes) >= self.alertas_por_datagrama:
+                self._cond.notify()
+        return sequencia
+
+    def descarrega(self, timeout=5.0):
+        """
+        Espera até que todos os alertas enfileirados tenham sido enviados.
+        """
+        limite = time.monotonic() + timeout
+        with self._cond:
+            while self._pendentes and time.monotonic() < limite:
+                self._cond.notify()
+                self._cond.wait(0.01)
+            return not self._pendentes
+
+    def fecha(self):
+        self.descarrega()
+        with self._cond:
+            self.ativo = False
+            self._cond.notify_all()
+        self._thread.join()
+        self._sock.close()
+
+    def estatisticas(self):
+        with self._cond:
+            return dict(self._contadores)
+
+    def _envia(self):
+        proximo_resumo = time.monotonic() + self.intervalo_resumo
+        while True:
+            with self._cond:
+                while self.ativo and not self._pendentes and time.monotonic() < proximo_resumo:
+                    self._cond.wait(max(proximo_resumo - time.monotonic(), 0))
+                if not self.ativo:
+                    return
+                if self._pendentes and len(self._pendentes) < self.alertas_por_datagrama:
+                    # Espera os alertas disparados junto com o primeiro (ou o lote encher)
+                    self._cond.wait(self.atraso_lote)
+                lote, self._pendentes = self._pendentes, []
+                ultimas = dict(self._sequencias)
+                self._cond.notify_all()
+            datagramas = [codifica_alertas(lote[i:i + self.alertas_por_datagrama], self.epoca)
+                          for i in range(0, len(lote), self.alertas_por_datagrama)]
+            if time.monotonic() >= proximo_resumo:
+                proximo_resumo = time.monotonic() + self.intervalo_resumo
+                if ultimas:
+                    datagramas.extend(codifica_resumo(dict(parte), self.epoca)
+                                      for parte in _fatias(list(ultimas.items()),
+                                                           (TAMANHO_MAX_DATAGRAMA - DATAGRAMA.size) // RESUMO.size))
+            self._transmite(datagramas)
+
+    def _transmite(self, datagramas):
+        for datagrama in datagramas * self.repeticoes:
+            if self.intervalo_datagramas:
+                agora = time.monotonic()
+                if self._proximo_envio > agora:
+                    time.sleep(self._proximo_envio - agora)
+                self._proximo_envio = max(self._proximo_envio, agora) + self.intervalo_datagramas
+            try:
+                self._sock.sendto(datagrama, self.destino)
+                self._contadores["datagramas"] += 1
+            except OSError as e:
+                self._contadores["erros_envio"] += 1
+                print(f"[Sensor Alert] Falha ao enviar alerta: {e}")
 
-def enviar_alerta(mensagem):
+
+def _fatias(itens, tamanho):
+    return [itens[i:i + tamanho] for i in range(0, len(itens), tamanho)]
+
+
+class EstadoSequencia:
     """
-    Envia uma mensagem de alerta para o grupo multicast.
+    Sequências vistas de um sensor: a maior recebida e as faltantes (limitadas).
+    """
+
+    def __init__(self, epoca, sequencia):
+        self.epoca = epoca
+        self.maior = sequencia
+        self.faltando = set()
+
+    def registra(self, sequencia):
+        """
+        Retorna ``(nova, lacuna)``: se a sequência ainda não tinha sido vista e, quando ela
+        salta à frente, o intervalo ``(de, ate)`` de sequências que faltam.
+        """
+        if sequencia > self.maior:
+            lacuna = None
+            if sequencia > self.maior + 1:
+                lacuna = (self.maior + 1, sequencia - 1)
+                self._lembra_faltantes(*lacuna)
+            self.maior = sequencia
+            return True, lacuna
+        if sequencia in self.faltando:
+            # Chegou fora de ordem (ou pela repetição do datagrama)
+            self.faltando.discard(sequencia)
+            return True, None
+        return False, None
+
+    def avanca(self, ultima):
+        """
+        Aplica a última sequência anunciada num resumo; retorna a lacuna, se houver.
+        """
+        if ultima <= self.maior:
+            return None
+        lacuna = (self.maior + 1, ultima)
+        self._lembra_faltantes(*lacuna)
+        self.maior = ultima
+        return lacuna
+
+    def _lembra_faltantes(self, de, ate):
+        self.faltando.update(range(max(de, ate - LIMITE_LACUNAS + 1), ate + 1))
+        if len(self.faltando) > LIMITE_LACUNAS:
+            for sequencia in sorted(self.faltando)[:len(self.faltando) - LIMITE_LACUNAS]:
+                self.faltando.discard(sequencia)
+
+
+class AssinanteAlertas:
     """
-    # Cria um socket UDP
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-    # Define o TTL (Time to Live) para 1 para restringir a mensagem à rede local
-    ttl = struct.pack('b', 1)
-    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+    Recebe os alertas do grupo multicast.
+
+    ``ao_alerta(alerta)`` é chamado uma vez por alerta novo (datagramas repetidos e alertas
+    iguais, mesmo sensor, regra e severidade, dentro de ``janela_repeticao`` segundos não
+    são entregues) e ``ao_lacuna(sensor_id, de, ate)`` quando faltam sequências.
+    ``processa(dados)`` pode ser usado sem socket, com datagramas obtidos de outra forma.
+    """
+
+    def __init__(self, grupo=MCAST_GRP, porta=MCAST_PORT, ao_alerta=None, ao_lacuna=None,
+                 janela_repeticao=10.0, buffer_recepcao=1 << 20, abrir_socket=True):
+        self.grupo = grupo
+        self.porta = porta
+        self.ao_alerta = ao_alerta
+        self.ao_lacuna = ao_lacuna
+        self.janela_repeticao = janela_repeticao
+        self.ativo = True
+        self._lock = threading.Lock()
+        self._sensores = {}
+        self._ultimas_entregas = {}
+        self._contadores = collections.Counter()
+        self._fila = queue.SimpleQueue()
+        self._threads = []
+        self._sock = None
+        if abrir_socket:
+            self._sock = self._abre_socket(buffer_recepcao)
+
+    def _abre_socket(self, buffer_recepcao):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            # Vários assinantes no mesmo host (sensores e cliente)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buffer_recepcao)
+        sock.bind(("", self.porta))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                        struct.pack("4sl", socket.inet_aton(self.grupo), socket.INADDR_ANY))
+        # Timeout na recepção para a thread perceber o encerramento
+        sock.settimeout(0.5)
+        return sock
+
+    def inicia(self):
+        # A recepção só esvazia o buffer do socket; decodificar e entregar fica em outra
+        # thread, para que uma rajada não transborde o buffer enquanto os alertas são tratados
+        for alvo, nome in ((self._recebe, "alertas-recepcao"), (self._trata, "alertas-tratamento")):
+            t = threading.Thread(target=alvo, name=nome, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def para(self):
+        self.ativo = False
+        for t in self._threads:
+            t.join()
+        if self._sock is not None:
+            self._sock.close()
+
+    def _recebe(self):
+        while self.ativo:
+            try:
+                self._fila.put(self._sock.recv(65535))
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+
+    def _trata(self):
+        while self.ativo or not self._fila.empty():
+            try:
+                dados = self._fila.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.processa(dados)
+
+    def processa(self, dados, agora=None):
+        """
+        Trata um datagrama e retorna os alertas entregues.
+        """
+        try:
+            tipo, epoca, itens = decodifica_datagrama(dados)
+        except ErroAlerta:
+            with self._lock:
+                self._contadores["invalidos"] += 1
+            return []
+        agora = time.monotonic() if agora is None else agora
+        entregues, lacunas = [], []
+        with self._lock:
+            self._contadores["datagramas"] += 1
+            if tipo == TIPO_RESUMO:
+                for sensor_id, ultima in itens:
+                    lacuna = self._estado(sensor_id, epoca, ultima).avanca(ultima)
+                    if lacuna is not None:
+                        lacunas.append((sensor_id,) + lacuna)
+            else:
+                for alerta in itens:
+                    estado = self._estado(alerta.sensor_id, epoca, alerta.sequencia - 1)
+                    if alerta.sequencia in estado.faltando:
+                        # Já contada como perdida: chegou fora de ordem
+                        self._contadores["perdidos"] -= 1
+                        self._contadores["atrasados"] += 1
+                    nova, lacuna = estado.registra(alerta.sequencia)
+                    if lacuna is not None:
+                        lacunas.append((alerta.sensor_id,) + lacuna)
+                    if not nova:
+                        self._contadores["duplicados"] += 1
+                        continue
+                    self._contadores["recebidos"] += 1
+                    chave = (alerta.sensor_id, alerta.regra, alerta.severidade)
+                    anterior = self._ultimas_entregas.get(chave)
+                    if anterior is not None and agora - anterior < self.janela_repeticao:
+                        self._contadores["suprimidos"] += 1
+                        continue
+                    self._ultimas_entregas[chave] = agora
+                    entregues.append(alerta)
+            for _, de, ate in lacunas:
+                self._contadores["perdidos"] += ate - de + 1
+            self._contadores["entregues"] += len(entregues)
+        for sensor_id, de, ate in lacunas:
+            if self.ao_lacuna is not None:
+                self.ao_lacuna(sensor_id, de, ate)
+        if self.ao_alerta is not None:
+            for alerta in entregues:
+                self.ao_alerta(alerta)
+        return entregues
+
+    def _estado(self, sensor_id, epoca, maior_inicial):
+        estado = self._sensores.get(sensor_id)
+        if estado is None or estado.epoca != epoca:
+            # Primeiro contato ou publicador reiniciado: começa a contar a partir daqui
+            estado = self._sensores[sensor_id] = EstadoSequencia(epoca, maior_inicial)
+        return estado
+
+    def estatisticas(self):
+        """
+        Contadores de datagramas e alertas; ``perdidos`` desconta as sequências que
+        chegaram depois fora de ordem.
+        """
+        with self._lock:
+            estatisticas = dict(self._contadores)
+            estatisticas["faltando"] = sum(len(e.faltando) for e in self._sensores.values())
+        return estatisticas
+
+
+def abre_publicador():
+    """
+    Cria o PublicadorAlertas com a configuração de SISD_MULTICAST_*.
+    """
+    return PublicadorAlertas(
+        ttl=int(os.environ.get("SISD_MULTICAST_TTL", 1)),
+        atraso_lote=float(os.environ.get("SISD_MULTICAST_ATRASO_LOTE", 0.005)),
+        repeticoes=int(os.environ.get("SISD_MULTICAST_REPETICOES", 2)),
+        taxa_max=float(os.environ.get("SISD_MULTICAST_TAXA", 20000)),
+        intervalo_resumo=float(os.environ.get("SISD_MULTICAST_RESUMO", 5.0)),
+    )
+
+
+def abre_assinante(ao_alerta=None, ao_lacuna=None):
+    """
+    Cria o AssinanteAlertas com a janela de repetição de SISD_MULTICAST_JANELA_REPETICAO.
+    """
+    return AssinanteAlertas(ao_alerta=ao_alerta, ao_lacuna=ao_lacuna,
+                            janela_repeticao=float(os.environ.get("SISD_MULTICAST_JANELA_REPETICAO", 10.0)))
+
+
+def escutar():
+    """
+    Imprime os alertas recebidos e as lacunas detectadas até Ctrl+C.
+    """
+    assinante = abre_assinante(
+        ao_alerta=lambda alerta: print(f"[Sensor Alert] Alerta recebido: {descreve_alerta(alerta)}"),
+        ao_lacuna=lambda sensor_id, de, ate: print(
+            f"[Sensor Alert] Alertas perdidos de sensor_{sensor_id}: {de}..{ate}")).inicia()
+    print(f"[Sensor Alert] Escutando {MCAST_GRP}:{MCAST_PORT}")
     try:
-        sock.sendto(mensagem.encode('utf-8'), (MCAST_GRP, MCAST_PORT))
-        print(f"[Sensor Alert] Alerta enviado: {mensagem}")
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
     finally:
-        sock.close()
+        assinante.para()
+        print(f"[Sensor Alert] {assinante.estatisticas()}")
 
-def main():
+
+def simular(sensor_id, intervalo):
     """
-    Simula a detecção de clima extremo e envia alertas periodicamente.
+    Publica um alerta sintético de ``sensor_id`` a cada ``intervalo`` segundos.
     """
-    while True:
-        # Para exemplo, envia um alerta a cada 30 segundos
-        alerta = "ALERTA: Condição climática extrema detectada!"
-        enviar_alerta(alerta)
-        time.sleep(30)
+    publicador = abre_publicador()
+    try:
+        while True:
+            sequencia = publicador.publica(sensor_id, SEVERIDADE_CRITICO, random.uniform(40, 45),
+                                           random.uniform(5, 15), random.uniform(960, 980))
+            print(f"[Sensor Alert] Alerta simulado enviado: sensor_{sensor_id} #{sequencia}")
+            time.sleep(intervalo)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publicador.fecha()
+
 
 if __name__ == "__main__":
-    # Ponto de entrada do alerta multicast
-    main()
+    if len(sys.argv) >= 2 and sys.argv[1] == "escutar":
+        escutar()
+    elif len(sys.argv) >= 2 and sys.argv[1] == "simular":
+        simular(int(sys.argv[2]) if len(sys.argv) >= 3 else 0,
+                float(sys.argv[3]) if len(sys.argv) >= 4 else 30.0)
+    else:
+        print("Uso: sensor_alert.py escutar | simular [id_sensor] [intervalo_s]")
@@ -2,216 +2,261 @@
 Módulo principal do Sensor do sistema distribuído SISD.
 
 Responsabilidades:
-- Simulação de dados climáticos e envio ao cliente via TCP.
+- Simulação de dados climáticos e envio ao cliente via TCP: sorteio uniforme por leitura
+  ou, no modo ``modelo``, leituras geradas em blocos com NumPy (ciclo diário + ruído AR(1)),
+  enviadas em lotes quando a taxa configurada passa de uma leitura por lote.
+- Detecção de clima extremo: regras (limiar, variação e janela deslizante) avaliadas a
+  cada leitura, com alerta multicast a cada mudança de estado.
 - Implementação de checkpoint/rollback (snapshots) para tolerância a falhas.
+- Participação no snapshot global (Chandy-Lamport): marcadores pelo enlace de controle
+  e propagação do marcador pelas conexões de dados.
 - Replicação de logs para o serviço cloud.
 - Exclusão mútua via Token Ring.
-- Eleição de coordenador via algoritmo Bully (gRPC).
-- Envio de status (heartbeat) ao monitor via gRPC.
-- Autenticação do cliente usando criptografia assimétrica (RSA).
+- Eleição de coordenador via algoritmo Bully (gRPC), convocada quando o detector
+  de falhas (batimentos UDP entre sensores) suspeita do coordenador.
+- Envio de status (heartbeat com métricas de carga) ao monitor por stream gRPC.
+- Canal cifrado com o cliente: handshake X25519 autenticado pela chave RSA do sensor,
+  retomada de sessão por ticket e quadros cifrados (AES-GCM ou ChaCha20-Poly1305).
+- Autenticação RSA dos clientes legados do protocolo texto.
+
+A inicialização abre os listeners TCP antes de subir os serviços de controle (gRPC,
+anel de token, detector de falhas), e ``grpc``, ``cryptography`` e ``requests`` só são
+importados quando usados pela primeira vez.
 """
 
 import socket
 import threading
 import time
 import os
-import json
 import random
 import sys
-import grpc
-from concurrent import futures
-from middleware.protos import sensor_status_pb2
-from middleware.protos import sensor_status_pb2_grpc
-from middleware.protos import bully_pb2
-from middleware.protos import bully_pb2_grpc
-import requests
-import glob
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.primitives import serialization, hashes
-
-# Diretórios para snapshots e logs
-SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), "snapshots")
+import itertools
+from common.armazem_chaves import abre_armazem_chaves
+from common.log_store import abre_log_store, migrar_log_json
+from common.snapshot_store import abre_snapshot_store
+from common.snapshot_global import ParticipanteSnapshot
+from common.replication import cria_replicador
+from common.framing import (MODO_CIFRADO, MODO_TEXTO, TIPO_CANAL_OLA, DecodificadorQuadros, ErroProtocolo,
+                            codifica_leitura, negocia_como_sensor)
+from common.token_ring import AnelToken, EstadoToken, PoliticaPosse
+from common.detector_falhas import BatimentosPares, DetectorFalhas
+from multicast.regras import abre_motor_regras
+from multicast.sensor_alert import SEVERIDADE_NORMALIZADO, abre_publicador
+
+# Diretórios para snapshots e logs (em SISD_SENSOR_DADOS, padrão o diretório do sensor)
+DADOS_DIR = os.environ.get("SISD_SENSOR_DADOS", os.path.dirname(__file__))
+SNAPSHOT_DIR = os.path.join(DADOS_DIR, "snapshots")
 if not os.path.exists(SNAPSHOT_DIR):
     os.makedirs(SNAPSHOT_DIR)
 
-LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
+LOG_DIR = os.path.join(DADOS_DIR, "logs")
+# Chaves RSA por sensor, fora do código-fonte (SISD_CHAVES_DIR)
+CHAVES_DIR = os.path.join(os.path.dirname(__file__), "chaves")
+armazem_chaves = abre_armazem_chaves(CHAVES_DIR)
+snapshot_store = None  # SnapshotStore do sensor em SNAPSHOT_DIR/<sensor_id> (criado em main)
+log_store = None  # LogStore append-only do sensor (criado em inicializa_log)
+replicador = None  # ReplicadorCloud em segundo plano (criado em inicializa_log)
 
 def inicializa_log(sensor_id):
     """
-    Inicializa o arquivo de log do sensor.
+    Inicializa o log segmentado do sensor, migrando o log JSON legado se existir.
     """
-    if not os.path.exists(LOG_DIR):
-        os.makedirs(LOG_DIR)
-    log_file = os.path.join(LOG_DIR, f"{sensor_id}_log.json")
-    if not os.path.exists(log_file):
-        with open(log_file, "w") as f:
-            json.dump([], f, indent=4)
-    return log_file
+    global log_store, replicador
+    if log_store is None:
+        log_store = abre_log_store(LOG_DIR, f"{sensor_id}_log")
+        migrar_log_json(os.path.join(LOG_DIR, f"{sensor_id}_log.json"), log_store)
+        replicador = cria_replicador(LOG_DIR, sensor_id)
+    return log_store
 
-def registrar_mensagem_log(sensor_id, sender_id, mensagem):
+def registrar_mensagem_log(sensor_id, sender_id, mensagem, **extras):
     """
-    Registra uma mensagem no log local e replica para a nuvem.
+    Registra uma mensagem (e campos extras) no log local e replica para a nuvem.
     """
-    log_file = os.path.join(LOG_DIR, f"{sensor_id}_log.json")
     log_entry = {
         "id": sender_id,
         "timestamp": time.time(),
         "mensagem": mensagem
     }
-    if not os.path.exists(log_file):
-        with open(log_file, "w") as f:
-            json.dump([], f, indent=4)
-    with open(log_file, "r+") as f:
-        logs = json.load(f)
-        logs.append(log_entry)
-        f.seek(0)
-        json.dump(logs, f, indent=4)
-        f.truncate()  # <-- ESSA LINHA É FUNDAMENTAL
+    log_entry.update(extras)
+    inicializa_log(sensor_id).append(log_entry)
     replica_para_cloud(log_entry)
 
 def replica_para_cloud(log_entry):
     """
-    Replica uma entrada de log para o serviço cloud.
+    Enfileira uma entrada de log para replicação assíncrona no serviço cloud.
     """
-    try:
-        requests.post("http://cloud:6000/replica", json=log_entry, timeout=2)
-    except Exception as e:
-        print(f"[Cloud] Falha ao replicar para nuvem: {e}")
+    replicador.enfileira(log_entry)
 
-def criar_snapshot_local_sensor():
+def estado_do_sensor(snapshot_id=None):
     """
-    Cria um snapshot do estado atual do sensor.
+    Cópia do estado do sensor para o snapshot: relógio, última leitura enviada,
+    posição no anel de token e coordenador conhecido.
     """
-    snapshot = {
+    return {
         "id": sensor_id,
+        "snapshot_id": snapshot_id,
         "timestamp": time.time(),
-        "lamport_clock": relogio_de_lamport
+        "lamport_clock": relogio_de_lamport,
+        "ultima_leitura": dict(ultima_leitura) if ultima_leitura else None,
+        "token": {
+            "possui": token.possui,
+            "leituras": token.leituras,
+            "geracao": list(anel.geracao) if anel else None,
+        },
+        "coordenador": coordinator_id,
     }
-    nome_arquivo = os.path.join(SNAPSHOT_DIR, f"snapshot_{sensor_id}_{int(time.time())}.json")
-    with open(nome_arquivo, "w") as f:
-        json.dump(snapshot, f, indent=4)
-    print(f"[Sensor] Snapshot criado: {nome_arquivo}")
+
+def criar_snapshot_local_sensor(snapshot_id=None):
+    """
+    Captura o estado do sensor e agenda a gravação em segundo plano; retorna o estado.
+    """
+    snapshot, pausa_ms = snapshot_store.captura(lambda: estado_do_sensor(snapshot_id))
+    snapshot_store.agenda(snapshot, snapshot["timestamp"], pausa_ms, ao_gravar=snapshot_gravado)
+    return snapshot
+
+def snapshot_gravado(caminho, metricas):
+    """
+    Chamada pela thread de gravação com os tempos de captura e de serialização.
+    """
+    print(f"[Sensor] Snapshot criado: {caminho} (pausa {metricas['pausa_ms']:.3f} ms, "
+          f"serialização {metricas['serializacao_ms']:.3f} ms, {metricas['bytes']} bytes)")
 
 def restaurar_estado_do_ultimo_snapshot():
     """
-    Restaura o estado do sensor a partir do último snapshot salvo.
+    Restaura o estado do sensor a partir do último snapshot salvo (ponteiro do manifesto).
     """
-    global relogio_de_lamport
-    arquivos = glob.glob(os.path.join(SNAPSHOT_DIR, f"snapshot_{sensor_id}_*.json"))
-    if not arquivos:
+    global relogio_de_lamport, sequencia_leituras
+    caminho, snapshot = snapshot_store.ultimo()
+    if snapshot is None:
         print("[Sensor] Nenhum snapshot encontrado para restaurar.")
         return
-    ultimo_snapshot = max(arquivos, key=os.path.getmtime)
-    with open(ultimo_snapshot, "r") as f:
-        snapshot = json.load(f)
-        relogio_de_lamport = snapshot.get("lamport_clock", 0)
-    print(f"[Sensor] Estado restaurado do snapshot: {ultimo_snapshot} (Lamport={relogio_de_lamport})")
+    relogio_de_lamport = snapshot.get("lamport_clock", 0)
+    if snapshot.get("ultima_leitura"):
+        sequencia_leituras = itertools.count(snapshot["ultima_leitura"]["sequencia"] + 1)
+    print(f"[Sensor] Estado restaurado do snapshot: {caminho} (Lamport={relogio_de_lamport})")
 
-# --- Marker Listener (para snapshots globais) ---
-def marker_listener(marker_port):
+# --- Snapshot global (Chandy-Lamport) ---
+def captura_estado_snapshot(snapshot_id, marcador_clock):
     """
-    Escuta por marcadores enviados pelo cliente para iniciar snapshots.
+    Registra o estado local ao receber o marcador (chamada com a trava do participante presa).
     """
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.bind(("0.0.0.0", marker_port))
-    server.listen(5)
-    print(f"[Sensor] Servidor de snapshot iniciado na porta {marker_port}")
-    while True:
-        conn, addr = server.accept()
-        try:
-            data = conn.recv(1024)
-            if data:
-                mensagem = data.decode().strip()
-                registrar_mensagem_log(sensor_id,"client", mensagem)
-                if mensagem.startswith("MARKER"):
-                    partes = mensagem.split("|")
-                    if len(partes) == 2:
-                        try:
-                            marcador_clock = int(partes[1])
-                        except ValueError:
-                            marcador_clock = None
-                        print(f"[Sensor] Marcador recebido com clock {marcador_clock}")
-                        incrementa_relogio_de_lamport()
-                        criar_snapshot_local_sensor()
-            conn.close()
-        except Exception as e:
-            print(f"[Sensor] Erro no marker listener: {e}")
-            conn.close()
+    print(f"[Sensor] Marcador {snapshot_id} recebido com clock {marcador_clock}")
+    if marcador_clock is not None:
+        atualizar_relogio_de_lamport(marcador_clock)
+    else:
+        incrementa_relogio_de_lamport()
+    return criar_snapshot_local_sensor(snapshot_id)
+
+participante = ParticipanteSnapshot(
+    captura_estado_snapshot,
+    ao_receber_marcador=lambda mensagem: registrar_mensagem_log(sensor_id, "client", mensagem),
+)
 
 def inicia_marker_listener(porta_base):
     """
-    Inicia a thread que escuta por marcadores de snapshot.
+    Inicia o listener dos enlaces de controle (marcadores de snapshot) em porta_base + 1000.
     """
     marker_port = porta_base + 1000
-    t = threading.Thread(target=marker_listener, args=(marker_port,))
-    t.daemon = True
-    t.start()
+    participante.escuta(marker_port)
+    print(f"[Sensor] Servidor de snapshot iniciado na porta {marker_port}")
 
 # --- Token Ring para exclusão mútua distribuída ---
-has_token = False  # Indica se este nó possui o token
+# Posse do token (Condition: as threads de envio acordam assim que o token chega)
+token = EstadoToken(PoliticaPosse.do_ambiente())
+# Intervalo mínimo entre leituras enviadas por este sensor (SISD_TAXA_LEITURAS, em leituras/s, tem precedência)
+INTERVALO_LEITURA = (1.0 / float(os.environ["SISD_TAXA_LEITURAS"]) if os.environ.get("SISD_TAXA_LEITURAS")
+                     else float(os.environ.get("SISD_INTERVALO_LEITURA", 1.0)))
+# Acima de uma leitura por INTERVALO_LOTE, as leituras devidas saem juntas em um único envio
+INTERVALO_LOTE = float(os.environ.get("SISD_LOTE_MS", 50.0)) / 1000
+LOTE_MAX = int(os.environ.get("SISD_LOTE_MAX", 4096))
+
+anel = None  # AnelToken com os enlaces persistentes para os vizinhos (criado em start_token_listener)
 
 def start_token_listener(token_port):
     """
-    Thread que escuta a chegada do token via TCP.
+    Inicia o anel de token: listener dos enlaces persistentes e detector de perda do token.
+    """
+    global anel
+    ids = sorted(sensores_conhecidos.keys())
+    # Nós mais baixos no anel esperam mais antes de regenerar (evita regenerações simultâneas)
+    posicao = ids.index(sensor_id) if sensor_id in ids else 0
+    timeout_perda = float(os.environ.get("SISD_TOKEN_TIMEOUT_PERDA", 15.0)) + 2.0 * posicao
+    anel = AnelToken(
+        token,
+        int(sensor_id.split("_")[-1]),
+        get_sucessores,
+        token_port,
+        timeout_ack=float(os.environ.get("SISD_TOKEN_TIMEOUT_ACK", 2.0)),
+        timeout_perda=timeout_perda,
+        ao_receber=ao_receber_token,
+    )
+    anel.inicia()
+
+def ao_receber_token():
     """
-    global has_token
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.bind(("0.0.0.0", token_port))
-    server.listen(5)
-    print(f"[Token] Sensor {sensor_id} escutando token na porta {token_port}")
-    while True:
-        conn, addr = server.accept()
-        token_message = conn.recv(1024).decode().strip()
-        if token_message == "TOKEN":
-            print(f"[Token] Sensor {sensor_id} recebeu o token")
-            has_token = True
-        conn.close()
+    Chamado quando o token chega (ou é regenerado) neste nó.
+    """
+    print(f"[Token] Sensor {sensor_id} recebeu o token (geração {anel.geracao})")
+    if token.remetentes == 0:
+        # Nenhum cliente conectado: não há leituras a enviar, repassa o token após o intervalo
+        t = threading.Timer(INTERVALO_LEITURA, repassa_token_ocioso)
+        t.daemon = True
+        t.start()
+
+def repassa_token_ocioso():
+    """
+    Passa o token adiante se este nó o possui e nenhuma thread de envio o está usando.
+    """
+    if token.adquire(timeout=0):
+        try:
+            pass_token()
+        finally:
+            token.solta()
 
 def inicia_token_listener(porta_base):
     """
-    Inicia a thread que escuta o token.
+    Inicia o anel de token na porta base + 2000.
     """
-    token_port = porta_base + 2000
-    t = threading.Thread(target=start_token_listener, args=(token_port,))
-    t.daemon = True
-    t.start()
+    start_token_listener(porta_base + 2000)
 
-def get_next_sensor():
+def get_sucessores():
     """
-    Determina o próximo sensor no anel lógico para passagem do token.
+    Retorna os demais sensores na ordem do anel a partir do próximo:
+    ``[(id numérico, host, porta_token), ...]``.
     """
     sensor_ids = sorted(sensores_conhecidos.keys())
     idx = sensor_ids.index(sensor_id)
-    next_idx = (idx + 1) % len(sensor_ids)
-    next_sensor_id = sensor_ids[next_idx]
-    next_sensor_host, _ = sensores_conhecidos[next_sensor_id]
-    # Para token, supomos que o sensor utiliza: base_port (extraído do id) + 2000
-    next_token_port = int(next_sensor_id.split("_")[-1]) + 2000
+    sucessores = []
+    for next_sensor_id in sensor_ids[idx + 1:] + sensor_ids[:idx]:
+        next_sensor_host, _ = sensores_conhecidos[next_sensor_id]
+        # Para token, supomos que o sensor utiliza: base_port (extraído do id) + 2000
+        base_port = int(next_sensor_id.split("_")[-1])
+        sucessores.append((base_port, next_sensor_host, base_port + 2000))
+    return sucessores
+
+def get_next_sensor():
+    """
+    Determina o próximo sensor no anel lógico para passagem do token.
+    """
+    _, next_sensor_host, next_token_port = get_sucessores()[0]
     return next_sensor_host, next_token_port
 
 def pass_token():
     """
-    Envia o token para o próximo sensor no anel.
-    Só envia o token se houver uma conexão ativa com o cliente.
+    Envia o token para o próximo sensor vivo no anel pelo enlace persistente.
+    Só envia o token se este nó o possuir.
     """
-    global has_token
-
-    # Verifica se há uma conexão ativa com o cliente
-    if not has_token:
+    if not token.possui:
         print(f"[Token] Sensor {sensor_id} não possui o token. Aguardando...")
         return
 
-    next_sensor_host, next_token_port = get_next_sensor()
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.connect((next_sensor_host, next_token_port))
-        s.sendall("TOKEN".encode())
-        print(f"[Token] Sensor {sensor_id} passou o token para {next_sensor_host}:{next_token_port}")
-    except Exception as e:
-        print(f"[Token] Erro ao passar o token: {e}")
-    finally:
-        s.close()
-        has_token = False
+    destino = anel.passa()
+    if destino is None:
+        print(f"[Token] Nenhum sucessor disponível; sensor {sensor_id} mantém o token")
+        return
+    metricas = anel.metricas()
+    if metricas["passados"] % 100 == 0:
+        print(f"[Token] Métricas do anel: {metricas}")
 
 # --- Variáveis e funções para Bully e status ---
 sensor_id = None        
@@ -219,12 +264,40 @@ is_coordinator = False
 coordinator_id = None   
 election_in_progress = False
 
+def carrega_sensores_conhecidos():
+    """
+    Retorna o dicionário de sensores conhecidos (id: (host, porta_bully)).
+    Pode ser sobrescrito por SISD_SENSORES_CONHECIDOS ("sensor_5000=sensor1:5001,...").
+    """
+    lista = os.environ.get("SISD_SENSORES_CONHECIDOS")
+    if not lista:
+        return {
+            "sensor_5000": ("sensor1", 5001),
+            "sensor_5001": ("sensor2", 5002),
+            "sensor_5002": ("sensor3", 5003)
+        }
+    sensores = {}
+    for item in lista.split(","):
+        s_id, _, endereco = item.strip().partition("=")
+        host, _, bully_port = endereco.rpartition(":")
+        sensores[s_id] = (host, int(bully_port))
+    return sensores
+
 # Dicionário de sensores conhecidos (id: (host, porta_bully))
-sensores_conhecidos = {
-    "sensor_5000": ("sensor1", 5001),
-    "sensor_5001": ("sensor2", 5002),
-    "sensor_5002": ("sensor3", 5003)
-}
+sensores_conhecidos = carrega_sensores_conhecidos()
+
+# Canais gRPC reutilizados (pares do Bully e monitor), criados no primeiro uso
+pool_canais = None
+
+def obtem_pool_canais():
+    """
+    Retorna o pool de canais gRPC do processo (importa grpc na primeira chamada).
+    """
+    global pool_canais
+    if pool_canais is None:
+        from common.canais_grpc import PoolCanais
+        pool_canais = PoolCanais()
+    return pool_canais
 
 relogio_de_lamport = 0
 lamport_lock = threading.Lock()
@@ -239,74 +312,302 @@ def incrementa_relogio_de_lamport():
         print(f"[Sensor] Relógio de Lamport incrementado: {relogio_de_lamport}")
         return relogio_de_lamport
 
-def envia_status_para_monitor(sensor_id, monitor_host="monitor", monitor_port=50051):
+def reserva_relogio_de_lamport(n):
     """
-    Envia periodicamente status do sensor ao monitor via gRPC.
+    Avança o relógio de Lamport de ``n`` eventos (um lote de leituras) e retorna o
+    primeiro valor reservado.
     """
-    channel = grpc.insecure_channel(f"{monitor_host}:{monitor_port}")
-    stub = sensor_status_pb2_grpc.MonitorServiceStub(channel)
-    while True:
-        incrementa_relogio_de_lamport()
-        timestamp = int(time.time()) 
-        status_msg = "Operando normalmente"
-        request = sensor_status_pb2.Status(sensor_id=sensor_id, status=status_msg, timestamp=timestamp)
-        try:
-            response = stub.SendStatus(request)
-            print(f"[Sensor] Status enviado para o monitor: {status_msg} com timestamp {timestamp}")
-        except Exception as e:
-            print(f"[Sensor] Erro ao enviar status para o monitor: {e}")
-        time.sleep(10)
+    global relogio_de_lamport
+    with lamport_lock:
+        relogio_de_lamport += n
+        return relogio_de_lamport - n + 1
+
+def atualizar_relogio_de_lamport(timestamp_recebido):
+    """
+    Atualiza o relógio de Lamport com base em timestamp recebido.
+    """
+    global relogio_de_lamport
+    with lamport_lock:
+        relogio_de_lamport = max(relogio_de_lamport, timestamp_recebido) + 1
+        print(f"[Sensor] Atualizado relógio de Lamport: {relogio_de_lamport}")
+        return relogio_de_lamport
+
+canal_status = None  # CanalStatus com o stream de batimentos ao monitor (criado em envia_status_para_monitor)
+
+def coleta_metricas_status():
+    """
+    Métricas de carga enviadas em cada batimento ao monitor.
+    """
+    return {
+        "queue_depth": replicador.estatisticas()["na_fila"] if replicador else 0,
+        "lamport_clock": incrementa_relogio_de_lamport(),
+        "token_hold_ms": token.tempo_de_posse() * 1000,
+        "log_size_bytes": log_store.tamanho_bytes() if log_store else 0,
+    }
+
+def envia_status_para_monitor(sensor_id, monitor_host="monitor", monitor_port=50051):
+    """
+    Mantém um stream de batimentos com o monitor via gRPC (SendStatus unário se o monitor for legado).
+    """
+    global canal_status
+    from middleware.protos import sensor_status_pb2_grpc
+    from common.status_monitor import CanalStatus
+    stub = obtem_pool_canais().stub(f"{monitor_host}:{monitor_port}", sensor_status_pb2_grpc.MonitorServiceStub)
+    canal_status = CanalStatus(
+        sensor_id,
+        stub,
+        coleta_metricas=coleta_metricas_status,
+        intervalo=float(os.environ.get("SISD_STATUS_INTERVALO", 10.0)),
+    )
+    canal_status.inicia()
+
+# "aleatorio" (sorteio uniforme por leitura) ou "modelo" (GeradorLeituras, requer NumPy)
+SIMULACAO = os.environ.get("SISD_SIMULACAO", "aleatorio")
+gerador = None  # GeradorLeituras do modo "modelo" (criado em obtem_gerador)
+gerador_lock = threading.Lock()
+
+def obtem_gerador():
+    """
+    Cria na primeira chamada o GeradorLeituras deste sensor (semente em
+    SISD_SIMULACAO_SEMENTE, instante inicial em SISD_SIMULACAO_INICIO e passo simulado por
+    leitura em SISD_SIMULACAO_PASSO, padrão o intervalo entre leituras).
+    """
+    global gerador
+    with gerador_lock:
+        if gerador is None:
+            from common.simulacao import GeradorLeituras
+            inicio = os.environ.get("SISD_SIMULACAO_INICIO")
+            gerador = GeradorLeituras(
+                int(sensor_id.split("_")[-1]),
+                semente=int(os.environ.get("SISD_SIMULACAO_SEMENTE", 0)),
+                inicio=float(inicio) if inicio else None,
+                passo=float(os.environ.get("SISD_SIMULACAO_PASSO", INTERVALO_LEITURA)),
+            )
+        return gerador
 
 def simula_dados():
     """
     Simula dados climáticos (temperatura, umidade, pressão).
     """
+    if SIMULACAO == "modelo":
+        return obtem_gerador().proxima()
     temperatura = round(random.uniform(15.0, 35.0), 1)
     umidade = round(random.uniform(30.0, 80.0), 1)
     pressao = round(random.uniform(990.0, 1020.0), 1)
-    return f"{temperatura},{umidade},{pressao}"
-
-def enviar_dados(conn):
+    return temperatura, umidade, pressao
+
+# Regras de clima extremo (SISD_REGRAS_ARQUIVO, padrão sensor/regras.json)
+REGRAS_ARQUIVO = os.path.join(os.path.dirname(__file__), "regras.json")
+motor_regras = abre_motor_regras(REGRAS_ARQUIVO)
+publicador_alertas = None  # PublicadorAlertas multicast (criado em main se houver regras)
+
+def avalia_regras(numero_sensor, temperatura, umidade, pressao, instante=None):
+    """
+    Avalia a leitura nas regras e publica um alerta multicast a cada mudança de estado
+    (regra disparada ou de volta ao normal).
+    """
+    instante = time.monotonic() if instante is None else instante
+    for regra, ativa, valor in motor_regras.avalia(temperatura, umidade, pressao, instante):
+        if publicador_alertas is not None:
+            publicador_alertas.publica(numero_sensor, regra.severidade if ativa else SEVERIDADE_NORMALIZADO,
+                                       temperatura, umidade, pressao, regra=regra.id)
+        mensagem = (f"[Sensor] Regra {regra.nome} {'disparada' if ativa else 'normalizada'} "
+                    f"({regra.grandeza}: {valor:.2f})")
+        print(mensagem)
+        registrar_mensagem_log(sensor_id, sensor_id, mensagem)
+
+# Número de sequência das leituras enviadas (permite ao cliente detectar lacunas)
+sequencia_leituras = itertools.count(1)
+# Última leitura enviada (entra no snapshot; atualizada com a trava do participante)
+ultima_leitura = None
+
+def simula_lote(n):
+    """
+    Gera ``n`` leituras de uma vez: temperatura, umidade e pressão (arrays NumPy no modo
+    "modelo", listas no modo "aleatorio").
+    """
+    if SIMULACAO == "modelo":
+        _, temperatura, umidade, pressao = obtem_gerador().bloco(n)
+        return temperatura, umidade, pressao
+    leituras = [simula_dados() for _ in range(n)]
+    return tuple(list(grandeza) for grandeza in zip(*leituras))
+
+def envia_lote(conn, numero_sensor, n, instante):
+    """
+    Envia ``n`` leituras binárias devidas em um único ``sendall``: um bloco do gerador,
+    Lamport e sequências reservados de uma vez e quadros codificados juntos.
+    """
+    global ultima_leitura, sequencia_leituras
+    temperatura, umidade, pressao = simula_lote(n)
+    with participante.trava:
+        lamport = reserva_relogio_de_lamport(n)
+        # Reserva as n sequências (quem consome sequencia_leituras também segura a trava)
+        sequencia = next(sequencia_leituras)
+        sequencia_leituras = itertools.count(sequencia + n)
+        if SIMULACAO == "modelo":
+            from common.simulacao import codifica_bloco
+            conn.sendall(codifica_bloco(temperatura, umidade, pressao, lamport, numero_sensor, sequencia))
+            temperatura, umidade, pressao = temperatura.tolist(), umidade.tolist(), pressao.tolist()
+        else:
+            conn.sendall(b"".join(
+                codifica_leitura(t, u, p, lamport + i, numero_sensor, sequencia + i)
+                for i, (t, u, p) in enumerate(zip(temperatura, umidade, pressao))))
+        ultima_leitura = {"sequencia": sequencia + n - 1, "lamport": lamport + n - 1,
+                          "valores": [temperatura[-1], umidade[-1], pressao[-1]]}
+    token.registra_leitura(n)
+    mensagem = (f"[Sensor] Lote de {n} leituras enviado: sequências {sequencia}..{sequencia + n - 1}, "
+                f"Lamport {lamport}..{lamport + n - 1}")
+    print(mensagem)
+    # Os valores vão juntos, em colunas, para o log e o cloud (uma entrada por lote)
+    registrar_mensagem_log(sensor_id, sensor_id, mensagem, leituras={
+        "temperatura": temperatura, "umidade": umidade, "pressao": pressao,
+        "lamport": lamport, "intervalo": INTERVALO_LEITURA})
+    for i in range(n):
+        avalia_regras(numero_sensor, temperatura[i], umidade[i], pressao[i], instante + i * INTERVALO_LEITURA)
+
+def enviar_dados(conn, modo=MODO_TEXTO):
     """
     Envia dados ao cliente apenas se possuir o token.
-    Após enviar, passa o token ao próximo sensor.
-    """
-    global has_token
+    No modo binário cada leitura vai em um quadro de tamanho fixo (cifrado, no modo
+    cifrado, por ``ConexaoCifrada``); no modo texto (clientes legados) vai como
+    "temp,umid,press|lamport".
+    A thread dorme na Condition do token até ele chegar e o passa adiante
+    conforme a política de posse (N leituras, T ms ou sem leitura pendente).
+    """
+    global ultima_leitura
+    numero_sensor = int(sensor_id.split("_")[-1])
+    proxima_leitura = time.monotonic()
+    token.registra_remetente(1)
+    if modo != MODO_TEXTO:
+        # Só o protocolo binário (em claro ou cifrado) transporta o marcador no canal de dados
+        participante.registra_conexao(conn)
     try:
         while True:
-            if not has_token:
-                # Se não possui o token, aguarda brevemente
-                time.sleep(0.1)
-                continue
-            # Sensor tem o token – envia dados para o cliente
-            dados = simula_dados()
-            timestamp = incrementa_relogio_de_lamport()
-            mensagem = f"{dados}|{timestamp}"
-            conn.sendall(mensagem.encode())
-            print(f"[Sensor] Dados enviados: {mensagem}")
-            registrar_mensagem_log(sensor_id, sensor_id,f"[Sensor] Dados enviados: {mensagem}")
-            time.sleep(1)
-            # Após enviar, passa o token para o próximo sensor
-            pass_token()
-    except ConnectionResetError:
+            token.adquire()
+            try:
+                agora = time.monotonic()
+                devidas = min(int((agora - proxima_leitura) / INTERVALO_LEITURA) + 1, LOTE_MAX)
+                if token.politica.max_leituras is not None:
+                    devidas = min(devidas, max(token.politica.max_leituras - token.leituras, 1))
+                if agora >= proxima_leitura and devidas > 1 and modo != MODO_TEXTO:
+                    # Várias leituras devidas (taxa alta): saem juntas, sem atrasar as seguintes
+                    envia_lote(conn, numero_sensor, devidas, proxima_leitura)
+                    proxima_leitura = max(proxima_leitura + devidas * INTERVALO_LEITURA,
+                                          agora - LOTE_MAX * INTERVALO_LEITURA)
+                elif agora >= proxima_leitura:
+                    # Sensor tem o token e uma leitura pendente – envia dados para o cliente
+                    temperatura, umidade, pressao = simula_dados()
+                    # Estado e envio atômicos em relação ao marcador do snapshot global
+                    with participante.trava:
+                        timestamp = incrementa_relogio_de_lamport()
+                        sequencia = next(sequencia_leituras)
+                        mensagem = f"{temperatura},{umidade},{pressao}|{timestamp}"
+                        if modo != MODO_TEXTO:
+                            conn.sendall(codifica_leitura(temperatura, umidade, pressao, timestamp,
+                                                          numero_sensor, sequencia))
+                        else:
+                            conn.sendall(mensagem.encode())
+                        ultima_leitura = {"sequencia": sequencia, "lamport": timestamp,
+                                          "valores": [temperatura, umidade, pressao]}
+                    token.registra_leitura()
+                    proxima_leitura = agora + INTERVALO_LEITURA
+                    print(f"[Sensor] Dados enviados: {mensagem}")
+                    registrar_mensagem_log(sensor_id, sensor_id,f"[Sensor] Dados enviados: {mensagem}")
+                    avalia_regras(numero_sensor, temperatura, umidade, pressao)
+                pendente = time.monotonic() >= proxima_leitura
+                if token.deve_liberar(pendente):
+                    pass_token()
+                elif not pendente:
+                    # Mantém o token até a próxima leitura (limitado pelo tempo máximo de posse)
+                    espera = proxima_leitura - time.monotonic()
+                    if INTERVALO_LEITURA < INTERVALO_LOTE:
+                        # Taxa alta: acumula as leituras de um lote em vez de acordar a cada uma
+                        espera = max(espera, INTERVALO_LOTE)
+                    if token.politica.max_posse_ms is not None:
+                        espera = min(espera, token.politica.max_posse_ms / 1000 - token.tempo_de_posse())
+                    time.sleep(max(espera, 0))
+            finally:
+                token.solta()
+    except (ConnectionResetError, BrokenPipeError):
         print(f"[Sensor] Cliente desconectado abruptamente")
     finally:
+        token.registra_remetente(-1)
+        participante.remove_conexao(conn)
         conn.close()
+        if token.remetentes == 0:
+            # Último cliente saiu com o token neste nó: não deixa o anel parado
+            repassa_token_ocioso()
+
+# Tickets de retomada do canal cifrado (chave só em memória, criada na primeira conexão cifrada)
+emissor_tickets = None
+emissor_lock = threading.Lock()
+EXIGE_CIFRA = os.environ.get("SISD_CANAL_EXIGE_CIFRA", "0") == "1"
 
 def trata_conexao(conn, addr):
     """
     Trata uma nova conexão TCP do cliente.
+    Negocia o protocolo binário e, com clientes da versão 2, o canal cifrado; clientes
+    legados que iniciam o handshake RSA são autenticados e atendidos no modo texto.
     """
     print(f"[Sensor] Conexão estabelecida com o cliente {addr}.")
-    autentica_cliente(conn)
-    enviar_dados(conn)
+    modo, dados_iniciais = negocia_como_sensor(conn)
+    if modo == MODO_CIFRADO:
+        try:
+            conn = estabelece_canal_cifrado(conn)
+        except (ErroProtocolo, OSError) as e:
+            print(f"[Sensor] Handshake do canal cifrado com {addr} falhou: {e}")
+            conn.close()
+            return
+    elif EXIGE_CIFRA:
+        print(f"[Sensor] Cliente {addr} recusado: canal cifrado exigido (protocolo {modo})")
+        conn.close()
+        return
+    elif modo == MODO_TEXTO and dados_iniciais:
+        autentica_cliente(conn, dados_iniciais)
+    print(f"[Sensor] Cliente {addr} usando protocolo {modo}")
+    enviar_dados(conn, modo)
+
+def estabelece_canal_cifrado(conn, timeout=5.0):
+    """
+    Responde ao handshake do cliente e retorna a conexão cifrada.
+    Com um ticket válido a sessão é retomada sem operação com a chave privada.
+    """
+    global emissor_tickets
+    from common.canal_seguro import ConexaoCifrada, EmissorTickets, aceita_handshake
+    with emissor_lock:
+        if emissor_tickets is None:
+            emissor_tickets = EmissorTickets(float(os.environ.get("SISD_TICKET_VALIDADE", 3600.0)))
+    decodificador = DecodificadorQuadros(tamanho_bloco=4096)
+    conn.settimeout(timeout)
+    try:
+        quadros = []
+        while not quadros:
+            quadros = decodificador.recebe(conn)
+            if quadros is None:
+                raise ConnectionResetError("Cliente encerrou a conexão durante o handshake")
+        tipo, payload = quadros[0]
+        if tipo != TIPO_CANAL_OLA:
+            raise ErroProtocolo(f"Quadro de tipo {tipo} no lugar do início do handshake")
+        aceite, sessao = aceita_handshake(payload, armazem_chaves.chave_privada(sensor_id), emissor_tickets)
+        conn.sendall(aceite)
+    finally:
+        conn.settimeout(None)
+    print(f"[Sensor] Canal cifrado estabelecido ({'sessão retomada' if sessao.retomada else 'handshake completo'})")
+    return ConexaoCifrada(conn, sessao)
 
-def autentica_cliente(conn):
+def autentica_cliente(conn, dados_iniciais=b""):
     """
     Autentica o cliente usando criptografia assimétrica.
     """
-    segredo_cifrado = conn.recv(256)
-    segredo = private_key.decrypt(
+    segredo_cifrado = dados_iniciais
+    while len(segredo_cifrado) < 256:
+        parte = conn.recv(256 - len(segredo_cifrado))
+        if not parte:
+            raise ConnectionResetError("Cliente encerrou a conexão durante a autenticação")
+        segredo_cifrado += parte
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+    segredo = armazem_chaves.chave_privada(sensor_id).decrypt(
         segredo_cifrado,
         padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
     )
@@ -314,159 +615,156 @@ def autentica_cliente(conn):
     # Após isso, conexão autenticada!
 
 # --- Implementação do algoritmo Bully via gRPC ---
-class BullyServiceServicer(bully_pb2_grpc.BullyServiceServicer):
-    """
-    Serviço gRPC para eleição Bully.
-    """
-    def StartElection(self, request, context):
-        global election_in_progress
-        caller_id = request.sensor_id
-        print(f"[Bully] Recebido pedido de eleição de '{caller_id}'")
-        if int(sensor_id.split('_')[-1]) > int(caller_id.split('_')[-1]):
-            resposta = bully_pb2.ElectionResponse(ok=True, message="OK")
-            if not election_in_progress:
-                election_in_progress = True
-                threading.Thread(target=inicia_eleicao).start()
-            return resposta
-        else:
-            return bully_pb2.ElectionResponse(ok=False, message="Meu id é menor")
-    
-    def AnnounceCoordinator(self, request, context):
-        global coordinator_id, is_coordinator, election_in_progress
-        coordinator_id = request.coordinator_id
-        is_coordinator = (coordinator_id == sensor_id)
-        election_in_progress = False
-        print(f"[Bully] Novo coordenador anunciado: {coordinator_id}")
-        return bully_pb2.ElectionResponse(ok=True, message="Coordenador recebido")
+eleicao = None  # EleicaoBully deste sensor (criada em inicia_bully_server)
+
+def ao_eleger_coordenador(novo_coordenador):
+    """
+    Atualiza as variáveis globais de coordenação quando um coordenador é definido.
+    """
+    global coordinator_id, is_coordinator, election_in_progress
+    coordinator_id = novo_coordenador
+    is_coordinator = (coordinator_id == sensor_id)
+    election_in_progress = False
 
 def inicia_bully_server(bully_port):
     """
     Inicia o servidor gRPC para o algoritmo Bully.
     """
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=5))
-    bully_pb2_grpc.add_BullyServiceServicer_to_server(BullyServiceServicer(), server)
+    global eleicao
+    import grpc
+    from concurrent import futures
+    from middleware.protos import bully_pb2_grpc
+    from common.bully import EleicaoBully
+    eleicao = EleicaoBully(
+        sensor_id,
+        lambda: sensores_conhecidos,
+        pool=obtem_pool_canais(),
+        timeout_rpc=float(os.environ.get("SISD_BULLY_TIMEOUT_RPC", 2.0)),
+        timeout_anuncio=float(os.environ.get("SISD_BULLY_TIMEOUT_ANUNCIO", 10.0)),
+        ao_eleger=ao_eleger_coordenador,
+    )
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    bully_pb2_grpc.add_BullyServiceServicer_to_server(eleicao.servicer(), server)
     server.add_insecure_port(f"0.0.0.0:{bully_port}")
     server.start()
+    eleicao.aquece()
     print(f"[Bully] Servidor Bully iniciado na porta {bully_port}")
-    server.wait_for_termination()
+    return server
 
 def inicia_eleicao():
     """
-    Inicia o processo de eleição Bully.
+    Inicia o processo de eleição Bully (pares de id maior contactados em paralelo).
     """
-    global election_in_progress, is_coordinator, coordinator_id
-    print(f"[Bully] {sensor_id} iniciando eleição...")
-    recebeu_ok = False
-    for s_id, (host, bully_port) in sensores_conhecidos.items():
-        if int(s_id.split('_')[-1]) > int(sensor_id.split('_')[-1]):
-            try:
-                channel = grpc.insecure_channel(f"{host}:{bully_port}")
-                stub = bully_pb2_grpc.BullyServiceStub(channel)
-                req = bully_pb2.ElectionRequest(sensor_id=sensor_id)
-                response = stub.StartElection(req, timeout=5)
-                if response.ok:
-                    print(f"[Bully] Recebi OK de {s_id}")
-                    recebeu_ok = True
-            except Exception as e:
-                print(f"[Bully] Erro ao contactar {s_id}: {e}")
-    if not recebeu_ok:
-        is_coordinator = True
-        coordinator_id = sensor_id
-        print(f"[Bully] {sensor_id} se declara o novo coordenador!")
-        anuncia_coordenador()
-    else:
-        print(f"[Bully] {sensor_id} aguardando anúncio do coordenador...")
-        time.sleep(10)
-        if coordinator_id is None:
-            print(f"[Bully] Tempo esgotado sem anúncio de coordenador, reiniciando eleição...")
-            inicia_eleicao()
-    election_in_progress = False
+    global election_in_progress
+    election_in_progress = True
+    try:
+        eleicao.inicia_eleicao()
+    finally:
+        election_in_progress = eleicao.em_andamento
 
 def anuncia_coordenador():
     """
     Anuncia o novo coordenador para os demais sensores.
     """
-    for s_id, (host, bully_port) in sensores_conhecidos.items():
-        if s_id == sensor_id:
-            continue
-        try:
-            channel = grpc.insecure_channel(f"{host}:{bully_port}")
-            stub = bully_pb2_grpc.BullyServiceStub(channel)
-            notificacao = bully_pb2.CoordinatorNotification(coordinator_id=coordinator_id)
-            response = stub.AnnounceCoordinator(notificacao, timeout=5)
-            if response.ok:
-                print(f"[Bully] {s_id} confirmou o novo coordenador")
-        except Exception as e:
-            print(f"[Bully] Erro ao anunciar para {s_id}: {e}")
-
-# --- Geração/carregamento das chaves RSA do sensor ---
-def load_or_generate_keys():
-    """
-    Gera ou carrega as chaves RSA do sensor.
-    """
-    priv_path = os.path.join(os.path.dirname(__file__), "sensor_private.pem")
-    pub_path = os.path.join(os.path.dirname(__file__), "sensor_public.pem")
-    if os.path.exists(priv_path):
-        with open(priv_path, "rb") as f:
-            private_key = serialization.load_pem_private_key(f.read(), password=None)
-    else:
-        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
-        with open(priv_path, "wb") as f:
-            f.write(private_key.private_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PrivateFormat.PKCS8,
-                encryption_algorithm=serialization.NoEncryption()
-            ))
-        with open(pub_path, "wb") as f:
-            f.write(private_key.public_key().public_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PublicFormat.SubjectPublicKeyInfo
-            ))
-    return private_key
-
-# Carrega as chaves ao iniciar o módulo
-private_key = load_or_generate_keys()
-public_key = private_key.public_key()
+    eleicao.anuncia_coordenador()
+
+# --- Detecção de falhas dos pares (batimentos UDP + phi accrual) ---
+batimentos = None  # BatimentosPares deste sensor (criado em inicia_detector_falhas)
+# Atraso por sensor de id maior antes de convocar eleição por suspeita (o maior vivo convoca primeiro)
+PASSO_ATRASO_ELEICAO = float(os.environ.get("SISD_ELEICAO_PASSO_ATRASO", 0.5))
+
+def ao_suspeitar_par(id_par):
+    """
+    Chamado quando o detector passa a suspeitar de um sensor; se for o coordenador, convoca eleição.
+    """
+    from common.bully import numero_do_id
+    suspeito = f"sensor_{id_par}"
+    print(f"[Falhas] Sensor {suspeito} sob suspeita. Estatísticas: {batimentos.detector.estatisticas()}")
+    if suspeito == coordinator_id and eleicao is not None:
+        maiores = [s_id for s_id in sensores_conhecidos
+                   if s_id != suspeito and numero_do_id(s_id) > numero_do_id(sensor_id)]
+        eleicao.convoca_por_suspeita(suspeito, PASSO_ATRASO_ELEICAO * len(maiores))
+
+def ao_recuperar_par(id_par):
+    print(f"[Falhas] Sensor sensor_{id_par} voltou a enviar batimentos")
+
+def inicia_detector_falhas(porta_base):
+    """
+    Inicia a troca de batimentos UDP (porta base + 3000) e o detector phi accrual.
+    """
+    global batimentos
+    from common.bully import numero_do_id
+    intervalo = float(os.environ.get("SISD_BATIMENTO_INTERVALO", 1.0))
+    detector = DetectorFalhas(intervalo_esperado=intervalo,
+                              limiar=float(os.environ.get("SISD_PHI_LIMIAR", 8.0)))
+    batimentos = BatimentosPares(
+        numero_do_id(sensor_id),
+        porta_base + 3000,
+        lambda: {numero_do_id(s_id): (host, numero_do_id(s_id) + 3000)
+                 for s_id, (host, _) in sensores_conhecidos.items()},
+        detector=detector,
+        intervalo=intervalo,
+        ao_suspeitar=ao_suspeitar_par,
+        ao_recuperar=ao_recuperar_par,
+    )
+    batimentos.inicia()
 
 # --- Main ---
+def inicia_servicos_controle(porta):
+    """
+    Sobe os serviços de controle (Bully via gRPC, detector de falhas, anel de token e
+    stream de status); roda em segundo plano depois que os listeners TCP estão abertos.
+    """
+    # Inicia o servidor Bully (porta + 1) e elege um coordenador (um nó que volta ao ar sempre convoca eleição)
+    inicia_bully_server(porta + 1)
+    threading.Thread(target=inicia_eleicao, daemon=True).start()
+
+    # Batimentos entre sensores: a suspeita do coordenador convoca uma nova eleição
+    inicia_detector_falhas(porta)
+
+    # Inicia o anel de token na porta + 2000 (enlaces persistentes e detecção de perda)
+    start_token_listener(porta + 2000)
+
+    # Inicia o stream de status (batimentos com métricas de carga) para o monitor via gRPC
+    envia_status_para_monitor(sensor_id)
+
 def main(porta=5000):
     """
     Função principal do sensor: inicializa módulos, threads e servidores.
     """
-    global sensor_id, election_in_progress
+    global sensor_id, election_in_progress, snapshot_store, publicador_alertas
+    inicio = time.monotonic()
     sensor_id = f"sensor_{porta}"
     election_in_progress = False
+    snapshot_store = abre_snapshot_store(SNAPSHOT_DIR, sensor_id)
 
     restaurar_estado_do_ultimo_snapshot()
 
     # Inicializa o log ao iniciar o sensor
     inicializa_log(sensor_id)
 
-    # Define a porta para o Bully gRPC (por exemplo, porta + 1)
-    bully_port = porta + 1
-
-    # Define a porta para o token
-    token_port = porta + 2000
-
-    # Inicia a thread para escutar o token
-    token_thread = threading.Thread(target=start_token_listener, args=(token_port,))
-    token_thread.daemon = True
-    token_thread.start()
-
-    # Inicia a thread para envio de status para o monitor via gRPC
-    status_thread = threading.Thread(target=envia_status_para_monitor, args=(sensor_id,))
-    status_thread.daemon = True
-    status_thread.start()
+    # Carrega (ou gera, na primeira execução) a chave RSA do sensor em segundo plano
+    armazem_chaves.aquece(sensor_id)
 
     # Inicia o servidor TCP para aceitar conexões de clientes
     servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     servidor.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) 
     servidor.bind(("0.0.0.0", porta))
     servidor.listen(5)
-    print(f"[Sensor] Servidor TCP iniciado na porta {porta}")
 
     # Inicia o servidor que escuta por marcadores do cliente
     inicia_marker_listener(porta)
+    print(f"[Sensor] Servidor TCP iniciado na porta {porta} "
+          f"({(time.monotonic() - inicio) * 1000:.0f} ms após o início do main)")
+
+    # Alertas de clima extremo pelo grupo multicast
+    if motor_regras.regras:
+        try:
+            publicador_alertas = abre_publicador()
+        except OSError as e:
+            print(f"[Sensor] Alertas multicast desativados: {e}")
+
+    threading.Thread(target=inicia_servicos_controle, args=(porta,), daemon=True).start()
 
     while True:
         conn, addr = servidor.accept()